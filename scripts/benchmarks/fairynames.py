@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Fairyname benchmark: signup name allocation against a large existing user base.
+
+Creates a scratch schema holding a minimal users table seeded with --existing generated
+fairynames, then runs --calls signups (pick a name, insert the user) with --concurrency
+in flight for each mode:
+
+    probe  generate a name and probe users for it, up to 10 times (the old signup path)
+    pool   claim a pre-generated name from fairyname_pool (the pool is refilled first,
+           and the refill rate is reported separately)
+
+Unique violations on insert are counted as errors. The scratch schema is dropped
+afterwards. Results include the git commit; pass --baseline with an earlier results
+file to print the change per mode.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/benchmarks/fairynames.py \\
+        --existing 2000000 --calls 5000 --concurrency 50 --output fairynames.json
+    python scripts/benchmarks/fairynames.py --modes pool --baseline fairynames.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+import asyncpg
+
+# Add project root and the identity service (flat imports) to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "services" / "identity"))
+
+from fairynames import (  # noqa: E402
+    _generate_unused_fairyname,
+    allocate_fairyname,
+    generate_fairyname,
+    refill_fairyname_pool,
+)
+
+from shared.database import DATABASE_URL, Database, init_connection  # noqa: E402
+
+MODES = ("probe", "pool")
+
+SEED_BATCH_SIZE = 100_000
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def create_schema(db: Database, schema: str, existing: int) -> None:
+    """Scratch users and fairyname_pool tables, users seeded with existing names"""
+    await db.execute_schema(
+        f"""
+        CREATE SCHEMA {schema};
+        CREATE TABLE {schema}.users (
+            id UUID PRIMARY KEY,
+            fairyname VARCHAR(50) UNIQUE NOT NULL
+        );
+        CREATE TABLE {schema}.fairyname_pool (
+            name VARCHAR(50) PRIMARY KEY,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            allocated_at TIMESTAMP WITH TIME ZONE
+        );
+        CREATE INDEX ON {schema}.fairyname_pool(name) WHERE allocated_at IS NULL;
+        """
+    )
+
+    seeded: set[str] = set()
+    while len(seeded) < existing:
+        batch = set()
+        while len(batch) < min(SEED_BATCH_SIZE, existing - len(seeded)):
+            name = generate_fairyname()
+            if name not in seeded:
+                batch.add(name)
+        async with db.transaction() as conn:
+            await conn.copy_records_to_table(
+                "users",
+                schema_name=schema,
+                records=[(uuid4(), name) for name in batch],
+                columns=["id", "fairyname"],
+            )
+        seeded |= batch
+        print(f"  seeded {len(seeded)}/{existing} users", flush=True)
+
+    await db.execute(f"ANALYZE {schema}.users")
+
+
+async def run_mode(db: Database, mode: str, args: argparse.Namespace) -> dict:
+    """Run --calls signups picking names the given way"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def signup():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if mode == "pool":
+                    fairyname = await allocate_fairyname(db)
+                else:
+                    fairyname = await _generate_unused_fairyname(db)
+                await db.execute(
+                    "INSERT INTO users (id, fairyname) VALUES ($1, $2)", uuid4(), fairyname
+                )
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(signup() for _ in range(args.calls)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "calls": args.calls,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "signups_per_second": round(args.calls / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+        },
+    }
+
+
+def print_comparison(results: list[dict], baseline_path: str) -> None:
+    """Change in signups/s and p95 per mode against an earlier results file"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    previous = {result["mode"]: result for result in baseline["results"]}
+    print(f"📊 Compared with {baseline_path} (commit {baseline.get('git_commit')}):")
+    for result in results:
+        before = previous.get(result["mode"])
+        if not before or not before["signups_per_second"]:
+            continue
+        throughput = (result["signups_per_second"] / before["signups_per_second"] - 1) * 100
+        p95_before = before["latency_ms"]["p95"]
+        p95 = (result["latency_ms"]["p95"] / p95_before - 1) * 100 if p95_before else 0.0
+        print(f"  {result['mode']:>6}: signups/s {throughput:+.1f}% | p95 {p95:+.1f}%")
+
+
+async def main(args: argparse.Namespace) -> None:
+    database_url = os.getenv("DATABASE_URL", DATABASE_URL)
+    modes = args.modes or list(MODES)
+    schema = f"fairyname_bench_{uuid4().hex[:8]}"
+    print(
+        f"🔄 Fairyname benchmark: {args.existing} existing users, {args.calls} signups per "
+        f"mode, concurrency {args.concurrency}"
+    )
+
+    pool = await asyncpg.create_pool(
+        database_url,
+        min_size=args.pool_size,
+        max_size=args.pool_size,
+        init=init_connection,
+        server_settings={"search_path": schema},
+    )
+    db = Database(pool)
+    refill = None
+
+    try:
+        await create_schema(db, schema, args.existing)
+
+        results = []
+        for mode in modes:
+            if mode == "pool":
+                started = time.perf_counter()
+                added = await refill_fairyname_pool(db, target=args.calls)
+                elapsed = time.perf_counter() - started
+                refill = {
+                    "names": added,
+                    "elapsed_seconds": round(elapsed, 4),
+                    "names_per_second": round(added / elapsed, 2) if elapsed else 0.0,
+                }
+            results.append(await run_mode(db, mode, args))
+    finally:
+        await db.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        await pool.close()
+
+    if refill:
+        print(f"  {'refill':>6}: {refill['names_per_second']:>9} names/s ({refill['names']} names)")
+    for result in results:
+        latency = result["latency_ms"]
+        print(
+            f"  {result['mode']:>6}: {result['signups_per_second']:>9} signups/s | "
+            f"p50 {latency['p50']}ms p95 {latency['p95']}ms p99 {latency['p99']}ms | "
+            f"errors {result['errors']}"
+        )
+
+    if args.baseline:
+        print_comparison(results, args.baseline)
+
+    if args.output:
+        payload = {
+            "benchmark": "fairynames",
+            "git_commit": git_commit(),
+            "config": {**vars(args), "modes": modes},
+            "refill": refill,
+            "results": results,
+        }
+        Path(args.output).write_text(json.dumps(payload, indent=2))
+        print(f"✅ Results written to {args.output}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--existing", type=int, default=1_000_000, help="Existing users")
+    parser.add_argument("--calls", type=int, default=5000, help="Signups per mode")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--modes", nargs="+", choices=MODES)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
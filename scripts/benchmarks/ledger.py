@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Ledger benchmark: throughput and latency of the core LedgerService operations.
+
+Runs consume_dust, grant_dust, get_balance and get_transactions against a local
+Postgres and either a local Redis or fakeredis, one operation at a time, with
+--concurrency calls in flight. --hot-ratio sends that fraction of calls to a single
+user to measure same-user contention (consume/grant then serialize on the balance lock;
+rejected calls are counted as conflicts, not errors).
+
+Benchmark users are created with a transaction history of --history rows each and
+deleted afterwards. Results include the git commit so runs can be compared; pass
+--baseline with an earlier results file to print the change per operation.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/benchmarks/ledger.py \\
+        --calls 2000 --concurrency 50 --users 200 --hot-ratio 0.1 --output ledger.json
+    python scripts/benchmarks/ledger.py --redis fake --baseline ledger.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+# Add project root and the ledger service (flat imports) to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "services" / "ledger"))
+
+from fastapi import HTTPException  # noqa: E402
+from ledger_service import LedgerService  # noqa: E402
+
+from shared.database import DATABASE_URL, Database, _create_pool  # noqa: E402
+
+OPERATIONS = ("consume", "grant", "get_balance", "get_transactions")
+
+STARTING_BALANCE = 1_000_000_000
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def create_redis(mode: str):
+    if mode == "fake":
+        try:
+            from fakeredis import aioredis
+        except ImportError:
+            sys.exit("❌ --redis fake needs fakeredis (and lupa for the balance lock scripts)")
+        return aioredis.FakeRedis(decode_responses=True)
+
+    import redis.asyncio as redis
+
+    return redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"), decode_responses=True)
+
+
+async def create_users(db: Database, run_id: str, count: int, history: int) -> list:
+    """Benchmark users with a starting balance and a transaction history"""
+    user_ids = [uuid4() for _ in range(count)]
+    async with db.transaction() as conn:
+        await conn.copy_records_to_table(
+            "users",
+            records=[
+                (user_id, f"bench_{run_id}_{i}", f"bench_{run_id}_{i}@bench.invalid", "bench")
+                for i, user_id in enumerate(user_ids)
+            ],
+            columns=["id", "fairyname", "email", "auth_provider"],
+        )
+        await conn.execute(
+            "UPDATE users SET dust_balance = $2 WHERE id = ANY($1::uuid[])",
+            user_ids,
+            STARTING_BALANCE,
+        )
+        await conn.copy_records_to_table(
+            "dust_transactions",
+            records=[
+                (uuid4(), user_id, -1, "consume", "completed", "Benchmark history")
+                for user_id in user_ids
+                for _ in range(history)
+            ],
+            columns=["id", "user_id", "amount", "type", "status", "description"],
+        )
+    return user_ids
+
+
+async def delete_users(db: Database, user_ids: list) -> None:
+    await db.execute("DELETE FROM users WHERE id = ANY($1::uuid[])", user_ids)
+
+
+async def run_operation(
+    ledger: LedgerService, operation: str, user_ids: list, args: argparse.Namespace
+) -> dict:
+    """Run --calls of one operation and collect throughput and latency"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    app_id = uuid4()
+    latencies: list[float] = []
+    conflicts = errors = 0
+
+    def pick_user():
+        if len(user_ids) == 1 or random.random() < args.hot_ratio:
+            return user_ids[0]
+        return random.choice(user_ids[1:])
+
+    async def call(n: int):
+        user_id = pick_user()
+        if operation == "consume":
+            await ledger.consume_dust(
+                user_id, 1, app_id, "benchmark", idempotency_key=f"bench:{uuid4()}:{n}"
+            )
+        elif operation == "grant":
+            await ledger.grant_dust(user_id, 1, "Benchmark grant")
+        elif operation == "get_balance":
+            await ledger.get_balance(user_id, use_cache=not args.no_balance_cache)
+        else:
+            await ledger.get_transactions(user_id, limit=args.page_size)
+
+    async def one_call(n: int):
+        nonlocal conflicts, errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call(n)
+            except HTTPException as e:
+                if e.status_code == 409:
+                    conflicts += 1
+                else:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_call(n) for n in range(args.calls)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "operation": operation,
+        "calls": args.calls,
+        "conflicts": conflicts,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "ops_per_second": round(args.calls / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+        },
+    }
+
+
+def print_comparison(results: list[dict], baseline_path: str) -> None:
+    """Change in ops/s and p95 per operation against an earlier results file"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    previous = {result["operation"]: result for result in baseline["results"]}
+    print(f"📊 Compared with {baseline_path} (commit {baseline.get('git_commit')}):")
+    for result in results:
+        before = previous.get(result["operation"])
+        if not before or not before["ops_per_second"]:
+            continue
+        throughput = (result["ops_per_second"] / before["ops_per_second"] - 1) * 100
+        p95_before = before["latency_ms"]["p95"]
+        p95 = (result["latency_ms"]["p95"] / p95_before - 1) * 100 if p95_before else 0.0
+        print(f"  {result['operation']:>16}: ops/s {throughput:+.1f}% | p95 {p95:+.1f}%")
+
+
+async def main(args: argparse.Namespace) -> None:
+    database_url = os.getenv("DATABASE_URL", DATABASE_URL)
+    operations = args.operations or list(OPERATIONS)
+    print(
+        f"🔄 Ledger benchmark: {args.calls} calls per operation, concurrency "
+        f"{args.concurrency}, {args.users} users, hot ratio {args.hot_ratio}, redis {args.redis}"
+    )
+
+    pool = await _create_pool(database_url, None, args.pool_size, args.pool_size)
+    redis_client = await create_redis(args.redis)
+    db = Database(pool)
+    ledger = LedgerService(db, redis_client)
+    run_id = uuid4().hex[:8]
+    user_ids = await create_users(db, run_id, args.users, args.history)
+
+    try:
+        # Warm up connections, prepared statements and caches
+        warmup = argparse.Namespace(**{**vars(args), "calls": min(args.calls, 100)})
+        for operation in operations:
+            await run_operation(ledger, operation, user_ids, warmup)
+
+        results = [
+            await run_operation(ledger, operation, user_ids, args) for operation in operations
+        ]
+    finally:
+        if not args.keep_users:
+            await delete_users(db, user_ids)
+        await redis_client.close()
+        await pool.close()
+
+    for result in results:
+        latency = result["latency_ms"]
+        print(
+            f"  {result['operation']:>16}: {result['ops_per_second']:>9} ops/s | "
+            f"p50 {latency['p50']}ms p95 {latency['p95']}ms p99 {latency['p99']}ms | "
+            f"conflicts {result['conflicts']} | errors {result['errors']}"
+        )
+
+    if args.baseline:
+        print_comparison(results, args.baseline)
+
+    if args.output:
+        payload = {
+            "benchmark": "ledger",
+            "git_commit": git_commit(),
+            "config": {**vars(args), "operations": operations},
+            "results": results,
+        }
+        Path(args.output).write_text(json.dumps(payload, indent=2))
+        print(f"✅ Results written to {args.output}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=2000, help="Calls per operation")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument(
+        "--hot-ratio", type=float, default=0.0, help="Fraction of calls hitting one user"
+    )
+    parser.add_argument("--history", type=int, default=50, help="Transactions per user")
+    parser.add_argument("--page-size", type=int, default=50, help="get_transactions limit")
+    parser.add_argument("--no-balance-cache", action="store_true")
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS)
+    parser.add_argument("--redis", choices=("local", "fake"), default="local")
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--keep-users", action="store_true", help="Skip deleting bench users")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
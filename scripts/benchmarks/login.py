@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Login benchmark: OTP logins per second for returning and new users.
+
+Each login consumes a stored OTP, finds or creates the user and counts the login, reads
+the login system config and issues tokens, against a local Postgres and either a local
+Redis or fakeredis, with --concurrency logins in flight. Modes:
+
+    pipeline    the identity service's login path (OTP checked and consumed by one
+                script, one upsert statement, config served from memory)
+    sequential  the same work as separate round trips: user lookup, insert for new
+                users, login counter UPDATE, two system_config reads, OTP GET and DELETE,
+                refresh-token SETEX
+
+--new-ratio sets the fraction of logins by users that don't exist yet. Benchmark users
+(and their outbox events and pooled names) are deleted afterwards. Results include the
+git commit so runs can be compared; pass --baseline with an earlier results file to
+print the change per mode.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/benchmarks/login.py \\
+        --logins 5000 --concurrency 50 --users 1000 --new-ratio 0.05 --output login.json
+    python scripts/benchmarks/login.py --redis fake --baseline login.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+# Add project root and the identity service (flat imports) to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "services" / "identity"))
+
+from auth import AuthService  # noqa: E402
+from fairynames import allocate_fairyname, refill_fairyname_pool  # noqa: E402
+from login import upsert_otp_user  # noqa: E402
+
+from shared.database import DATABASE_URL, Database, _create_pool  # noqa: E402
+from shared.system_config import system_config  # noqa: E402
+
+MODES = ("pipeline", "sequential")
+
+OTP = "123456"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def create_redis(mode: str):
+    if mode == "fake":
+        try:
+            from fakeredis import aioredis
+        except ImportError:
+            sys.exit("❌ --redis fake needs fakeredis (and lupa for the OTP script)")
+        return aioredis.FakeRedis(decode_responses=True)
+
+    import redis.asyncio as redis
+
+    return redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"), decode_responses=True)
+
+
+async def create_users(db: Database, run_id: str, count: int) -> list[str]:
+    """Existing benchmark users; returns their emails"""
+    emails = [f"login_{run_id}_{i}@bench.invalid" for i in range(count)]
+    async with db.transaction() as conn:
+        await conn.copy_records_to_table(
+            "users",
+            records=[
+                (uuid4(), f"bench_{run_id}_{i}", email, "otp")
+                for i, email in enumerate(emails)
+            ],
+            columns=["id", "fairyname", "email", "auth_provider"],
+        )
+    return emails
+
+
+async def delete_users(db: Database, run_id: str) -> None:
+    pattern = f"login_{run_id}_%@bench.invalid"
+    async with db.transaction() as conn:
+        await conn.execute(
+            """
+            DELETE FROM outbox_events WHERE event_type = 'user.created'
+              AND aggregate_id IN (SELECT id FROM users WHERE email LIKE $1)
+            """,
+            pattern,
+        )
+        await conn.execute(
+            """
+            DELETE FROM fairyname_pool
+            WHERE name IN (SELECT fairyname FROM users WHERE email LIKE $1)
+            """,
+            pattern,
+        )
+        await conn.execute("DELETE FROM users WHERE email LIKE $1", pattern)
+
+
+async def sequential_login(db: Database, auth: AuthService, email: str) -> None:
+    """The login as separate round trips"""
+    if not await auth.verify_otp(email, OTP):
+        raise ValueError("OTP rejected")
+
+    user = await db.fetch_one("SELECT * FROM users WHERE email = $1", email)
+    if not user:
+        user = await db.fetch_one(
+            """
+            INSERT INTO users (id, fairyname, email, dust_balance, auth_provider)
+            VALUES ($1, $2, $3, 0, 'otp')
+            RETURNING *
+            """,
+            uuid4(),
+            await allocate_fairyname(db),
+            email,
+        )
+    await db.execute(
+        "UPDATE users SET total_logins = total_logins + 1, updated_at = CURRENT_TIMESTAMP "
+        "WHERE id = $1",
+        user["id"],
+    )
+    for key in ("daily_login_bonus_amount", "initial_dust_amount"):
+        await db.fetch_one("SELECT value FROM system_config WHERE key = $1", key)
+
+    await auth.create_access_token({"user_id": str(user["id"])})
+    await auth.create_refresh_token({"user_id": str(user["id"])})
+
+
+async def pipeline_login(db: Database, auth: AuthService, email: str) -> None:
+    """The identity service's login path"""
+    if not await auth.consume_otp(email, OTP):
+        raise ValueError("OTP rejected")
+
+    user, _ = await upsert_otp_user(db, "email", email)
+    system_config.get("daily_login_bonus_amount")
+    system_config.get("initial_dust_amount")
+    await auth.issue_tokens({"user_id": str(user["id"])})
+
+
+async def run_mode(
+    db: Database, auth: AuthService, mode: str, emails: list[str], args: argparse.Namespace
+) -> dict:
+    """Run --logins logins the given way and collect throughput and latency"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    login = pipeline_login if mode == "pipeline" else sequential_login
+    run_id = uuid4().hex[:8]
+    latencies: list[float] = []
+    errors = 0
+
+    # Pick each login's user up front; a user logs in once at a time, since a login
+    # consumes the user's OTP
+    logins = [
+        f"login_{args.run_id}_new_{run_id}_{n}@bench.invalid"
+        if random.random() < args.new_ratio
+        else random.choice(emails)
+        for n in range(args.logins)
+    ]
+    user_locks = {email: asyncio.Lock() for email in logins}
+
+    async def one_login(email: str):
+        nonlocal errors
+        async with user_locks[email], semaphore:
+            # Storing the OTP is part of the run time but not of the login's latency
+            await auth.redis.setex(f"otp:{email}", 600, OTP)
+            started = time.perf_counter()
+            try:
+                await login(db, auth, email)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_login(email) for email in logins))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "logins": args.logins,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "logins_per_second": round(args.logins / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+        },
+    }
+
+
+def print_comparison(results: list[dict], baseline_path: str) -> None:
+    """Change in logins/s and p95 per mode against an earlier results file"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    previous = {result["mode"]: result for result in baseline["results"]}
+    print(f"📊 Compared with {baseline_path} (commit {baseline.get('git_commit')}):")
+    for result in results:
+        before = previous.get(result["mode"])
+        if not before or not before["logins_per_second"]:
+            continue
+        throughput = (result["logins_per_second"] / before["logins_per_second"] - 1) * 100
+        p95_before = before["latency_ms"]["p95"]
+        p95 = (result["latency_ms"]["p95"] / p95_before - 1) * 100 if p95_before else 0.0
+        print(f"  {result['mode']:>10}: logins/s {throughput:+.1f}% | p95 {p95:+.1f}%")
+
+
+async def main(args: argparse.Namespace) -> None:
+    database_url = os.getenv("DATABASE_URL", DATABASE_URL)
+    modes = args.modes or list(MODES)
+    args.run_id = uuid4().hex[:8]
+    print(
+        f"🔄 Login benchmark: {args.logins} logins per mode, concurrency {args.concurrency}, "
+        f"{args.users} users, new-user ratio {args.new_ratio}, redis {args.redis}"
+    )
+
+    pool = await _create_pool(database_url, None, args.pool_size, args.pool_size)
+    redis_client = await create_redis(args.redis)
+    db = Database(pool)
+    auth = AuthService(redis_client)
+    emails = await create_users(db, args.run_id, args.users)
+
+    try:
+        # New users claim pooled names, as in production
+        await refill_fairyname_pool(db, target=int(args.logins * args.new_ratio * 2) + 100)
+
+        await system_config.load(db)
+
+        # Warm up connections and prepared statements
+        warmup = argparse.Namespace(**{**vars(args), "logins": min(args.logins, 100)})
+        for mode in modes:
+            await run_mode(db, auth, mode, emails, warmup)
+
+        results = [await run_mode(db, auth, mode, emails, args) for mode in modes]
+    finally:
+        await delete_users(db, args.run_id)
+        await auth.http_client.aclose()
+        await redis_client.close()
+        await pool.close()
+
+    for result in results:
+        latency = result["latency_ms"]
+        print(
+            f"  {result['mode']:>10}: {result['logins_per_second']:>9} logins/s | "
+            f"p50 {latency['p50']}ms p95 {latency['p95']}ms p99 {latency['p99']}ms | "
+            f"errors {result['errors']}"
+        )
+
+    if args.baseline:
+        print_comparison(results, args.baseline)
+
+    if args.output:
+        payload = {
+            "benchmark": "login",
+            "git_commit": git_commit(),
+            "config": {**vars(args), "modes": modes},
+            "results": results,
+        }
+        Path(args.output).write_text(json.dumps(payload, indent=2))
+        print(f"✅ Results written to {args.output}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=5000, help="Logins per mode")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=1000, help="Existing users")
+    parser.add_argument(
+        "--new-ratio", type=float, default=0.05, help="Fraction of logins by new users"
+    )
+    parser.add_argument("--modes", nargs="+", choices=MODES)
+    parser.add_argument("--redis", choices=("local", "fake"), default="local")
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Pool-pressure benchmark: per-call connection acquisition vs request-scoped sessions.
+
+Simulates handlers like verify_otp that run several sequential queries. Each
+simulated request runs --queries statements either through a plain Database
+(one pool.acquire() per statement) or through Database.connection() (one acquire
+per request), with --concurrency requests in flight against a deliberately small
+pool.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/benchmarks/pool_pressure.py \\
+        --requests 2000 --concurrency 50 --queries 8 --pool-size 8 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import asyncpg  # noqa: E402
+
+from shared.database import DATABASE_URL, Database  # noqa: E402
+from shared.db_metrics import query_metrics  # noqa: E402
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def simulated_request(db: Database, queries: int, query_sleep_ms: float) -> None:
+    """Run a handler-shaped sequence of small queries"""
+    for i in range(queries):
+        if query_sleep_ms:
+            await db.execute("SELECT pg_sleep($1)", query_sleep_ms / 1000)
+        else:
+            await db.fetch_one("SELECT $1::int AS n", i)
+
+
+async def run_mode(pool: asyncpg.Pool, mode: str, args: argparse.Namespace) -> dict:
+    """Run the workload in one mode and collect latency and pool-wait statistics"""
+    db = Database(pool)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one_request():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if mode == "session":
+                    async with db.connection() as session:
+                        await simulated_request(session, args.queries, args.query_sleep_ms)
+                else:
+                    await simulated_request(db, args.queries, args.query_sleep_ms)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    query_metrics.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    pool_acquire = query_metrics.snapshot()["pool_acquire"]
+    return {
+        "mode": mode,
+        "requests": args.requests,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "requests_per_second": round(args.requests / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+        },
+        "pool_acquires": pool_acquire["count"],
+        "pool_wait_seconds_total": pool_acquire["seconds_total"],
+        "pool_wait_seconds_max": pool_acquire["seconds_max"],
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    database_url = os.getenv("DATABASE_URL", DATABASE_URL)
+    print(
+        f"🔄 Pool pressure benchmark: {args.requests} requests x {args.queries} queries, "
+        f"concurrency {args.concurrency}, pool size {args.pool_size}"
+    )
+
+    pool = await asyncpg.create_pool(
+        database_url, min_size=args.pool_size, max_size=args.pool_size
+    )
+    try:
+        # Warm up connections and statement caches
+        await run_mode(pool, "per_call", argparse.Namespace(**{**vars(args), "requests": 50}))
+
+        results = [await run_mode(pool, mode, args) for mode in ("per_call", "session")]
+    finally:
+        await pool.close()
+
+    for result in results:
+        latency = result["latency_ms"]
+        print(
+            f"  {result['mode']:>8}: {result['requests_per_second']:>9} req/s | "
+            f"p50 {latency['p50']}ms p95 {latency['p95']}ms p99 {latency['p99']}ms | "
+            f"acquires {result['pool_acquires']} | "
+            f"pool wait {result['pool_wait_seconds_total']}s | errors {result['errors']}"
+        )
+
+    if args.output:
+        payload = {"benchmark": "pool_pressure", "config": vars(args), "results": results}
+        Path(args.output).write_text(json.dumps(payload, indent=2))
+        print(f"✅ Results written to {args.output}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=8, help="Sequential queries per request")
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument(
+        "--query-sleep-ms", type=float, default=0.0, help="Server-side time per query"
+    )
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Convert dust_transactions and ai_usage_logs to monthly range partitions.
+
+Existing rows stay in place as a single <table>_legacy partition; new rows go to
+monthly partitions. Each table is converted in one transaction under an exclusive
+lock, so run this during a quiet period, after the services have applied the current
+schema. Safe to re-run: partitioned tables are skipped.
+
+Usage:
+    DATABASE_URL=your_database_url python scripts/partition_tables.py [table ...]
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+
+async def run_migration(tables: list[str]) -> bool:
+    """Convert the given tables (default: all partitioned tables)"""
+    if not os.getenv("DATABASE_URL"):
+        print("❌ DATABASE_URL environment variable not set")
+        return False
+
+    try:
+        from shared.database import get_db, init_db
+        from shared.partitioning import PARTITIONED_TABLES, convert_to_partitioned
+
+        await init_db()
+        db = await get_db()
+        print("✅ Connected to database")
+
+        known = [table.name for table in PARTITIONED_TABLES]
+        for table in tables or known:
+            if table not in known:
+                print(f"❌ {table} is not a partitioned table ({', '.join(known)})")
+                return False
+
+            print(f"🔄 Converting {table}...")
+            if await convert_to_partitioned(db, table):
+                print(f"✅ {table} is now partitioned by month")
+            else:
+                print(f"✓ {table} is already partitioned, skipping")
+
+        return True
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+    finally:
+        from shared.database import close_db
+
+        await close_db()
+
+
+if __name__ == "__main__":
+    success = asyncio.run(run_migration(sys.argv[1:]))
+    sys.exit(0 if success else 1)
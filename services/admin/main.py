@@ -8,7 +8,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 
 from shared.database import close_db, init_db
-from shared.redis_client import close_redis, init_redis
+from shared.db_metrics import metrics_router
+from shared.redis_client import close_redis, get_redis, init_redis
+from shared.sessions import start_revocation_sync, stop_revocation_sync
 
 
 @asynccontextmanager
@@ -31,6 +33,9 @@ async def lifespan(app: FastAPI):
         await init_redis()
         logger.info("Redis initialized successfully")
 
+        # Admin payment routes authenticate bearer tokens through shared.auth
+        await start_revocation_sync(await get_redis())
+
         logger.info("Admin service startup completed")
         yield
 
@@ -40,6 +45,7 @@ async def lifespan(app: FastAPI):
     finally:
         # Shutdown
         logger.info("Shutting down admin service...")
+        await stop_revocation_sync()
         await close_db()
         await close_redis()
         logger.info("Admin service shutdown completed")
@@ -125,6 +131,7 @@ app.include_router(terms_router, prefix="/admin/terms")
 app.include_router(system_router, prefix="/admin/system")
 app.include_router(model_configs_router, prefix="/admin/model-configs")
 app.include_router(global_config_router, prefix="/api")  # Global API endpoint
+app.include_router(metrics_router)  # Must precede the React catch-all route
 
 # Dynamic asset serving for any file with cache-busting
 static_dir = Path(__file__).parent / "static"
@@ -1,7 +1,10 @@
+from datetime import datetime, timedelta, timezone
+
 from auth import get_current_admin_user
 from fastapi import APIRouter, Depends
 
-from shared.database import Database, get_db
+from shared.ai_usage_rollups import fetch_ai_usage
+from shared.database import Database, get_read_db
 
 ai_router = APIRouter()
 
@@ -10,178 +13,133 @@ ai_router = APIRouter()
 async def get_ai_usage_metrics(
     timeframe: str = "7d",
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get AI usage metrics for all model types (Text, Image, Video)"""
 
-    # Map timeframe to SQL interval
-    interval_map = {"1d": "1 day", "7d": "7 days", "30d": "30 days", "90d": "90 days"}
-    interval = interval_map.get(timeframe, "7 days")
-
-    # Get text/LLM model stats from ai_usage_logs
-    text_stats = await db.fetch_one(
-        f"""
-        SELECT
-            COUNT(*) as total_requests,
-            SUM(COALESCE(prompt_tokens, 0) + COALESCE(completion_tokens, 0)) as total_tokens,
-            SUM(cost_usd) as total_cost_usd,
-            AVG(latency_ms) as avg_latency_ms
-        FROM ai_usage_logs
-        WHERE created_at >= NOW() - INTERVAL '{interval}'
-        AND model_type = 'text'
-        """
-    )
+    # Map timeframe to a window
+    days_map = {"1d": 1, "7d": 7, "30d": 30, "90d": 90}
+    window_start = datetime.now(timezone.utc) - timedelta(days=days_map.get(timeframe, 7))
 
-    # Get image usage stats from ai_usage_logs
-    image_stats = await db.fetch_one(
-        f"""
-        SELECT
-            COUNT(*) as total_images,
-            SUM(cost_usd) as total_cost_usd,
-            AVG(latency_ms) as avg_latency_ms
-        FROM ai_usage_logs
-        WHERE created_at >= NOW() - INTERVAL '{interval}'
-        AND model_type = 'image'
-        """
+    # One pass over rollups (plus raw rows for the unfinished hour), grouped finely enough
+    # to derive totals, the model breakdown and per-app usage in Python
+    usage = await fetch_ai_usage(
+        db, window_start, group_by=("app_id", "model_type", "provider", "model_id")
     )
 
-    # Get video usage stats from ai_usage_logs
-    video_stats = await db.fetch_one(
-        f"""
-        SELECT
-            COUNT(*) as total_videos,
-            SUM(cost_usd) as total_cost_usd,
-            AVG(latency_ms) as avg_latency_ms
-        FROM ai_usage_logs
-        WHERE created_at >= NOW() - INTERVAL '{interval}'
-        AND model_type = 'video'
-        """
-    )
+    def combine(rows: list[dict]) -> dict:
+        totals = dict.fromkeys(
+            (
+                "request_count",
+                "prompt_tokens",
+                "completion_tokens",
+                "tokens",
+                "images_generated",
+                "videos_generated",
+                "latency_ms_sum",
+            ),
+            0,
+        )
+        totals["cost_usd"] = 0.0
+        for row in rows:
+            for key in totals:
+                totals[key] += row[key]
+        count = totals["request_count"]
+        totals["avg_latency_ms"] = totals["latency_ms_sum"] / count if count else 0.0
+        return totals
+
+    by_type = {
+        model_type: combine([row for row in usage if row["model_type"] == model_type])
+        for model_type in ("text", "image", "video")
+    }
+    text_stats, image_stats, video_stats = by_type["text"], by_type["image"], by_type["video"]
 
-    # Combine stats (convert Decimal to float for JSON serialization)
     total_stats = {
-        "total_requests": (text_stats["total_requests"] if text_stats else 0)
-        + (image_stats["total_images"] if image_stats else 0)
-        + (video_stats["total_videos"] if video_stats else 0),
-        "total_tokens": (text_stats["total_tokens"] if text_stats else 0),
-        "total_images": (image_stats["total_images"] if image_stats else 0),
-        "total_videos": (video_stats["total_videos"] if video_stats else 0),
-        "total_cost_usd": (
-            float(
-                text_stats["total_cost_usd"] if text_stats and text_stats["total_cost_usd"] else 0
-            )
-            + float(
-                image_stats["total_cost_usd"]
-                if image_stats and image_stats["total_cost_usd"]
-                else 0
-            )
-            + float(
-                video_stats["total_cost_usd"]
-                if video_stats and video_stats["total_cost_usd"]
-                else 0
-            )
-        ),
-        "avg_latency_ms": float(
-            text_stats["avg_latency_ms"] if text_stats and text_stats["avg_latency_ms"] else 0
-        ),
+        "total_requests": text_stats["request_count"]
+        + image_stats["request_count"]
+        + video_stats["request_count"],
+        "total_tokens": text_stats["tokens"],
+        "total_images": image_stats["request_count"],
+        "total_videos": video_stats["request_count"],
+        "total_cost_usd": text_stats["cost_usd"]
+        + image_stats["cost_usd"]
+        + video_stats["cost_usd"],
+        "avg_latency_ms": float(text_stats["avg_latency_ms"]),
     }
 
-    # Get model breakdown for all model types from ai_usage_logs
-    all_model_stats = await db.fetch_all(
-        f"""
-        SELECT
-            provider,
-            model_id,
-            model_type,
-            COUNT(*) as requests,
-            SUM(cost_usd) as cost,
-            AVG(latency_ms) as avg_latency,
-            SUM(COALESCE(prompt_tokens, 0) + COALESCE(completion_tokens, 0)) as tokens,
-            SUM(CASE WHEN model_type = 'image' THEN images_generated ELSE 0 END) as images,
-            SUM(CASE WHEN model_type = 'video' THEN videos_generated ELSE 0 END) as videos
-        FROM ai_usage_logs
-        WHERE created_at >= NOW() - INTERVAL '{interval}'
-        GROUP BY provider, model_id, model_type
-        ORDER BY cost DESC
-        LIMIT 15
-        """
-    )
+    # Model breakdown across all model types
+    models: dict[tuple, list[dict]] = {}
+    for row in usage:
+        models.setdefault((row["provider"], row["model_id"], row["model_type"]), []).append(row)
 
-    # Get per-app usage analytics from ai_usage_logs
-    app_usage_stats = await db.fetch_all(
-        f"""
-        SELECT
-            a.name as app_name,
-            a.slug as app_slug,
-            COUNT(l.id) as total_requests,
-            AVG(COALESCE(l.prompt_tokens, 0)) as avg_prompt_tokens,
-            AVG(COALESCE(l.completion_tokens, 0)) as avg_completion_tokens,
-            AVG(COALESCE(l.prompt_tokens, 0) + COALESCE(l.completion_tokens, 0)) as avg_total_tokens,
-            SUM(CASE WHEN l.model_type = 'image' THEN l.images_generated ELSE 0 END) as total_images,
-            SUM(CASE WHEN l.model_type = 'video' THEN l.videos_generated ELSE 0 END) as total_videos,
-            AVG(l.cost_usd) as avg_cost_per_request,
-            SUM(l.cost_usd) as total_cost
-        FROM apps a
-        LEFT JOIN ai_usage_logs l ON a.id = l.app_id
-            AND l.created_at >= NOW() - INTERVAL '{interval}'
-        WHERE l.id IS NOT NULL
-        GROUP BY a.id, a.name, a.slug
-        ORDER BY total_cost DESC
-        """
+    model_breakdown = []
+    for (provider, model_id, model_type), rows in models.items():
+        totals = combine(rows)
+        model_breakdown.append(
+            {
+                "provider": provider,
+                "model_id": model_id,
+                "model_type": model_type,
+                "requests": totals["request_count"],
+                "cost": totals["cost_usd"],
+                "avg_latency": float(totals["avg_latency_ms"]),
+                "tokens": totals["tokens"],
+                "images": totals["images_generated"],
+                "videos": totals["videos_generated"],
+            }
+        )
+    model_breakdown.sort(key=lambda model: model["cost"], reverse=True)
+    model_breakdown = model_breakdown[:15]
+
+    # Per-app usage with the models each app used
+    by_app: dict = {}
+    for row in usage:
+        by_app.setdefault(row["app_id"], []).append(row)
+
+    apps = await db.fetch_all(
+        "SELECT id, name, slug FROM apps WHERE id = ANY($1::uuid[])", list(by_app)
     )
 
-    # Format app usage with models_used array
     formatted_app_usage = []
-    for app in app_usage_stats:
-        # Get models used by this app from ai_usage_logs
-        models_used = await db.fetch_all(
-            f"""
-            SELECT DISTINCT
-                model_id,
-                model_type,
-                COUNT(*) as requests,
-                SUM(cost_usd) as cost,
-                AVG(latency_ms) as avg_latency_ms
-            FROM ai_usage_logs
-            WHERE app_id = (SELECT id FROM apps WHERE slug = $1)
-                AND created_at >= NOW() - INTERVAL '{interval}'
-            GROUP BY model_id, model_type
-            ORDER BY cost DESC
-            """,
-            app["app_slug"],
-        )
+    for app in apps:
+        rows = by_app[app["id"]]
+        totals = combine(rows)
+        count = totals["request_count"]
+
+        app_models: dict[tuple, list[dict]] = {}
+        for row in rows:
+            app_models.setdefault((row["model_id"], row["model_type"]), []).append(row)
+
+        models_used = []
+        for (model_id, model_type), model_rows in app_models.items():
+            model_totals = combine(model_rows)
+            models_used.append(
+                {
+                    "model_id": model_id,
+                    "model_type": model_type,
+                    "requests": model_totals["request_count"],
+                    "cost": model_totals["cost_usd"],
+                    "avg_latency_ms": float(model_totals["avg_latency_ms"]),
+                }
+            )
+        models_used.sort(key=lambda model: model["cost"], reverse=True)
 
-        # Convert Decimal types to float for JSON serialization
-        app_dict = dict(app)
-        for key in [
-            "avg_prompt_tokens",
-            "avg_completion_tokens",
-            "avg_total_tokens",
-            "avg_cost_per_request",
-            "total_cost",
-        ]:
-            if app_dict.get(key) is not None:
-                app_dict[key] = float(app_dict[key])
-
-        # Convert model data Decimal types to float
-        models_dict = []
-        for model in models_used:
-            model_dict = dict(model)
-            for key in ["cost", "avg_latency_ms"]:
-                if model_dict.get(key) is not None:
-                    model_dict[key] = float(model_dict[key])
-            models_dict.append(model_dict)
-
-        formatted_app_usage.append({**app_dict, "models_used": models_dict})
-
-    # Convert model breakdown Decimal types to float
-    model_breakdown = []
-    for row in all_model_stats:
-        row_dict = dict(row)
-        for key in ["cost", "avg_latency"]:
-            if row_dict.get(key) is not None:
-                row_dict[key] = float(row_dict[key])
-        model_breakdown.append(row_dict)
+        formatted_app_usage.append(
+            {
+                "app_name": app["name"],
+                "app_slug": app["slug"],
+                "total_requests": count,
+                "avg_prompt_tokens": totals["prompt_tokens"] / count,
+                "avg_completion_tokens": totals["completion_tokens"] / count,
+                "avg_total_tokens": totals["tokens"] / count,
+                "total_images": totals["images_generated"],
+                "total_videos": totals["videos_generated"],
+                "avg_cost_per_request": totals["cost_usd"] / count,
+                "total_cost": totals["cost_usd"],
+                "models_used": models_used,
+            }
+        )
+    formatted_app_usage.sort(key=lambda app: app["total_cost"], reverse=True)
 
     return {
         "timeframe": timeframe,
@@ -196,7 +154,7 @@ async def get_ai_model_usage(
     type: str = "all",
     timeframe: str = "7d",
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get model usage statistics for all AI model types"""
 
@@ -240,7 +198,7 @@ async def get_ai_model_usage(
 async def get_ai_action_analytics(
     timeframe: str = "7d",
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get AI usage analytics by action-slug for all model types"""
 
@@ -350,7 +308,7 @@ async def get_ai_action_analytics(
 async def get_ai_fallback_analytics(
     timeframe: str = "7d",
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get AI fallback usage analytics and provider reliability metrics for all model types"""
 
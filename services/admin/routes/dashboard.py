@@ -5,7 +5,7 @@ import httpx
 from auth import get_current_admin_user
 from fastapi import APIRouter, Depends
 
-from shared.database import Database, get_db
+from shared.database import Database, get_read_db
 
 dashboard_router = APIRouter()
 
@@ -64,7 +64,7 @@ async def check_service_health() -> dict:
 @dashboard_router.get("/dashboard/stats")
 async def get_dashboard_stats(
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get dashboard statistics for React app"""
     total_users = await db.fetch_one("SELECT COUNT(*) as count FROM users WHERE is_active = true")
@@ -85,8 +85,9 @@ async def get_dashboard_stats(
     total_dust_consumed = await db.fetch_one(
         "SELECT COALESCE(SUM(ABS(amount)), 0) as total FROM dust_transactions WHERE type = 'consume'"
     )
+    # Range on created_at (not DATE(created_at)) so only today's partition is scanned
     dust_consumed_today = await db.fetch_one(
-        "SELECT COALESCE(SUM(ABS(amount)), 0) as total FROM dust_transactions WHERE type = 'consume' AND DATE(created_at) = CURRENT_DATE"
+        "SELECT COALESCE(SUM(ABS(amount)), 0) as total FROM dust_transactions WHERE type = 'consume' AND created_at >= CURRENT_DATE AND created_at < CURRENT_DATE + INTERVAL '1 day'"
     )
     dust_consumed_week = await db.fetch_one(
         "SELECT COALESCE(SUM(ABS(amount)), 0) as total FROM dust_transactions WHERE type = 'consume' AND created_at >= CURRENT_DATE - INTERVAL '7 days'"
@@ -130,7 +131,7 @@ async def get_system_health(admin_user: dict = Depends(get_current_admin_user)):
 @dashboard_router.get("/dashboard/recent-users")
 async def get_recent_users(
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get recent users by app usage (not account creation) for React app"""
     recent_users = await db.fetch_all(
@@ -152,7 +153,7 @@ async def get_recent_users(
 @dashboard_router.get("/dashboard/recent-apps")
 async def get_recent_apps(
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get recent apps for React app"""
     recent_apps = await db.fetch_all(
@@ -173,7 +174,7 @@ async def get_recent_apps(
 @dashboard_router.get("/dashboard/recent-activity")
 async def get_recent_activity(
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get recent DUST activity (both consumption and grants) for React app"""
     recent_activity = await db.fetch_all(
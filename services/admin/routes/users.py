@@ -3,7 +3,11 @@ from typing import Optional
 from auth import get_current_admin_user
 from fastapi import APIRouter, Depends, HTTPException
 
-from shared.database import Database, get_db
+from shared.account_deletion import request_account_deletion
+from shared.database import Database, get_db, get_read_db
+from shared.ledger_stats import record_ledger_transaction
+from shared.redis_client import get_redis
+from shared.sessions import revoke_user_sessions
 
 users_router = APIRouter()
 
@@ -16,7 +20,7 @@ async def get_users_json(
     search: Optional[str] = None,
     filter: Optional[str] = None,
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get users list as JSON for React app"""
     offset = (page - 1) * limit
@@ -141,6 +145,10 @@ async def update_user_json(
         *params,
     )
 
+    # A deactivated user is signed out everywhere at once
+    if "is_active" in update_data and not update_data["is_active"]:
+        await revoke_user_sessions(await get_redis(), user_id)
+
     return {"success": True, "message": "User updated successfully"}
 
 
@@ -150,112 +158,35 @@ async def delete_user_json(
     admin_user: dict = Depends(get_current_admin_user),
     db: Database = Depends(get_db),
 ):
-    """Delete user via JSON API with audit logging"""
-    import json
-    from datetime import datetime
-
-    from shared.uuid_utils import generate_uuid7
-
-    # Verify user exists
-    user_data = await db.fetch_one(
-        """SELECT fairyname, email, created_at, dust_balance,
-                  avatar_url, avatar_uploaded_at, avatar_size_bytes
-           FROM users WHERE id = $1""",
-        user_id,
-    )
-    if not user_data:
-        raise HTTPException(status_code=404, detail="User not found")
-
+    """Delete user via JSON API with audit logging (queued; runs in the identity service)"""
     # Don't allow deleting own account
     if user_id == admin_user["user_id"]:
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
 
     try:
-        # Gather data summary for audit log
-        stats_queries = [
-            ("recipes_created", "SELECT COUNT(*) as count FROM user_recipes WHERE user_id = $1"),
-            ("stories_created", "SELECT COUNT(*) as count FROM user_stories WHERE user_id = $1"),
-            ("images_generated", "SELECT COUNT(*) as count FROM user_images WHERE user_id = $1"),
-            (
-                "people_in_life",
-                "SELECT COUNT(*) as count FROM people_in_my_life WHERE user_id = $1",
-            ),
-            (
-                "total_transactions",
-                "SELECT COUNT(*) as count FROM dust_transactions WHERE user_id = $1",
-            ),
-            ("referrals_made", "SELECT COUNT(*) as count FROM referral_codes WHERE user_id = $1"),
-        ]
-
-        data_summary = {
-            "dust_balance": user_data["dust_balance"],
-            "account_age_days": (
-                datetime.utcnow().replace(tzinfo=None)
-                - user_data["created_at"].replace(tzinfo=None)
-            ).days
-            if user_data["created_at"]
-            else 0,
-            "has_avatar": bool(user_data["avatar_url"]),
-            "admin_deletion_reason": "admin_action",
-            "deleted_by_admin": admin_user.get("fairyname", "unknown_admin"),
-        }
-
-        # Get counts for data summary
-        for stat_name, query in stats_queries:
-            try:
-                result = await db.fetch_one(query, user_id)
-                data_summary[stat_name] = result["count"] if result else 0
-            except Exception:
-                data_summary[stat_name] = 0
-
-        # Create deletion log entry
-        deletion_id = str(generate_uuid7())
-        await db.execute(
-            """INSERT INTO account_deletion_logs
-               (id, user_id, fairyname, email, deletion_reason, deletion_feedback,
-                deleted_by, deleted_by_user_id, user_created_at, data_summary, deletion_requested_at)
-               VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, CURRENT_TIMESTAMP)""",
-            deletion_id,
+        admin_name = admin_user.get("fairyname", "unknown_admin")
+        deletion_id = await request_account_deletion(
+            db,
             user_id,
-            user_data["fairyname"],
-            user_data["email"],
             "other",  # Admin deletions use "other" as reason
             f"Admin deletion by {admin_user.get('fairyname', 'unknown')}",
-            "admin",
-            admin_user["user_id"],
-            user_data["created_at"],
-            json.dumps(data_summary),
+            deleted_by="admin",
+            deleted_by_user_id=admin_user["user_id"],
+            summary={"admin_deletion_reason": "admin_action", "deleted_by_admin": admin_name},
         )
-
-        # Delete storage assets (avatars, people photos, generated images)
-        # Import here to avoid circular import issues
-        from shared.storage_service import delete_user_assets
-
-        storage_deletion_summary = await delete_user_assets(user_id)
-
-        # Delete user record (CASCADE will handle all related data)
-        await db.execute("DELETE FROM users WHERE id = $1", user_id)
-
-        # Update deletion log with completion
-        await db.execute(
-            """UPDATE account_deletion_logs
-               SET deletion_completed_at = CURRENT_TIMESTAMP,
-                   data_summary = data_summary || $2
-               WHERE id = $1""",
-            deletion_id,
-            json.dumps({"storage_cleanup": storage_deletion_summary}),
-        )
-
-        return {
-            "success": True,
-            "message": "User deleted successfully",
-            "deletion_id": deletion_id,
-            "storage_cleanup": storage_deletion_summary,
-        }
-
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"User deletion failed: {str(e)}")
 
+    if not deletion_id:
+        raise HTTPException(status_code=404, detail="User not found")
+    await revoke_user_sessions(await get_redis(), user_id)
+
+    return {
+        "success": True,
+        "message": "User deletion scheduled",
+        "deletion_id": str(deletion_id),
+    }
+
 
 @users_router.get("/deletion-logs")
 async def get_deletion_logs(
@@ -264,7 +195,7 @@ async def get_deletion_logs(
     deleted_by: str = None,  # Filter by 'self' or 'admin'
     reason: str = None,  # Filter by deletion reason
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get account deletion logs for admin review"""
 
@@ -296,7 +227,7 @@ async def get_deletion_logs(
     logs_query = f"""
         SELECT id, user_id, fairyname, email, deletion_reason, deletion_feedback,
                deleted_by, deleted_by_user_id, user_created_at, deletion_requested_at,
-               deletion_completed_at, data_summary
+               deletion_completed_at, data_summary, status, attempts, last_error, progress
         FROM account_deletion_logs
         {where_clause}
         ORDER BY deletion_requested_at DESC
@@ -336,7 +267,7 @@ async def get_deletion_logs(
 @users_router.get("/deletion-logs/stats")
 async def get_deletion_stats(
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get deletion statistics for admin dashboard"""
 
@@ -408,6 +339,11 @@ async def grant_dust_api(
 
     # Create transaction and update balance
     async with db.transaction() as conn:
+        # Update user balance first so the row lock covers the stats update
+        await conn.execute(
+            "UPDATE users SET dust_balance = dust_balance + $1 WHERE id = $2", amount, user_id
+        )
+
         # Insert transaction
         await conn.execute(
             """
@@ -418,11 +354,7 @@ async def grant_dust_api(
             amount,
             f"Admin grant by {admin_user['fairyname']}: {reason}",
         )
-
-        # Update user balance
-        await conn.execute(
-            "UPDATE users SET dust_balance = dust_balance + $1 WHERE id = $2", amount, user_id
-        )
+        await record_ledger_transaction(conn, user_id, "grant", amount)
 
     return {"success": True, "message": f"Granted {amount} DUST to user"}
 
@@ -477,7 +409,7 @@ async def toggle_admin_api(
 async def get_user_people(
     user_id: str,
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get user's people in my life"""
     people = await db.fetch_all(
@@ -492,7 +424,7 @@ async def get_user_people(
 async def get_user_app_usage(
     user_id: str,
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get user's app usage statistics"""
     # Get app usage from dust transactions
@@ -528,7 +460,7 @@ async def get_user_generated_content(
     user_id: str,
     limit: int = 10,
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get user's generated content"""
     content = []
@@ -567,7 +499,7 @@ async def get_user_dust_transactions(
     user_id: str,
     limit: int = 20,
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get user's DUST transaction history"""
     transactions = await db.fetch_all(
@@ -584,7 +516,7 @@ async def get_user_payments(
     user_id: str,
     limit: int = 20,
     admin_user: dict = Depends(get_current_admin_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_read_db),
 ):
     """Get user's payment history"""
     payments = await db.fetch_all(
@@ -0,0 +1,68 @@
+# services/apps/background.py
+import asyncio
+
+from shared.ai_usage_rollups import roll_up_ai_usage
+from shared.database import get_db
+
+# Global task references
+_background_tasks: set[asyncio.Task] = set()
+_shutdown_event = asyncio.Event()
+
+ROLLUP_INTERVAL_SECONDS = 300
+
+
+async def _sleep_unless_shutdown(seconds: float):
+    """Sleep for the interval, waking early on shutdown"""
+    try:
+        await asyncio.wait_for(_shutdown_event.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def ai_usage_rollup_task():
+    """Fold completed hours of ai_usage_logs into hourly/daily rollups"""
+    db = await get_db()
+
+    while not _shutdown_event.is_set():
+        try:
+            # Catch up after downtime one batch of hours at a time
+            while not _shutdown_event.is_set() and await roll_up_ai_usage(db):
+                pass
+
+            await _sleep_unless_shutdown(ROLLUP_INTERVAL_SECONDS)
+
+        except Exception as e:
+            print(f"❌ AI_USAGE_ROLLUP: Error rolling up usage: {e}", flush=True)
+            await _sleep_unless_shutdown(60)  # Shorter sleep on error
+
+
+async def start_background_tasks():
+    """Start all background tasks"""
+    global _background_tasks
+
+    tasks = [
+        asyncio.create_task(ai_usage_rollup_task()),
+    ]
+
+    # Store task references
+    _background_tasks = set(tasks)
+
+    # Remove completed tasks
+    for task in tasks:
+        task.add_done_callback(_background_tasks.discard)
+
+
+async def stop_background_tasks():
+    """Stop all background tasks gracefully"""
+    global _background_tasks
+
+    # Signal shutdown
+    _shutdown_event.set()
+
+    # Wait for tasks to complete
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+
+    # Clear references
+    _background_tasks.clear()
+    _shutdown_event.clear()
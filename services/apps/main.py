@@ -2,6 +2,7 @@
 import os
 from contextlib import asynccontextmanager
 
+from background import start_background_tasks, stop_background_tasks
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
@@ -18,8 +19,11 @@ from routes import (
 )
 from service_routes import service_router
 
-from shared.database import close_db, init_db
-from shared.redis_client import close_redis, init_redis
+from shared.database import close_db, get_db, init_db
+from shared.db_metrics import metrics_router
+from shared.redis_client import close_redis, get_redis, init_redis
+from shared.sessions import start_revocation_sync, stop_revocation_sync
+from shared.system_config import start_system_config, stop_system_config
 
 
 @asynccontextmanager
@@ -27,9 +31,15 @@ async def lifespan(app: FastAPI):
     # Initialize database and Redis
     await init_db()
     await init_redis()
+    await start_system_config(await get_db())
+    await start_revocation_sync(await get_redis())
+    await start_background_tasks()
     print("Apps service started successfully")
     yield
     # Cleanup
+    await stop_background_tasks()
+    await stop_revocation_sync()
+    await stop_system_config()
     await close_db()
     await close_redis()
 
@@ -95,6 +105,7 @@ app.include_router(model_config_router, prefix="/model-configs", tags=["model-co
 app.include_router(image_router, prefix="/image", tags=["image"])
 app.include_router(video_router, prefix="/video", tags=["video"])
 app.include_router(referral_router, prefix="/referrals", tags=["referrals"])
+app.include_router(metrics_router)
 
 
 @app.get("/")
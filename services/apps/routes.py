@@ -5,7 +5,7 @@ from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from models import (
     App,
@@ -35,8 +35,10 @@ from models import (
     VideoUsageLogCreate,
 )
 
+from shared.ai_usage_rollups import fetch_ai_usage
 from shared.auth_middleware import TokenData, get_current_user, require_admin
 from shared.database import Database, get_db
+from shared.middleware import conditional_get
 from shared.redis_client import get_redis
 from shared.uuid_utils import generate_uuid7
 
@@ -143,6 +145,7 @@ async def approve_app(
 
 
 @marketplace_router.get("/")
+@conditional_get(cache_control="public, no-cache")
 async def browse_marketplace(db: Database = Depends(get_db)):
     """Simple marketplace endpoint"""
     apps = await db.fetch_all(
@@ -414,64 +417,38 @@ async def get_user_llm_usage(
     end_date = datetime.utcnow()
     start_date = end_date - timedelta(days=days)
 
-    # Build query conditions
-    conditions = ["user_id = $1", "created_at >= $2", "created_at <= $3"]
-    params = [user_id, start_date, end_date]
-
+    # Text-model usage from the hourly/daily rollups plus raw rows for the current hour
+    filters = {"user_id": user_id, "model_type": "text"}
     if app_id:
-        conditions.append("app_id = $4")
-        params.append(app_id)
-
-    where_clause = " AND ".join(conditions)
+        filters["app_id"] = app_id
 
-    # Get aggregate stats from ai_usage_logs for text models
-    stats = await db.fetch_one(
-        f"""
-        SELECT
-            COUNT(*) as total_requests,
-            SUM(COALESCE(prompt_tokens, 0) + COALESCE(completion_tokens, 0)) as total_tokens,
-            SUM(cost_usd) as total_cost_usd,
-            AVG(latency_ms) as average_latency_ms
-        FROM ai_usage_logs
-        WHERE {where_clause} AND model_type = 'text'
-    """,
-        *params,
-    )
-
-    # Get model breakdown from ai_usage_logs for text models
-    model_stats = await db.fetch_all(
-        f"""
-        SELECT
-            provider,
-            model_id,
-            COUNT(*) as requests,
-            SUM(COALESCE(prompt_tokens, 0) + COALESCE(completion_tokens, 0)) as tokens,
-            SUM(cost_usd) as cost,
-            AVG(latency_ms) as avg_latency
-        FROM ai_usage_logs
-        WHERE {where_clause} AND model_type = 'text'
-        GROUP BY provider, model_id
-        ORDER BY cost DESC
-    """,
-        *params,
+    model_stats = await fetch_ai_usage(
+        db, start_date, end_date, group_by=("provider", "model_id"), **filters
     )
+    model_stats.sort(key=lambda stat: stat["cost_usd"], reverse=True)
 
     # Format model breakdown
     model_breakdown = {}
+    total_requests = total_tokens = total_latency_ms = 0
+    total_cost_usd = 0.0
     for stat in model_stats:
         key = f"{stat['provider']}/{stat['model_id']}"
         model_breakdown[key] = {
-            "requests": stat["requests"],
+            "requests": stat["request_count"],
             "tokens": stat["tokens"],
-            "cost": float(stat["cost"]),
-            "avg_latency": float(stat["avg_latency"]),
+            "cost": stat["cost_usd"],
+            "avg_latency": float(stat["avg_latency_ms"]),
         }
+        total_requests += stat["request_count"]
+        total_tokens += stat["tokens"]
+        total_cost_usd += stat["cost_usd"]
+        total_latency_ms += stat["latency_ms_sum"]
 
     return LLMUsageStats(
-        total_requests=stats["total_requests"] or 0,
-        total_tokens=stats["total_tokens"] or 0,
-        total_cost_usd=float(stats["total_cost_usd"] or 0),
-        average_latency_ms=float(stats["average_latency_ms"] or 0),
+        total_requests=total_requests,
+        total_tokens=total_tokens,
+        total_cost_usd=total_cost_usd,
+        average_latency_ms=total_latency_ms / total_requests if total_requests else 0.0,
         model_breakdown=model_breakdown,
         period_start=start_date,
         period_end=end_date,
@@ -1436,6 +1413,7 @@ async def invalidate_pricing_cache(redis):
 
 # Action-based DUST pricing endpoints
 @app_router.get("/pricing/actions")
+@conditional_get(cache_control="public, no-cache")
 async def get_action_pricing(
     db: Database = Depends(get_db),
     redis=Depends(get_redis),
@@ -1457,7 +1435,8 @@ async def get_action_pricing(
             cached_data = await redis.get(cache_key)
             if cached_data:
                 logger.info("🎯 PRICING_CACHE: Cache HIT - returning cached data")
-                return json.loads(cached_data)
+                # Served as stored; no parse and re-serialize
+                return Response(content=cached_data, media_type="application/json")
             else:
                 logger.info("🎯 PRICING_CACHE: Cache MISS - fetching from database")
         except Exception as cache_error:
@@ -1483,16 +1462,17 @@ async def get_action_pricing(
                 "last_updated": row["updated_at"].isoformat() + "Z",
             }
 
-        # Cache for 1 hour (3600 seconds)
+        # Cache for 1 hour (3600 seconds); hits serve these exact bytes, so the ETag holds
+        pricing_json = json.dumps(pricing_data)
         try:
-            await redis.setex(cache_key, 3600, json.dumps(pricing_data))
+            await redis.setex(cache_key, 3600, pricing_json)
             logger.info(f"🎯 PRICING_CACHE: Cached {len(pricing_data)} actions for 1 hour")
         except Exception as cache_error:
             logger.error(f"🎯 PRICING_CACHE: Failed to cache data: {cache_error}")
 
         logger.info(f"🎯 PRICING_DATA: {pricing_data}")
 
-        return pricing_data
+        return Response(content=pricing_json, media_type="application/json")
 
     except Exception as e:
         import logging
@@ -10,6 +10,7 @@ from fastapi.staticfiles import StaticFiles
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 from shared.database import close_db, init_db
+from shared.db_metrics import metrics_router
 from shared.redis_client import close_redis, init_redis
 
 
@@ -47,6 +48,7 @@ if static_dir.exists():
 from routes import builder_router
 
 app.include_router(builder_router, prefix="/builder")
+app.include_router(metrics_router)
 
 
 @app.get("/")
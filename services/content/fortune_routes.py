@@ -24,6 +24,13 @@ from shared.auth_middleware import TokenData, get_current_user
 from shared.database import Database, get_db
 from shared.llm_client import LLMError, llm_client
 from shared.llm_usage_logger import create_request_metadata
+from shared.pagination import (
+    FAVORITES_FIRST,
+    decode_cursor,
+    keyset_condition,
+    order_by,
+    paginate,
+)
 from shared.uuid_utils import generate_uuid7
 
 router = APIRouter()
@@ -714,6 +721,9 @@ async def get_user_fortune_readings(
     db: Database = Depends(get_db),
     limit: int = Query(20, ge=1, le=50, description="Number of results to return"),
     offset: int = Query(0, ge=0, description="Pagination offset"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from a previous page; takes precedence over offset"
+    ),
     favorites_only: bool = Query(False, description="Return only favorited readings"),
 ):
     """
@@ -729,6 +739,10 @@ async def get_user_fortune_readings(
         )
         return FortuneErrorResponse(error="Can only access your own fortune readings")
 
+    if cursor:
+        decode_cursor(cursor, FAVORITES_FIRST)  # Reject bad cursors with a 400
+        offset = 0
+
     try:
         # Build query with filters
         base_query = """
@@ -742,15 +756,19 @@ async def get_user_fortune_readings(
         if favorites_only:
             base_query += " AND is_favorited = TRUE"
 
+        if cursor:
+            base_query += f" AND {keyset_condition(FAVORITES_FIRST, cursor, params)}"
+
         # Order by favorites first, then creation date descending
-        base_query += " ORDER BY is_favorited DESC, created_at DESC"
+        base_query += f" {order_by(FAVORITES_FIRST)}"
 
-        # Add pagination
+        # Add pagination (one extra row tells whether there is a next page)
         base_query += f" LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
-        params.extend([limit, offset])
+        params.extend([limit + 1, offset])
 
         # Execute query
         rows = await db.fetch_all(base_query, *params)
+        rows, next_cursor = paginate(rows, limit, FAVORITES_FIRST)
 
         # Get total counts
         count_query = """
@@ -786,6 +804,7 @@ async def get_user_fortune_readings(
             readings=readings,
             total_count=total_count,
             favorites_count=favorites_count,
+            next_cursor=next_cursor,
         )
 
     except Exception as e:
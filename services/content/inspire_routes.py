@@ -1,11 +1,8 @@
 # services/content/inspire_routes.py
-# Service URL configuration based on environment
-import os
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
-import httpx
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from models import (
     InspirationCategory,
@@ -22,14 +19,17 @@ from models import (
 
 from shared.auth_middleware import TokenData, get_current_user
 from shared.database import Database, get_db
+from shared.generation_context import get_generation_context
 from shared.llm_client import LLMError, llm_client
+from shared.pagination import (
+    FAVORITES_FIRST,
+    decode_cursor,
+    keyset_condition,
+    order_by,
+    paginate,
+)
 from shared.uuid_utils import generate_uuid7
 
-# Service URL configuration
-environment = os.getenv("ENVIRONMENT", "staging")
-base_url_suffix = "production" if environment == "production" else "staging"
-ledger_url = f"https://fairydust-ledger-{base_url_suffix}.up.railway.app"
-
 router = APIRouter()
 
 # Constants
@@ -85,13 +85,6 @@ async def generate_inspiration(
                 error=f"Rate limit exceeded. Maximum {INSPIRE_RATE_LIMIT} inspirations per hour."
             )
 
-        # Get user balance for logging purposes only (payment handled by app)
-        user_balance = await _get_user_balance(request.user_id, auth_token)
-        print(
-            f"💰 INSPIRE DEBUG: User balance: {user_balance} DUST",
-            flush=True,
-        )
-
         # Get user context for personalization
         user_context = await _get_user_context(db, request.user_id)
         print("👤 INSPIRE: Retrieved user context", flush=True)
@@ -171,8 +164,12 @@ async def generate_inspiration(
         # Mark onboarding as completed for first-time users
         await _mark_onboarding_completed(db, request.user_id)
 
-        # DUST payment is handled by the app before calling this endpoint
-        new_balance = user_balance  # Balance unchanged by content service
+        # DUST payment is handled by the app before calling this endpoint; the balance is
+        # read from the shared users table rather than from the ledger over HTTP
+        balance_row = await db.fetch_one(
+            "SELECT dust_balance FROM users WHERE id = $1", request.user_id
+        )
+        new_balance = balance_row["dust_balance"] if balance_row else 0
 
         # Build response
         inspiration = UserInspiration(
@@ -210,6 +207,9 @@ async def get_user_inspirations(
     db: Database = Depends(get_db),
     limit: int = Query(50, ge=1, le=100, description="Number of results to return"),
     offset: int = Query(0, ge=0, description="Pagination offset"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from a previous page; takes precedence over offset"
+    ),
     category: Optional[InspirationCategory] = Query(None, description="Filter by category"),
     favorites_only: bool = Query(False, description="Return only favorited items"),
 ):
@@ -226,6 +226,10 @@ async def get_user_inspirations(
         )
         return InspirationErrorResponse(error="Can only access your own inspirations")
 
+    if cursor:
+        decode_cursor(cursor, FAVORITES_FIRST)  # Reject bad cursors with a 400
+        offset = 0
+
     try:
         # Build query with filters
         base_query = """
@@ -244,13 +248,17 @@ async def get_user_inspirations(
         if favorites_only:
             base_query += " AND is_favorited = TRUE"
 
+        if cursor:
+            base_query += f" AND {keyset_condition(FAVORITES_FIRST, cursor, params)}"
+            param_count = len(params)
+
         # Order by favorites first, then creation date descending
-        base_query += " ORDER BY is_favorited DESC, created_at DESC"
+        base_query += f" {order_by(FAVORITES_FIRST)}"
 
-        # Add pagination
+        # Add pagination (one extra row tells whether there is a next page)
         param_count += 1
         base_query += f" LIMIT ${param_count}"
-        params.append(limit)
+        params.append(limit + 1)
 
         param_count += 1
         base_query += f" OFFSET ${param_count}"
@@ -258,6 +266,7 @@ async def get_user_inspirations(
 
         # Execute query
         rows = await db.fetch_all(base_query, *params)
+        rows, next_cursor = paginate(rows, limit, FAVORITES_FIRST)
 
         # Get total counts
         count_query = """
@@ -295,6 +304,7 @@ async def get_user_inspirations(
             inspirations=inspirations,
             total_count=total_count,
             favorites_count=favorites_count,
+            next_cursor=next_cursor,
         )
 
     except Exception as e:
@@ -411,30 +421,6 @@ async def delete_inspiration(
 
 
 # Helper functions
-async def _get_user_balance(user_id: UUID, auth_token: str) -> int:
-    """Get user's current DUST balance via Ledger Service"""
-    print(f"🔍 INSPIRE_BALANCE: Checking DUST balance for user {user_id}", flush=True)
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ledger_url}/balance/{user_id}",
-                headers={"Authorization": auth_token},
-                timeout=10.0,
-            )
-
-            if response.status_code == 200:
-                balance_data = response.json()
-                balance = balance_data.get("balance", 0)
-                print(f"✅ INSPIRE_BALANCE: User {user_id} has {balance} DUST", flush=True)
-                return balance
-            else:
-                print(f"❌ INSPIRE_BALANCE: Ledger service error: {response.text}", flush=True)
-                return 0
-    except Exception as e:
-        print(f"❌ INSPIRE_BALANCE: Exception getting balance: {str(e)}", flush=True)
-        return 0
-
-
 async def _check_rate_limit(db: Database, user_id: UUID) -> bool:
     """Check if user has exceeded rate limit for inspiration generation"""
     try:
@@ -537,13 +523,7 @@ async def _get_user_context(db: Database, user_id: UUID) -> str:
     """Get user context for personalization"""
     try:
         # Get people and pets in my life
-        people_query = """
-            SELECT name, relationship, birth_date, personality_description, entry_type, species
-            FROM people_in_my_life
-            WHERE user_id = $1
-        """
-
-        people_rows = await db.fetch_all(people_query, user_id)
+        people_rows = (await get_generation_context(db, user_id))["people"]
 
         # Build context string
         context_parts = []
@@ -33,8 +33,11 @@ from video_routes import video_router
 from wyr_routes import router as wyr_router
 
 # Import modules with minimal logging
-from shared.database import close_db, init_db
-from shared.redis_client import close_redis, init_redis
+from shared.database import close_db, get_db, init_db
+from shared.db_metrics import metrics_router
+from shared.redis_client import close_redis, get_redis, init_redis
+from shared.sessions import start_revocation_sync, stop_revocation_sync
+from shared.system_config import start_system_config, stop_system_config
 
 
 @asynccontextmanager
@@ -48,8 +51,6 @@ async def lifespan(app: FastAPI):
     # EMERGENCY: Add retry columns directly if they don't exist
     # This bypasses any shared/database.py issues
     try:
-        from shared.database import get_db
-
         db = await get_db()
 
         logger.info("🔧 EMERGENCY: Adding retry columns directly...")
@@ -85,6 +86,8 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ EMERGENCY: Failed to add retry columns: {e}")
 
     await init_redis()
+    await start_system_config(await get_db())
+    await start_revocation_sync(await get_redis())
 
     # Start video background processor
     import asyncio
@@ -97,6 +100,8 @@ async def lifespan(app: FastAPI):
     # Cleanup
     logger.info("Shutting down content service...")
     await video_background_processor.stop()
+    await stop_revocation_sync()
+    await stop_system_config()
     await close_db()
     await close_redis()
 
@@ -221,6 +226,7 @@ app.include_router(wyr_router, tags=["would-you-rather"])
 app.include_router(twenty_questions_router, prefix="/twenty-questions", tags=["twenty-questions"])
 app.include_router(image_router, tags=["images"])
 app.include_router(video_router, prefix="/videos", tags=["videos"])
+app.include_router(metrics_router)
 
 
 @app.get("/")
@@ -231,6 +231,7 @@ class StoriesListResponse(BaseModel):
     stories: list[UserStoryNew]
     total_count: int
     favorites_count: int
+    next_cursor: Optional[str] = None
 
 
 class StoryFavoriteResponse(BaseModel):
@@ -332,6 +333,7 @@ class FortuneHistoryResponse(BaseModel):
     readings: list[FortuneReading]
     total_count: int
     favorites_count: int
+    next_cursor: Optional[str] = None
 
 
 class FortuneProfile(BaseModel):
@@ -419,6 +421,7 @@ class InspirationsListResponse(BaseModel):
     inspirations: list[UserInspiration]
     total_count: int
     favorites_count: int
+    next_cursor: Optional[str] = None
 
 
 class InspirationFavoriteRequest(BaseModel):
@@ -510,6 +513,7 @@ class RecipesListResponse(BaseModel):
     recipes: list[UserRecipeNew]
     total_count: int
     favorites_count: int
+    next_cursor: Optional[str] = None
 
 
 class RecipeAdjustRequest(BaseModel):
@@ -717,6 +721,7 @@ class WyrGameSessionsResponse(BaseModel):
     total_count: int
     in_progress_count: int
     completed_count: int
+    next_cursor: Optional[str] = None
 
 
 class WyrGameCompleteResponse(BaseModel):
@@ -29,11 +29,19 @@ from models import (
 )
 
 from shared.auth_middleware import TokenData, get_current_user
-from shared.database import Database, get_db
+from shared.database import Database, get_db, read_db
+from shared.generation_context import get_generation_context, interests_from
 from shared.json_utils import parse_jsonb_field
 from shared.llm_client import LLMError, llm_client
 from shared.llm_pricing import calculate_llm_cost
 from shared.llm_usage_logger import calculate_prompt_hash, create_request_metadata, log_llm_usage
+from shared.pagination import (
+    FAVORITES_FIRST,
+    decode_cursor,
+    keyset_condition,
+    order_by,
+    paginate,
+)
 
 router = APIRouter()
 
@@ -77,18 +85,18 @@ async def generate_recipe(
 
         # Content service no longer manages DUST - handled externally
 
+        # Profile and people for personalization, in one cache read
+        generation_context = await get_generation_context(db, request.user_id)
+
         # Validate selected people exist in user's "People in My Life"
         if request.selected_people:
-            valid_people = await _validate_selected_people(
-                db, request.user_id, request.selected_people
-            )
-            if not valid_people:
+            if _selected_people(generation_context, request.selected_people) is None:
                 return RecipeErrorResponse(
                     error="One or more selected people not found in your contacts"
                 )
 
         # Get user context for personalization
-        user_context = await _get_user_context(db, request.user_id, request.selected_people)
+        user_context = _get_user_context(generation_context, request.selected_people)
         print("👤 RECIPE: Retrieved user context", flush=True)
 
         # Get dietary preferences
@@ -245,7 +253,7 @@ async def adjust_recipe(
         print(f"📖 RECIPE_ADJUST: Found original recipe: {original_recipe['title']}", flush=True)
 
         # Get user context for personalization
-        user_context = await _get_user_context(db, request.user_id, [])
+        user_context = _get_user_context(await get_generation_context(db, request.user_id), [])
         print("👤 RECIPE_ADJUST: Retrieved user context", flush=True)
 
         # Apply adjustments using LLM
@@ -375,9 +383,12 @@ async def adjust_recipe(
 async def get_user_recipes(
     user_id: UUID,
     current_user: TokenData = Depends(get_current_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(read_db(max_lag_seconds=2)),  # Replica unless lagging
     limit: int = Query(50, ge=1, le=100, description="Number of results to return"),
     offset: int = Query(0, ge=0, description="Pagination offset"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from a previous page; takes precedence over offset"
+    ),
     complexity: Optional[RecipeComplexity] = Query(None, description="Filter by complexity"),
     favorites_only: bool = Query(False, description="Return only favorited recipes"),
     search: Optional[str] = Query(None, description="Search in recipe title and content"),
@@ -395,6 +406,10 @@ async def get_user_recipes(
         )
         return RecipeErrorResponse(error="Can only access your own recipes")
 
+    if cursor:
+        decode_cursor(cursor, FAVORITES_FIRST)  # Reject bad cursors with a 400
+        offset = 0
+
     try:
         # Build query with filters
         base_query = """
@@ -420,13 +435,17 @@ async def get_user_recipes(
             search_pattern = f"%{search}%"
             params.append(search_pattern)
 
+        if cursor:
+            base_query += f" AND {keyset_condition(FAVORITES_FIRST, cursor, params)}"
+            param_count = len(params)
+
         # Order by favorites first, then creation date descending
-        base_query += " ORDER BY is_favorited DESC, created_at DESC"
+        base_query += f" {order_by(FAVORITES_FIRST)}"
 
-        # Add pagination
+        # Add pagination (one extra row tells whether there is a next page)
         param_count += 1
         base_query += f" LIMIT ${param_count}"
-        params.append(limit)
+        params.append(limit + 1)
 
         param_count += 1
         base_query += f" OFFSET ${param_count}"
@@ -434,6 +453,7 @@ async def get_user_recipes(
 
         # Execute query
         rows = await db.fetch_all(base_query, *params)
+        rows, next_cursor = paginate(rows, limit, FAVORITES_FIRST)
 
         # Get total counts
         count_query = """
@@ -485,6 +505,7 @@ async def get_user_recipes(
             recipes=recipes,
             total_count=total_count,
             favorites_count=favorites_count,
+            next_cursor=next_cursor,
         )
 
     except Exception as e:
@@ -775,30 +796,6 @@ async def update_user_recipe_preferences(
 
 
 # Helper functions
-async def _get_user_balance(user_id: UUID, auth_token: str) -> int:
-    """Get user's current DUST balance via Ledger Service"""
-    print(f"🔍 RECIPE_BALANCE: Checking DUST balance for user {user_id}", flush=True)
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{ledger_url}/balance/{user_id}",
-                headers={"Authorization": auth_token},
-                timeout=10.0,
-            )
-
-            if response.status_code == 200:
-                balance_data = response.json()
-                balance = balance_data.get("balance", 0)
-                print(f"✅ RECIPE_BALANCE: User {user_id} has {balance} DUST", flush=True)
-                return balance
-            else:
-                print(f"❌ RECIPE_BALANCE: Ledger service error: {response.text}", flush=True)
-                return 0
-    except Exception as e:
-        print(f"❌ RECIPE_BALANCE: Exception getting balance: {str(e)}", flush=True)
-        return 0
-
-
 async def _get_app_id(db: Database) -> str:
     """Get the UUID for the fairydust-recipe app"""
     result = await db.fetch_one("SELECT id FROM apps WHERE slug = $1", "fairydust-recipe")
@@ -867,91 +864,71 @@ async def _validate_selected_people(db: Database, user_id: UUID, person_ids: lis
         return False
 
 
-async def _get_user_context(db: Database, user_id: UUID, selected_people: list[UUID]) -> str:
-    """Get user context for personalization"""
-    try:
-        context_parts = []
-
-        # Get user profile data
-        profile_query = """
-            SELECT field_name, field_value
-            FROM user_profile_data
-            WHERE user_id = $1
-        """
+def _selected_people(context: dict, person_ids: list[UUID]) -> Optional[list[dict]]:
+    """The selected entries from the user's people, or None if any isn't theirs"""
+    people = {person["id"]: person for person in context["people"]}
+    selected = [people.get(str(person_id)) for person_id in person_ids]
+    return None if None in selected else selected
 
-        profile_rows = await db.fetch_all(profile_query, user_id)
 
-        if profile_rows:
-            interests = []
-            for row in profile_rows:
-                if row["field_name"] == "interests":
-                    field_value = row["field_value"]
-                    if isinstance(field_value, str):
-                        interests.extend(field_value.split(","))
-                    elif isinstance(field_value, list):
-                        interests.extend(field_value)
+def _get_user_context(context: dict, selected_people: list[UUID]) -> str:
+    """Get user context for personalization from the user's generation context"""
+    try:
+        context_parts = []
 
-            if interests:
-                context_parts.append(f"Interests: {', '.join(interests[:5])}")
+        interests = interests_from(context)
+        if interests:
+            context_parts.append(f"Interests: {', '.join(interests[:5])}")
 
         # Get selected people and pets information
         if selected_people:
-            people_query = """
-                SELECT name, relationship, birth_date, personality_description, entry_type, species
-                FROM people_in_my_life
-                WHERE user_id = $1 AND id = ANY($2)
-            """
-
-            people_rows = await db.fetch_all(people_query, user_id, selected_people)
-
-            if people_rows:
-                people_list = []
-                pets_list = []
-
-                for row in people_rows:
-                    entry_type = row.get("entry_type", "person")
-
-                    if entry_type == "pet":
-                        # Handle pets differently - no age calculation, include species
-                        pet_desc = f"{row['name']} ({row.get('species', 'pet')}"
-                        if row["relationship"]:
-                            pet_desc += f", {row['relationship']}"
-                        pet_desc += ")"
-                        pets_list.append(pet_desc)
-                        print(f"🐾 RECIPE_CONTEXT: Including pet {row['name']} in context")
-                    else:
-                        # Handle people as before
-                        person_desc = f"{row['name']} ({row['relationship']}"
-                        if row["birth_date"]:
-                            # Calculate age from birth date
-                            from datetime import date
-
-                            birth = date.fromisoformat(str(row["birth_date"]))
-                            age = (date.today() - birth).days // 365
-                            person_desc += f", {age} years old"
-
-                        # Add personality description if available
-                        if row["personality_description"]:
-                            person_desc += f", {row['personality_description']}"
-
-                        person_desc += ")"
-                        people_list.append(person_desc)
-
-                # Build context strings for people and pets separately
-                if people_list and pets_list:
-                    context_parts.append(f"Cooking for: {', '.join(people_list)}")
-                    context_parts.append(
-                        f"Note: Also cooking for pets: {', '.join(pets_list)} (ensure pet-safe ingredients)"
-                    )
-                elif people_list:
-                    context_parts.append(f"Cooking for: {', '.join(people_list)}")
-                elif pets_list:
-                    context_parts.append(
-                        f"Cooking for pets: {', '.join(pets_list)} (focus on pet-safe ingredients only)"
-                    )
-                    print(
-                        "🐾 RECIPE_CONTEXT: Recipe context set for pets only - enabling pet safety mode"
-                    )
+            people_list = []
+            pets_list = []
+
+            for row in _selected_people(context, selected_people) or []:
+                entry_type = row.get("entry_type") or "person"
+
+                if entry_type == "pet":
+                    # Handle pets differently - no age calculation, include species
+                    pet_desc = f"{row['name']} ({row.get('species') or 'pet'}"
+                    if row["relationship"]:
+                        pet_desc += f", {row['relationship']}"
+                    pet_desc += ")"
+                    pets_list.append(pet_desc)
+                    print(f"🐾 RECIPE_CONTEXT: Including pet {row['name']} in context")
+                else:
+                    # Handle people as before
+                    person_desc = f"{row['name']} ({row['relationship']}"
+                    if row["birth_date"]:
+                        # Calculate age from birth date
+                        from datetime import date
+
+                        birth = date.fromisoformat(str(row["birth_date"]))
+                        age = (date.today() - birth).days // 365
+                        person_desc += f", {age} years old"
+
+                    # Add personality description if available
+                    if row["personality_description"]:
+                        person_desc += f", {row['personality_description']}"
+
+                    person_desc += ")"
+                    people_list.append(person_desc)
+
+            # Build context strings for people and pets separately
+            if people_list and pets_list:
+                context_parts.append(f"Cooking for: {', '.join(people_list)}")
+                context_parts.append(
+                    f"Note: Also cooking for pets: {', '.join(pets_list)} (ensure pet-safe ingredients)"
+                )
+            elif people_list:
+                context_parts.append(f"Cooking for: {', '.join(people_list)}")
+            elif pets_list:
+                context_parts.append(
+                    f"Cooking for pets: {', '.join(pets_list)} (focus on pet-safe ingredients only)"
+                )
+                print(
+                    "🐾 RECIPE_CONTEXT: Recipe context set for pets only - enabling pet safety mode"
+                )
 
         return "; ".join(context_parts) if context_parts else "general user"
 
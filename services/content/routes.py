@@ -14,7 +14,7 @@ from models import (
 )
 
 from shared.auth_middleware import TokenData, get_current_user
-from shared.database import Database, get_db
+from shared.database import Database, get_db, read_db
 from shared.json_utils import parse_recipe_metadata as parse_recipe_data
 from shared.json_utils import safe_json_dumps
 from shared.uuid_utils import generate_uuid7
@@ -37,7 +37,7 @@ async def get_user_recipes(
     app_id: Optional[str] = Query("fairydust-recipe"),
     favorited_only: bool = Query(False),
     current_user: TokenData = Depends(get_current_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(read_db(max_lag_seconds=2)),  # Replica unless lagging
 ):
     """Get user recipes with pagination and filtering"""
     print(
@@ -1,5 +1,6 @@
 # services/content/story_routes.py
 import asyncio
+import hashlib
 import json
 import os
 import re
@@ -41,10 +42,20 @@ from story_image_generator import story_image_generator
 from story_image_service import story_image_service
 
 from shared.auth_middleware import TokenData, get_current_user
-from shared.database import Database, get_db
+from shared.database import Database, get_db, read_db
+from shared.db_statements import register_hot_query
+from shared.generation_context import get_generation_context, interests_from
 from shared.json_utils import parse_jsonb_field, safe_json_dumps
 from shared.llm_client import LLMError, llm_client
 from shared.llm_usage_logger import calculate_prompt_hash, create_request_metadata
+from shared.middleware import conditional_get
+from shared.pagination import (
+    FAVORITES_FIRST,
+    decode_cursor,
+    keyset_condition,
+    order_by,
+    paginate,
+)
 
 router = APIRouter()
 
@@ -58,6 +69,131 @@ READING_TIME_WORD_TARGETS = {
 
 STORY_RATE_LIMIT = 25  # Max 25 stories per hour per user
 
+# Options offered by the story app; static, so clients revalidate it by version
+STORY_CONFIG = {
+    "story_lengths": [
+        {
+            "label": "Quick Read",
+            "value": "quick",
+            "reading_time": "2-3 minutes",
+            "words": "400-600",
+        },
+        {
+            "label": "Medium Story",
+            "value": "medium",
+            "reading_time": "5-7 minutes",
+            "words": "1000-1400",
+        },
+        {
+            "label": "Long Story",
+            "value": "long",
+            "reading_time": "8-12 minutes",
+            "words": "1600-2400",
+        },
+    ],
+    "target_audiences": [
+        {
+            "label": "Toddler",
+            "value": "toddler",
+            "age_range": "2-4 years",
+            "description": "Very simple language, familiar objects and concepts",
+        },
+        {
+            "label": "Preschool",
+            "value": "preschool",
+            "age_range": "4-6 years",
+            "description": "Simple vocabulary with gentle lessons about friendship and kindness",
+        },
+        {
+            "label": "Early Elementary",
+            "value": "early_elementary",
+            "age_range": "6-9 years",
+            "description": "Age-appropriate adventures with themes of courage and teamwork",
+        },
+        {
+            "label": "Late Elementary",
+            "value": "late_elementary",
+            "age_range": "9-12 years",
+            "description": "More sophisticated stories with character growth and mild challenges",
+        },
+        {
+            "label": "Teen",
+            "value": "teen",
+            "age_range": "13+ years",
+            "description": "Complex themes of identity, relationships, and personal growth",
+        },
+    ],
+    "character_relationships": [
+        "protagonist",
+        "daughter",
+        "son",
+        "spouse",
+        "parent",
+        "sibling",
+        "friend",
+        "pet",
+        "grandparent",
+        "cousin",
+        "teacher",
+        "neighbor",
+    ],
+    "common_traits": [
+        "brave",
+        "curious",
+        "kind",
+        "funny",
+        "creative",
+        "smart",
+        "athletic",
+        "musical",
+        "artistic",
+        "adventurous",
+        "gentle",
+        "energetic",
+    ],
+}
+STORY_CONFIG_VERSION = hashlib.sha256(json.dumps(STORY_CONFIG, sort_keys=True).encode()).hexdigest()
+
+# Hot queries for the unfiltered story list (the common case from the app)
+USER_STORIES_QUERY = register_hot_query(
+    "stories.list_for_user",
+    """
+    SELECT id, title, content, story_length, target_audience,
+           word_count, is_favorited, created_at, metadata,
+           has_images, images_complete, image_data, story_summary
+    FROM user_stories
+    WHERE user_id = $1
+    ORDER BY is_favorited DESC, created_at DESC, id DESC
+    LIMIT $2 OFFSET $3
+    """,
+    slots=True,
+)
+
+USER_STORIES_AFTER_QUERY = register_hot_query(
+    "stories.list_for_user_after",
+    """
+    SELECT id, title, content, story_length, target_audience,
+           word_count, is_favorited, created_at, metadata,
+           has_images, images_complete, image_data, story_summary
+    FROM user_stories
+    WHERE user_id = $1 AND (is_favorited, created_at, id) < ($2, $3, $4)
+    ORDER BY is_favorited DESC, created_at DESC, id DESC
+    LIMIT $5
+    """,
+    slots=True,
+)
+
+USER_STORIES_COUNT_QUERY = register_hot_query(
+    "stories.count_for_user",
+    """
+    SELECT
+        COUNT(*) as total_count,
+        COUNT(*) FILTER (WHERE is_favorited = TRUE) as favorites_count
+    FROM user_stories
+    WHERE user_id = $1
+    """,
+)
+
 
 @router.post("/apps/story/generate")
 @traceable(run_type="chain", name="story-generation")
@@ -100,15 +236,17 @@ async def generate_story(
         if not auth_token:
             return StoryErrorResponse(error="Authorization header required")
 
-        # Check rate limiting
-        rate_limit_exceeded = await _check_rate_limit(db, request.user_id)
-        if rate_limit_exceeded:
-            return StoryErrorResponse(
-                error=f"Rate limit exceeded. Maximum {STORY_RATE_LIMIT} stories per hour."
-            )
+        # Pre-generation reads share one connection; it's released before the LLM call
+        async with db.connection() as session:
+            # Check rate limiting
+            rate_limit_exceeded = await _check_rate_limit(session, request.user_id)
+            if rate_limit_exceeded:
+                return StoryErrorResponse(
+                    error=f"Rate limit exceeded. Maximum {STORY_RATE_LIMIT} stories per hour."
+                )
 
-        # Get user context for personalization
-        user_context = await _get_user_context(db, request.user_id)
+            # Get user context for personalization
+            user_context = await _get_user_context(session, request.user_id)
 
         # Characters are now fully resolved by frontend - no processing needed
 
@@ -263,9 +401,12 @@ async def generate_story(
 async def get_user_stories(
     user_id: UUID,
     current_user: TokenData = Depends(get_current_user),
-    db: Database = Depends(get_db),
+    db: Database = Depends(read_db(max_lag_seconds=2)),  # Replica unless lagging
     limit: int = Query(50, ge=1, le=100, description="Number of results to return"),
     offset: int = Query(0, ge=0, description="Pagination offset"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from a previous page; takes precedence over offset"
+    ),
     story_length: Optional[StoryLength] = Query(None, description="Filter by story length"),
     target_audience: Optional[TargetAudience] = Query(
         None, description="Filter by target audience"
@@ -285,6 +426,10 @@ async def get_user_stories(
         )
         return StoryErrorResponse(error="Can only access your own stories")
 
+    after = decode_cursor(cursor, FAVORITES_FIRST) if cursor else None
+    if after:
+        offset = 0
+
     try:
         # Build query with filters
         base_query = """
@@ -316,20 +461,33 @@ async def get_user_stories(
             search_pattern = f"%{search}%"
             params.append(search_pattern)
 
+        if cursor:
+            base_query += f" AND {keyset_condition(FAVORITES_FIRST, cursor, params)}"
+            param_count = len(params)
+
         # Order by favorites first, then creation date descending
-        base_query += " ORDER BY is_favorited DESC, created_at DESC"
+        base_query += f" {order_by(FAVORITES_FIRST)}"
 
-        # Add pagination
+        # Add pagination (one extra row tells whether there is a next page)
         param_count += 1
         base_query += f" LIMIT ${param_count}"
-        params.append(limit)
+        params.append(limit + 1)
 
         param_count += 1
         base_query += f" OFFSET ${param_count}"
         params.append(offset)
 
-        # Execute query
-        rows = await db.fetch_all(base_query, *params)
+        # Execute query; the unfiltered list runs as a prepared hot query
+        unfiltered = not (story_length or target_audience or favorites_only or search)
+        if unfiltered and after:
+            rows = await db.fetch_all_prepared(
+                USER_STORIES_AFTER_QUERY.name, user_id, *after, limit + 1
+            )
+        elif unfiltered:
+            rows = await db.fetch_all_prepared(USER_STORIES_QUERY.name, user_id, limit + 1, offset)
+        else:
+            rows = await db.fetch_all(base_query, *params, slots=True)
+        rows, next_cursor = paginate(rows, limit, FAVORITES_FIRST)
 
         # Get total counts
         count_query = """
@@ -356,7 +514,10 @@ async def get_user_stories(
             count_query += f" AND (title ILIKE ${param_idx} OR content ILIKE ${param_idx})"
             count_params.append(search_pattern)
 
-        count_result = await db.fetch_one(count_query, *count_params)
+        if unfiltered:
+            count_result = await db.fetch_one_prepared(USER_STORIES_COUNT_QUERY.name, user_id)
+        else:
+            count_result = await db.fetch_one(count_query, *count_params)
         total_count = count_result["total_count"] if count_result else 0
         favorites_count = count_result["favorites_count"] if count_result else 0
 
@@ -390,6 +551,7 @@ async def get_user_stories(
             stories=stories,
             total_count=total_count,
             favorites_count=favorites_count,
+            next_cursor=next_cursor,
         )
 
     except Exception as e:
@@ -493,100 +655,12 @@ async def delete_story(
 
 
 @router.get("/apps/story/config")
+@conditional_get(version=lambda **_: STORY_CONFIG_VERSION, cache_control="public, no-cache")
 async def get_story_config():
     """
     Get available story lengths (reading times), and DUST costs.
     """
-
-    try:
-        config = {
-            "story_lengths": [
-                {
-                    "label": "Quick Read",
-                    "value": "quick",
-                    "reading_time": "2-3 minutes",
-                    "words": "400-600",
-                },
-                {
-                    "label": "Medium Story",
-                    "value": "medium",
-                    "reading_time": "5-7 minutes",
-                    "words": "1000-1400",
-                },
-                {
-                    "label": "Long Story",
-                    "value": "long",
-                    "reading_time": "8-12 minutes",
-                    "words": "1600-2400",
-                },
-            ],
-            "target_audiences": [
-                {
-                    "label": "Toddler",
-                    "value": "toddler",
-                    "age_range": "2-4 years",
-                    "description": "Very simple language, familiar objects and concepts",
-                },
-                {
-                    "label": "Preschool",
-                    "value": "preschool",
-                    "age_range": "4-6 years",
-                    "description": "Simple vocabulary with gentle lessons about friendship and kindness",
-                },
-                {
-                    "label": "Early Elementary",
-                    "value": "early_elementary",
-                    "age_range": "6-9 years",
-                    "description": "Age-appropriate adventures with themes of courage and teamwork",
-                },
-                {
-                    "label": "Late Elementary",
-                    "value": "late_elementary",
-                    "age_range": "9-12 years",
-                    "description": "More sophisticated stories with character growth and mild challenges",
-                },
-                {
-                    "label": "Teen",
-                    "value": "teen",
-                    "age_range": "13+ years",
-                    "description": "Complex themes of identity, relationships, and personal growth",
-                },
-            ],
-            "character_relationships": [
-                "protagonist",
-                "daughter",
-                "son",
-                "spouse",
-                "parent",
-                "sibling",
-                "friend",
-                "pet",
-                "grandparent",
-                "cousin",
-                "teacher",
-                "neighbor",
-            ],
-            "common_traits": [
-                "brave",
-                "curious",
-                "kind",
-                "funny",
-                "creative",
-                "smart",
-                "athletic",
-                "musical",
-                "artistic",
-                "adventurous",
-                "gentle",
-                "energetic",
-            ],
-        }
-
-        return StoryConfigResponse(config=config)
-
-    except Exception as e:
-        print(f"❌ STORY: Error getting config: {str(e)}", flush=True)
-        return StoryErrorResponse(error="Failed to retrieve story configuration")
+    return StoryConfigResponse(config=STORY_CONFIG)
 
 
 # Helper functions
@@ -637,36 +711,15 @@ async def _check_rate_limit(db: Database, user_id: UUID) -> bool:
 async def _get_user_context(db: Database, user_id: UUID) -> str:
     """Get user context for personalization (interests only, NOT people)"""
     try:
-        # Get user profile data (interests only)
-        profile_query = """
-            SELECT field_name, field_value
-            FROM user_profile_data
-            WHERE user_id = $1
-        """
-
-        profile_rows = await db.fetch_all(profile_query, user_id)
+        context = await get_generation_context(db, user_id)
 
         # Build context string - ONLY include interests, NOT people
         # People should only be included when explicitly requested as Characters
-        context_parts = []
+        interests = interests_from(context)
+        if interests:
+            return f"Interests: {', '.join(interests[:5])}"
 
-        if profile_rows:
-            interests = []
-            for row in profile_rows:
-                if row["field_name"] == "interests":
-                    field_value = row["field_value"]
-                    if isinstance(field_value, str):
-                        interests.extend(field_value.split(","))
-                    elif isinstance(field_value, list):
-                        interests.extend(field_value)
-
-            if interests:
-                context_parts.append(f"Interests: {', '.join(interests[:5])}")
-
-        # REMOVED: Automatic inclusion of "My People" data
-        # My People should only be factored in when explicitly requested as Characters
-
-        return "; ".join(context_parts) if context_parts else "general user"
+        return "general user"
 
     except Exception as e:
         print(f"⚠️ STORY_CONTEXT: Error getting user context: {str(e)}", flush=True)
@@ -24,8 +24,10 @@ from models import (
 
 from shared.auth_middleware import TokenData, get_current_user
 from shared.database import Database, get_db
+from shared.generation_context import get_generation_context
 from shared.json_utils import safe_json_parse
 from shared.llm_client import LLMError, llm_client
+from shared.pagination import NEWEST_FIRST, decode_cursor, keyset_condition, order_by, paginate
 from shared.uuid_utils import generate_uuid7
 
 router = APIRouter()
@@ -311,6 +313,9 @@ async def get_user_sessions(
     user_id: UUID = Path(..., description="User ID"),
     limit: int = Query(50, ge=1, le=100, description="Number of results to return"),
     offset: int = Query(0, ge=0, description="Pagination offset"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from a previous page; takes precedence over offset"
+    ),
     status: str = Query("all", description="Filter by status: all|in_progress|completed"),
     current_user: TokenData = Depends(get_current_user),
     db: Database = Depends(get_db),
@@ -322,11 +327,16 @@ async def get_user_sessions(
     if current_user.user_id != str(user_id):
         raise HTTPException(status_code=403, detail="Can only access your own sessions")
 
+    if cursor:
+        decode_cursor(cursor, NEWEST_FIRST)  # Reject bad cursors with a 400
+        offset = 0
+
     try:
         # Build query with filters
         base_query = """
             SELECT id, user_id, game_length, category, custom_request, status,
-                   current_question, started_at, completed_at, summary, questions, answers
+                   current_question, started_at, completed_at, summary, questions, answers,
+                   created_at
             FROM wyr_game_sessions
             WHERE user_id = $1
         """
@@ -338,13 +348,17 @@ async def get_user_sessions(
             base_query += f" AND status = ${param_count}"
             params.append(status)
 
+        if cursor:
+            base_query += f" AND {keyset_condition(NEWEST_FIRST, cursor, params)}"
+            param_count = len(params)
+
         # Order by creation date descending
-        base_query += " ORDER BY created_at DESC"
+        base_query += f" {order_by(NEWEST_FIRST)}"
 
-        # Add pagination
+        # Add pagination (one extra row tells whether there is a next page)
         param_count += 1
         base_query += f" LIMIT ${param_count}"
-        params.append(limit)
+        params.append(limit + 1)
 
         param_count += 1
         base_query += f" OFFSET ${param_count}"
@@ -352,6 +366,7 @@ async def get_user_sessions(
 
         # Execute query
         rows = await db.fetch_all(base_query, *params)
+        rows, next_cursor = paginate(rows, limit, NEWEST_FIRST)
 
         # Get total counts
         count_query = """
@@ -391,6 +406,7 @@ async def get_user_sessions(
             total_count=total_count,
             in_progress_count=in_progress_count,
             completed_count=completed_count,
+            next_cursor=next_cursor,
         )
 
     except Exception as e:
@@ -595,18 +611,14 @@ async def _get_user_age_context(db: Database, user_id: UUID) -> str:
     """Get user age context for content filtering"""
     try:
         # Get user birth date
-        user_query = """
-            SELECT birth_date FROM users WHERE id = $1
-        """
-
-        user_result = await db.fetch_one(user_query, user_id)
-        if not user_result or not user_result["birth_date"]:
+        context = await get_generation_context(db, user_id)
+        if not context["birth_date"]:
             return "general audience"
 
         # Calculate age
         from datetime import date
 
-        birth_date = user_result["birth_date"]
+        birth_date = context["birth_date"]
         if isinstance(birth_date, str):
             birth_date = date.fromisoformat(birth_date)
 
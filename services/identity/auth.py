@@ -1,7 +1,8 @@
 import os
 import secrets
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Optional
+from uuid import uuid4
 
 import httpx
 import jwt
@@ -10,7 +11,8 @@ from fastapi import Depends, HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from passlib.context import CryptContext
 
-from shared.auth_middleware import TokenData
+from shared.auth_middleware import TokenData, check_not_revoked
+from shared.sessions import create_session
 
 # Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", secrets.token_urlsafe(32))
@@ -19,6 +21,16 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 REFRESH_TOKEN_EXPIRE_DAYS = 30
 OTP_EXPIRE_MINUTES = 10
 
+# Deletes the OTP only if it matches, so a code can be used by a single login.
+# KEYS: otp key. ARGV: code. Returns 1 if the code was consumed.
+CONSUME_OTP_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
 # Password context for any future password needs
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -83,6 +95,25 @@ class AuthService:
 
         return False
 
+    async def consume_otp(self, identifier: str, otp: str) -> bool:
+        """Check and delete an OTP in one Redis call; a concurrent reuse of the code fails"""
+        return bool(await self.redis.eval(CONSUME_OTP_SCRIPT, 1, f"otp:{identifier}", otp))
+
+    async def issue_tokens(
+        self, data: dict[str, Any], device: Optional[str] = None
+    ) -> tuple[str, str]:
+        """Open a session and create its access and refresh tokens"""
+        session_id = uuid4().hex
+        refresh_token = self._encode_refresh_token({**data, "sid": session_id})
+        version = await create_session(
+            self.redis, data["user_id"], session_id, refresh_token, device
+        )
+
+        access_token = await self.create_access_token(
+            {**data, "sid": session_id, "ver": version}
+        )
+        return access_token, refresh_token
+
     async def create_access_token(self, data: dict[str, Any]) -> str:
         """Create JWT access token"""
         to_encode = data.copy()
@@ -94,11 +125,7 @@ class AuthService:
 
     async def create_refresh_token(self, data: dict[str, Any]) -> str:
         """Create JWT refresh token"""
-        to_encode = data.copy()
-        expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-        to_encode.update({"exp": expire, "type": "refresh"})
-
-        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        encoded_jwt = self._encode_refresh_token(data)
 
         # Store refresh token in Redis for revocation capability
         await self.redis.setex(
@@ -109,21 +136,15 @@ class AuthService:
 
         return encoded_jwt
 
+    def _encode_refresh_token(self, data: dict[str, Any]) -> str:
+        to_encode = data.copy()
+        expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        to_encode.update({"exp": expire, "type": "refresh"})
+        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
     async def decode_token(self, token: str) -> TokenData:
         """Decode and validate JWT token"""
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            # Filter payload to only include fields that TokenData expects
-            filtered_payload = {
-                k: v
-                for k, v in payload.items()
-                if k in {"user_id", "fairyname", "email", "is_builder", "is_admin", "exp", "type"}
-            }
-            return TokenData(**filtered_payload)
-        except jwt.ExpiredSignatureError:
-            raise HTTPException(status_code=401, detail="Token has expired")
-        except jwt.JWTError:
-            raise HTTPException(status_code=401, detail="Invalid token")
+        return decode_token(token)
 
     async def get_oauth_token(self, provider: str, code: str) -> dict[str, Any]:
         """Exchange OAuth code for access token"""
@@ -318,23 +339,38 @@ class AuthService:
     # HTTP client will be cleaned up by garbage collection
 
 
+def decode_token(token: str) -> TokenData:
+    """Decode and validate JWT token"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        # Filter payload to only include fields that TokenData expects
+        filtered_payload = {
+            k: v
+            for k, v in payload.items()
+            if k in {"user_id", "fairyname", "email", "is_builder", "is_admin", "exp", "type"}
+        }
+        return TokenData(
+            **filtered_payload,
+            session_id=payload.get("sid"),
+            session_version=payload.get("ver", 0),
+        )
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token has expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+
 # Dependency to get current user from JWT token
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Security(security),
 ) -> TokenData:
     """Dependency to get current user from JWT token"""
-    from shared.redis_client import get_redis
-
-    redis_client = await get_redis()
-    auth_service = AuthService(redis_client)
-    token_data = await auth_service.decode_token(credentials.credentials)
-
-    # Optionally check if token is revoked
-    if token_data.user_id:
-        is_revoked = await redis_client.get(f"revoked_token:{credentials.credentials}")
-        if is_revoked:
-            print(f"🔐 AUTH: Token revoked for user {token_data.user_id}", flush=True)
-            raise HTTPException(status_code=401, detail="Token has been revoked")
+    token_data = decode_token(credentials.credentials)
+    if token_data.type == "refresh":
+        raise HTTPException(status_code=401, detail="Invalid token type")
+
+    # Revoked sessions and users are checked in memory (shared/sessions.py)
+    check_not_revoked(token_data)
     return token_data
 
 
@@ -0,0 +1,124 @@
+# services/identity/background.py
+import asyncio
+import os
+import time
+
+from fairynames import (
+    FAIRYNAME_POOL_LOW_WATERMARK,
+    available_fairynames,
+    purge_allocated_fairynames,
+    refill_fairyname_pool,
+)
+
+from shared.account_deletion import AccountDeletionWorker
+from shared.database import get_db
+from shared.delivery_queue import DeliveryWorker
+from shared.email_service import EMAIL_DESTINATION
+from shared.hubspot_webhook import HUBSPOT_DESTINATION
+from shared.outbox import OutboxDispatcher
+from shared.redis_client import get_redis
+from shared.storage_service import delete_user_assets
+
+# Global task references
+_background_tasks: set[asyncio.Task] = set()
+_shutdown_event = asyncio.Event()
+
+
+def _outbox_dispatcher(db) -> OutboxDispatcher:
+    return OutboxDispatcher(db, [HUBSPOT_DESTINATION, EMAIL_DESTINATION])
+
+
+async def outbox_dispatch_task():
+    """Deliver queued webhooks and notification emails"""
+    await _outbox_dispatcher(await get_db()).run(_shutdown_event)
+
+
+async def outbox_cleanup_task():
+    """Delete delivered outbox events past retention"""
+    dispatcher = _outbox_dispatcher(await get_db())
+
+    while not _shutdown_event.is_set():
+        try:
+            purged = await dispatcher.purge_delivered()
+            if purged:
+                print(f"📤 OUTBOX: Purged {purged} delivered events", flush=True)
+
+            # Run hourly
+            await asyncio.sleep(3600)
+
+        except Exception as e:
+            print(f"Error in outbox cleanup task: {e}")
+            await asyncio.sleep(300)
+
+
+async def delivery_worker_task():
+    """Send queued OTP and notification emails and SMS"""
+    await DeliveryWorker(await get_redis()).run(_shutdown_event)
+
+
+async def account_deletion_task():
+    """Run queued account deletions"""
+    worker = AccountDeletionWorker(await get_db(), await get_redis(), delete_user_assets)
+    await worker.run(_shutdown_event)
+
+
+async def fairyname_pool_task():
+    """Keep the fairyname pool stocked for signups"""
+    db = await get_db()
+    last_purge = 0.0
+
+    while not _shutdown_event.is_set():
+        try:
+            if await available_fairynames(db) < FAIRYNAME_POOL_LOW_WATERMARK:
+                added = await refill_fairyname_pool(db)
+                if added:
+                    print(f"🧚 FAIRYNAME_POOL: Added {added} names", flush=True)
+
+            if time.monotonic() - last_purge > 3600:
+                purged = await purge_allocated_fairynames(db)
+                last_purge = time.monotonic()
+                if purged:
+                    print(f"🧚 FAIRYNAME_POOL: Purged {purged} allocated names", flush=True)
+
+            # Check every 30 seconds
+            await asyncio.sleep(30)
+
+        except Exception as e:
+            print(f"Error in fairyname pool task: {e}")
+            await asyncio.sleep(60)
+
+
+async def start_background_tasks():
+    """Start all background tasks"""
+    global _background_tasks
+
+    tasks = [
+        asyncio.create_task(outbox_dispatch_task()),
+        asyncio.create_task(outbox_cleanup_task()),
+        asyncio.create_task(fairyname_pool_task()),
+        asyncio.create_task(account_deletion_task()),
+    ]
+    # Disable on replicas that should only queue messages for a dedicated worker
+    if os.getenv("DELIVERY_WORKER_ENABLED", "true").lower() == "true":
+        tasks.append(asyncio.create_task(delivery_worker_task()))
+
+    _background_tasks = set(tasks)
+    for task in tasks:
+        task.add_done_callback(_background_tasks.discard)
+
+
+async def stop_background_tasks():
+    """Stop all background tasks gracefully"""
+    global _background_tasks
+
+    _shutdown_event.set()
+
+    # Don't wait out the cleanup task's hourly sleep; a delivery cut off here is retried
+    # by any dispatcher (or delivery worker) once its claim lease expires
+    for task in _background_tasks:
+        task.cancel()
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+
+    _background_tasks.clear()
+    _shutdown_event.clear()
@@ -0,0 +1,318 @@
+# services/identity/fairynames.py
+"""
+Fairyname generation and the pre-generated fairyname pool.
+
+Signup used to generate a name and probe users for it until one was free, which gets
+slower and less predictable as the table fills. Instead, names are generated in bulk in
+the background, checked against users in one statement and stored in fairyname_pool;
+signup claims one with a single atomic UPDATE ... SKIP LOCKED. Claimed names stay in the
+pool, marked allocated, for a day (by then their user exists), so a concurrent refill
+can never hand the same name out twice.
+"""
+
+import os
+import secrets
+import string
+import time
+from typing import Optional
+
+from shared.database import Database
+
+# Unallocated names to keep ready; refilled in bulk once below the low watermark
+FAIRYNAME_POOL_TARGET = int(os.getenv("FAIRYNAME_POOL_TARGET", "5000"))
+FAIRYNAME_POOL_LOW_WATERMARK = int(os.getenv("FAIRYNAME_POOL_LOW_WATERMARK", "1000"))
+
+# Candidates checked against users per statement while refilling
+REFILL_BATCH_SIZE = 2000
+
+# pg_try_advisory_xact_lock key so only one identity replica refills at a time
+FAIRYNAME_POOL_LOCK_KEY = 730_005
+
+# Allocated names are dropped from the pool once their user has long existed
+ALLOCATED_RETENTION_SECONDS = 86400
+
+
+def generate_fairyname() -> str:
+    """Generate a random fairyname; uniqueness is checked by the caller"""
+    # Expanded whimsical word lists for more variety
+    adjectives = [
+        # Mystical/Magic
+        "crystal",
+        "lunar",
+        "stellar",
+        "mystic",
+        "cosmic",
+        "ethereal",
+        "radiant",
+        "twilight",
+        "enchanted",
+        "magical",
+        "celestial",
+        "divine",
+        "arcane",
+        "mystical",
+        "sacred",
+        "ethereal",
+        "luminous",
+        "shimmering",
+        "iridescent",
+        "opalescent",
+        "glowing",
+        "sparkling",
+        # Nature/Elements
+        "golden",
+        "silver",
+        "emerald",
+        "sapphire",
+        "ruby",
+        "diamond",
+        "amber",
+        "pearl",
+        "forest",
+        "ocean",
+        "mountain",
+        "desert",
+        "winter",
+        "spring",
+        "summer",
+        "autumn",
+        "stormy",
+        "sunny",
+        "cloudy",
+        "misty",
+        "frosty",
+        "dewy",
+        "breezy",
+        "gentle",
+        # Emotions/Qualities
+        "serene",
+        "peaceful",
+        "joyful",
+        "cheerful",
+        "brave",
+        "kind",
+        "wise",
+        "clever",
+        "swift",
+        "graceful",
+        "elegant",
+        "charming",
+        "vibrant",
+        "lively",
+        "spirited",
+        "bold",
+        "dreamy",
+        "whimsical",
+        "playful",
+        "curious",
+        "adventurous",
+        "creative",
+        "artistic",
+        # Fantasy/Ethereal
+        "fairy",
+        "sprite",
+        "pixie",
+        "angel",
+        "phoenix",
+        "dragon",
+        "unicorn",
+        "pegasus",
+        "starlight",
+        "moonbeam",
+        "sunray",
+        "rainbow",
+        "aurora",
+        "nebula",
+        "comet",
+        "galaxy",
+    ]
+
+    nouns = [
+        # Natural elements
+        "spark",
+        "dream",
+        "wish",
+        "star",
+        "moon",
+        "light",
+        "dawn",
+        "dusk",
+        "flame",
+        "ember",
+        "glow",
+        "shine",
+        "beam",
+        "ray",
+        "gleam",
+        "shimmer",
+        "breeze",
+        "whisper",
+        "echo",
+        "song",
+        "melody",
+        "harmony",
+        "rhythm",
+        "dance",
+        # Magical/Fantasy
+        "wand",
+        "spell",
+        "charm",
+        "potion",
+        "crystal",
+        "gem",
+        "jewel",
+        "treasure",
+        "feather",
+        "wing",
+        "flight",
+        "soar",
+        "glide",
+        "float",
+        "drift",
+        "flow",
+        "blossom",
+        "petal",
+        "bloom",
+        "garden",
+        "meadow",
+        "grove",
+        "haven",
+        "sanctuary",
+        # Abstract concepts
+        "spirit",
+        "soul",
+        "heart",
+        "mind",
+        "essence",
+        "aura",
+        "vibe",
+        "energy",
+        "journey",
+        "quest",
+        "adventure",
+        "discovery",
+        "wonder",
+        "mystery",
+        "secret",
+        "riddle",
+        "joy",
+        "bliss",
+        "peace",
+        "calm",
+        "zen",
+        "balance",
+        "harmony",
+        "grace",
+        # Celestial
+        "nova",
+        "quasar",
+        "orbit",
+        "cosmos",
+        "void",
+        "infinity",
+        "eternity",
+        "horizon",
+        "eclipse",
+        "solstice",
+        "equinox",
+        "constellation",
+        "meteorite",
+        "asteroid",
+        "planet",
+    ]
+
+    adj = secrets.choice(adjectives)
+    noun = secrets.choice(nouns)
+    suffix = "".join(secrets.choice(string.digits) for _ in range(4))
+
+    return f"{adj}{noun}{suffix}"
+
+
+async def allocate_fairyname(db: Database) -> str:
+    """Claim an unused fairyname, generating one on the spot if the pool is empty"""
+    row = await db.fetch_one(
+        """
+        UPDATE fairyname_pool SET allocated_at = CURRENT_TIMESTAMP
+        WHERE name = (
+            SELECT name FROM fairyname_pool
+            WHERE allocated_at IS NULL
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING name
+        """
+    )
+    if row:
+        return row["name"]
+
+    print("⚠️ FAIRYNAME_POOL: Pool empty, generating a name at signup", flush=True)
+    return await _generate_unused_fairyname(db)
+
+
+async def _generate_unused_fairyname(db: Database) -> str:
+    # Check fairyname uniqueness with limited retries to prevent infinite loops
+    fairyname = generate_fairyname()
+    for _ in range(10):
+        if not await db.fetch_one("SELECT id FROM users WHERE fairyname = $1", fairyname):
+            return fairyname
+        fairyname = generate_fairyname()
+
+    # If we couldn't find unique name after 10 tries, add timestamp
+    return f"{fairyname}{int(time.time() % 10000)}"
+
+
+async def available_fairynames(db: Database) -> int:
+    row = await db.fetch_one(
+        "SELECT COUNT(*) AS available FROM fairyname_pool WHERE allocated_at IS NULL"
+    )
+    return row["available"]
+
+
+async def refill_fairyname_pool(
+    db: Database,
+    target: int = FAIRYNAME_POOL_TARGET,
+    batch_size: int = REFILL_BATCH_SIZE,
+) -> Optional[int]:
+    """
+    Top the pool up to target unallocated names; returns how many were added, or None
+    if another replica is already refilling
+    """
+    added = 0
+    async with db.transaction() as conn:
+        if not await conn.fetchval("SELECT pg_try_advisory_xact_lock($1)", FAIRYNAME_POOL_LOCK_KEY):
+            return None
+
+        available = await conn.fetchval(
+            "SELECT COUNT(*) FROM fairyname_pool WHERE allocated_at IS NULL"
+        )
+        # Collisions with users or the pool only shrink a batch; stop if the name space
+        # is so full that batches stop yielding names
+        for _ in range(max(1, 4 * (target - available) // batch_size + 4)):
+            wanted = target - available - added
+            if wanted <= 0:
+                break
+            candidates = {generate_fairyname() for _ in range(min(wanted, batch_size))}
+            status = await conn.execute(
+                """
+                INSERT INTO fairyname_pool (name)
+                SELECT c.name FROM unnest($1::text[]) AS c(name)
+                WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.fairyname = c.name)
+                ON CONFLICT (name) DO NOTHING
+                """,
+                list(candidates),
+            )
+            added += int(status.split()[-1])
+
+    return added
+
+
+async def purge_allocated_fairynames(db: Database) -> int:
+    """Drop allocated names whose users have long been created; returns how many"""
+    status = await db.execute(
+        """
+        DELETE FROM fairyname_pool
+        WHERE allocated_at < CURRENT_TIMESTAMP - $1 * INTERVAL '1 second'
+        """,
+        float(ALLOCATED_RETENTION_SECONDS),
+    )
+    return int(status.split()[-1])
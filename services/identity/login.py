@@ -0,0 +1,92 @@
+# services/identity/login.py
+"""
+Login fast path.
+
+An OTP login finds or creates the user and counts the login in a single statement:
+UPDATE the existing user, or claim a pooled fairyname, INSERT the user and queue its
+user.created outbox event, all in one CTE. With system config served from memory
+(shared/system_config.py), a returning user's login costs one database round trip plus
+the OTP check and the token store in Redis.
+"""
+
+from typing import Any
+
+from fairynames import allocate_fairyname
+
+from shared.database import Database
+from shared.hubspot_webhook import USER_CREATED_PAYLOAD_SQL, hubspot_webhook_enabled
+from shared.uuid_utils import generate_uuid7
+
+# $1 new user id, $2 email or phone, $3 fairyname (NULL to claim one from the pool),
+# $4 outbox event id, $5 whether to queue the HubSpot user.created event.
+# Returns the user row plus is_new_user; no row if the pool was empty or a concurrent
+# signup took the identifier or name first.
+LOGIN_UPSERT_SQL = """
+    WITH existing AS (
+        UPDATE users
+        SET total_logins = COALESCE(total_logins, 0) + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE {column} = $2
+        RETURNING *
+    ),
+    claimed AS (
+        UPDATE fairyname_pool SET allocated_at = CURRENT_TIMESTAMP
+        WHERE $3::text IS NULL
+          AND NOT EXISTS (SELECT 1 FROM existing)
+          AND name = (
+              SELECT name FROM fairyname_pool
+              WHERE allocated_at IS NULL
+              LIMIT 1
+              FOR UPDATE SKIP LOCKED
+          )
+        RETURNING name
+    ),
+    created AS (
+        INSERT INTO users (id, fairyname, {column}, dust_balance, auth_provider, total_logins)
+        SELECT $1, f.name, $2, 0, 'otp', 1
+        FROM (SELECT COALESCE((SELECT name FROM claimed), $3::text) AS name) f
+        WHERE f.name IS NOT NULL AND NOT EXISTS (SELECT 1 FROM existing)
+        ON CONFLICT DO NOTHING
+        RETURNING *
+    ),
+    event AS (
+        INSERT INTO outbox_events (id, destination, event_type, aggregate_id, payload, dedup_key)
+        SELECT $4, 'hubspot', 'user.created', u.id, {payload}, 'user.created:' || u.id
+        FROM created u
+        WHERE $5::boolean
+        ON CONFLICT (destination, dedup_key) WHERE dedup_key IS NOT NULL DO NOTHING
+    )
+    SELECT *, false AS is_new_user FROM existing
+    UNION ALL
+    SELECT *, true AS is_new_user FROM created
+"""
+
+_UPSERT_QUERIES = {
+    column: LOGIN_UPSERT_SQL.format(column=column, payload=USER_CREATED_PAYLOAD_SQL)
+    for column in ("email", "phone")
+}
+
+
+async def upsert_otp_user(
+    db: Database, identifier_type: str, identifier: str
+) -> tuple[dict[str, Any], bool]:
+    """Find or create the user for an OTP login and count the login; returns (user, is_new)"""
+    query = _UPSERT_QUERIES[identifier_type]
+    fairyname = None
+
+    for _ in range(3):
+        row = await db.fetch_one(
+            query,
+            generate_uuid7(),
+            identifier,
+            fairyname,
+            generate_uuid7(),
+            hubspot_webhook_enabled(),
+        )
+        if row:
+            user = dict(row)
+            return user, user.pop("is_new_user")
+
+        # Pool empty or a concurrent signup won; the retry finds that user or uses this name
+        fairyname = await allocate_fairyname(db)
+
+    raise RuntimeError(f"Could not create user for {identifier_type} login")
@@ -10,10 +10,15 @@ from fastapi.middleware.cors import CORSMiddleware
 load_dotenv()
 
 # Import our routes and dependencies
+from background import start_background_tasks, stop_background_tasks
 from routes import auth_router, public_terms_router, terms_router, user_router
 
-from shared.database import close_db, init_db
-from shared.redis_client import close_redis, init_redis
+from shared.database import close_db, get_db, init_db
+from shared.db_metrics import metrics_router
+from shared.delivery_queue import delivery_metrics_router
+from shared.redis_client import close_redis, get_redis, init_redis
+from shared.sessions import start_revocation_sync, stop_revocation_sync
+from shared.system_config import start_system_config, stop_system_config
 
 
 @asynccontextmanager
@@ -21,8 +26,14 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     await init_redis()
+    await start_system_config(await get_db())
+    await start_revocation_sync(await get_redis())
+    await start_background_tasks()
     yield
     # Shutdown
+    await stop_background_tasks()
+    await stop_revocation_sync()
+    await stop_system_config()
     await close_db()
     await close_redis()
 
@@ -78,6 +89,8 @@ app.include_router(auth_router, prefix="/auth", tags=["authentication"])
 app.include_router(user_router, prefix="/users", tags=["users"])
 app.include_router(terms_router, prefix="/users/me", tags=["terms"])
 app.include_router(public_terms_router, tags=["public-terms"])
+app.include_router(metrics_router)
+app.include_router(delivery_metrics_router)
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8001))
@@ -112,6 +112,13 @@ class Token(BaseModel):
     refresh_token: Optional[str] = None
 
 
+class SessionInfo(BaseModel):
+    session_id: str
+    device: Optional[str] = None
+    created_at: datetime
+    current: bool = False
+
+
 # TokenData moved to shared.auth_middleware for consistency
 
 
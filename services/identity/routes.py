@@ -1,21 +1,24 @@
-import json
+import asyncio
+import os
 import secrets
 import string
 from datetime import datetime
 from typing import Optional
+from uuid import UUID
 
 from auth import AuthService, TokenData, get_current_user
+from fairynames import allocate_fairyname
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Depends,
     File,
+    Form,
+    Header,
     HTTPException,
     Query,
-    Security,
     UploadFile,
 )
-from fastapi.security import HTTPBearer
+from login import upsert_otp_user
 from models import (
     AccountDeletionRequest,
     AccountDeletionResponse,
@@ -31,6 +34,7 @@ from models import (
     PublicTermsResponse,
     ReferralCodeResponse,
     RefreshTokenRequest,
+    SessionInfo,
     SingleTermsResponse,
     TermsAcceptanceRequest,
     TermsCheckResponse,
@@ -41,254 +45,67 @@ from models import (
     UserUpdate,
 )
 
+from shared.account_deletion import request_account_deletion
 from shared.daily_bonus_utils import check_daily_bonus_eligibility
-from shared.database import Database, get_db
-from shared.email_service import send_account_deletion_confirmation, send_otp_email
-from shared.hubspot_webhook import send_user_created_webhook, send_user_updated_webhook
+from shared.database import Database, get_db, get_db_session
+from shared.delivery_queue import enqueue_otp
+from shared.generation_context import invalidate_generation_context
+from shared.hubspot_webhook import enqueue_user_created, enqueue_user_updated
+from shared.json_utils import parse_jsonb_field
+from shared.middleware import conditional_get
 from shared.redis_client import get_redis
-from shared.sms_service import send_otp_sms
+from shared.sessions import (
+    check_refresh,
+    list_sessions,
+    revoke_session,
+    revoke_user_sessions,
+)
 from shared.storage_service import (
     delete_person_photo,
-    delete_user_assets,
     delete_user_avatar,
     upload_person_photo,
     upload_user_avatar,
 )
+from shared.system_config import system_config
 from shared.uuid_utils import generate_uuid7
 
-
-async def get_daily_bonus_amount(db: Database) -> int:
-    """Get current daily bonus amount from system config with fallback"""
-    try:
-        config_result = await db.fetch_one(
-            "SELECT value FROM system_config WHERE key = 'daily_login_bonus_amount'"
-        )
-        if config_result:
-            return int(config_result["value"])
-    except Exception:
-        pass
-    return 5  # Default fallback
-
-
-async def get_initial_dust_amount(db: Database) -> int:
-    """Get current initial dust amount from system config with fallback"""
-    try:
-        config_result = await db.fetch_one(
-            "SELECT value FROM system_config WHERE key = 'initial_dust_amount'"
-        )
-        if config_result:
-            return int(config_result["value"])
-    except Exception:
-        pass
-    return 100  # Default fallback
-
-
-security = HTTPBearer()
-
 # Constants
 FAIRYNAME_LENGTH = 12
 
+# Columns of a person in my life, as returned by the people routes
+PERSON_COLUMNS = """
+    id, user_id, name, entry_type, birth_date, relationship, species,
+    personality_description, photo_url, photo_uploaded_at, photo_size_bytes,
+    created_at, updated_at
+"""
+
+# Fields the batch people endpoint can project, and the SQL for each
+PEOPLE_BATCH_FIELDS = {
+    "id": "p.id",
+    "user_id": "p.user_id",
+    "name": "p.name",
+    "entry_type": "p.entry_type",
+    "birth_date": "p.birth_date",
+    "relationship": "p.relationship",
+    "species": "p.species",
+    "personality_description": "p.personality_description",
+    "photo_url": "p.photo_url",
+    "photo_uploaded_at": "p.photo_uploaded_at",
+    "photo_size_bytes": "p.photo_size_bytes",
+    "created_at": "p.created_at",
+    "updated_at": "p.updated_at",
+    "fortune_profile": "ppd.field_value",
+}
+
+# Bulk photo uploads: files per request, and uploads to R2 at a time
+PHOTO_BATCH_MAX = 10
+PHOTO_UPLOAD_CONCURRENCY = int(os.getenv("PHOTO_UPLOAD_CONCURRENCY", "4"))
+
 # Create routers
 auth_router = APIRouter()
 user_router = APIRouter()
 
 
-def generate_fairyname() -> str:
-    """Generate a unique fairyname for new users"""
-    # Expanded whimsical word lists for more variety
-    adjectives = [
-        # Mystical/Magic
-        "crystal",
-        "lunar",
-        "stellar",
-        "mystic",
-        "cosmic",
-        "ethereal",
-        "radiant",
-        "twilight",
-        "enchanted",
-        "magical",
-        "celestial",
-        "divine",
-        "arcane",
-        "mystical",
-        "sacred",
-        "ethereal",
-        "luminous",
-        "shimmering",
-        "iridescent",
-        "opalescent",
-        "glowing",
-        "sparkling",
-        # Nature/Elements
-        "golden",
-        "silver",
-        "emerald",
-        "sapphire",
-        "ruby",
-        "diamond",
-        "amber",
-        "pearl",
-        "forest",
-        "ocean",
-        "mountain",
-        "desert",
-        "winter",
-        "spring",
-        "summer",
-        "autumn",
-        "stormy",
-        "sunny",
-        "cloudy",
-        "misty",
-        "frosty",
-        "dewy",
-        "breezy",
-        "gentle",
-        # Emotions/Qualities
-        "serene",
-        "peaceful",
-        "joyful",
-        "cheerful",
-        "brave",
-        "kind",
-        "wise",
-        "clever",
-        "swift",
-        "graceful",
-        "elegant",
-        "charming",
-        "vibrant",
-        "lively",
-        "spirited",
-        "bold",
-        "dreamy",
-        "whimsical",
-        "playful",
-        "curious",
-        "adventurous",
-        "creative",
-        "artistic",
-        # Fantasy/Ethereal
-        "fairy",
-        "sprite",
-        "pixie",
-        "angel",
-        "phoenix",
-        "dragon",
-        "unicorn",
-        "pegasus",
-        "starlight",
-        "moonbeam",
-        "sunray",
-        "rainbow",
-        "aurora",
-        "nebula",
-        "comet",
-        "galaxy",
-    ]
-
-    nouns = [
-        # Natural elements
-        "spark",
-        "dream",
-        "wish",
-        "star",
-        "moon",
-        "light",
-        "dawn",
-        "dusk",
-        "flame",
-        "ember",
-        "glow",
-        "shine",
-        "beam",
-        "ray",
-        "gleam",
-        "shimmer",
-        "breeze",
-        "whisper",
-        "echo",
-        "song",
-        "melody",
-        "harmony",
-        "rhythm",
-        "dance",
-        # Magical/Fantasy
-        "wand",
-        "spell",
-        "charm",
-        "potion",
-        "crystal",
-        "gem",
-        "jewel",
-        "treasure",
-        "feather",
-        "wing",
-        "flight",
-        "soar",
-        "glide",
-        "float",
-        "drift",
-        "flow",
-        "blossom",
-        "petal",
-        "bloom",
-        "garden",
-        "meadow",
-        "grove",
-        "haven",
-        "sanctuary",
-        # Abstract concepts
-        "spirit",
-        "soul",
-        "heart",
-        "mind",
-        "essence",
-        "aura",
-        "vibe",
-        "energy",
-        "journey",
-        "quest",
-        "adventure",
-        "discovery",
-        "wonder",
-        "mystery",
-        "secret",
-        "riddle",
-        "joy",
-        "bliss",
-        "peace",
-        "calm",
-        "zen",
-        "balance",
-        "harmony",
-        "grace",
-        # Celestial
-        "nova",
-        "quasar",
-        "orbit",
-        "cosmos",
-        "void",
-        "infinity",
-        "eternity",
-        "horizon",
-        "eclipse",
-        "solstice",
-        "equinox",
-        "constellation",
-        "meteorite",
-        "asteroid",
-        "planet",
-    ]
-
-    adj = secrets.choice(adjectives)
-    noun = secrets.choice(nouns)
-    suffix = "".join(secrets.choice(string.digits) for _ in range(4))
-
-    return f"{adj}{noun}{suffix}"
-
-
 def generate_referral_code() -> str:
     """Generate a unique referral code for users"""
     # Use "FAIRY" prefix followed by 3 random digits
@@ -300,7 +117,6 @@ def generate_referral_code() -> str:
 @auth_router.post("/otp/request", response_model=dict)
 async def request_otp(
     otp_request: OTPRequest,
-    background_tasks: BackgroundTasks,
     auth_service: AuthService = Depends(lambda r=Depends(get_redis): AuthService(r)),
 ):
     """Request OTP for email or phone authentication"""
@@ -310,11 +126,10 @@ async def request_otp(
     # Store OTP in Redis
     await auth_service.store_otp(otp_request.identifier, otp)
 
-    # Send OTP in background
-    if otp_request.identifier_type == "email":
-        background_tasks.add_task(send_otp_email, otp_request.identifier, otp)
-    else:
-        background_tasks.add_task(send_otp_sms, otp_request.identifier, otp)
+    # Queue for the delivery worker, ahead of bulk mail; survives a restart of this process
+    await enqueue_otp(
+        auth_service.redis, otp_request.identifier_type, otp_request.identifier, otp
+    )
 
     return {
         "message": f"OTP sent to {otp_request.identifier_type}",
@@ -325,96 +140,34 @@ async def request_otp(
 @auth_router.post("/otp/verify", response_model=AuthResponse)
 async def verify_otp(
     otp_verify: OTPVerify,
-    db: Database = Depends(get_db),
+    db: Database = Depends(get_db_session),  # One connection for the whole login
     auth_service: AuthService = Depends(lambda r=Depends(get_redis): AuthService(r)),
+    user_agent: Optional[str] = Header(None),
 ):
     """Verify OTP and create/login user"""
-    # Verify OTP
-    is_valid = await auth_service.verify_otp(otp_verify.identifier, otp_verify.code)
+    # Consume the OTP before any write, so a code submitted twice logs in only once
+    is_valid = await auth_service.consume_otp(otp_verify.identifier, otp_verify.code)
     if not is_valid:
         raise HTTPException(status_code=400, detail="Invalid or expired OTP")
 
-    # Check if user exists
+    # Find or create the user and count the login in one statement
     identifier_type = "email" if "@" in otp_verify.identifier else "phone"
-    user = await db.fetch_one(
-        f"""SELECT id, fairyname, email, phone, is_admin,
-                  first_name, birth_date, is_onboarding_completed, dust_balance, auth_provider,
-                  last_login_date, total_logins,
-                  created_at, updated_at
-           FROM users WHERE {identifier_type} = $1""",
-        otp_verify.identifier,
-    )
-
-    is_new_user = False
-
-    if not user:
-        # Create new user
-        is_new_user = True
-
-        user_id = generate_uuid7()
-        fairyname = generate_fairyname()
-
-        # Check fairyname uniqueness with limited retries to prevent infinite loops
-        max_retries = 10
-        for _ in range(max_retries):
-            if not await db.fetch_one("SELECT id FROM users WHERE fairyname = $1", fairyname):
-                break
-            fairyname = generate_fairyname()
-        else:
-            # If we couldn't find unique name after 10 tries, add timestamp
-            import time
-
-            fairyname = f"{fairyname}{int(time.time() % 10000)}"
-
-        # Create user
-        user = await db.fetch_one(
-            """
-            INSERT INTO users (id, fairyname, email, phone, dust_balance, auth_provider)
-            VALUES ($1, $2, $3, $4, $5, $6)
-            RETURNING *
-            """,
-            user_id,
-            fairyname,
-            otp_verify.identifier if identifier_type == "email" else None,
-            otp_verify.identifier if identifier_type == "phone" else None,
-            0,  # Starting balance is 0, app will handle initial grants
-            "otp",
-        )
-
-        # Send HubSpot webhook for new user (non-blocking)
-        try:
-            await send_user_created_webhook(dict(user))
-        except Exception as e:
-            # Log error but don't block user registration
-            import logging
-
-            logger = logging.getLogger(__name__)
-            logger.warning(f"HubSpot webhook failed for new user {user['fairyname']}: {e}")
+    user, is_new_user = await upsert_otp_user(db, identifier_type, otp_verify.identifier)
 
     # Check daily login bonus eligibility
     is_bonus_eligible, current_time = await check_daily_bonus_eligibility(
         db, str(user["id"]), user.get("last_login_date")
     )
 
-    # Update login statistics (total_logins should increment on every successful login)
-    await db.execute(
-        "UPDATE users SET total_logins = total_logins + 1, updated_at = CURRENT_TIMESTAMP WHERE id = $1",
-        user["id"],
-    )
-
     # Note: last_login_date is NOT updated here - only checked for response
     # DUST grant endpoint will handle last_login_date updates to avoid bonus timing issues
 
-    # Get daily bonus amount from system config
-    daily_bonus_amount = await get_daily_bonus_amount(db)
+    # Daily bonus and initial dust amounts from system config
+    daily_bonus_amount = system_config.get("daily_login_bonus_amount")
+    initial_dust_amount = system_config.get("initial_dust_amount")
 
-    # Get initial dust amount from system config
-    initial_dust_amount = await get_initial_dust_amount(db)
-
-    # Add calculated daily bonus fields to user data
+    # Add calculated daily bonus fields to user data (total_logins already includes this login)
     user_dict = dict(user)
-    # Update total_logins in response to reflect the database increment
-    user_dict["total_logins"] = user.get("total_logins", 0) + 1
     daily_bonus_value = (
         not is_new_user and is_bonus_eligible and user.get("is_onboarding_completed", False)
     )
@@ -430,8 +183,7 @@ async def verify_otp(
         "is_admin": user.get("is_admin", False),
     }
 
-    access_token = await auth_service.create_access_token(token_data)
-    refresh_token = await auth_service.create_refresh_token(token_data)
+    access_token, refresh_token = await auth_service.issue_tokens(token_data, device=user_agent)
 
     # Log comprehensive login response for daily login bonus debugging
     print(f"🚀 LOGIN_RESPONSE (OTP): User {user['fairyname']} ({user['id']}) login details:")
@@ -468,6 +220,7 @@ async def oauth_login(
     callback: OAuthCallback,
     db: Database = Depends(get_db),
     auth_service: AuthService = Depends(lambda r=Depends(get_redis): AuthService(r)),
+    user_agent: Optional[str] = Header(None),
 ):
     """Handle OAuth callback and create/login user"""
 
@@ -506,16 +259,19 @@ async def oauth_login(
     if not user_info.get("provider_id"):
         raise HTTPException(status_code=400, detail="Failed to get user info")
 
-    # Check if user exists
+    # Find a linked user and count the login in one statement
     user = await db.fetch_one(
         """
-        SELECT u.* FROM users u
-        JOIN user_auth_providers uap ON u.id = uap.user_id
-        WHERE uap.provider = $1 AND uap.provider_user_id = $2
+        UPDATE users u
+        SET total_logins = COALESCE(u.total_logins, 0) + 1, updated_at = CURRENT_TIMESTAMP
+        FROM user_auth_providers uap
+        WHERE u.id = uap.user_id AND uap.provider = $1 AND uap.provider_user_id = $2
+        RETURNING u.*
         """,
         provider,
         user_info["provider_id"],
     )
+    login_counted = user is not None
 
     is_new_user = False
 
@@ -562,19 +318,7 @@ async def oauth_login(
             is_new_user = True
 
             user_id = generate_uuid7()
-            fairyname = generate_fairyname()
-
-            # Check fairyname uniqueness with limited retries to prevent infinite loops
-            max_retries = 10
-            for _ in range(max_retries):
-                if not await db.fetch_one("SELECT id FROM users WHERE fairyname = $1", fairyname):
-                    break
-                fairyname = generate_fairyname()
-            else:
-                # If we couldn't find unique name after 10 tries, add timestamp
-                import time
-
-                fairyname = f"{fairyname}{int(time.time() % 10000)}"
+            fairyname = await allocate_fairyname(db)
 
             # Create user with email/phone handling for constraint
             email = user_info.get("email")
@@ -583,43 +327,37 @@ async def oauth_login(
                 # Generate a unique placeholder email for Apple users who hide their email
                 email = f"apple_user_{user_info.get('provider_id', user_id.hex[:8])}@private.fairydust.app"
 
-            user = await db.fetch_one(
-                """
-                INSERT INTO users (id, fairyname, email, dust_balance, auth_provider)
-                VALUES ($1, $2, $3, $4, $5)
-                RETURNING *
-                """,
-                user_id,
-                fairyname,
-                email,
-                0,  # Starting balance is 0, app will handle initial grants
-                provider,
-            )
-
-            # Link OAuth provider
-            await db.execute(
-                """
-                INSERT INTO user_auth_providers (user_id, provider, provider_user_id)
-                VALUES ($1, $2, $3)
-                """,
-                user_id,
-                provider,
-                user_info["provider_id"],
-            )
+            # Create the user, link the OAuth provider and queue the HubSpot webhook
+            # (sent by the outbox) in one transaction
+            async with db.transaction() as conn:
+                user = dict(
+                    await conn.fetchrow(
+                        """
+                        INSERT INTO users (id, fairyname, email, dust_balance, auth_provider)
+                        VALUES ($1, $2, $3, $4, $5)
+                        RETURNING *
+                        """,
+                        user_id,
+                        fairyname,
+                        email,
+                        0,  # Starting balance is 0, app will handle initial grants
+                        provider,
+                    )
+                )
 
-            print(f"👤 OAUTH: Created new user {fairyname} with {provider} authentication")
+                await conn.execute(
+                    """
+                    INSERT INTO user_auth_providers (user_id, provider, provider_user_id)
+                    VALUES ($1, $2, $3)
+                    """,
+                    user_id,
+                    provider,
+                    user_info["provider_id"],
+                )
 
-            # Send HubSpot webhook for new user (non-blocking)
-            try:
-                await send_user_created_webhook(dict(user))
-            except Exception as e:
-                # Log error but don't block user registration
-                import logging
+                await enqueue_user_created(conn, user)
 
-                logger = logging.getLogger(__name__)
-                logger.warning(
-                    f"HubSpot webhook failed for new OAuth user {user['fairyname']}: {e}"
-                )
+            print(f"👤 OAUTH: Created new user {fairyname} with {provider} authentication")
 
     # Check daily login bonus eligibility
     is_bonus_eligible, current_time = await check_daily_bonus_eligibility(
@@ -627,24 +365,23 @@ async def oauth_login(
     )
 
     # Update login statistics (total_logins should increment on every successful login)
-    await db.execute(
-        "UPDATE users SET total_logins = total_logins + 1, updated_at = CURRENT_TIMESTAMP WHERE id = $1",
-        user["id"],
-    )
+    user_dict = dict(user)
+    if not login_counted:
+        await db.execute(
+            "UPDATE users SET total_logins = total_logins + 1, updated_at = CURRENT_TIMESTAMP WHERE id = $1",
+            user["id"],
+        )
+        # Update total_logins in response to reflect the database increment
+        user_dict["total_logins"] = (user.get("total_logins") or 0) + 1
 
     # Note: last_login_date is NOT updated here - only checked for response
     # DUST grant endpoint will handle last_login_date updates to avoid bonus timing issues
 
-    # Get daily bonus amount from system config
-    daily_bonus_amount = await get_daily_bonus_amount(db)
-
-    # Get initial dust amount from system config
-    initial_dust_amount = await get_initial_dust_amount(db)
+    # Daily bonus and initial dust amounts from system config
+    daily_bonus_amount = system_config.get("daily_login_bonus_amount")
+    initial_dust_amount = system_config.get("initial_dust_amount")
 
     # Add calculated daily bonus fields to user data
-    user_dict = dict(user)
-    # Update total_logins in response to reflect the database increment
-    user_dict["total_logins"] = user.get("total_logins", 0) + 1
     daily_bonus_value = (
         not is_new_user and is_bonus_eligible and user.get("is_onboarding_completed", False)
     )
@@ -660,8 +397,7 @@ async def oauth_login(
         "is_admin": user.get("is_admin", False),
     }
 
-    access_token = await auth_service.create_access_token(token_data)
-    refresh_token = await auth_service.create_refresh_token(token_data)
+    access_token, refresh_token = await auth_service.issue_tokens(token_data, device=user_agent)
 
     # Extract name and DOB for frontend pre-population
     extracted_name = user_info.get("name") if user_info else None
@@ -722,28 +458,36 @@ async def refresh_token(
             print(f"❌ REFRESH: Invalid token type: {token_data.type}", flush=True)
             raise HTTPException(status_code=400, detail="Invalid token type")
 
-        # Check if refresh token is still valid in Redis
-        redis_key = f"refresh_token:{token_data.user_id}"
-        stored_token = await auth_service.redis.get(redis_key)
-        print(
-            f"🔄 REFRESH: Redis lookup for {redis_key}: {'found' if stored_token else 'not found'}",
-            flush=True,
-        )
-
-        if not stored_token:
-            print(
-                f"❌ REFRESH: No stored token found in Redis for user {token_data.user_id}",
-                flush=True,
+        if token_data.session_id:
+            # The session must still be open and this its current refresh token
+            session_version = await check_refresh(
+                auth_service.redis,
+                token_data.user_id,
+                token_data.session_id,
+                request.refresh_token,
             )
-            raise HTTPException(status_code=401, detail="Refresh token not found")
+            if session_version is None:
+                print(
+                    f"❌ REFRESH: Session {token_data.session_id} not open for user "
+                    f"{token_data.user_id}",
+                    flush=True,
+                )
+                raise HTTPException(status_code=401, detail="Refresh token not found")
+        else:
+            # Tokens from before sessions: one refresh token per user
+            redis_key = f"refresh_token:{token_data.user_id}"
+            stored_token = await auth_service.redis.get(redis_key)
+            if not stored_token:
+                print(
+                    f"❌ REFRESH: No stored token found in Redis for user {token_data.user_id}",
+                    flush=True,
+                )
+                raise HTTPException(status_code=401, detail="Refresh token not found")
 
-        if stored_token != request.refresh_token:
-            print(f"❌ REFRESH: Token mismatch for user {token_data.user_id}", flush=True)
-            print(
-                f"❌ REFRESH: Stored: {stored_token[:50]}... vs Provided: {request.refresh_token[:50]}...",
-                flush=True,
-            )
-            raise HTTPException(status_code=401, detail="Invalid refresh token")
+            if stored_token != request.refresh_token:
+                print(f"❌ REFRESH: Token mismatch for user {token_data.user_id}", flush=True)
+                raise HTTPException(status_code=401, detail="Invalid refresh token")
+            session_version = 0
 
         print(f"✅ REFRESH: Token validation successful for user {token_data.user_id}", flush=True)
     except HTTPException:
@@ -759,6 +503,8 @@ async def refresh_token(
         "email": token_data.email,
         "is_admin": token_data.is_admin,
     }
+    if token_data.session_id:
+        new_token_data.update({"sid": token_data.session_id, "ver": session_version})
 
     new_access_token = await auth_service.create_access_token(new_token_data)
 
@@ -769,22 +515,58 @@ async def refresh_token(
 async def logout(
     current_user: TokenData = Depends(get_current_user),
     redis_client=Depends(get_redis),
-    credentials=Depends(lambda c=Security(security): c),
 ):
     """Logout user and revoke tokens"""
-    # Revoke access token
-    await redis_client.setex(
-        f"revoked_token:{credentials.credentials}", 3600, "1"  # Same as token expiry
-    )
-
-    # Delete refresh token
-    await redis_client.delete(f"refresh_token:{current_user.user_id}")
+    if current_user.session_id:
+        # End this device's session; other devices stay signed in
+        await revoke_session(redis_client, current_user.user_id, current_user.session_id)
+    else:
+        # Tokens from before sessions can't be told apart: sign out everywhere
+        await revoke_user_sessions(redis_client, current_user.user_id)
 
     return {"message": "Successfully logged out"}
 
 
+@auth_router.post("/logout-all")
+async def logout_all(
+    current_user: TokenData = Depends(get_current_user),
+    redis_client=Depends(get_redis),
+):
+    """Sign out of every device"""
+    await revoke_user_sessions(redis_client, current_user.user_id)
+    return {"message": "Signed out of all devices"}
+
+
+@auth_router.get("/sessions", response_model=list[SessionInfo])
+async def get_sessions(
+    current_user: TokenData = Depends(get_current_user),
+    redis_client=Depends(get_redis),
+):
+    """List the devices the user is signed in on"""
+    return [
+        SessionInfo(
+            **session,
+            current=session["session_id"] == current_user.session_id,
+        )
+        for session in await list_sessions(redis_client, current_user.user_id)
+    ]
+
+
+@auth_router.delete("/sessions/{session_id}")
+async def delete_session(
+    session_id: str,
+    current_user: TokenData = Depends(get_current_user),
+    redis_client=Depends(get_redis),
+):
+    """Sign out of one device"""
+    if not await revoke_session(redis_client, current_user.user_id, session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"message": "Session revoked"}
+
+
 # User Routes
 @user_router.get("/me", response_model=User)
+@conditional_get()
 async def get_current_user_profile(
     current_user: TokenData = Depends(get_current_user), db: Database = Depends(get_db)
 ):
@@ -807,10 +589,10 @@ async def get_current_user_profile(
     )
 
     # Get daily bonus amount from system config
-    daily_bonus_amount = await get_daily_bonus_amount(db)
+    daily_bonus_amount = system_config.get("daily_login_bonus_amount")
 
     # Get initial dust amount from system config
-    initial_dust_amount = await get_initial_dust_amount(db)
+    initial_dust_amount = system_config.get("initial_dust_amount")
 
     # Convert user dict to mutable dict and add calculated fields
     user_dict = dict(user)
@@ -826,6 +608,7 @@ async def update_user_profile(
     update_data: UserUpdate,
     current_user: TokenData = Depends(get_current_user),
     db: Database = Depends(get_db),
+    redis_client=Depends(get_redis),
 ):
     """Update current user profile"""
     # Track changed fields for HubSpot webhook
@@ -903,9 +686,17 @@ async def update_user_profile(
         RETURNING *
     """
 
-    user = await db.fetch_one(query, *values)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # The HubSpot webhook is queued with the update; bursts of edits are coalesced
+    async with db.transaction() as conn:
+        row = await conn.fetchrow(query, *values)
+        if not row:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = dict(row)
+        await enqueue_user_updated(conn, user, changed_fields)
+
+    # Generation prompts use the birth date
+    if "birth_date" in changed_fields:
+        await invalidate_generation_context(redis_client, current_user.user_id)
 
     # Log the result after update
     print(
@@ -913,17 +704,6 @@ async def update_user_profile(
         flush=True,
     )
 
-    # Send HubSpot webhook for user update (non-blocking)
-    if changed_fields:  # Only send if there were actual changes
-        try:
-            await send_user_updated_webhook(dict(user), changed_fields)
-        except Exception as e:
-            # Log error but don't block user update
-            import logging
-
-            logger = logging.getLogger(__name__)
-            logger.warning(f"HubSpot webhook failed for user update {user['fairyname']}: {e}")
-
     return User(**user)
 
 
@@ -1052,123 +832,19 @@ async def delete_account(
     db: Database = Depends(get_db),
     redis=Depends(get_redis),
 ):
-    """Delete user's account permanently"""
+    """Delete user's account permanently (queued; the deletion runs in the background)"""
     try:
-        user_id = current_user.user_id
-
-        # Get user data for logging before deletion
-        user_data = await db.fetch_one(
-            """SELECT fairyname, email, created_at, dust_balance,
-                      avatar_url, avatar_uploaded_at, avatar_size_bytes
-               FROM users WHERE id = $1""",
-            user_id,
+        deletion_id = await request_account_deletion(
+            db, current_user.user_id, request.reason, request.feedback
         )
-
-        if not user_data:
+        if not deletion_id:
             raise HTTPException(status_code=404, detail="User not found")
 
-        # Gather data summary for audit log
-        stats_queries = [
-            ("recipes_created", "SELECT COUNT(*) as count FROM user_recipes WHERE user_id = $1"),
-            ("stories_created", "SELECT COUNT(*) as count FROM user_stories WHERE user_id = $1"),
-            ("images_generated", "SELECT COUNT(*) as count FROM user_images WHERE user_id = $1"),
-            (
-                "people_in_life",
-                "SELECT COUNT(*) as count FROM people_in_my_life WHERE user_id = $1",
-            ),
-            (
-                "total_transactions",
-                "SELECT COUNT(*) as count FROM dust_transactions WHERE user_id = $1",
-            ),
-            ("referrals_made", "SELECT COUNT(*) as count FROM referral_codes WHERE user_id = $1"),
-        ]
-
-        data_summary = {
-            "dust_balance": user_data["dust_balance"],
-            "account_age_days": (
-                datetime.utcnow().replace(tzinfo=None)
-                - user_data["created_at"].replace(tzinfo=None)
-            ).days
-            if user_data["created_at"]
-            else 0,
-            "has_avatar": bool(user_data["avatar_url"]),
-            "last_deletion_request": datetime.utcnow().isoformat(),
-        }
-
-        # Get counts for data summary
-        for stat_name, query in stats_queries:
-            try:
-                result = await db.fetch_one(query, user_id)
-                data_summary[stat_name] = result["count"] if result else 0
-            except Exception:
-                data_summary[stat_name] = 0
-
-        # Create deletion log entry
-        deletion_id = str(generate_uuid7())
-        await db.execute(
-            """INSERT INTO account_deletion_logs
-               (id, user_id, fairyname, email, deletion_reason, deletion_feedback,
-                deleted_by, user_created_at, data_summary, deletion_requested_at)
-               VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, CURRENT_TIMESTAMP)""",
-            deletion_id,
-            user_id,
-            user_data["fairyname"],
-            user_data["email"],
-            request.reason,
-            request.feedback,
-            "self",
-            user_data["created_at"],
-            json.dumps(data_summary),
-        )
-
-        # Delete storage assets (avatars, people photos, generated images)
-        storage_deletion_summary = await delete_user_assets(user_id)
-
-        # Clear Redis data (sessions, rate limits, etc.)
-        try:
-            # Clear user sessions
-            session_keys = await redis.keys(f"session:*:{user_id}")
-            if session_keys:
-                await redis.delete(*session_keys)
-
-            # Clear rate limiting data
-            rate_limit_keys = await redis.keys(f"rate_limit:*:{user_id}*")
-            if rate_limit_keys:
-                await redis.delete(*rate_limit_keys)
-
-            # Clear OTP codes
-            otp_keys = await redis.keys(f"otp:*:{user_data['email']}*")
-            if otp_keys:
-                await redis.delete(*otp_keys)
-
-        except Exception as e:
-            # Log but don't fail deletion for Redis errors
-            print(f"Redis cleanup warning for user {user_id}: {e}")
-
-        # Delete user record (CASCADE will handle all related data)
-        await db.execute("DELETE FROM users WHERE id = $1", user_id)
-
-        # Update deletion log with completion
-        await db.execute(
-            """UPDATE account_deletion_logs
-               SET deletion_completed_at = CURRENT_TIMESTAMP,
-                   data_summary = data_summary || $2
-               WHERE id = $1""",
-            deletion_id,
-            json.dumps({"storage_cleanup": storage_deletion_summary}),
-        )
-
-        # Send deletion confirmation email
-        try:
-            await send_account_deletion_confirmation(
-                user_data["email"], user_data["fairyname"], deletion_id
-            )
-        except Exception as e:
-            # Log email error but don't fail the deletion
-            print(f"Email notification failed for user {user_id}: {e}")
+        # Sign the user out everywhere now rather than when the job runs
+        await revoke_user_sessions(redis, current_user.user_id)
 
         return AccountDeletionResponse(
-            message="Account successfully deleted", deletion_id=deletion_id
+            message="Account deletion scheduled", deletion_id=str(deletion_id)
         )
 
     except HTTPException:
@@ -1286,6 +962,7 @@ async def add_person_to_life(
     person: PersonInMyLifeCreate,
     current_user: TokenData = Depends(get_current_user),
     db: Database = Depends(get_db),
+    redis_client=Depends(get_redis),
 ):
     """Add person or pet to user's life"""
     if current_user.user_id != user_id and not current_user.is_admin:
@@ -1317,6 +994,7 @@ async def add_person_to_life(
         person.species,
         person.personality_description,
     )
+    await invalidate_generation_context(redis_client, user_id)
 
     return PersonInMyLife(**new_person)
 
@@ -1343,19 +1021,99 @@ async def get_people_in_my_life(
 
         print(f"🐾 PEOPLE_API: Filtering for {type_filter}s only for user {user_id}")
         people = await db.fetch_all(
-            "SELECT * FROM people_in_my_life WHERE user_id = $1 AND entry_type = $2 ORDER BY created_at ASC",
+            f"""
+            SELECT {PERSON_COLUMNS} FROM people_in_my_life
+            WHERE user_id = $1 AND entry_type = $2 ORDER BY created_at ASC
+            """,
             user_id,
             type_filter,
         )
     else:
         people = await db.fetch_all(
-            "SELECT * FROM people_in_my_life WHERE user_id = $1 ORDER BY created_at ASC", user_id
+            f"""
+            SELECT {PERSON_COLUMNS} FROM people_in_my_life
+            WHERE user_id = $1 ORDER BY created_at ASC
+            """,
+            user_id,
         )
 
     result = [PersonInMyLife(**person) for person in people]
     return result
 
 
+@user_router.get("/{user_id}/people/batch")
+@conditional_get()
+async def get_people_batch(
+    user_id: str,
+    ids: Optional[str] = Query(None, description="Comma-separated person ids; omit for all"),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return; omit for all (id is always included)"
+    ),
+    type_filter: Optional[str] = Query(
+        None, alias="type", description="Filter by type: 'person', 'pet', or omit for all"
+    ),
+    current_user: TokenData = Depends(get_current_user),
+    db: Database = Depends(get_db),
+):
+    """People and/or pets with photo info and fortune profiles, in one query"""
+    if current_user.user_id != user_id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    if type_filter and type_filter not in ["person", "pet"]:
+        raise HTTPException(status_code=400, detail="Invalid type filter. Use 'person' or 'pet'")
+
+    selected = list(PEOPLE_BATCH_FIELDS)
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in PEOPLE_BATCH_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        selected = ["id"] + [field for field in requested if field != "id"]
+
+    conditions = ["p.user_id = $1"]
+    values: list = [user_id]
+    if type_filter:
+        values.append(type_filter)
+        conditions.append(f"p.entry_type = ${len(values)}")
+    if ids:
+        try:
+            person_ids = [UUID(person_id.strip()) for person_id in ids.split(",")]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid person id")
+        values.append(person_ids)
+        conditions.append(f"p.id = ANY(${len(values)})")
+
+    join = ""
+    if "fortune_profile" in selected:
+        join = """
+            LEFT JOIN person_profile_data ppd
+                ON ppd.person_id = p.id AND ppd.field_name = 'fortune_profile'
+        """
+    columns = ", ".join(f"{PEOPLE_BATCH_FIELDS[field]} AS {field}" for field in selected)
+
+    rows = await db.fetch_all(
+        f"""
+        SELECT {columns}
+        FROM people_in_my_life p
+        {join}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY p.created_at ASC
+        """,
+        *values,
+    )
+
+    people = []
+    for row in rows:
+        person = dict(row)
+        if person.get("fortune_profile") is not None:
+            person["fortune_profile"] = parse_jsonb_field(
+                person["fortune_profile"], field_name="fortune_profile"
+            )
+        people.append(person)
+
+    return {"people": people}
+
+
 @user_router.patch("/{user_id}/people/{person_id}", response_model=PersonInMyLife)
 async def update_person_in_my_life(
     user_id: str,
@@ -1363,6 +1121,7 @@ async def update_person_in_my_life(
     person_update: PersonInMyLifeUpdate,
     current_user: TokenData = Depends(get_current_user),
     db: Database = Depends(get_db),
+    redis_client=Depends(get_redis),
 ):
     """Update person in user's life"""
     if current_user.user_id != user_id and not current_user.is_admin:
@@ -1429,6 +1188,7 @@ async def update_person_in_my_life(
     """
 
     updated_person = await db.fetch_one(query, *values)
+    await invalidate_generation_context(redis_client, user_id)
     return PersonInMyLife(**updated_person)
 
 
@@ -1438,6 +1198,7 @@ async def remove_person_from_life(
     person_id: str,
     current_user: TokenData = Depends(get_current_user),
     db: Database = Depends(get_db),
+    redis_client=Depends(get_redis),
 ):
     """Remove person from user's life"""
     if current_user.user_id != user_id and not current_user.is_admin:
@@ -1452,6 +1213,7 @@ async def remove_person_from_life(
         raise HTTPException(status_code=404, detail="Person not found")
 
     await db.execute("DELETE FROM people_in_my_life WHERE id = $1", person_id)
+    await invalidate_generation_context(redis_client, user_id)
 
     return {"message": "Person removed successfully"}
 
@@ -1463,6 +1225,7 @@ async def upload_person_photo_endpoint(
     file: UploadFile = File(...),
     current_user: TokenData = Depends(get_current_user),
     db: Database = Depends(get_db),
+    redis_client=Depends(get_redis),
 ):
     """Upload a photo for a person in user's life"""
     if current_user.user_id != user_id and not current_user.is_admin:
@@ -1496,6 +1259,7 @@ async def upload_person_photo_endpoint(
             file_size,
             person_id,
         )
+        await invalidate_generation_context(redis_client, user_id)
 
         return {
             "message": "Photo uploaded successfully",
@@ -1509,6 +1273,92 @@ async def upload_person_photo_endpoint(
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
+@user_router.post("/{user_id}/people/photos")
+async def upload_person_photos_endpoint(
+    user_id: str,
+    person_ids: list[str] = Form(..., description="Person id for each file, in the same order"),
+    files: list[UploadFile] = File(...),
+    current_user: TokenData = Depends(get_current_user),
+    db: Database = Depends(get_db),
+    redis_client=Depends(get_redis),
+):
+    """Upload or replace photos for several people in user's life at once"""
+    if current_user.user_id != user_id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    if len(person_ids) != len(files):
+        raise HTTPException(status_code=400, detail="Provide one person_id per file")
+    if len(files) > PHOTO_BATCH_MAX:
+        raise HTTPException(
+            status_code=400, detail=f"Too many photos. Maximum {PHOTO_BATCH_MAX} per request."
+        )
+    if len(set(person_ids)) != len(person_ids):
+        raise HTTPException(status_code=400, detail="Duplicate person_id")
+    try:
+        person_uuids = [UUID(person_id) for person_id in person_ids]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid person id")
+    person_ids = [str(person_uuid) for person_uuid in person_uuids]
+
+    existing = {
+        str(row["id"]): row["photo_url"]
+        for row in await db.fetch_all(
+            "SELECT id, photo_url FROM people_in_my_life WHERE user_id = $1 AND id = ANY($2)",
+            user_id,
+            person_uuids,
+        )
+    }
+
+    semaphore = asyncio.Semaphore(PHOTO_UPLOAD_CONCURRENCY)
+
+    async def upload(person_id: str, file: UploadFile) -> dict:
+        if person_id not in existing:
+            return {"person_id": person_id, "error": "Person not found"}
+        try:
+            async with semaphore:
+                photo_url, file_size = await upload_person_photo(file, user_id, person_id)
+        except HTTPException as e:
+            return {"person_id": person_id, "error": e.detail}
+        except Exception as e:
+            return {"person_id": person_id, "error": f"Upload failed: {str(e)}"}
+        return {"person_id": person_id, "photo_url": photo_url, "file_size": file_size}
+
+    results = await asyncio.gather(
+        *(upload(pid, file) for pid, file in zip(person_ids, files, strict=True))
+    )
+    uploaded = [result for result in results if "photo_url" in result]
+
+    if uploaded:
+        await db.execute(
+            """
+            UPDATE people_in_my_life p
+            SET photo_url = u.photo_url, photo_uploaded_at = CURRENT_TIMESTAMP,
+                photo_size_bytes = u.file_size, updated_at = CURRENT_TIMESTAMP
+            FROM unnest($1::uuid[], $2::text[], $3::int[]) AS u(id, photo_url, file_size)
+            WHERE p.id = u.id AND p.user_id = $4
+            """,
+            [UUID(result["person_id"]) for result in uploaded],
+            [result["photo_url"] for result in uploaded],
+            [result["file_size"] for result in uploaded],
+            user_id,
+        )
+        await invalidate_generation_context(redis_client, user_id)
+
+        # Old photos are removed once nothing points at them
+        await asyncio.gather(
+            *(
+                delete_person_photo(existing[result["person_id"]])
+                for result in uploaded
+                if existing[result["person_id"]]
+            )
+        )
+
+    return {
+        "message": f"Uploaded {len(uploaded)} of {len(results)} photos",
+        "results": results,
+    }
+
+
 @user_router.get("/{user_id}/people/{person_id}/photo")
 async def get_person_photo_endpoint(
     user_id: str,
@@ -1547,6 +1397,7 @@ async def update_person_photo_endpoint(
     file: UploadFile = File(...),
     current_user: TokenData = Depends(get_current_user),
     db: Database = Depends(get_db),
+    redis_client=Depends(get_redis),
 ):
     """Update/replace a photo for a person in user's life"""
     if current_user.user_id != user_id and not current_user.is_admin:
@@ -1580,6 +1431,7 @@ async def update_person_photo_endpoint(
             file_size,
             person_id,
         )
+        await invalidate_generation_context(redis_client, user_id)
 
         return {
             "message": "Photo updated successfully",
@@ -1599,6 +1451,7 @@ async def delete_person_photo_endpoint(
     person_id: str,
     current_user: TokenData = Depends(get_current_user),
     db: Database = Depends(get_db),
+    redis_client=Depends(get_redis),
 ):
     """Delete a photo for a person in user's life"""
     if current_user.user_id != user_id and not current_user.is_admin:
@@ -1627,6 +1480,7 @@ async def delete_person_photo_endpoint(
                WHERE id = $1""",
             person_id,
         )
+        await invalidate_generation_context(redis_client, user_id)
 
         return {"message": "Photo deleted successfully", "deleted_from_storage": deleted}
 
@@ -1886,6 +1740,7 @@ public_terms_router = APIRouter(prefix="/public/terms", tags=["public-terms"])
 
 
 @public_terms_router.get("/current")
+@conditional_get(cache_control="public, no-cache")
 async def get_current_terms(document_type: str = None, db: Database = Depends(get_db)):
     """Get current active terms documents (public endpoint)"""
     try:
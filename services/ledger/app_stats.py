@@ -0,0 +1,269 @@
+# services/ledger/app_stats.py
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+
+import redis.asyncio as redis
+
+from shared.database import Database
+
+WATERMARK = "hourly_app_stats"
+
+# Transactions are stamped when their database transaction starts, so leave a margin for
+# ones that commit late before an hour is aggregated
+SETTLE_DELAY = timedelta(minutes=5)
+
+# Hours aggregated per pass; callers loop until caught up
+MAX_HOURS_PER_PASS = 24
+
+# pg_try_advisory_xact_lock key so only one ledger replica aggregates at a time
+APP_STATS_LOCK_KEY = 730_004
+
+# Live counters only need to outlive the hour plus the aggregator's settle delay
+LIVE_TTL_SECONDS = 3 * 3600
+
+# Consumes that count toward app stats (reversed consumes were refunded)
+CONSUMES_SQL = """
+    t.type = 'consume' AND t.status = 'completed' AND t.app_id IS NOT NULL
+    AND EXISTS (SELECT 1 FROM apps a WHERE a.id = t.app_id)
+"""
+
+
+def _utc(value: datetime) -> datetime:
+    """Treat naive datetimes as UTC, matching how the services stamp times"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def floor_hour(value: datetime) -> datetime:
+    return _utc(value).replace(minute=0, second=0, microsecond=0)
+
+
+def live_keys(app_id: UUID, hour: datetime) -> tuple[str, str]:
+    """Redis keys for an app's live counters and user set for one hour"""
+    bucket = f"{app_id}:{hour:%Y%m%d%H}"
+    return f"app_stats:{bucket}", f"app_stats_users:{bucket}"
+
+
+async def record_live_consume(
+    redis_client: redis.Redis,
+    app_id: Optional[UUID],
+    user_id: UUID,
+    amount: int,
+    at: Optional[datetime] = None,
+) -> None:
+    """Count a consume toward its app's live stats for the current hour"""
+    if app_id is None:
+        return
+
+    counters, users = live_keys(app_id, floor_hour(at or datetime.now(timezone.utc)))
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hincrby(counters, "transactions", 1)
+        pipe.hincrby(counters, "dust_consumed", amount)
+        pipe.sadd(users, str(user_id))
+        pipe.expire(counters, LIVE_TTL_SECONDS)
+        pipe.expire(users, LIVE_TTL_SECONDS)
+        await pipe.execute()
+    except Exception as e:
+        # Live stats are best effort; the hourly aggregate is rebuilt from the ledger
+        print(f"⚠️ APP_STATS: Failed to update live counters for app {app_id}: {e}", flush=True)
+
+
+async def aggregate_app_stats(
+    db: Database, now: Optional[datetime] = None, max_hours: int = MAX_HOURS_PER_PASS
+) -> int:
+    """
+    Aggregate the next closed hours of consumes into hourly_app_stats and daily_app_users.
+
+    Each hour is rebuilt from the ledger and the watermark only moves forward, so every
+    hour is processed once and a stopped aggregator catches up from where it left off.
+    Returns the number of hours aggregated; 0 means caught up (or another replica holds
+    the lock).
+    """
+    target = floor_hour(_utc(now or datetime.now(timezone.utc)) - SETTLE_DELAY)
+
+    async with db.transaction() as conn:
+        if not await conn.fetchval("SELECT pg_try_advisory_xact_lock($1)", APP_STATS_LOCK_KEY):
+            return 0
+
+        watermark = await conn.fetchval(
+            "SELECT watermark FROM aggregation_watermarks WHERE name = $1 FOR UPDATE", WATERMARK
+        )
+        if watermark is None:
+            # First run: start at the oldest consume so history is backfilled
+            oldest = await conn.fetchval(
+                "SELECT MIN(created_at) FROM dust_transactions WHERE type = 'consume'"
+            )
+            watermark = floor_hour(oldest) if oldest else target
+
+        watermark = _utc(watermark)
+        window_end = min(target, watermark + timedelta(hours=max_hours))
+        if window_end <= watermark:
+            return 0
+
+        await conn.execute(
+            "DELETE FROM hourly_app_stats WHERE hour >= $1 AND hour < $2", watermark, window_end
+        )
+        await conn.execute(
+            f"""
+            INSERT INTO hourly_app_stats (app_id, hour, unique_users, transactions, dust_consumed)
+            SELECT
+                t.app_id,
+                date_trunc('hour', t.created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                COUNT(DISTINCT t.user_id),
+                COUNT(*),
+                SUM(ABS(t.amount))
+            FROM dust_transactions t
+            WHERE {CONSUMES_SQL} AND t.created_at >= $1 AND t.created_at < $2
+            GROUP BY 1, 2
+            """,
+            watermark,
+            window_end,
+        )
+        # Users per app and day, so distinct users over any range of days is exact
+        await conn.execute(
+            f"""
+            INSERT INTO daily_app_users (app_id, day, user_id)
+            SELECT DISTINCT t.app_id, (t.created_at AT TIME ZONE 'UTC')::date, t.user_id
+            FROM dust_transactions t
+            WHERE {CONSUMES_SQL} AND t.created_at >= $1 AND t.created_at < $2
+            ON CONFLICT DO NOTHING
+            """,
+            watermark,
+            window_end,
+        )
+
+        await conn.execute(
+            """
+            INSERT INTO aggregation_watermarks (name, watermark, updated_at)
+            VALUES ($1, $2, CURRENT_TIMESTAMP)
+            ON CONFLICT (name) DO UPDATE
+            SET watermark = EXCLUDED.watermark, updated_at = EXCLUDED.updated_at
+            """,
+            WATERMARK,
+            window_end,
+        )
+
+    return int((window_end - watermark) / timedelta(hours=1))
+
+
+async def fetch_app_analytics(
+    db: Database,
+    redis_client: redis.Redis,
+    app_id: UUID,
+    start: datetime,
+    end: datetime,
+    now: Optional[datetime] = None,
+) -> dict:
+    """
+    Consume stats for an app between start and end, at hour granularity.
+
+    Aggregated hours come from hourly_app_stats, the current hour from the live Redis
+    counters, and only closed hours the aggregator hasn't reached yet (normally none)
+    from the ledger. Unique users are counted per UTC day.
+    """
+    start, end = floor_hour(start), _utc(end)
+    current_hour = floor_hour(now or datetime.now(timezone.utc))
+
+    row = await db.fetch_one(
+        "SELECT watermark FROM aggregation_watermarks WHERE name = $1", WATERMARK
+    )
+    rolled_end = min(_utc(row["watermark"]), end) if row else start
+
+    # hour -> [transactions, dust_consumed]; users not yet in daily_app_users by day
+    hours: dict[datetime, list[int]] = {}
+    extra_users: dict[date, set[str]] = defaultdict(set)
+
+    if rolled_end > start:
+        for stat in await db.fetch_all(
+            """
+            SELECT hour, transactions, dust_consumed FROM hourly_app_stats
+            WHERE app_id = $1 AND hour >= $2 AND hour < $3
+            """,
+            app_id,
+            start,
+            rolled_end,
+        ):
+            hours[_utc(stat["hour"])] = [stat["transactions"], stat["dust_consumed"]]
+
+    raw_start, raw_end = max(rolled_end, start), min(end, current_hour)
+    if raw_end > raw_start:
+        for stat in await db.fetch_all(
+            f"""
+            SELECT date_trunc('hour', t.created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS hour,
+                   COUNT(*) AS transactions, SUM(ABS(t.amount)) AS dust_consumed,
+                   ARRAY_AGG(DISTINCT t.user_id) AS user_ids
+            FROM dust_transactions t
+            WHERE t.app_id = $1 AND {CONSUMES_SQL}
+              AND t.created_at >= $2 AND t.created_at < $3
+            GROUP BY 1
+            """,
+            app_id,
+            raw_start,
+            raw_end,
+        ):
+            hour = _utc(stat["hour"])
+            hours[hour] = [stat["transactions"], stat["dust_consumed"]]
+            extra_users[hour.date()].update(str(user_id) for user_id in stat["user_ids"])
+
+    if start <= current_hour <= end:
+        counters, users = live_keys(app_id, current_hour)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hgetall(counters)
+        pipe.smembers(users)
+        live, live_users = await pipe.execute()
+        if live:
+            hours[current_hour] = [int(live["transactions"]), int(live["dust_consumed"])]
+            extra_users[current_hour.date()].update(live_users)
+
+    extra_days = [day for day, users in extra_users.items() for _ in users]
+    extra_ids = [user_id for users in extra_users.values() for user_id in users]
+    day_users = await db.fetch_all(
+        """
+        SELECT day, COUNT(DISTINCT user_id) AS unique_users FROM (
+            SELECT day, user_id FROM daily_app_users
+            WHERE app_id = $1 AND day >= $2 AND day <= $3
+            UNION ALL
+            SELECT * FROM unnest($4::date[], $5::uuid[])
+        ) u
+        GROUP BY ROLLUP (day)
+        """,
+        app_id,
+        start.date(),
+        end.date(),
+        extra_days,
+        extra_ids,
+    )
+    unique_by_day = {stat["day"]: stat["unique_users"] for stat in day_users}
+
+    daily: dict[date, list[int]] = defaultdict(lambda: [0, 0])
+    for hour, (transactions, dust_consumed) in hours.items():
+        daily[hour.date()][0] += transactions
+        daily[hour.date()][1] += dust_consumed
+
+    active_hours = sorted(hour for hour, (transactions, _) in hours.items() if transactions)
+    transaction_count = sum(transactions for transactions, _ in hours.values())
+    total_consumed = sum(dust_consumed for _, dust_consumed in hours.values())
+
+    return {
+        "summary": {
+            "unique_users": unique_by_day.get(None, 0),
+            "transaction_count": transaction_count,
+            "total_consumed": total_consumed,
+            "avg_consumption": total_consumed / transaction_count if transaction_count else None,
+            "first_usage": active_hours[0] if active_hours else None,
+            "last_usage": active_hours[-1] if active_hours else None,
+        },
+        "daily_breakdown": [
+            {
+                "date": day,
+                "unique_users": unique_by_day.get(day, 0),
+                "transactions": transactions,
+                "dust_consumed": dust_consumed,
+            }
+            for day, (transactions, dust_consumed) in sorted(daily.items(), reverse=True)
+        ],
+    }
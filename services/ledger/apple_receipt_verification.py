@@ -10,7 +10,7 @@ from fastapi import HTTPException
 class AppleReceiptVerificationService:
     """Service for verifying Apple App Store receipts"""
 
-    def __init__(self):
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.bundle_id = os.getenv("APPLE_BUNDLE_ID")
         self.team_id = os.getenv("APPLE_TEAM_ID", "5W2L2KPQDY")
         # Note: shared_secret not needed for one-time purchases, only auto-renewable subscriptions
@@ -21,8 +21,15 @@ class AppleReceiptVerificationService:
         )
 
         # Keep both URLs for Apple's recommended fallback pattern
-        self.production_url = "https://buy.itunes.apple.com/verifyReceipt"
-        self.sandbox_url = "https://sandbox.itunes.apple.com/verifyReceipt"
+        self.production_url = os.getenv(
+            "APPLE_PRODUCTION_URL", "https://buy.itunes.apple.com/verifyReceipt"
+        )
+        self.sandbox_url = os.getenv(
+            "APPLE_SANDBOX_URL", "https://sandbox.itunes.apple.com/verifyReceipt"
+        )
+
+        # Lets tests route requests to a local stub of Apple's endpoint
+        self.transport = transport
 
         # Product ID to DUST amount mapping
         self.product_dust_mapping = {
@@ -106,7 +113,7 @@ class AppleReceiptVerificationService:
         try:
             print(f"🍎 APPLE_RECEIPT: Verifying with {environment} environment")
 
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with httpx.AsyncClient(timeout=30.0, transport=self.transport) as client:
                 response = await client.post(
                     url, json=request_data, headers={"Content-Type": "application/json"}
                 )
@@ -1,11 +1,23 @@
 # services/ledger/background.py
 import asyncio
 import json
-from datetime import datetime, timedelta
+import os
+
+from app_stats import aggregate_app_stats
+from bulk_grant import BulkGrantEngine, start_job_runner
+from expiry import ExpiredTransactionSweeper
+from ledger_service import LedgerService
+from receipt_verification import ReceiptVerifier
+from reconciliation import LedgerReconciler
 
 from shared.database import get_db
+from shared.ledger_stats import backfill_ledger_stats, check_ledger_stats
+from shared.partitioning import maintain_partitions
 from shared.redis_client import get_redis
 
+# Concurrent queued receipt verifications per ledger replica
+RECEIPT_WORKERS = int(os.getenv("APPLE_RECEIPT_WORKERS", "4"))
+
 # Global task references
 _background_tasks: set[asyncio.Task] = set()
 _shutdown_event = asyncio.Event()
@@ -43,42 +55,19 @@ async def balance_sync_task():
 
 
 async def expired_transaction_cleanup():
-    """Clean up expired pending transactions"""
-    db = await get_db()
+    """Expire stale pending transactions and refund expired consumes"""
+    sweeper = ExpiredTransactionSweeper(await get_db(), await get_redis())
 
     while not _shutdown_event.is_set():
         try:
-            # Find pending transactions older than 1 hour
-            expired_time = datetime.utcnow() - timedelta(hours=1)
-
-            expired_transactions = await db.fetch_all(
-                """
-                SELECT id, user_id, amount FROM dust_transactions
-                WHERE status = 'pending' AND created_at < $1
-                """,
-                expired_time,
-            )
-
-            for tx in expired_transactions:
-                # Mark as failed
-                await db.execute(
-                    """
-                    UPDATE dust_transactions
-                    SET status = 'failed',
-                        updated_at = CURRENT_TIMESTAMP,
-                        metadata = jsonb_set(
-                            COALESCE(metadata, '{}'),
-                            '{failure_reason}',
-                            '"Transaction expired"'
-                        )
-                    WHERE id = $1
-                    """,
-                    tx["id"],
+            result = await sweeper.sweep()
+            if result["expired"] or result["holds_expired"]:
+                print(
+                    f"⏱️ EXPIRED_TX: Expired {result['expired']} pending transactions "
+                    f"(refunded {result['refunded']}) and {result['holds_expired']} holds",
+                    flush=True,
                 )
 
-                # If it was a consume transaction, we might need to refund
-                # This depends on business logic
-
             # Run every 5 minutes
             await asyncio.sleep(300)
 
@@ -88,42 +77,150 @@ async def expired_transaction_cleanup():
 
 
 async def analytics_aggregation():
-    """Aggregate analytics data for faster queries"""
+    """Aggregate closed hours of consumes into hourly app stats"""
     db = await get_db()
 
     while not _shutdown_event.is_set():
         try:
-            # Aggregate hourly stats
-            await db.execute(
-                """
-                INSERT INTO hourly_app_stats (app_id, hour, unique_users, transactions, dust_consumed)
-                SELECT
-                    app_id,
-                    date_trunc('hour', created_at) as hour,
-                    COUNT(DISTINCT user_id) as unique_users,
-                    COUNT(*) as transactions,
-                    SUM(ABS(amount)) as dust_consumed
-                FROM dust_transactions
-                WHERE type = 'consume'
-                AND created_at >= date_trunc('hour', NOW() - INTERVAL '2 hours')
-                AND created_at < date_trunc('hour', NOW() - INTERVAL '1 hour')
-                AND app_id IS NOT NULL
-                GROUP BY app_id, hour
-                ON CONFLICT (app_id, hour) DO UPDATE SET
-                    unique_users = EXCLUDED.unique_users,
-                    transactions = EXCLUDED.transactions,
-                    dust_consumed = EXCLUDED.dust_consumed
-                """
-            )
-
-            # Run every hour
-            await asyncio.sleep(3600)
+            # Catch up after downtime one batch of hours at a time
+            while not _shutdown_event.is_set() and await aggregate_app_stats(db):
+                pass
+
+            # Run every 5 minutes so each hour lands shortly after it settles
+            await asyncio.sleep(300)
 
         except Exception as e:
             print(f"Error in analytics aggregation: {e}")
             await asyncio.sleep(300)
 
 
+async def bulk_grant_resume_task():
+    """Resume bulk grant jobs whose runner died (e.g. across a deploy)"""
+    engine = BulkGrantEngine(await get_db(), await get_redis())
+
+    while not _shutdown_event.is_set():
+        try:
+            for job_id in await engine.find_resumable_jobs():
+                print(f"🎁 BULK_GRANT: Resuming stale job {job_id}", flush=True)
+                start_job_runner(engine, job_id)
+
+            await asyncio.sleep(60)
+
+        except Exception as e:
+            print(f"Error in bulk grant resume task: {e}")
+            await asyncio.sleep(60)
+
+
+async def receipt_verification_worker():
+    """Verify queued in-app purchase receipts and record the purchases"""
+    redis_client = await get_redis()
+    verifier = ReceiptVerifier(redis_client)
+    ledger = LedgerService(await get_db(), redis_client)
+
+    while not _shutdown_event.is_set():
+        try:
+            job = await verifier.next_job(timeout=1)
+            if job:
+                job = await verifier.process_job(job, ledger)
+                print(
+                    f"🍎 RECEIPT_QUEUE: Verification {job['id']} {job['status']}",
+                    flush=True,
+                )
+
+        except Exception as e:
+            print(f"Error in receipt verification worker: {e}")
+            await asyncio.sleep(5)
+
+
+async def receipt_verification_requeue_task():
+    """Re-queue receipt verifications whose worker died (e.g. across a deploy)"""
+    verifier = ReceiptVerifier(await get_redis())
+
+    while not _shutdown_event.is_set():
+        try:
+            requeued = await verifier.requeue_stale_jobs()
+            if requeued:
+                print(f"🍎 RECEIPT_QUEUE: Re-queued {requeued} stale verifications", flush=True)
+
+            await asyncio.sleep(60)
+
+        except Exception as e:
+            print(f"Error in receipt verification requeue task: {e}")
+            await asyncio.sleep(60)
+
+
+async def ledger_stats_maintenance_task():
+    """Backfill missing user ledger stats, then periodically check and repair drift"""
+    db = await get_db()
+
+    try:
+        backfilled = await backfill_ledger_stats(db)
+        if backfilled:
+            print(f"📊 LEDGER_STATS: Backfilled stats for {backfilled} users", flush=True)
+    except Exception as e:
+        print(f"Error backfilling ledger stats: {e}")
+
+    while not _shutdown_event.is_set():
+        try:
+            # Check the most recently active users every 6 hours
+            await asyncio.sleep(6 * 3600)
+            drifted = await check_ledger_stats(db, repair=True)
+            if drifted:
+                print(
+                    f"⚠️ LEDGER_STATS: Repaired drifted stats for {len(drifted)} users",
+                    flush=True,
+                )
+
+        except Exception as e:
+            print(f"Error in ledger stats maintenance: {e}")
+            await asyncio.sleep(300)
+
+
+async def ledger_reconciliation_task():
+    """Verify balances against the ledger for users with new transactions"""
+    reconciler = LedgerReconciler(await get_db())
+
+    while not _shutdown_event.is_set():
+        try:
+            result = await reconciler.reconcile()
+            if result["drifted"]:
+                print(
+                    f"⚠️ LEDGER_RECONCILE: {result['drifted']} of {result['users_checked']} "
+                    "checked users have balance drift",
+                    flush=True,
+                )
+
+            # Run every 10 minutes
+            await asyncio.sleep(600)
+
+        except Exception as e:
+            print(f"Error in ledger reconciliation task: {e}")
+            await asyncio.sleep(60)
+
+
+async def partition_maintenance_task():
+    """Create upcoming monthly partitions and apply partition retention"""
+    db = await get_db()
+
+    while not _shutdown_event.is_set():
+        try:
+            summary = await maintain_partitions(db)
+            for table, changes in summary.items():
+                if changes["created"] or changes["removed"]:
+                    print(
+                        f"🗂️ PARTITIONS: {table} created {changes['created']}, "
+                        f"retired {changes['removed']}",
+                        flush=True,
+                    )
+
+            # Run daily; partitions are created months ahead
+            await asyncio.sleep(24 * 3600)
+
+        except Exception as e:
+            print(f"Error in partition maintenance task: {e}")
+            await asyncio.sleep(600)
+
+
 async def balance_update_listener():
     """Listen for balance updates and notify connected clients"""
     redis_client = await get_redis()
@@ -162,8 +259,14 @@ async def start_background_tasks():
         asyncio.create_task(balance_sync_task()),
         asyncio.create_task(expired_transaction_cleanup()),
         asyncio.create_task(analytics_aggregation()),
+        asyncio.create_task(bulk_grant_resume_task()),
+        asyncio.create_task(ledger_stats_maintenance_task()),
+        asyncio.create_task(ledger_reconciliation_task()),
+        asyncio.create_task(partition_maintenance_task()),
         asyncio.create_task(balance_update_listener()),
+        asyncio.create_task(receipt_verification_requeue_task()),
     ]
+    tasks += [asyncio.create_task(receipt_verification_worker()) for _ in range(RECEIPT_WORKERS)]
 
     # Store task references
     _background_tasks = set(tasks)
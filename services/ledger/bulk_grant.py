@@ -0,0 +1,287 @@
+# services/ledger/bulk_grant.py
+import asyncio
+import json
+from typing import Optional
+from uuid import UUID
+
+import redis.asyncio as redis
+from models import TransactionStatus, TransactionType
+
+from shared.database import Database
+from shared.ledger_stats import record_ledger_grants
+from shared.uuid_utils import generate_uuid7
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Jobs whose runner stopped updating them for this long are picked up again
+STALE_JOB_SECONDS = 120
+
+TRANSACTION_COLUMNS = [
+    "id",
+    "user_id",
+    "amount",
+    "type",
+    "status",
+    "description",
+    "metadata",
+    "idempotency_key",
+]
+
+# Job runners started from this process, keyed by job id
+_running_jobs: dict[UUID, asyncio.Task] = {}
+
+
+class BulkGrantEngine:
+    """
+    Set-based DUST grants for many users.
+
+    A job stores its (deduplicated) user list and is applied in chunks. Each chunk is one
+    transaction: a single UPDATE ... FROM unnest() for balances, a COPY of the grant
+    transactions and the job's progress. A job interrupted part-way resumes from its
+    last committed chunk without granting anyone twice.
+    """
+
+    def __init__(self, db: Database, redis_client: redis.Redis):
+        self.db = db
+        self.redis = redis_client
+        self.lock_prefix = "bulk_grant_lock"
+
+    async def create_job(
+        self,
+        user_ids: list[UUID],
+        amount: int,
+        reason: str,
+        admin_id: UUID,
+        metadata: Optional[dict] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> dict:
+        """Record a bulk grant job and its user list"""
+        unique_user_ids = list(dict.fromkeys(user_ids))
+        job_id = generate_uuid7()
+
+        async with self.db.transaction() as conn:
+            await conn.execute(
+                """
+                INSERT INTO bulk_grant_jobs (
+                    id, admin_id, amount, reason, metadata, total_users, chunk_size
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7)
+                """,
+                job_id,
+                admin_id,
+                amount,
+                reason,
+                json.dumps(metadata or {}),
+                len(unique_user_ids),
+                chunk_size,
+            )
+            await conn.copy_records_to_table(
+                "bulk_grant_job_users",
+                records=[(job_id, position, uid) for position, uid in enumerate(unique_user_ids)],
+                columns=["job_id", "position", "user_id"],
+            )
+
+        return await self.get_job(job_id)
+
+    async def get_job(self, job_id: UUID) -> Optional[dict]:
+        """Current state and progress of a job"""
+        job = await self.db.fetch_one("SELECT * FROM bulk_grant_jobs WHERE id = $1", job_id)
+        if job and isinstance(job.get("metadata"), str):
+            job["metadata"] = json.loads(job["metadata"])
+        return job
+
+    async def run_job(self, job_id: UUID) -> tuple[dict, list[tuple[UUID, int]]]:
+        """
+        Apply the remaining chunks of a job.
+
+        Returns the final job row and (user_id, new_balance) for users granted by this run.
+        Only one runner works on a job at a time.
+        """
+        lock_key = f"{self.lock_prefix}:{job_id}"
+        if not await self.redis.set(lock_key, "1", nx=True, ex=STALE_JOB_SECONDS):
+            raise RuntimeError(f"Bulk grant job {job_id} is already running")
+
+        granted: list[tuple[UUID, int]] = []
+        try:
+            job = await self.get_job(job_id)
+            if not job:
+                raise ValueError(f"Bulk grant job {job_id} not found")
+            if job["status"] == "completed":
+                return job, granted
+
+            await self.db.execute(
+                """
+                UPDATE bulk_grant_jobs
+                SET status = 'running', error = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE id = $1
+                """,
+                job_id,
+            )
+
+            chunk = job["next_chunk"]
+            while chunk * job["chunk_size"] < job["total_users"]:
+                chunk_granted = await self._apply_chunk(job, chunk)
+                await self._notify_balances(chunk_granted, job["amount"])
+                granted.extend(chunk_granted)
+                chunk += 1
+                # Keep the runner lock alive while progressing
+                await self.redis.expire(lock_key, STALE_JOB_SECONDS)
+
+            await self.db.execute(
+                """
+                UPDATE bulk_grant_jobs
+                SET status = 'completed', completed_at = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = $1
+                """,
+                job_id,
+            )
+            print(f"🎁 BULK_GRANT: Job {job_id} completed ({len(granted)} granted)", flush=True)
+
+        except Exception as e:
+            await self.db.execute(
+                """
+                UPDATE bulk_grant_jobs
+                SET status = 'failed', error = $2, updated_at = CURRENT_TIMESTAMP
+                WHERE id = $1
+                """,
+                job_id,
+                str(e)[:1000],
+            )
+            print(f"❌ BULK_GRANT: Job {job_id} failed: {e}", flush=True)
+            raise
+        finally:
+            await self.redis.delete(lock_key)
+
+        return await self.get_job(job_id), granted
+
+    async def _apply_chunk(self, job: dict, chunk: int) -> list[tuple[UUID, int]]:
+        """Grant one chunk of users and record progress in the same transaction"""
+        job_id = job["id"]
+        start = chunk * job["chunk_size"]
+        end = start + job["chunk_size"]
+        metadata = json.dumps(
+            {
+                **(job["metadata"] or {}),
+                "admin_id": str(job["admin_id"]),
+                "bulk_grant_job_id": str(job_id),
+            }
+        )
+
+        async with self.db.transaction() as conn:
+            user_ids = [
+                row["user_id"]
+                for row in await conn.fetch(
+                    """
+                    SELECT user_id FROM bulk_grant_job_users
+                    WHERE job_id = $1 AND position >= $2 AND position < $3
+                    """,
+                    job_id,
+                    start,
+                    end,
+                )
+            ]
+
+            # Lock rows in a stable order so concurrent bulk jobs can't deadlock
+            await conn.execute(
+                "SELECT 1 FROM users WHERE id = ANY($1::uuid[]) ORDER BY id FOR UPDATE",
+                user_ids,
+            )
+            updated = await conn.fetch(
+                """
+                UPDATE users u
+                SET dust_balance = u.dust_balance + $2, updated_at = CURRENT_TIMESTAMP
+                FROM unnest($1::uuid[]) AS t(id)
+                WHERE u.id = t.id
+                RETURNING u.id, u.dust_balance
+                """,
+                user_ids,
+                job["amount"],
+            )
+
+            await conn.copy_records_to_table(
+                "dust_transactions",
+                records=[
+                    (
+                        generate_uuid7(),
+                        row["id"],
+                        job["amount"],
+                        TransactionType.GRANT.value,
+                        TransactionStatus.COMPLETED.value,
+                        job["reason"],
+                        metadata,
+                        f"bulk_grant:{job_id}:{row['id']}",
+                    )
+                    for row in updated
+                ],
+                columns=TRANSACTION_COLUMNS,
+            )
+            await record_ledger_grants(conn, [row["id"] for row in updated], job["amount"])
+
+            await conn.execute(
+                """
+                UPDATE bulk_grant_jobs
+                SET next_chunk = $2,
+                    processed_users = processed_users + $3,
+                    granted_users = granted_users + $4,
+                    skipped_users = skipped_users + $5,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = $1
+                """,
+                job_id,
+                chunk + 1,
+                len(user_ids),
+                len(updated),
+                len(user_ids) - len(updated),
+            )
+
+        return [(row["id"], row["dust_balance"]) for row in updated]
+
+    async def _notify_balances(self, granted: list[tuple[UUID, int]], amount: int) -> None:
+        """Invalidate cached balances and publish updates in one pipelined round trip"""
+        if not granted:
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        for user_id, new_balance in granted:
+            pipe.delete(f"balance:{user_id}")
+            pipe.publish(
+                f"balance_update:{user_id}",
+                json.dumps(
+                    {
+                        "user_id": str(user_id),
+                        "old_balance": new_balance - amount,
+                        "new_balance": new_balance,
+                    }
+                ),
+            )
+        await pipe.execute()
+
+    async def find_resumable_jobs(self) -> list[UUID]:
+        """Jobs left pending/running by a runner that stopped making progress"""
+        rows = await self.db.fetch_all(
+            """
+            SELECT id FROM bulk_grant_jobs
+            WHERE status IN ('pending', 'running')
+              AND updated_at < CURRENT_TIMESTAMP - make_interval(secs => $1)
+            ORDER BY created_at
+            """,
+            STALE_JOB_SECONDS,
+        )
+        return [row["id"] for row in rows]
+
+
+def start_job_runner(engine: BulkGrantEngine, job_id: UUID) -> None:
+    """Run a job in the background of this process"""
+    existing = _running_jobs.get(job_id)
+    if existing and not existing.done():
+        return
+
+    async def runner():
+        try:
+            await engine.run_job(job_id)
+        except Exception as e:
+            print(f"⚠️ BULK_GRANT: Background run of job {job_id} stopped: {e}", flush=True)
+
+    task = asyncio.create_task(runner())
+    _running_jobs[job_id] = task
+    task.add_done_callback(lambda _: _running_jobs.pop(job_id, None))
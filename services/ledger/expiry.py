@@ -0,0 +1,193 @@
+# services/ledger/expiry.py
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+
+import redis.asyncio as redis
+from models import TransactionStatus, TransactionType
+
+from shared.database import Database
+from shared.ledger_stats import record_ledger_totals
+from shared.uuid_utils import generate_uuid7
+
+# Pending transactions older than this are expired
+PENDING_TTL = timedelta(hours=1)
+
+# Transactions expired per database transaction
+SWEEP_BATCH_SIZE = 500
+
+REFUND_COLUMNS = ["id", "user_id", "amount", "type", "status", "description", "metadata"]
+
+# Claims a batch of expired pending transactions. SKIP LOCKED lets several ledger replicas
+# sweep at once without waiting on (or double-processing) each other's rows. Consumes
+# already debited the balance, so they are marked reversed and refunded; anything else
+# never touched the balance and just fails. $1 cutoff, $2 batch size.
+EXPIRE_SQL = """
+    WITH expired AS (
+        SELECT id, created_at FROM dust_transactions
+        WHERE status = 'pending' AND created_at < $1
+        ORDER BY created_at
+        LIMIT $2
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE dust_transactions t
+    SET status = CASE WHEN t.type = 'consume' THEN 'reversed' ELSE 'failed' END,
+        updated_at = CURRENT_TIMESTAMP,
+        metadata = jsonb_set(
+            COALESCE(t.metadata, '{}'), '{failure_reason}', '"Transaction expired"'
+        )
+    FROM expired e
+    WHERE t.id = e.id AND t.created_at = e.created_at
+    RETURNING t.id, t.user_id, t.amount, t.type, t.app_id
+"""
+
+# Claims a batch of holds past their expiry; their DUST goes back to the balance without
+# a ledger transaction, exactly like a release. $1 batch size.
+EXPIRE_HOLDS_SQL = """
+    WITH expired AS (
+        SELECT id FROM dust_holds
+        WHERE status = 'held' AND expires_at < CURRENT_TIMESTAMP
+        ORDER BY expires_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE dust_holds h
+    SET status = 'expired', resolved_at = CURRENT_TIMESTAMP
+    FROM expired e
+    WHERE h.id = e.id
+    RETURNING h.id, h.user_id, h.amount
+"""
+
+
+class ExpiredTransactionSweeper:
+    """
+    Expires pending transactions and DUST holds in batches.
+
+    Each batch is one transaction: a single UPDATE ... RETURNING claims and expires the
+    rows, then expired consumes get a compensating refund (balance credit plus a refund
+    transaction) and expired holds are credited back before commit, so a crash never
+    leaves expired DUST unreturned.
+    """
+
+    def __init__(self, db: Database, redis_client: redis.Redis):
+        self.db = db
+        self.redis = redis_client
+
+    async def sweep(self, now: Optional[datetime] = None) -> dict:
+        """Expire everything past the cutoff; returns counts for the pass"""
+        cutoff = (now or datetime.now(timezone.utc)) - PENDING_TTL
+        expired = refunded = 0
+
+        while True:
+            batch, balances = await self._sweep_batch(cutoff)
+            expired += len(batch)
+            refunded += sum(1 for tx in batch if tx["type"] == TransactionType.CONSUME.value)
+            await self._notify_balances(balances)
+            if len(batch) < SWEEP_BATCH_SIZE:
+                break
+
+        holds_expired = 0
+        while True:
+            batch, balances = await self._expire_holds_batch()
+            holds_expired += len(batch)
+            await self._notify_balances(balances)
+            if len(batch) < SWEEP_BATCH_SIZE:
+                break
+
+        return {"expired": expired, "refunded": refunded, "holds_expired": holds_expired}
+
+    async def _credit_balances(self, conn, credits: dict[UUID, int]) -> list:
+        """Add per-user amounts back to balances; returns (id, dust_balance) rows"""
+        # Lock rows in a stable order so concurrent sweepers and bulk jobs can't deadlock
+        user_ids = sorted(credits)
+        await conn.execute(
+            "SELECT 1 FROM users WHERE id = ANY($1::uuid[]) ORDER BY id FOR UPDATE", user_ids
+        )
+        return await conn.fetch(
+            """
+            UPDATE users u
+            SET dust_balance = u.dust_balance + t.amount, updated_at = CURRENT_TIMESTAMP
+            FROM unnest($1::uuid[], $2::int[]) AS t(id, amount)
+            WHERE u.id = t.id
+            RETURNING u.id, u.dust_balance
+            """,
+            user_ids,
+            [credits[user_id] for user_id in user_ids],
+        )
+
+    async def _sweep_batch(self, cutoff: datetime) -> tuple[list, list[tuple[UUID, int, int]]]:
+        """Expire one batch and refund its consumes in the same transaction"""
+        async with self.db.transaction() as conn:
+            batch = await conn.fetch(EXPIRE_SQL, cutoff, SWEEP_BATCH_SIZE)
+            consumes = [tx for tx in batch if tx["type"] == TransactionType.CONSUME.value]
+            if not consumes:
+                return batch, []
+
+            refunds: dict[UUID, int] = {}
+            refund_counts: dict[UUID, int] = {}
+            for tx in consumes:
+                refunds[tx["user_id"]] = refunds.get(tx["user_id"], 0) + abs(tx["amount"])
+                refund_counts[tx["user_id"]] = refund_counts.get(tx["user_id"], 0) + 1
+
+            updated = await self._credit_balances(conn, refunds)
+
+            await conn.copy_records_to_table(
+                "dust_transactions",
+                records=[
+                    (
+                        generate_uuid7(),
+                        tx["user_id"],
+                        abs(tx["amount"]),
+                        TransactionType.REFUND.value,
+                        TransactionStatus.COMPLETED.value,
+                        "Refund: transaction expired",
+                        json.dumps(
+                            {
+                                "original_transaction_id": str(tx["id"]),
+                                "original_app_id": str(tx["app_id"]) if tx["app_id"] else None,
+                            }
+                        ),
+                    )
+                    for tx in consumes
+                ],
+                columns=REFUND_COLUMNS,
+            )
+            await record_ledger_totals(conn, TransactionType.REFUND.value, refunds, refund_counts)
+
+        return batch, [(row["id"], row["dust_balance"], refunds[row["id"]]) for row in updated]
+
+    async def _expire_holds_batch(self) -> tuple[list, list[tuple[UUID, int, int]]]:
+        """Expire one batch of holds and return their DUST in the same transaction"""
+        async with self.db.transaction() as conn:
+            batch = await conn.fetch(EXPIRE_HOLDS_SQL, SWEEP_BATCH_SIZE)
+            if not batch:
+                return batch, []
+
+            credits: dict[UUID, int] = {}
+            for hold in batch:
+                credits[hold["user_id"]] = credits.get(hold["user_id"], 0) + hold["amount"]
+            updated = await self._credit_balances(conn, credits)
+
+        return batch, [(row["id"], row["dust_balance"], credits[row["id"]]) for row in updated]
+
+    async def _notify_balances(self, balances: list[tuple[UUID, int, int]]) -> None:
+        """Invalidate cached balances and publish updates in one pipelined round trip"""
+        if not balances:
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        for user_id, new_balance, refunded in balances:
+            pipe.delete(f"balance:{user_id}")
+            pipe.publish(
+                f"balance_update:{user_id}",
+                json.dumps(
+                    {
+                        "user_id": str(user_id),
+                        "old_balance": new_balance - refunded,
+                        "new_balance": new_balance,
+                        "type": "refund",
+                    }
+                ),
+            )
+        await pipe.execute()
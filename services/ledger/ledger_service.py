@@ -5,8 +5,12 @@ from uuid import UUID
 
 import pytz
 import redis.asyncio as redis
+from app_stats import record_live_consume
 from fastapi import HTTPException
 from models import (
+    DustHold,
+    HoldResponse,
+    HoldStatus,
     Transaction,
     TransactionResponse,
     TransactionStatus,
@@ -15,9 +19,19 @@ from models import (
 
 from shared.daily_bonus_utils import update_last_login_for_bonus
 from shared.database import Database
+from shared.db_statements import register_hot_query
+from shared.ledger_stats import record_ledger_transaction
+from shared.pagination import NEWEST_FIRST, keyset_condition, order_by
 from shared.redis_client import RedisCache
 from shared.uuid_utils import generate_uuid7
 
+BALANCE_QUERY = register_hot_query(
+    "ledger.balance_for_user", "SELECT dust_balance FROM users WHERE id = $1"
+)
+
+# How long a hold lasts when the caller doesn't say
+DEFAULT_HOLD_TTL_SECONDS = 1800
+
 
 class LedgerService:
     """Core ledger service for DUST transactions"""
@@ -48,7 +62,7 @@ class LedgerService:
                 return int(cached)
 
         # Get from database
-        result = await self.db.fetch_one("SELECT dust_balance FROM users WHERE id = $1", user_id)
+        result = await self.db.fetch_one_prepared(BALANCE_QUERY.name, user_id)
 
         if not result:
             raise HTTPException(status_code=404, detail="User not found")
@@ -147,7 +161,7 @@ class LedgerService:
             async with self.db.transaction() as conn:
                 # Get current balance (Redis lock provides concurrency control)
                 user = await conn.fetchrow(
-                    "SELECT id, dust_balance FROM users WHERE id = $1", user_id
+                    "SELECT id, dust_balance FROM users WHERE id = $1 FOR UPDATE", user_id
                 )
 
                 if not user:
@@ -189,6 +203,9 @@ class LedgerService:
                     json.dumps(metadata) if metadata else None,
                     idempotency_key,
                 )
+                await record_ledger_transaction(
+                    conn, user_id, TransactionType.CONSUME.value, amount, app_id
+                )
 
                 # Store idempotency key
                 await self._store_idempotency(idempotency_key, transaction_id)
@@ -209,13 +226,16 @@ class LedgerService:
                     ),
                 )
 
-                # Parse transaction data and return
-                transaction_data = self._parse_transaction_data(transaction)
-                return TransactionResponse(
-                    transaction=Transaction(**transaction_data),
-                    new_balance=new_balance,
-                    previous_balance=current_balance,
-                )
+            # Live app stats are recorded once the consume has committed
+            await record_live_consume(self.redis, app_id, user_id, amount)
+
+            # Parse transaction data and return
+            transaction_data = self._parse_transaction_data(transaction)
+            return TransactionResponse(
+                transaction=Transaction(**transaction_data),
+                new_balance=new_balance,
+                previous_balance=current_balance,
+            )
 
         finally:
             await self._release_balance_lock(user_id)
@@ -239,7 +259,7 @@ class LedgerService:
             async with self.db.transaction() as conn:
                 # Get current balance (Redis lock provides concurrency control)
                 user = await conn.fetchrow(
-                    "SELECT id, dust_balance FROM users WHERE id = $1", user_id
+                    "SELECT id, dust_balance FROM users WHERE id = $1 FOR UPDATE", user_id
                 )
 
                 if not user:
@@ -276,6 +296,7 @@ class LedgerService:
                     if metadata
                     else None,
                 )
+                await record_ledger_transaction(conn, user_id, TransactionType.GRANT.value, amount)
 
                 # Invalidate cache
                 await self.balance_cache.delete(str(user_id))
@@ -365,71 +386,80 @@ class LedgerService:
 
             print("🍎 APPLE_PURCHASE: ✅ No duplicate found, proceeding with transaction")
 
-            # Get current balance
-            current_balance = await self.get_balance(user_id, use_cache=False)
-            new_balance = current_balance + dust_amount
-            print(
-                f"🍎 APPLE_PURCHASE: Balance update - Current: {current_balance}, Adding: {dust_amount}, New: {new_balance}"
-            )
+            # Record the purchase, balance and stats atomically
+            async with self.db.transaction() as conn:
+                # Get current balance
+                current_balance = await conn.fetchval(
+                    "SELECT dust_balance FROM users WHERE id = $1 FOR UPDATE", user_id
+                )
+                if current_balance is None:
+                    raise HTTPException(status_code=404, detail="User not found")
+                new_balance = current_balance + dust_amount
+                print(
+                    f"🍎 APPLE_PURCHASE: Balance update - Current: {current_balance}, Adding: {dust_amount}, New: {new_balance}"
+                )
 
-            # Create transaction ID
-            transaction_id = generate_uuid7()
-            print(f"🍎 APPLE_PURCHASE: Generated transaction_id: {transaction_id}")
+                # Create transaction ID
+                transaction_id = generate_uuid7()
+                print(f"🍎 APPLE_PURCHASE: Generated transaction_id: {transaction_id}")
 
-            # Insert transaction with Apple receipt fields
-            print("🍎 APPLE_PURCHASE: Inserting transaction record with full Apple data")
-            print(
-                f"🍎 APPLE_PURCHASE: Receipt data length: {len(receipt_data)} chars, Verification status: {verification_status}"
-            )
+                # Insert transaction with Apple receipt fields
+                print("🍎 APPLE_PURCHASE: Inserting transaction record with full Apple data")
+                print(
+                    f"🍎 APPLE_PURCHASE: Receipt data length: {len(receipt_data)} chars, Verification status: {verification_status}"
+                )
 
-            transaction = await self.db.fetch_one(
-                """
-                INSERT INTO dust_transactions (
-                    id, user_id, amount, type, status, description, metadata,
-                    payment_id, receipt_data, receipt_verification_status,
-                    receipt_verification_response, apple_transaction_id,
-                    apple_original_transaction_id, apple_product_id,
-                    apple_purchase_date_ms, payment_amount_cents
+                transaction = await conn.fetchrow(
+                    """
+                    INSERT INTO dust_transactions (
+                        id, user_id, amount, type, status, description, metadata,
+                        payment_id, receipt_data, receipt_verification_status,
+                        receipt_verification_response, apple_transaction_id,
+                        apple_original_transaction_id, apple_product_id,
+                        apple_purchase_date_ms, payment_amount_cents
+                    )
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16)
+                    RETURNING *
+                    """,
+                    transaction_id,
+                    user_id,
+                    dust_amount,
+                    TransactionType.PURCHASE.value,
+                    TransactionStatus.COMPLETED.value,
+                    f"Apple App Store purchase: {dust_amount} DUST",
+                    json.dumps(
+                        {
+                            "platform": "ios",
+                            "verification_status": verification_status,
+                            "product_id": apple_transaction_data.get("apple_product_id"),
+                            "quantity": apple_transaction_data.get("quantity", 1),
+                        }
+                    ),
+                    payment_id,
+                    receipt_data,
+                    verification_status,
+                    json.dumps(verification_response),
+                    apple_transaction_data.get("apple_transaction_id"),
+                    apple_transaction_data.get("apple_original_transaction_id"),
+                    apple_transaction_data.get("apple_product_id"),
+                    apple_transaction_data.get("apple_purchase_date_ms"),
+                    payment_amount_cents,
                 )
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16)
-                RETURNING *
-                """,
-                transaction_id,
-                user_id,
-                dust_amount,
-                TransactionType.PURCHASE.value,
-                TransactionStatus.COMPLETED.value,
-                f"Apple App Store purchase: {dust_amount} DUST",
-                json.dumps(
-                    {
-                        "platform": "ios",
-                        "verification_status": verification_status,
-                        "product_id": apple_transaction_data.get("apple_product_id"),
-                        "quantity": apple_transaction_data.get("quantity", 1),
-                    }
-                ),
-                payment_id,
-                receipt_data,
-                verification_status,
-                json.dumps(verification_response),
-                apple_transaction_data.get("apple_transaction_id"),
-                apple_transaction_data.get("apple_original_transaction_id"),
-                apple_transaction_data.get("apple_product_id"),
-                apple_transaction_data.get("apple_purchase_date_ms"),
-                payment_amount_cents,
-            )
 
-            print(
-                f"🍎 APPLE_PURCHASE: ✅ Transaction record created successfully: {transaction['id']}"
-            )
+                print(
+                    f"🍎 APPLE_PURCHASE: ✅ Transaction record created successfully: {transaction['id']}"
+                )
 
-            # Update user balance
-            print(f"🍎 APPLE_PURCHASE: Updating user balance to {new_balance}")
-            await self.db.execute(
-                "UPDATE users SET dust_balance = $1, updated_at = CURRENT_TIMESTAMP WHERE id = $2",
-                new_balance,
-                user_id,
-            )
+                # Update user balance
+                print(f"🍎 APPLE_PURCHASE: Updating user balance to {new_balance}")
+                await conn.execute(
+                    "UPDATE users SET dust_balance = $1, updated_at = CURRENT_TIMESTAMP WHERE id = $2",
+                    new_balance,
+                    user_id,
+                )
+                await record_ledger_transaction(
+                    conn, user_id, TransactionType.PURCHASE.value, dust_amount
+                )
 
             # Invalidate cache
             print(f"🍎 APPLE_PURCHASE: Invalidating balance cache for user {user_id}")
@@ -521,8 +551,9 @@ class LedgerService:
         offset: int = 0,
         type_filter: Optional[TransactionType] = None,
         app_id: Optional[UUID] = None,
+        cursor: Optional[str] = None,
     ) -> list[Transaction]:
-        """Get user's transaction history"""
+        """Get user's transaction history, after cursor when given (offset is then ignored)"""
 
         query = """
             SELECT * FROM dust_transactions
@@ -541,7 +572,12 @@ class LedgerService:
             params.append(app_id)
             param_count += 1
 
-        query += f" ORDER BY created_at DESC LIMIT ${param_count} OFFSET ${param_count + 1}"
+        if cursor:
+            query += f" AND {keyset_condition(NEWEST_FIRST, cursor, params)}"
+            offset = 0
+
+        param_count = len(params) + 1
+        query += f" {order_by(NEWEST_FIRST)} LIMIT ${param_count} OFFSET ${param_count + 1}"
         params.extend([limit, offset])
 
         transactions = await self.db.fetch_all(query, *params)
@@ -624,7 +660,7 @@ class LedgerService:
             async with self.db.transaction() as conn:
                 # Verify user exists (Redis lock provides concurrency control)
                 user = await conn.fetchrow(
-                    "SELECT id, dust_balance FROM users WHERE id = $1", user_id
+                    "SELECT id, dust_balance FROM users WHERE id = $1 FOR UPDATE", user_id
                 )
 
                 if not user:
@@ -658,6 +694,7 @@ class LedgerService:
                     app_id,
                     json.dumps({"grant_type": "initial", "app_id": str(app_id)}),
                 )
+                await record_ledger_transaction(conn, user_id, TransactionType.GRANT.value, amount)
 
                 # Record grant in app_grants table
                 await conn.execute(
@@ -747,7 +784,8 @@ class LedgerService:
 
                 # Verify user exists and get current info
                 user = await conn.fetchrow(
-                    "SELECT id, dust_balance, last_login_date FROM users WHERE id = $1", user_id
+                    "SELECT id, dust_balance, last_login_date FROM users WHERE id = $1 FOR UPDATE",
+                    user_id,
                 )
 
                 if not user:
@@ -787,6 +825,7 @@ class LedgerService:
                     app_id,
                     json.dumps({"grant_type": "daily_bonus", "app_id": str(app_id)}),
                 )
+                await record_ledger_transaction(conn, user_id, TransactionType.GRANT.value, amount)
 
                 # Record grant in app_grants table (should not fail now)
                 await conn.execute(
@@ -853,7 +892,7 @@ class LedgerService:
             async with self.db.transaction() as conn:
                 # Get current balance
                 user = await conn.fetchrow(
-                    "SELECT id, dust_balance FROM users WHERE id = $1", user_id
+                    "SELECT id, dust_balance FROM users WHERE id = $1 FOR UPDATE", user_id
                 )
 
                 if not user:
@@ -887,6 +926,7 @@ class LedgerService:
                     json.dumps(metadata) if metadata else None,
                     idempotency_key,
                 )
+                await record_ledger_transaction(conn, user_id, TransactionType.REFUND.value, amount)
 
                 # Store idempotency key if provided
                 if idempotency_key:
@@ -919,3 +959,267 @@ class LedgerService:
 
         finally:
             await self._release_balance_lock(user_id)
+
+    def _hold(self, record) -> DustHold:
+        return DustHold(**self._parse_transaction_data(record))
+
+    async def _notify_balance(
+        self, user_id: UUID, old_balance: int, new_balance: int, **extra
+    ) -> None:
+        """Invalidate the cached balance and publish the update in one round trip"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(f"{self.balance_cache.prefix}:{user_id}")
+        pipe.publish(
+            f"balance_update:{user_id}",
+            json.dumps(
+                {
+                    "user_id": str(user_id),
+                    "old_balance": old_balance,
+                    "new_balance": new_balance,
+                    **extra,
+                }
+            ),
+        )
+        await pipe.execute()
+
+    async def hold_dust(
+        self,
+        user_id: UUID,
+        amount: int,
+        app_id: UUID,
+        action: str,
+        idempotency_key: str,
+        ttl_seconds: int = DEFAULT_HOLD_TTL_SECONDS,
+        metadata: Optional[dict] = None,
+    ) -> HoldResponse:
+        """
+        Reserve DUST for a long-running generation.
+
+        The amount leaves the available balance immediately; no ledger transaction is
+        written until the hold is captured. Unresolved holds are released once they expire.
+        """
+        existing = await self.db.fetch_one(
+            "SELECT * FROM dust_holds WHERE idempotency_key = $1", idempotency_key
+        )
+        if existing:
+            balance = await self.get_balance(user_id, use_cache=False)
+            return HoldResponse(
+                hold=self._hold(existing),
+                new_balance=balance,
+                previous_balance=balance + existing["amount"],
+            )
+
+        async with self.db.transaction() as conn:
+            # The row lock taken by the UPDATE makes the balance check and debit atomic
+            new_balance = await conn.fetchval(
+                """
+                UPDATE users SET dust_balance = dust_balance - $2, updated_at = CURRENT_TIMESTAMP
+                WHERE id = $1 AND dust_balance >= $2
+                RETURNING dust_balance
+                """,
+                user_id,
+                amount,
+            )
+            if new_balance is None:
+                current_balance = await conn.fetchval(
+                    "SELECT dust_balance FROM users WHERE id = $1", user_id
+                )
+                if current_balance is None:
+                    raise HTTPException(status_code=404, detail="User not found")
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Insufficient balance. Have {current_balance}, need {amount}",
+                )
+
+            hold = await conn.fetchrow(
+                """
+                INSERT INTO dust_holds (
+                    id, user_id, app_id, amount, action, idempotency_key, metadata, expires_at
+                ) VALUES (
+                    $1, $2, $3, $4, $5, $6, $7, CURRENT_TIMESTAMP + $8::int * INTERVAL '1 second'
+                )
+                ON CONFLICT (idempotency_key) DO NOTHING
+                RETURNING *
+                """,
+                generate_uuid7(),
+                user_id,
+                app_id,
+                amount,
+                action,
+                idempotency_key,
+                json.dumps(metadata or {}),
+                ttl_seconds,
+            )
+            if hold is None:
+                # A concurrent request with the same key won; roll back our debit
+                raise HTTPException(status_code=409, detail="Hold is already being placed")
+
+        await self._notify_balance(
+            user_id, new_balance + amount, new_balance, hold_id=str(hold["id"]), type="hold"
+        )
+        return HoldResponse(
+            hold=self._hold(hold), new_balance=new_balance, previous_balance=new_balance + amount
+        )
+
+    async def capture_hold(
+        self, hold_id: UUID, amount: Optional[int] = None, metadata: Optional[dict] = None
+    ) -> TransactionResponse:
+        """
+        Charge a hold as a single consume transaction.
+
+        Capturing less than the held amount returns the rest to the balance. Capturing an
+        already captured hold returns its transaction.
+        """
+        async with self.db.transaction() as conn:
+            hold = await conn.fetchrow(
+                """
+                SELECT *, expires_at <= CURRENT_TIMESTAMP AS expired
+                FROM dust_holds WHERE id = $1 FOR UPDATE
+                """,
+                hold_id,
+            )
+            if not hold:
+                raise HTTPException(status_code=404, detail="Hold not found")
+
+            if hold["status"] == HoldStatus.CAPTURED.value:
+                transaction = await conn.fetchrow(
+                    "SELECT * FROM dust_transactions WHERE id = $1", hold["transaction_id"]
+                )
+                balance = await conn.fetchval(
+                    "SELECT dust_balance FROM users WHERE id = $1", hold["user_id"]
+                )
+                return TransactionResponse(
+                    transaction=Transaction(**self._parse_transaction_data(transaction)),
+                    new_balance=balance,
+                    previous_balance=balance,
+                )
+            if hold["status"] != HoldStatus.HELD.value:
+                raise HTTPException(status_code=409, detail=f"Hold is {hold['status']}")
+            if hold["expired"]:
+                raise HTTPException(status_code=409, detail="Hold has expired")
+
+            captured = amount or hold["amount"]
+            if captured > hold["amount"]:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Cannot capture {captured}, only {hold['amount']} is held",
+                )
+            remainder = hold["amount"] - captured
+
+            new_balance = await conn.fetchval(
+                """
+                UPDATE users SET dust_balance = dust_balance + $2, updated_at = CURRENT_TIMESTAMP
+                WHERE id = $1
+                RETURNING dust_balance
+                """,
+                hold["user_id"],
+                remainder,
+            )
+
+            hold_data = self._parse_transaction_data(hold)
+            transaction = await conn.fetchrow(
+                """
+                INSERT INTO dust_transactions (
+                    id, user_id, amount, type, status, description,
+                    app_id, metadata, idempotency_key
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                RETURNING *
+                """,
+                generate_uuid7(),
+                hold["user_id"],
+                -captured,
+                TransactionType.CONSUME.value,
+                TransactionStatus.COMPLETED.value,
+                f"Consumed for {hold['action']}",
+                hold["app_id"],
+                json.dumps(
+                    {**(hold_data["metadata"] or {}), **(metadata or {}), "hold_id": str(hold_id)}
+                ),
+                f"hold:{hold_id}",
+            )
+            await conn.execute(
+                """
+                UPDATE dust_holds
+                SET status = $2, transaction_id = $3, captured_amount = $4,
+                    resolved_at = CURRENT_TIMESTAMP
+                WHERE id = $1
+                """,
+                hold_id,
+                HoldStatus.CAPTURED.value,
+                transaction["id"],
+                captured,
+            )
+            await record_ledger_transaction(
+                conn, hold["user_id"], TransactionType.CONSUME.value, captured, hold["app_id"]
+            )
+
+        await self._notify_balance(
+            hold["user_id"],
+            new_balance - remainder,
+            new_balance,
+            transaction_id=str(transaction["id"]),
+        )
+        await record_live_consume(self.redis, hold["app_id"], hold["user_id"], captured)
+        return TransactionResponse(
+            transaction=Transaction(**self._parse_transaction_data(transaction)),
+            new_balance=new_balance,
+            previous_balance=new_balance - remainder,
+        )
+
+    async def release_hold(self, hold_id: UUID, reason: Optional[str] = None) -> HoldResponse:
+        """Return a hold's DUST to the balance without writing a ledger transaction"""
+        async with self.db.transaction() as conn:
+            hold = await conn.fetchrow(
+                """
+                UPDATE dust_holds
+                SET status = $2, resolved_at = CURRENT_TIMESTAMP,
+                    metadata = COALESCE(metadata, '{}') || jsonb_build_object('release_reason', $3::text)
+                WHERE id = $1 AND status = 'held'
+                RETURNING *
+                """,
+                hold_id,
+                HoldStatus.RELEASED.value,
+                reason,
+            )
+            if hold is None:
+                hold = await conn.fetchrow("SELECT * FROM dust_holds WHERE id = $1", hold_id)
+                if not hold:
+                    raise HTTPException(status_code=404, detail="Hold not found")
+                if hold["status"] == HoldStatus.CAPTURED.value:
+                    raise HTTPException(status_code=409, detail="Hold is captured")
+                # Already released or expired: nothing left to return
+                balance = await conn.fetchval(
+                    "SELECT dust_balance FROM users WHERE id = $1", hold["user_id"]
+                )
+                return HoldResponse(
+                    hold=self._hold(hold), new_balance=balance, previous_balance=balance
+                )
+
+            new_balance = await conn.fetchval(
+                """
+                UPDATE users SET dust_balance = dust_balance + $2, updated_at = CURRENT_TIMESTAMP
+                WHERE id = $1
+                RETURNING dust_balance
+                """,
+                hold["user_id"],
+                hold["amount"],
+            )
+
+        await self._notify_balance(
+            hold["user_id"],
+            new_balance - hold["amount"],
+            new_balance,
+            hold_id=str(hold_id),
+            type="release",
+        )
+        return HoldResponse(
+            hold=self._hold(hold),
+            new_balance=new_balance,
+            previous_balance=new_balance - hold["amount"],
+        )
+
+    async def get_hold(self, hold_id: UUID) -> DustHold:
+        hold = await self.db.fetch_one("SELECT * FROM dust_holds WHERE id = $1", hold_id)
+        if not hold:
+            raise HTTPException(status_code=404, detail="Hold not found")
+        return self._hold(hold)
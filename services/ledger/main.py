@@ -18,8 +18,11 @@ logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 from background import start_background_tasks, stop_background_tasks
 from routes import admin_router, balance_router, grants_router, transaction_router
 
-from shared.database import close_db, init_db
-from shared.redis_client import close_redis, init_redis
+from shared.database import close_db, get_db, init_db
+from shared.db_metrics import metrics_router
+from shared.redis_client import close_redis, get_redis, init_redis
+from shared.sessions import start_revocation_sync, stop_revocation_sync
+from shared.system_config import start_system_config, stop_system_config
 
 
 @asynccontextmanager
@@ -27,10 +30,14 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     await init_redis()
+    await start_system_config(await get_db())
+    await start_revocation_sync(await get_redis())
     await start_background_tasks()
     yield
     # Shutdown
     await stop_background_tasks()
+    await stop_revocation_sync()
+    await stop_system_config()
     await close_db()
     await close_redis()
 
@@ -64,6 +71,7 @@ app.include_router(balance_router, prefix="/balance", tags=["balance"])
 app.include_router(transaction_router, prefix="/transactions", tags=["transactions"])
 app.include_router(admin_router, prefix="/admin", tags=["admin"])
 app.include_router(grants_router, prefix="/grants", tags=["grants"])
+app.include_router(metrics_router)
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8002))
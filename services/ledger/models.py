@@ -23,6 +23,20 @@ class TransactionStatus(str, Enum):
     REVERSED = "reversed"
 
 
+class HoldStatus(str, Enum):
+    HELD = "held"
+    CAPTURED = "captured"
+    RELEASED = "released"
+    EXPIRED = "expired"
+
+
+class ReceiptVerificationStatus(str, Enum):
+    QUEUED = "queued"
+    VERIFYING = "verifying"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 # Request models
 class ConsumeRequest(BaseModel):
     user_id: UUID
@@ -197,6 +211,55 @@ class ServiceRefundRequest(BaseModel):
         return v
 
 
+class HoldRequest(BaseModel):
+    """Reserve DUST for a long-running generation before it starts"""
+
+    user_id: UUID
+    amount: int = Field(..., gt=0, description="Amount of DUST to hold")
+    app_id: str = Field(..., description="App UUID or slug")
+    action: str = Field(..., description="Action being performed")
+    idempotency_key: str = Field(..., min_length=1, max_length=128)
+    ttl_seconds: int = Field(
+        1800, ge=60, le=86400, description="Seconds until an unresolved hold is released"
+    )
+    metadata: Optional[dict[str, Any]] = None
+
+    @validator("app_id")
+    def validate_app_id(cls, v):
+        import re
+        from uuid import UUID
+
+        try:
+            UUID(v)
+            return v  # Valid UUID
+        except ValueError:
+            pass
+
+        if re.match(r"^[a-zA-Z0-9][a-zA-Z0-9\-]*[a-zA-Z0-9]$", v) and len(v) <= 255:
+            return v  # Valid slug
+
+        raise ValueError("app_id must be a valid UUID or slug")
+
+    @validator("idempotency_key")
+    def validate_idempotency_key(cls, v):
+        import re
+
+        if not re.match(r"^[a-zA-Z0-9_\-:]+$", v):
+            raise ValueError("Idempotency key must be alphanumeric with -_: allowed")
+        return v
+
+
+class CaptureHoldRequest(BaseModel):
+    amount: Optional[int] = Field(
+        None, gt=0, description="DUST to charge, at most the held amount (default: all of it)"
+    )
+    metadata: Optional[dict[str, Any]] = None
+
+
+class ReleaseHoldRequest(BaseModel):
+    reason: Optional[str] = Field(None, max_length=500)
+
+
 class PurchaseRequest(BaseModel):
     user_id: UUID
     amount: int = Field(..., gt=0, description="Amount of DUST purchased")
@@ -224,6 +287,14 @@ class InAppPurchaseRequest(BaseModel):
         return v
 
 
+class QueuedInAppPurchaseRequest(InAppPurchaseRequest):
+    callback_url: Optional[str] = Field(
+        None,
+        max_length=2048,
+        description="HTTPS URL to POST the verification result to (allow-listed hosts only)",
+    )
+
+
 # Response models
 class Balance(BaseModel):
     user_id: UUID
@@ -261,6 +332,41 @@ class TransactionList(BaseModel):
     page: int
     page_size: int
     has_more: bool
+    next_cursor: Optional[str] = None
+
+
+class DustHold(BaseModel):
+    id: UUID
+    user_id: UUID
+    app_id: Optional[UUID] = None
+    amount: int
+    action: str
+    status: HoldStatus
+    idempotency_key: str
+    transaction_id: Optional[UUID] = None
+    captured_amount: Optional[int] = None
+    metadata: Optional[dict[str, Any]] = None
+    expires_at: datetime
+    created_at: datetime
+    resolved_at: Optional[datetime] = None
+
+
+class HoldResponse(BaseModel):
+    hold: DustHold
+    new_balance: int
+    previous_balance: int
+
+
+class ReceiptVerificationJob(BaseModel):
+    id: UUID
+    user_id: UUID
+    product_id: str
+    status: ReceiptVerificationStatus
+    error: Optional[str] = None
+    transaction_id: Optional[UUID] = None
+    new_balance: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
 
 
 # Admin models
@@ -271,6 +377,50 @@ class BulkGrantRequest(BaseModel):
     admin_id: UUID
 
 
+class BulkGrantJobRequest(BaseModel):
+    user_ids: list[UUID] = Field(..., min_items=1, max_items=200000)
+    amount: int = Field(..., gt=0, le=1000)
+    reason: str = Field(..., min_length=1, max_length=255)
+    admin_id: UUID
+    metadata: Optional[dict[str, Any]] = None
+    chunk_size: int = Field(1000, ge=100, le=10000, description="Users per transaction")
+
+
+class BulkGrantJob(BaseModel):
+    id: UUID
+    admin_id: UUID
+    amount: int
+    reason: str
+    status: str
+    total_users: int
+    processed_users: int
+    granted_users: int
+    skipped_users: int
+    chunk_size: int
+    progress: float = Field(..., description="Fraction of users processed (0-1)")
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    completed_at: Optional[datetime] = None
+
+
+class BalanceAsOf(BaseModel):
+    user_id: UUID
+    as_of: datetime
+    balance: int
+
+
+class LedgerDriftFlag(BaseModel):
+    id: int
+    user_id: UUID
+    stored_balance: int
+    ledger_balance: int
+    drift: int = Field(..., description="Stored balance minus ledger balance")
+    checkpoint_transaction_id: Optional[UUID] = None
+    detected_at: datetime
+    last_seen_at: datetime
+
+
 class BalanceAdjustment(BaseModel):
     user_id: UUID
     adjustment: int = Field(..., description="Positive or negative adjustment")
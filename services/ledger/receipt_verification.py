@@ -0,0 +1,353 @@
+# services/ledger/receipt_verification.py
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from urllib.parse import urlparse
+from uuid import UUID
+
+import httpx
+import redis.asyncio as redis
+from apple_receipt_verification import AppleReceiptVerificationService
+from fastapi import HTTPException
+from ledger_service import LedgerService
+from models import ReceiptVerificationStatus, TransactionResponse
+
+from shared.uuid_utils import generate_uuid7
+
+# Apple's answer for a transaction doesn't change, and the ledger rejects a second
+# purchase of it anyway, so verified results are kept for a day
+RESULT_TTL_SECONDS = 24 * 3600
+
+# Receipts Apple will never accept are remembered briefly so a retrying client fails fast
+REJECTION_TTL_SECONDS = 300
+
+# Malformed, unauthenticated or unauthorized receipts: retrying won't change the answer
+PERMANENT_STATUSES = {21002, 21003, 21010}
+
+# Outlives a slow verification (30s Apple timeout) so other replicas wait instead of
+# calling Apple for the same receipt
+LOCK_TTL_SECONDS = 35
+LOCK_POLL_SECONDS = 0.2
+
+QUEUE_KEY = "apple_receipt_queue"
+PROCESSING_KEY = "apple_receipt_processing"
+JOB_TTL_SECONDS = 24 * 3600
+
+# Jobs in the processing list untouched for this long lost their worker and are re-queued
+STALE_JOB_SECONDS = 120
+
+CALLBACK_TIMEOUT_SECONDS = 10.0
+
+# Hosts queued verifications may call back to, e.g. "api.example.com,hooks.example.com"
+CALLBACK_HOSTS = {
+    host.strip()
+    for host in os.getenv("APPLE_RECEIPT_CALLBACK_HOSTS", "").split(",")
+    if host.strip()
+}
+
+# Verifications running in this process, keyed by receipt digest
+_inflight: dict[str, asyncio.Task] = {}
+
+_TERMINAL = {ReceiptVerificationStatus.COMPLETED.value, ReceiptVerificationStatus.FAILED.value}
+
+
+def receipt_digest(receipt_data: str, product_id: str) -> str:
+    """Cache key for a receipt; content validation is per product, so it's part of the key"""
+    return hashlib.sha256(f"{product_id}:{receipt_data}".encode()).hexdigest()
+
+
+def purchase_transaction_id(verification_response: dict, product_id: str) -> Optional[str]:
+    """Apple transaction id of the receipt's purchase of product_id"""
+    for purchase in verification_response.get("receipt", {}).get("in_app", []):
+        if purchase.get("product_id") == product_id:
+            return purchase.get("transaction_id")
+    return None
+
+
+def callback_allowed(url: str) -> bool:
+    parsed = urlparse(url)
+    return parsed.scheme == "https" and parsed.hostname in CALLBACK_HOSTS
+
+
+def public_job(job: dict) -> dict:
+    """A job hash without the receipt and callback, with unset fields dropped"""
+    return {
+        field: value
+        for field, value in job.items()
+        if value != "" and field not in ("receipt_data", "callback_url")
+    }
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+async def record_verified_purchase(
+    ledger: LedgerService,
+    apple_service: AppleReceiptVerificationService,
+    user_id: UUID,
+    product_id: str,
+    receipt_data: str,
+    verification_response: dict,
+) -> TransactionResponse:
+    """Grant the DUST for a receipt Apple verified"""
+    apple_transaction_data = apple_service.extract_transaction_data(
+        verification_response, product_id
+    )
+    dust_amount = apple_transaction_data["dust_amount"]
+
+    return await ledger.record_apple_purchase(
+        user_id=user_id,
+        dust_amount=dust_amount,
+        payment_id=f"ios_{product_id}_{secrets.token_hex(8)}",
+        receipt_data=receipt_data,
+        verification_status="verified",
+        verification_response=verification_response,
+        apple_transaction_data=apple_transaction_data,
+        payment_amount_cents=dust_amount,  # 1 DUST = 1 cent
+    )
+
+
+class ReceiptVerifier:
+    """
+    Apple receipt verification with caching, de-duplication and an optional queue.
+
+    Verified results are cached by Apple transaction id, with a pointer from the receipt's
+    digest, so a client resubmitting a receipt doesn't go back to Apple. Concurrent
+    verifications of one receipt share a single Apple call: within a process through a
+    shared task, across replicas through a short Redis lock whose holder's cached result
+    the others wait for.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        apple_service: Optional[AppleReceiptVerificationService] = None,
+    ):
+        self.redis = redis_client
+        self.apple = apple_service or AppleReceiptVerificationService()
+
+    async def verify(self, receipt_data: str, product_id: str) -> tuple[bool, dict, Optional[str]]:
+        """Same contract as AppleReceiptVerificationService.verify_receipt"""
+        digest = receipt_digest(receipt_data, product_id)
+        cached = await self._cached(digest)
+        if cached:
+            print(f"🍎 RECEIPT_VERIFIER: Cache hit for receipt {digest[:12]}", flush=True)
+            return cached
+
+        task = _inflight.get(digest)
+        if task is None:
+            task = asyncio.create_task(self._verify_once(digest, receipt_data, product_id))
+            _inflight[digest] = task
+            task.add_done_callback(lambda _: _inflight.pop(digest, None))
+
+        # Shielded so a caller that goes away doesn't cancel the call others are waiting on
+        return await asyncio.shield(task)
+
+    async def cached_transaction(self, transaction_id: str) -> Optional[dict]:
+        """Apple's verification response for a transaction, if cached"""
+        value = await self.redis.get(f"apple_receipt_txn:{transaction_id}")
+        return json.loads(value) if value else None
+
+    async def _cached(self, digest: str) -> Optional[tuple[bool, dict, Optional[str]]]:
+        value = await self.redis.get(f"apple_receipt:{digest}")
+        if not value:
+            return None
+
+        entry = json.loads(value)
+        if "transaction_id" not in entry:
+            return False, entry["response"], entry["error"]
+
+        response = await self.cached_transaction(entry["transaction_id"])
+        return (True, response, None) if response else None
+
+    async def _verify_once(
+        self, digest: str, receipt_data: str, product_id: str
+    ) -> tuple[bool, dict, Optional[str]]:
+        lock_key = f"apple_receipt_lock:{digest}"
+        locked = await self.redis.set(lock_key, "1", nx=True, ex=LOCK_TTL_SECONDS)
+
+        if not locked:
+            # Another replica is verifying this receipt; use its result once cached. If it
+            # gives up without one (e.g. Apple timed out) verify here instead.
+            deadline = asyncio.get_running_loop().time() + LOCK_TTL_SECONDS
+            while asyncio.get_running_loop().time() < deadline:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                cached = await self._cached(digest)
+                if cached:
+                    return cached
+                if await self.redis.get(lock_key) is None:
+                    break
+
+        try:
+            is_valid, response, error = await self.apple.verify_receipt(receipt_data, product_id)
+            await self._store(digest, product_id, is_valid, response, error)
+            return is_valid, response, error
+        finally:
+            if locked:
+                await self.redis.delete(lock_key)
+
+    async def _store(
+        self, digest: str, product_id: str, is_valid: bool, response: dict, error: Optional[str]
+    ) -> None:
+        """Cache a definitive answer; transient failures (network, 21005) are not cached"""
+        if is_valid:
+            transaction_id = purchase_transaction_id(response, product_id)
+            if transaction_id:
+                await self.redis.set(
+                    f"apple_receipt_txn:{transaction_id}",
+                    json.dumps(response),
+                    ex=RESULT_TTL_SECONDS,
+                )
+                await self.redis.set(
+                    f"apple_receipt:{digest}",
+                    json.dumps({"transaction_id": transaction_id}),
+                    ex=RESULT_TTL_SECONDS,
+                )
+        elif response.get("status") == 0 or response.get("status") in PERMANENT_STATUSES:
+            # Status 0 here means Apple accepted the receipt but its contents didn't match
+            await self.redis.set(
+                f"apple_receipt:{digest}",
+                json.dumps({"response": response, "error": error}),
+                ex=REJECTION_TTL_SECONDS,
+            )
+
+    async def enqueue(
+        self,
+        user_id: UUID,
+        product_id: str,
+        receipt_data: str,
+        callback_url: Optional[str] = None,
+    ) -> dict:
+        """Queue a purchase for verification; returns the job"""
+        now = _now()
+        job = {
+            "id": str(generate_uuid7()),
+            "user_id": str(user_id),
+            "product_id": product_id,
+            "receipt_data": receipt_data,
+            "callback_url": callback_url or "",
+            "status": ReceiptVerificationStatus.QUEUED.value,
+            "created_at": now,
+            "updated_at": now,
+        }
+        key = f"apple_receipt_job:{job['id']}"
+
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(key, mapping=job)
+        pipe.expire(key, JOB_TTL_SECONDS)
+        pipe.rpush(QUEUE_KEY, job["id"])
+        await pipe.execute()
+        return job
+
+    async def get_job(self, verification_id: str) -> Optional[dict]:
+        return await self.redis.hgetall(f"apple_receipt_job:{verification_id}") or None
+
+    async def next_job(self, timeout: float = 1.0) -> Optional[dict]:
+        """
+        Claim the next queued job, waiting up to timeout seconds.
+
+        The id moves to a processing list until the job finishes, so a worker that dies
+        mid-job doesn't lose it (see requeue_stale_jobs).
+        """
+        verification_id = await self.redis.blmove(
+            QUEUE_KEY, PROCESSING_KEY, timeout, "LEFT", "RIGHT"
+        )
+        if verification_id is None:
+            return None
+
+        job = await self.get_job(verification_id)
+        if job is None:
+            # Expired while queued
+            await self.redis.lrem(PROCESSING_KEY, 0, verification_id)
+        return job
+
+    async def requeue_stale_jobs(self) -> int:
+        """Put jobs whose worker stopped (e.g. across a deploy) back on the queue"""
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=STALE_JOB_SECONDS)
+        requeued = 0
+
+        for verification_id in await self.redis.lrange(PROCESSING_KEY, 0, -1):
+            job = await self.get_job(verification_id)
+            if job is None or job["status"] in _TERMINAL:
+                await self.redis.lrem(PROCESSING_KEY, 0, verification_id)
+            elif datetime.fromisoformat(job["updated_at"]) < stale_before:
+                pipe = self.redis.pipeline(transaction=True)
+                pipe.lrem(PROCESSING_KEY, 0, verification_id)
+                pipe.rpush(QUEUE_KEY, verification_id)
+                await pipe.execute()
+                requeued += 1
+
+        return requeued
+
+    async def process_job(self, job: dict, ledger: LedgerService) -> dict:
+        """Verify a queued receipt, record the purchase and report the outcome"""
+        verification_id = job["id"]
+        await self._update_job(verification_id, status=ReceiptVerificationStatus.VERIFYING.value)
+
+        try:
+            is_valid, response, error = await self.verify(job["receipt_data"], job["product_id"])
+            if is_valid:
+                result = await record_verified_purchase(
+                    ledger,
+                    self.apple,
+                    UUID(job["user_id"]),
+                    job["product_id"],
+                    job["receipt_data"],
+                    response,
+                )
+                job = await self._update_job(
+                    verification_id,
+                    status=ReceiptVerificationStatus.COMPLETED.value,
+                    transaction_id=str(result.transaction.id),
+                    new_balance=str(result.new_balance),
+                )
+            else:
+                job = await self._update_job(
+                    verification_id,
+                    status=ReceiptVerificationStatus.FAILED.value,
+                    error=f"Receipt verification failed: {error}",
+                )
+        except HTTPException as e:
+            job = await self._update_job(
+                verification_id, status=ReceiptVerificationStatus.FAILED.value, error=e.detail
+            )
+        except Exception as e:
+            print(f"❌ RECEIPT_VERIFIER: Job {verification_id} failed: {e}", flush=True)
+            job = await self._update_job(
+                verification_id,
+                status=ReceiptVerificationStatus.FAILED.value,
+                error="Receipt verification service error",
+            )
+
+        await self.redis.lrem(PROCESSING_KEY, 0, verification_id)
+        await self._notify(job)
+        return job
+
+    async def _update_job(self, verification_id: str, **fields) -> dict:
+        key = f"apple_receipt_job:{verification_id}"
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(key, mapping={**fields, "updated_at": _now()})
+        pipe.hgetall(key)
+        _, job = await pipe.execute()
+        return job
+
+    async def _notify(self, job: dict) -> None:
+        """Publish the outcome to the user's channel and POST it to the job's callback"""
+        payload = public_job(job)
+        await self.redis.publish(f"receipt_verification:{job['user_id']}", json.dumps(payload))
+
+        callback_url = job.get("callback_url")
+        if not callback_url:
+            return
+        try:
+            async with httpx.AsyncClient(timeout=CALLBACK_TIMEOUT_SECONDS) as client:
+                response = await client.post(callback_url, json=payload)
+                response.raise_for_status()
+        except Exception as e:
+            # Clients can still poll the job; a failed callback doesn't fail the purchase
+            print(f"⚠️ RECEIPT_VERIFIER: Callback for job {job['id']} failed: {e}", flush=True)
@@ -0,0 +1,256 @@
+# services/ledger/reconciliation.py
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+
+from shared.database import Database
+
+WATERMARK = "ledger_reconciliation"
+
+# Transactions are stamped when their database transaction starts, so only ones older
+# than this are assumed committed when a checkpoint is written past them
+SETTLE_DELAY = timedelta(minutes=5)
+
+# Users verified per database round trip
+BATCH_SIZE = 500
+
+# Advisory lock key so only one ledger replica reconciles at a time
+RECONCILE_LOCK_KEY = 730_002
+
+# Transactions that moved the balance: consumes debit when inserted, even while pending, and
+# an expired consume is reversed by a separate refund rather than un-booked
+APPLIED_SQL = """
+    (t.status IN ('completed', 'reversed') OR (t.status = 'pending' AND t.type = 'consume'))
+"""
+
+# For each user: latest checkpoint, the ledger balance now (checkpoint plus applied
+# transactions after it) and the settled balance to checkpoint next. Open holds are
+# debited from dust_balance before they reach the ledger, so they count as part of the
+# stored balance. $1 users, $2 horizon.
+VERIFY_SQL = f"""
+    WITH heads AS (
+        SELECT u.id AS user_id,
+               u.dust_balance + COALESCE(
+                   (SELECT SUM(amount) FROM dust_holds hd
+                    WHERE hd.user_id = u.id AND hd.status = 'held'),
+                   0
+               ) AS dust_balance,
+               cp.transaction_id, cp.transaction_at,
+               COALESCE(cp.balance, 0) AS checkpoint_balance
+        FROM users u
+        LEFT JOIN LATERAL (
+            SELECT transaction_id, transaction_at, balance
+            FROM ledger_balance_checkpoints c
+            WHERE c.user_id = u.id
+            ORDER BY transaction_at DESC, transaction_id DESC
+            LIMIT 1
+        ) cp ON TRUE
+        WHERE u.id = ANY($1::uuid[])
+    )
+    SELECT
+        h.user_id,
+        h.dust_balance,
+        h.transaction_id AS checkpoint_transaction_id,
+        h.checkpoint_balance + COALESCE(SUM(t.amount), 0) AS ledger_balance,
+        h.checkpoint_balance
+            + COALESCE(SUM(t.amount) FILTER (WHERE t.created_at < $2), 0) AS settled_balance,
+        (ARRAY_AGG(t.id ORDER BY t.created_at DESC, t.id DESC)
+            FILTER (WHERE t.created_at < $2))[1] AS settled_transaction_id,
+        MAX(t.created_at) FILTER (WHERE t.created_at < $2) AS settled_transaction_at
+    FROM heads h
+    LEFT JOIN dust_transactions t
+        ON t.user_id = h.user_id
+        AND {APPLIED_SQL}
+        AND (
+            h.transaction_at IS NULL
+            OR (t.created_at, t.id) > (h.transaction_at, h.transaction_id)
+        )
+    GROUP BY h.user_id, h.dust_balance, h.transaction_id, h.checkpoint_balance
+"""
+
+
+class LedgerReconciler:
+    """
+    Verifies users.dust_balance against the sum of their applied transactions.
+
+    Each user has a chain of checkpoints (balance as of transaction X). A pass only
+    looks at users with transactions since the last pass and, for each, only at the
+    transactions after their latest checkpoint. Any difference between the stored
+    balance and the ledger is recorded as an open drift flag until it disappears.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    async def reconcile(self, now: Optional[datetime] = None) -> dict:
+        """Verify every user with ledger activity since the last pass"""
+        now = now or datetime.now(timezone.utc)
+        horizon = now - SETTLE_DELAY
+
+        async with self.db.connection() as session:
+            lock = await session.fetch_one(
+                "SELECT pg_try_advisory_lock($1) AS locked", RECONCILE_LOCK_KEY
+            )
+            if not lock["locked"]:
+                return {"users_checked": 0, "drifted": 0}
+
+            try:
+                watermark = await session.fetch_one(
+                    "SELECT watermark FROM aggregation_watermarks WHERE name = $1", WATERMARK
+                )
+                # Re-read the settle window so transactions committed late are included. A
+                # plain range predicate lets the planner skip older monthly partitions.
+                if watermark:
+                    rows = await session.fetch_all(
+                        "SELECT DISTINCT user_id FROM dust_transactions WHERE created_at >= $1",
+                        watermark["watermark"] - SETTLE_DELAY,
+                    )
+                else:
+                    rows = await session.fetch_all("SELECT DISTINCT user_id FROM dust_transactions")
+                user_ids = [row["user_id"] for row in rows]
+
+                # One transaction per batch so an interrupted pass keeps its progress
+                drifted = 0
+                for start in range(0, len(user_ids), BATCH_SIZE):
+                    async with session.transaction() as conn:
+                        drifted += await self._verify(
+                            conn, user_ids[start : start + BATCH_SIZE], horizon
+                        )
+
+                await session.execute(
+                    """
+                    INSERT INTO aggregation_watermarks (name, watermark, updated_at)
+                    VALUES ($1, $2, CURRENT_TIMESTAMP)
+                    ON CONFLICT (name) DO UPDATE
+                    SET watermark = EXCLUDED.watermark, updated_at = EXCLUDED.updated_at
+                    """,
+                    WATERMARK,
+                    now,
+                )
+            finally:
+                await session.execute("SELECT pg_advisory_unlock($1)", RECONCILE_LOCK_KEY)
+
+        return {"users_checked": len(user_ids), "drifted": drifted}
+
+    async def verify_users(self, user_ids: list[UUID]) -> int:
+        """Verify specific users now; returns how many are drifted"""
+        horizon = datetime.now(timezone.utc) - SETTLE_DELAY
+        async with self.db.transaction() as conn:
+            return await self._verify(conn, user_ids, horizon)
+
+    async def _verify(self, conn, user_ids: list[UUID], horizon: datetime) -> int:
+        """Compare balances, flag or resolve drift and advance checkpoints for a batch"""
+        rows = await conn.fetch(VERIFY_SQL, user_ids, horizon)
+
+        checkpoints = [
+            (
+                row["user_id"],
+                row["settled_transaction_id"],
+                row["settled_transaction_at"],
+                row["settled_balance"],
+            )
+            for row in rows
+            if row["settled_transaction_id"] is not None
+        ]
+        if checkpoints:
+            await conn.executemany(
+                """
+                INSERT INTO ledger_balance_checkpoints
+                    (user_id, transaction_id, transaction_at, balance)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (user_id, transaction_id) DO NOTHING
+                """,
+                checkpoints,
+            )
+
+        drifted = [row for row in rows if row["dust_balance"] != row["ledger_balance"]]
+        balanced = [row["user_id"] for row in rows if row["dust_balance"] == row["ledger_balance"]]
+
+        if balanced:
+            await conn.execute(
+                """
+                UPDATE ledger_drift_flags SET resolved_at = CURRENT_TIMESTAMP
+                WHERE user_id = ANY($1::uuid[]) AND resolved_at IS NULL
+                """,
+                balanced,
+            )
+
+        for row in drifted:
+            # Keep one open flag per user, refreshed with the latest figures
+            flag = await conn.fetchval(
+                """
+                UPDATE ledger_drift_flags
+                SET stored_balance = $2, ledger_balance = $3, last_seen_at = CURRENT_TIMESTAMP
+                WHERE user_id = $1 AND resolved_at IS NULL
+                RETURNING id
+                """,
+                row["user_id"],
+                row["dust_balance"],
+                row["ledger_balance"],
+            )
+            if flag is None:
+                await conn.execute(
+                    """
+                    INSERT INTO ledger_drift_flags
+                        (user_id, stored_balance, ledger_balance, checkpoint_transaction_id)
+                    VALUES ($1, $2, $3, $4)
+                    """,
+                    row["user_id"],
+                    row["dust_balance"],
+                    row["ledger_balance"],
+                    row["checkpoint_transaction_id"],
+                )
+                print(
+                    f"⚠️ LEDGER_RECONCILE: Balance drift for user {row['user_id']}: "
+                    f"stored {row['dust_balance']}, ledger {row['ledger_balance']}",
+                    flush=True,
+                )
+
+        return len(drifted)
+
+    async def balance_as_of(self, user_id: UUID, as_of: datetime) -> int:
+        """
+        The user's ledger balance at a point in time.
+
+        Starts from the latest checkpoint at or before as_of and adds only the applied
+        transactions between it and as_of.
+        """
+        row = await self.db.fetch_one(
+            f"""
+            WITH cp AS (
+                SELECT transaction_id, transaction_at, balance
+                FROM ledger_balance_checkpoints
+                WHERE user_id = $1 AND transaction_at <= $2
+                ORDER BY transaction_at DESC, transaction_id DESC
+                LIMIT 1
+            )
+            SELECT COALESCE((SELECT balance FROM cp), 0) + COALESCE(SUM(t.amount), 0) AS balance
+            FROM dust_transactions t
+            WHERE t.user_id = $1
+              AND {APPLIED_SQL}
+              AND t.created_at <= $2
+              AND (
+                  NOT EXISTS (SELECT 1 FROM cp)
+                  OR (t.created_at, t.id)
+                      > ((SELECT transaction_at FROM cp), (SELECT transaction_id FROM cp))
+              )
+            """,
+            user_id,
+            as_of,
+        )
+        return row["balance"]
+
+    async def open_drift(self, limit: int = 100) -> list[dict]:
+        """Unresolved drift flags, largest first"""
+        return await self.db.fetch_all(
+            """
+            SELECT id, user_id, stored_balance, ledger_balance,
+                   stored_balance - ledger_balance AS drift,
+                   checkpoint_transaction_id, detected_at, last_seen_at
+            FROM ledger_drift_flags
+            WHERE resolved_at IS NULL
+            ORDER BY ABS(stored_balance - ledger_balance) DESC, detected_at
+            LIMIT $1
+            """,
+            limit,
+        )
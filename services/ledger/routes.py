@@ -6,31 +6,55 @@ from uuid import UUID
 
 import httpx
 import redis.asyncio as redis
+from app_stats import fetch_app_analytics
+from apple_receipt_verification import AppleReceiptVerificationService
+from bulk_grant import BulkGrantEngine, start_job_runner
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from ledger_service import LedgerService
 from models import (
     AppInitialGrantRequest,
     Balance,
     BalanceAdjustment,
+    BalanceAsOf,
+    BulkGrantJob,
+    BulkGrantJobRequest,
     BulkGrantRequest,
+    CaptureHoldRequest,
     ConsumeRequest,
     DailyBonusGrantRequest,
+    DustHold,
     GrantRequest,
+    HoldRequest,
+    HoldResponse,
     InAppPurchaseRequest,
+    LedgerDriftFlag,
     PromotionalGrantRequest,
     PurchaseRequest,
+    QueuedInAppPurchaseRequest,
+    ReceiptVerificationJob,
     ReferralRewardGrantRequest,
     RefundRequest,
+    ReleaseHoldRequest,
     ServiceRefundRequest,
     TransactionList,
     TransactionResponse,
     TransactionType,
     UserStats,
 )
+from receipt_verification import (
+    ReceiptVerifier,
+    callback_allowed,
+    public_job,
+    record_verified_purchase,
+)
+from reconciliation import LedgerReconciler
 
 from shared.auth_middleware import TokenData, get_current_user, require_admin
 from shared.database import Database, get_db
+from shared.ledger_stats import get_ledger_stats
+from shared.pagination import NEWEST_FIRST, paginate
 from shared.redis_client import get_redis
+from shared.system_config import system_config
 
 # Create routers
 balance_router = APIRouter()
@@ -79,6 +103,17 @@ async def get_ledger_service(
     return LedgerService(db, redis_client)
 
 
+async def get_bulk_grant_engine(
+    db: Database = Depends(get_db), redis_client: redis.Redis = Depends(get_redis)
+) -> BulkGrantEngine:
+    return BulkGrantEngine(db, redis_client)
+
+
+def _bulk_grant_job_response(job: dict) -> BulkGrantJob:
+    total = job["total_users"]
+    return BulkGrantJob(**job, progress=job["processed_users"] / total if total else 1.0)
+
+
 # Balance Routes
 @balance_router.get("/{user_id}", response_model=Balance)
 async def get_balance(
@@ -94,12 +129,14 @@ async def get_balance(
 
     balance = await ledger.get_balance(user_id)
 
-    # Get pending balance (transactions in progress)
+    # Get pending balance (transactions in progress and open holds)
     pending_result = await db.fetch_one(
         """
-        SELECT COALESCE(SUM(ABS(amount)), 0) as pending
-        FROM dust_transactions
-        WHERE user_id = $1 AND status = 'pending'
+        SELECT
+            (SELECT COALESCE(SUM(ABS(amount)), 0) FROM dust_transactions
+             WHERE user_id = $1 AND status = 'pending')
+            + (SELECT COALESCE(SUM(amount), 0) FROM dust_holds
+               WHERE user_id = $1 AND status = 'held') as pending
         """,
         user_id,
     )
@@ -184,6 +221,75 @@ async def consume_dust(
     return transaction
 
 
+@transaction_router.post("/holds", response_model=HoldResponse)
+async def hold_dust(
+    request: HoldRequest,
+    current_user: TokenData = Depends(get_current_user),
+    db: Database = Depends(get_db),
+    cache: redis.Redis = Depends(get_redis),
+):
+    """Reserve DUST for a long-running generation; capture or release it when done"""
+    app_uuid = await resolve_app_id(request.app_id, db, cache)
+
+    app_validation = await validate_app(app_uuid)
+    if not app_validation["is_valid"]:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="App not found")
+    if not app_validation["is_active"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="App is not active or not approved"
+        )
+
+    expected_amount = await get_action_pricing(request.action, cache)
+    if expected_amount is not None and request.amount != expected_amount:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid DUST amount for action '{request.action}'. "
+            f"Expected: {expected_amount}, Provided: {request.amount}",
+        )
+
+    return await LedgerService(db, cache).hold_dust(
+        user_id=request.user_id,
+        amount=request.amount,
+        app_id=app_uuid,
+        action=request.action,
+        idempotency_key=request.idempotency_key,
+        ttl_seconds=request.ttl_seconds,
+        metadata=request.metadata,
+    )
+
+
+@transaction_router.get("/holds/{hold_id}", response_model=DustHold)
+async def get_hold(
+    hold_id: UUID,
+    current_user: TokenData = Depends(get_current_user),
+    ledger: LedgerService = Depends(get_ledger_service),
+):
+    """Get a hold and its current status"""
+    return await ledger.get_hold(hold_id)
+
+
+@transaction_router.post("/holds/{hold_id}/capture", response_model=TransactionResponse)
+async def capture_hold(
+    hold_id: UUID,
+    request: CaptureHoldRequest,
+    current_user: TokenData = Depends(get_current_user),
+    ledger: LedgerService = Depends(get_ledger_service),
+):
+    """Charge a hold once the generation has succeeded"""
+    return await ledger.capture_hold(hold_id, amount=request.amount, metadata=request.metadata)
+
+
+@transaction_router.post("/holds/{hold_id}/release", response_model=HoldResponse)
+async def release_hold(
+    hold_id: UUID,
+    request: ReleaseHoldRequest,
+    current_user: TokenData = Depends(get_current_user),
+    ledger: LedgerService = Depends(get_ledger_service),
+):
+    """Return a hold's DUST when the generation failed or was cancelled"""
+    return await ledger.release_hold(hold_id, reason=request.reason)
+
+
 @transaction_router.post("/refund", response_model=TransactionResponse)
 async def process_refund(
     request: ServiceRefundRequest,
@@ -224,6 +330,7 @@ async def process_in_app_purchase(
     request: InAppPurchaseRequest,
     current_user: TokenData = Depends(get_current_user),
     ledger: LedgerService = Depends(get_ledger_service),
+    cache: redis.Redis = Depends(get_redis),
 ):
     """Process in-app purchase from mobile app stores with receipt verification"""
     # Users can only make purchases for themselves
@@ -249,11 +356,9 @@ async def process_in_app_purchase(
 
     if request.platform == "ios":
         print("🍎 IN_APP_PURCHASE: Initializing Apple receipt verification service")
-        # Use Apple receipt verification
-        from apple_receipt_verification import AppleReceiptVerificationService
-
         try:
             apple_service = AppleReceiptVerificationService()
+            verifier = ReceiptVerifier(cache, apple_service)
             print("🍎 IN_APP_PURCHASE: ✅ Apple service initialized successfully")
         except Exception as e:
             print(f"🍎 IN_APP_PURCHASE: ❌ Failed to initialize Apple service: {str(e)}")
@@ -261,10 +366,10 @@ async def process_in_app_purchase(
                 status_code=500, detail="Failed to initialize receipt verification service"
             )
 
-        # Verify receipt with Apple
+        # Verify receipt with Apple (cached and de-duplicated per receipt)
         print("🍎 IN_APP_PURCHASE: Starting Apple receipt verification process")
         try:
-            is_valid, verification_response, error_message = await apple_service.verify_receipt(
+            is_valid, verification_response, error_message = await verifier.verify(
                 request.receipt_data, request.product_id
             )
             print(f"🍎 IN_APP_PURCHASE: Verification process completed - Valid: {is_valid}")
@@ -282,33 +387,15 @@ async def process_in_app_purchase(
 
         print("🍎 IN_APP_PURCHASE: ✅ Apple receipt verification successful")
 
-        # Extract transaction data from Apple response
-        print("🍎 IN_APP_PURCHASE: Extracting transaction data from Apple response")
         try:
-            apple_transaction_data = apple_service.extract_transaction_data(
-                verification_response, request.product_id
-            )
-
-            dust_amount = apple_transaction_data["dust_amount"]
-            print(f"🍎 IN_APP_PURCHASE: DUST amount to grant: {dust_amount}")
-
-            # Generate payment ID
-            import secrets
-
-            purchase_id = f"ios_{request.product_id}_{secrets.token_hex(8)}"
-            print(f"🍎 IN_APP_PURCHASE: Generated payment ID: {purchase_id}")
-
-            # Record the verified purchase
             print("🍎 IN_APP_PURCHASE: Recording purchase in ledger...")
-            result = await ledger.record_apple_purchase(
-                user_id=user_id,
-                dust_amount=dust_amount,
-                payment_id=purchase_id,
-                receipt_data=request.receipt_data,
-                verification_status="verified",
-                verification_response=verification_response,
-                apple_transaction_data=apple_transaction_data,
-                payment_amount_cents=dust_amount,  # 1 DUST = 1 cent
+            result = await record_verified_purchase(
+                ledger,
+                apple_service,
+                user_id,
+                request.product_id,
+                request.receipt_data,
+                verification_response,
             )
 
             print(
@@ -336,6 +423,45 @@ async def process_in_app_purchase(
         raise HTTPException(status_code=400, detail="Invalid platform. Must be 'ios' or 'android'")
 
 
+@transaction_router.post(
+    "/purchase/in-app/verifications",
+    response_model=ReceiptVerificationJob,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def queue_in_app_purchase(
+    request: QueuedInAppPurchaseRequest,
+    current_user: TokenData = Depends(get_current_user),
+    cache: redis.Redis = Depends(get_redis),
+):
+    """Queue an in-app purchase for receipt verification; poll the job or pass a callback_url"""
+    if request.platform != "ios":
+        raise HTTPException(
+            status_code=501, detail="Android receipt verification not yet implemented"
+        )
+    if request.callback_url and not callback_allowed(request.callback_url):
+        raise HTTPException(status_code=400, detail="callback_url host is not allowed")
+
+    job = await ReceiptVerifier(cache).enqueue(
+        UUID(current_user.user_id), request.product_id, request.receipt_data, request.callback_url
+    )
+    return ReceiptVerificationJob(**public_job(job))
+
+
+@transaction_router.get(
+    "/purchase/in-app/verifications/{verification_id}", response_model=ReceiptVerificationJob
+)
+async def get_in_app_verification(
+    verification_id: UUID,
+    current_user: TokenData = Depends(get_current_user),
+    cache: redis.Redis = Depends(get_redis),
+):
+    """Status of a queued in-app purchase verification"""
+    job = await ReceiptVerifier(cache).get_job(str(verification_id))
+    if not job or (job["user_id"] != current_user.user_id and not current_user.is_admin):
+        raise HTTPException(status_code=404, detail="Verification not found")
+    return ReceiptVerificationJob(**public_job(job))
+
+
 @transaction_router.get("/{user_id}", response_model=TransactionList)
 async def get_transactions(
     user_id: UUID,
@@ -343,11 +469,12 @@ async def get_transactions(
     page_size: int = Query(50, ge=1, le=100),
     type: Optional[TransactionType] = None,
     app_id: Optional[UUID] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page"),
     current_user: TokenData = Depends(get_current_user),
     ledger: LedgerService = Depends(get_ledger_service),
     db: Database = Depends(get_db),
 ):
-    """Get user's transaction history"""
+    """Get user's transaction history (page/page_size, or cursor for deep pages)"""
     # Users can only view their own transactions unless admin
     if str(user_id) != current_user.user_id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Cannot view other users' transactions")
@@ -361,12 +488,12 @@ async def get_transactions(
         offset=offset,
         type_filter=type,
         app_id=app_id,
+        cursor=cursor,
     )
 
     # Check if there are more
     has_more = len(transactions) > page_size
-    if has_more:
-        transactions = transactions[:page_size]
+    transactions, next_cursor = paginate(transactions, page_size, NEWEST_FIRST)
 
     # Get total count
     count_query = "SELECT COUNT(*) as total FROM dust_transactions WHERE user_id = $1"
@@ -384,7 +511,12 @@ async def get_transactions(
     total = total_result["total"]
 
     return TransactionList(
-        transactions=transactions, total=total, page=page, page_size=page_size, has_more=has_more
+        transactions=transactions,
+        total=total,
+        page=page,
+        page_size=page_size,
+        has_more=has_more,
+        next_cursor=next_cursor,
     )
 
 
@@ -398,23 +530,8 @@ async def get_user_stats(
     if str(user_id) != current_user.user_id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Cannot view other users' stats")
 
-    stats = await db.fetch_one(
-        """
-        SELECT
-            user_id,
-            SUM(CASE WHEN type = 'grant' THEN amount ELSE 0 END) as total_granted,
-            SUM(CASE WHEN type = 'consume' THEN ABS(amount) ELSE 0 END) as total_consumed,
-            SUM(CASE WHEN type = 'purchase' THEN amount ELSE 0 END) as total_purchased,
-            SUM(CASE WHEN type = 'refund' THEN amount ELSE 0 END) as total_refunded,
-            COUNT(*) as transaction_count,
-            MIN(created_at) as first_transaction,
-            MAX(created_at) as last_transaction
-        FROM dust_transactions
-        WHERE user_id = $1
-        GROUP BY user_id
-        """,
-        user_id,
-    )
+    # Maintained with every ledger write, so this is a primary-key lookup
+    stats = await get_ledger_stats(db, user_id)
 
     if not stats:
         # Return empty stats for user with no transactions
@@ -430,20 +547,7 @@ async def get_user_stats(
             favorite_app_id=None,
         )
 
-    # Get favorite app
-    favorite_app = await db.fetch_one(
-        """
-        SELECT app_id, COUNT(*) as usage_count
-        FROM dust_transactions
-        WHERE user_id = $1 AND type = 'consume' AND app_id IS NOT NULL
-        GROUP BY app_id
-        ORDER BY usage_count DESC
-        LIMIT 1
-        """,
-        user_id,
-    )
-
-    return UserStats(**stats, favorite_app_id=favorite_app["app_id"] if favorite_app else None)
+    return UserStats(**stats)
 
 
 # Admin Routes
@@ -467,25 +571,30 @@ async def grant_dust(
 async def bulk_grant_dust(
     request: BulkGrantRequest,
     current_user: TokenData = Depends(require_admin),
-    ledger: LedgerService = Depends(get_ledger_service),
+    engine: BulkGrantEngine = Depends(get_bulk_grant_engine),
 ):
     """Grant DUST to multiple users (admin only)"""
-    results = []
-    errors = []
-
-    for user_id in request.user_ids:
-        try:
-            result = await ledger.grant_dust(
-                user_id=user_id,
-                amount=request.amount,
-                reason=request.reason,
-                admin_id=request.admin_id,
-            )
-            results.append({"user_id": user_id, "success": True, "new_balance": result.new_balance})
-        except Exception as e:
-            errors.append({"user_id": user_id, "success": False, "error": str(e)})
+    job = await engine.create_job(
+        user_ids=request.user_ids,
+        amount=request.amount,
+        reason=request.reason,
+        admin_id=request.admin_id,
+    )
+    job, granted = await engine.run_job(job["id"])
+
+    results = [
+        {"user_id": user_id, "success": True, "new_balance": new_balance}
+        for user_id, new_balance in granted
+    ]
+    granted_ids = {user_id for user_id, _ in granted}
+    errors = [
+        {"user_id": user_id, "success": False, "error": "User not found"}
+        for user_id in dict.fromkeys(request.user_ids)
+        if user_id not in granted_ids
+    ]
 
     return {
+        "job_id": job["id"],
         "total": len(request.user_ids),
         "successful": len(results),
         "failed": len(errors),
@@ -494,6 +603,55 @@ async def bulk_grant_dust(
     }
 
 
+@admin_router.post(
+    "/bulk-grant/jobs", response_model=BulkGrantJob, status_code=status.HTTP_202_ACCEPTED
+)
+async def create_bulk_grant_job(
+    request: BulkGrantJobRequest,
+    current_user: TokenData = Depends(require_admin),
+    engine: BulkGrantEngine = Depends(get_bulk_grant_engine),
+):
+    """Start a large (campaign) grant in the background; poll the job for progress"""
+    job = await engine.create_job(
+        user_ids=request.user_ids,
+        amount=request.amount,
+        reason=request.reason,
+        admin_id=request.admin_id,
+        metadata=request.metadata,
+        chunk_size=request.chunk_size,
+    )
+    start_job_runner(engine, job["id"])
+    return _bulk_grant_job_response(job)
+
+
+@admin_router.get("/bulk-grant/jobs/{job_id}", response_model=BulkGrantJob)
+async def get_bulk_grant_job(
+    job_id: UUID,
+    current_user: TokenData = Depends(require_admin),
+    engine: BulkGrantEngine = Depends(get_bulk_grant_engine),
+):
+    """Get progress of a bulk grant job"""
+    job = await engine.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Bulk grant job not found")
+    return _bulk_grant_job_response(job)
+
+
+@admin_router.post("/bulk-grant/jobs/{job_id}/resume", response_model=BulkGrantJob)
+async def resume_bulk_grant_job(
+    job_id: UUID,
+    current_user: TokenData = Depends(require_admin),
+    engine: BulkGrantEngine = Depends(get_bulk_grant_engine),
+):
+    """Resume a failed or interrupted bulk grant job from its last committed chunk"""
+    job = await engine.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Bulk grant job not found")
+    if job["status"] != "completed":
+        start_job_runner(engine, job_id)
+    return _bulk_grant_job_response(job)
+
+
 @admin_router.post("/refund", response_model=TransactionResponse)
 async def refund_transaction(
     request: RefundRequest,
@@ -528,6 +686,28 @@ async def adjust_balance(
         raise HTTPException(status_code=501, detail="Negative adjustments not yet implemented")
 
 
+@admin_router.get("/balance-as-of/{user_id}", response_model=BalanceAsOf)
+async def get_balance_as_of(
+    user_id: UUID,
+    as_of: datetime = Query(..., description="Point in time (ISO 8601)"),
+    current_user: TokenData = Depends(require_admin),
+    db: Database = Depends(get_db),
+):
+    """User's ledger balance at a point in time, from the nearest checkpoint (admin only)"""
+    balance = await LedgerReconciler(db).balance_as_of(user_id, as_of)
+    return BalanceAsOf(user_id=user_id, as_of=as_of, balance=balance)
+
+
+@admin_router.get("/reconciliation/drift", response_model=list[LedgerDriftFlag])
+async def get_ledger_drift(
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: TokenData = Depends(require_admin),
+    db: Database = Depends(get_db),
+):
+    """Users whose stored balance disagrees with their ledger (admin only)"""
+    return [LedgerDriftFlag(**flag) for flag in await LedgerReconciler(db).open_drift(limit)]
+
+
 @admin_router.delete("/testing/reset-grants/{user_id}")
 async def reset_user_grants(
     user_id: UUID,
@@ -557,57 +737,20 @@ async def get_app_analytics(
     end_date: Optional[datetime] = None,
     current_user: TokenData = Depends(require_admin),
     db: Database = Depends(get_db),
+    cache: redis.Redis = Depends(get_redis),
 ):
-    """Get analytics for an app (admin only)"""
+    """Get analytics for an app (admin only), served from hourly aggregates"""
     if not start_date:
         start_date = datetime.utcnow() - timedelta(days=30)
     if not end_date:
         end_date = datetime.utcnow()
 
-    stats = await db.fetch_one(
-        """
-        SELECT
-            COUNT(DISTINCT user_id) as unique_users,
-            COUNT(*) as transaction_count,
-            SUM(ABS(amount)) as total_consumed,
-            AVG(ABS(amount)) as avg_consumption,
-            MIN(created_at) as first_usage,
-            MAX(created_at) as last_usage
-        FROM dust_transactions
-        WHERE app_id = $1
-        AND type = 'consume'
-        AND created_at BETWEEN $2 AND $3
-        """,
-        app_id,
-        start_date,
-        end_date,
-    )
-
-    # Daily breakdown
-    daily_stats = await db.fetch_all(
-        """
-        SELECT
-            DATE(created_at) as date,
-            COUNT(DISTINCT user_id) as unique_users,
-            COUNT(*) as transactions,
-            SUM(ABS(amount)) as dust_consumed
-        FROM dust_transactions
-        WHERE app_id = $1
-        AND type = 'consume'
-        AND created_at BETWEEN $2 AND $3
-        GROUP BY DATE(created_at)
-        ORDER BY date DESC
-        """,
-        app_id,
-        start_date,
-        end_date,
-    )
+    analytics = await fetch_app_analytics(db, cache, app_id, start_date, end_date)
 
     return {
         "app_id": app_id,
         "period": {"start": start_date, "end": end_date},
-        "summary": stats,
-        "daily_breakdown": daily_stats,
+        **analytics,
     }
 
 
@@ -743,15 +886,8 @@ async def grant_daily_bonus(
             status_code=status.HTTP_403_FORBIDDEN, detail="App is not active or not approved"
         )
 
-    # Get daily bonus amount from system config
-    config_result = await db.fetch_one(
-        "SELECT value FROM system_config WHERE key = 'daily_login_bonus_amount'"
-    )
-
-    if not config_result:
-        raise HTTPException(status_code=500, detail="Daily bonus not configured")
-
-    bonus_amount = int(config_result["value"])
+    # Get daily bonus amount from system config (the same amount identity shows at login)
+    bonus_amount = system_config.get("daily_login_bonus_amount")
 
     # Apps can grant daily bonuses to any user
     return await ledger.grant_daily_bonus(
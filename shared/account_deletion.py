@@ -0,0 +1,308 @@
+# shared/account_deletion.py
+"""
+Queued account deletion.
+
+A deletion request (self-service or admin) writes its account_deletion_logs row with the
+audit summary, computed in one query, and returns; the row is the job. An
+AccountDeletionWorker claims pending rows with SKIP LOCKED under a lease and runs the
+steps in order, recording each in the row's progress so a retried job resumes where it
+stopped:
+
+    database  delete the user (related data cascades) and queue the confirmation email,
+              in one transaction
+    storage   purge the user's R2 prefixes with batched DeleteObjects
+    redis     unlink the user's keys, found from the per-user key index below plus a
+              SCAN (never KEYS) for legacy patterns
+
+Failed jobs are retried with backoff and parked as failed after MAX_ATTEMPTS; the error
+is kept in last_error for the admin deletion log.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections.abc import Awaitable, Callable
+from typing import Any, Optional
+from uuid import UUID
+
+from shared.database import Database
+from shared.email_service import enqueue_account_deletion_confirmation
+from shared.outbox import retry_delay
+from shared.uuid_utils import generate_uuid7
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_DELETION_POLL_SECONDS = float(os.getenv("ACCOUNT_DELETION_POLL_SECONDS", "2"))
+ACCOUNT_DELETION_CONCURRENCY = int(os.getenv("ACCOUNT_DELETION_CONCURRENCY", "4"))
+
+# A claimed job is picked up again by any worker if not settled within the lease
+CLAIM_LEASE_SECONDS = 600
+
+MAX_ATTEMPTS = 8
+
+STEPS = ("database", "storage", "redis")
+
+# Per-user key index: every Redis key that belongs to one user, by user id. Add new
+# per-user keys here so deletion removes them.
+USER_KEYS = (
+    "refresh_token:{user_id}",
+    "sessions:{user_id}",
+    "admin_session:{user_id}",
+    "builder_session:{user_id}",
+    "balance:{user_id}",
+    "story_gen_limit:{user_id}",
+    "api_limit:{user_id}",
+    "burst_limit:{user_id}",
+    "generation_context:{user_id}",
+    "generation_context_version:{user_id}",
+)
+
+# Keys by login identifier (email or phone)
+IDENTIFIER_KEYS = ("otp:{identifier}",)
+
+# Patterns from older key layouts, swept with SCAN
+LEGACY_USER_KEY_PATTERNS = (
+    "session:*:{user_id}",
+    "rate_limit:*:{user_id}*",
+)
+
+SCAN_COUNT = 1000
+
+# Queues the job for a user with the audit summary; no row if the user doesn't exist or
+# already has a job in progress. $1 id, $2 user id, $3 reason, $4 feedback, $5 deleted by,
+# $6 deleting admin's id, $7 extra summary fields.
+REQUEST_SQL = """
+    INSERT INTO account_deletion_logs
+        (id, user_id, fairyname, email, deletion_reason, deletion_feedback, deleted_by,
+         deleted_by_user_id, user_created_at, data_summary, deletion_requested_at, status,
+         next_attempt_at)
+    SELECT $1, u.id, u.fairyname, u.email, $3, $4, $5, $6, u.created_at,
+        jsonb_build_object(
+            'dust_balance', u.dust_balance,
+            'account_age_days',
+                COALESCE(EXTRACT(DAY FROM CURRENT_TIMESTAMP - u.created_at)::int, 0),
+            'has_avatar', u.avatar_url IS NOT NULL,
+            'recipes_created', (SELECT COUNT(*) FROM user_recipes WHERE user_id = u.id),
+            'stories_created', (SELECT COUNT(*) FROM user_stories WHERE user_id = u.id),
+            'images_generated', (SELECT COUNT(*) FROM user_images WHERE user_id = u.id),
+            'people_in_life', (SELECT COUNT(*) FROM people_in_my_life WHERE user_id = u.id),
+            'total_transactions',
+                (SELECT COUNT(*) FROM dust_transactions WHERE user_id = u.id),
+            'referrals_made', (SELECT COUNT(*) FROM referral_codes WHERE user_id = u.id)
+        ) || $7::jsonb,
+        CURRENT_TIMESTAMP, 'pending', CURRENT_TIMESTAMP
+    FROM users u
+    WHERE u.id = $2
+    ON CONFLICT (user_id) WHERE status IN ('pending', 'running') DO NOTHING
+    RETURNING id
+"""
+
+# $1 batch size, $2 lease seconds
+CLAIM_SQL = """
+    UPDATE account_deletion_logs
+    SET status = 'running',
+        attempts = attempts + 1,
+        next_attempt_at = CURRENT_TIMESTAMP + $2::int * INTERVAL '1 second'
+    WHERE id IN (
+        SELECT id FROM account_deletion_logs
+        WHERE status IN ('pending', 'running') AND next_attempt_at <= CURRENT_TIMESTAMP
+        ORDER BY next_attempt_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, user_id, fairyname, email, attempts, progress
+"""
+
+PROGRESS_SQL = """
+    UPDATE account_deletion_logs
+    SET progress = progress || jsonb_build_object($2::text, $3::jsonb)
+    WHERE id = $1
+"""
+
+
+async def request_account_deletion(
+    db: Database,
+    user_id: UUID,
+    reason: str,
+    feedback: Optional[str] = None,
+    deleted_by: str = "self",
+    deleted_by_user_id: Optional[UUID] = None,
+    summary: Optional[dict[str, Any]] = None,
+) -> Optional[UUID]:
+    """Queue the user's deletion; returns the deletion id (an in-progress job's if any)"""
+    row = await db.fetch_one(
+        REQUEST_SQL,
+        generate_uuid7(),
+        user_id,
+        reason,
+        feedback,
+        deleted_by,
+        deleted_by_user_id,
+        json.dumps(summary or {}),
+    )
+    if row:
+        return row["id"]
+
+    # Either the user doesn't exist or a deletion is already queued
+    row = await db.fetch_one(
+        """
+        SELECT id FROM account_deletion_logs
+        WHERE user_id = $1 AND status IN ('pending', 'running')
+        """,
+        user_id,
+    )
+    return row["id"] if row else None
+
+
+def user_key_names(user_id, identifiers=()) -> list[str]:
+    """The user's Redis keys from the per-user key index"""
+    keys = [template.format(user_id=user_id) for template in USER_KEYS]
+    for identifier in identifiers:
+        if identifier:
+            keys.extend(template.format(identifier=identifier) for template in IDENTIFIER_KEYS)
+    return keys
+
+
+async def purge_user_keys(redis, user_id, identifiers=()) -> int:
+    """Unlink the user's Redis keys; returns how many existed"""
+    deleted = await redis.unlink(*user_key_names(user_id, identifiers))
+
+    for pattern in LEGACY_USER_KEY_PATTERNS:
+        batch = []
+        async for key in redis.scan_iter(match=pattern.format(user_id=user_id), count=SCAN_COUNT):
+            batch.append(key)
+            if len(batch) >= SCAN_COUNT:
+                deleted += await redis.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += await redis.unlink(*batch)
+
+    return deleted
+
+
+class AccountDeletionWorker:
+    """Runs queued account deletions"""
+
+    def __init__(
+        self,
+        db: Database,
+        redis,
+        purge_assets: Callable[[str], Awaitable[dict]],
+        concurrency: int = ACCOUNT_DELETION_CONCURRENCY,
+    ):
+        self.db = db
+        self.redis = redis
+        self.purge_assets = purge_assets
+        self.concurrency = concurrency
+
+    async def claim(self) -> list[dict]:
+        rows = await self.db.fetch_all(CLAIM_SQL, self.concurrency, CLAIM_LEASE_SECONDS)
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            if isinstance(job["progress"], str):
+                job["progress"] = json.loads(job["progress"])
+            jobs.append(job)
+        return jobs
+
+    async def _record(self, job: dict, step: str, result: dict, conn=None) -> None:
+        await (conn or self.db).execute(PROGRESS_SQL, job["id"], step, json.dumps(result))
+        job["progress"][step] = result
+
+    async def _delete_user(self, job: dict) -> dict:
+        async with self.db.transaction() as conn:
+            user = await conn.fetchrow(
+                "DELETE FROM users WHERE id = $1 RETURNING email, phone", job["user_id"]
+            )
+            if job["email"]:
+                await enqueue_account_deletion_confirmation(
+                    conn, job["email"], job["fairyname"], job["id"]
+                )
+            result = {"user_deleted": user is not None}
+            await self._record(job, "database", result, conn)
+
+        # OTP keys are by email or phone, which are gone once the delete commits; they
+        # expire within minutes, so a retry that can't see them leaves nothing behind
+        job["identifiers"] = (user["email"], user["phone"]) if user else ()
+        return result
+
+    async def _purge_storage(self, job: dict) -> dict:
+        summary = await self.purge_assets(str(job["user_id"]))
+        await self._record(job, "storage", summary)
+        if summary.get("errors"):
+            raise RuntimeError(f"Storage cleanup incomplete: {summary['errors'][:3]}")
+        return summary
+
+    async def _purge_redis(self, job: dict) -> dict:
+        deleted = await purge_user_keys(self.redis, job["user_id"], job.get("identifiers", ()))
+        result = {"keys_deleted": deleted}
+        await self._record(job, "redis", result)
+        return result
+
+    async def run_job(self, job: dict) -> bool:
+        """Run the job's remaining steps; True once complete"""
+        steps = {
+            "database": self._delete_user,
+            "storage": self._purge_storage,
+            "redis": self._purge_redis,
+        }
+        try:
+            for step in STEPS:
+                done = job["progress"].get(step)
+                # A storage step that hit errors is run again
+                if done and not (step == "storage" and done.get("errors")):
+                    continue
+                await steps[step](job)
+        except Exception as e:
+            failed = job["attempts"] >= MAX_ATTEMPTS
+            logger.error(f"Account deletion {job['id']} failed (attempt {job['attempts']}): {e}")
+            await self.db.execute(
+                """
+                UPDATE account_deletion_logs
+                SET status = $2, last_error = $3,
+                    next_attempt_at = CURRENT_TIMESTAMP + $4::float * INTERVAL '1 second'
+                WHERE id = $1
+                """,
+                job["id"],
+                "failed" if failed else "pending",
+                str(e)[:1000],
+                retry_delay(job["attempts"]),
+            )
+            return False
+
+        await self.db.execute(
+            """
+            UPDATE account_deletion_logs
+            SET status = 'completed', last_error = NULL,
+                deletion_completed_at = CURRENT_TIMESTAMP,
+                data_summary = data_summary || jsonb_build_object('storage_cleanup', $2::jsonb)
+            WHERE id = $1
+            """,
+            job["id"],
+            json.dumps(job["progress"]["storage"]),
+        )
+        return True
+
+    async def run(self, shutdown: asyncio.Event) -> None:
+        """Run queued deletions until shutdown"""
+        while not shutdown.is_set():
+            claimed = 0
+            try:
+                jobs = await self.claim()
+                claimed = len(jobs)
+                results = await asyncio.gather(*(self.run_job(job) for job in jobs))
+                if jobs:
+                    logger.info(
+                        f"Account deletions: {sum(results)} completed, "
+                        f"{len(jobs) - sum(results)} to retry"
+                    )
+            except Exception as e:
+                logger.error(f"Account deletion worker failed: {e}")
+
+            if claimed >= self.concurrency:
+                continue
+            try:
+                await asyncio.wait_for(shutdown.wait(), ACCOUNT_DELETION_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
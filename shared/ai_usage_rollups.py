@@ -0,0 +1,334 @@
+# shared/ai_usage_rollups.py
+"""
+Hourly and daily rollups of ai_usage_logs for analytics.
+
+The aggregator folds complete UTC hours of raw logs into ai_usage_rollups_hourly and
+complete UTC days of hourly rows into ai_usage_rollups_daily, keyed by model_type,
+provider, model, app and user. Progress is tracked in aggregation_watermarks, so a
+restart catches up from where it stopped and re-running a bucket simply rebuilds it.
+
+Readers call fetch_ai_usage(), which stitches a time window together from daily
+rollups, hourly rollups and raw rows for the edges that are not rolled up yet
+(normally only the unfinished current hour).
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from shared.database import Database
+
+logger = logging.getLogger(__name__)
+
+HOURLY_WATERMARK = "ai_usage_hourly"
+DAILY_WATERMARK = "ai_usage_daily"
+
+# Rows are stamped on insert, so leave a margin for transactions that commit late
+SETTLE_DELAY = timedelta(minutes=5)
+
+# Hours folded per aggregator pass; callers loop until caught up
+MAX_HOURS_PER_PASS = 24
+
+# pg_try_advisory_xact_lock key so only one service replica aggregates at a time
+ROLLUP_LOCK_KEY = 730_001
+
+DIMENSIONS = ("model_type", "provider", "model_id", "app_id", "user_id")
+
+METRICS = (
+    "request_count",
+    "prompt_tokens",
+    "completion_tokens",
+    "images_generated",
+    "videos_generated",
+    "cost_usd",
+    "latency_ms_sum",
+    "fallback_count",
+)
+
+# Per-row metric expressions over ai_usage_logs
+RAW_METRICS_SQL = """
+    1 AS request_count,
+    COALESCE(prompt_tokens, 0) AS prompt_tokens,
+    COALESCE(completion_tokens, 0) AS completion_tokens,
+    CASE WHEN model_type = 'image' THEN COALESCE(images_generated, 0) ELSE 0 END
+        AS images_generated,
+    CASE WHEN model_type = 'video' THEN COALESCE(videos_generated, 0) ELSE 0 END
+        AS videos_generated,
+    cost_usd,
+    latency_ms AS latency_ms_sum,
+    CASE WHEN was_fallback THEN 1 ELSE 0 END AS fallback_count
+"""
+
+DIMENSIONS_SQL = ", ".join(DIMENSIONS)
+METRICS_SQL = ", ".join(METRICS)
+
+ROLLUP_SUMS_SQL = """
+    SUM(request_count), SUM(prompt_tokens), SUM(completion_tokens),
+    SUM(images_generated), SUM(videos_generated), SUM(cost_usd),
+    SUM(latency_ms_sum), SUM(fallback_count)
+"""
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value: datetime) -> datetime:
+    floored = floor_hour(value)
+    return floored if floored == value else floored + timedelta(hours=1)
+
+
+def floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ceil_day(value: datetime) -> datetime:
+    floored = floor_day(value)
+    return floored if floored == value else floored + timedelta(days=1)
+
+
+def _utc(value: datetime) -> datetime:
+    """Treat naive datetimes as UTC, matching how the services stamp times"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def plan_segments(
+    start: datetime,
+    end: datetime,
+    hourly_watermark: Optional[datetime],
+    daily_watermark: Optional[datetime],
+) -> list[tuple[str, datetime, datetime]]:
+    """
+    Split [start, end] into (source, from, to) pieces read from "raw", "hourly" or
+    "daily" tables. Pieces are half-open except the final raw piece, which includes end.
+    """
+    start, end = _utc(start), _utc(end)
+    if hourly_watermark is None:
+        return [("raw", start, end)]
+
+    covered_start = ceil_hour(start)
+    covered_end = min(_utc(hourly_watermark), floor_hour(end))
+    if covered_start >= covered_end:
+        return [("raw", start, end)]
+
+    segments = []
+    if start < covered_start:
+        segments.append(("raw", start, covered_start))
+
+    day_start = ceil_day(covered_start)
+    day_end = floor_day(covered_end)
+    if daily_watermark is not None:
+        day_end = min(day_end, _utc(daily_watermark))
+
+    if day_start < day_end:
+        if covered_start < day_start:
+            segments.append(("hourly", covered_start, day_start))
+        segments.append(("daily", day_start, day_end))
+        if day_end < covered_end:
+            segments.append(("hourly", day_end, covered_end))
+    else:
+        segments.append(("hourly", covered_start, covered_end))
+
+    segments.append(("raw", covered_end, end))
+    return segments
+
+
+async def get_watermarks(db: Database) -> dict[str, datetime]:
+    """Current rollup watermarks by name"""
+    rows = await db.fetch_all(
+        "SELECT name, watermark FROM aggregation_watermarks WHERE name = ANY($1::text[])",
+        [HOURLY_WATERMARK, DAILY_WATERMARK],
+    )
+    return {row["name"]: row["watermark"] for row in rows}
+
+
+async def fetch_ai_usage(
+    db: Database,
+    start: datetime,
+    end: Optional[datetime] = None,
+    group_by: tuple[str, ...] = (),
+    **filters: Any,
+) -> list[dict[str, Any]]:
+    """
+    Aggregate AI usage for [start, end] grouped by the given dimensions.
+
+    Filters are equality matches on dimensions (e.g. user_id=..., model_type="text").
+    Each result row has the group columns plus summed metrics and derived tokens and
+    avg_latency_ms.
+    """
+    for column in (*group_by, *filters):
+        if column not in DIMENSIONS:
+            raise ValueError(f"Unknown AI usage dimension: {column}")
+
+    end = end or datetime.now(timezone.utc)
+    watermarks = await get_watermarks(db)
+    segments = plan_segments(
+        start, end, watermarks.get(HOURLY_WATERMARK), watermarks.get(DAILY_WATERMARK)
+    )
+
+    params: list[Any] = []
+
+    def param(value: Any) -> str:
+        params.append(value)
+        return f"${len(params)}"
+
+    filter_sql = "".join(f" AND {column} = {param(value)}" for column, value in filters.items())
+    group_sql = "".join(f"{column}, " for column in group_by)
+
+    parts = []
+    for index, (source, seg_start, seg_end) in enumerate(segments):
+        upper = "<=" if index == len(segments) - 1 else "<"
+        if source == "raw":
+            parts.append(
+                f"""
+                SELECT {group_sql}{RAW_METRICS_SQL}
+                FROM ai_usage_logs
+                WHERE created_at >= {param(seg_start)} AND created_at {upper} {param(seg_end)}
+                {filter_sql}
+                """
+            )
+        else:
+            parts.append(
+                f"""
+                SELECT {group_sql}{METRICS_SQL}
+                FROM ai_usage_rollups_{source}
+                WHERE bucket_start >= {param(seg_start)} AND bucket_start < {param(seg_end)}
+                {filter_sql}
+                """
+            )
+
+    sums = ",\n".join(
+        f"COALESCE(SUM({metric}), 0){'' if metric == 'cost_usd' else '::bigint'} AS {metric}"
+        for metric in METRICS
+    )
+    query = f"""
+        SELECT {group_sql}{sums}
+        FROM ({" UNION ALL ".join(parts)}) usage
+        {f"GROUP BY {', '.join(group_by)}" if group_by else ""}
+    """
+
+    rows = await db.fetch_all(query, *params)
+    results = []
+    for row in rows:
+        row["cost_usd"] = float(row["cost_usd"] or 0)
+        row["tokens"] = row["prompt_tokens"] + row["completion_tokens"]
+        row["avg_latency_ms"] = (
+            row["latency_ms_sum"] / row["request_count"] if row["request_count"] else 0.0
+        )
+        results.append(row)
+    return results
+
+
+async def roll_up_ai_usage(
+    db: Database, now: Optional[datetime] = None, max_hours: int = MAX_HOURS_PER_PASS
+) -> int:
+    """
+    Fold the next complete hours of raw logs into the rollup tables.
+
+    Returns the number of hours rolled up; 0 means caught up (or another replica holds
+    the aggregation lock).
+    """
+    now = _utc(now or datetime.now(timezone.utc))
+    target = floor_hour(now - SETTLE_DELAY)
+
+    async with db.transaction() as conn:
+        if not await conn.fetchval("SELECT pg_try_advisory_xact_lock($1)", ROLLUP_LOCK_KEY):
+            return 0
+
+        watermark = await conn.fetchval(
+            "SELECT watermark FROM aggregation_watermarks WHERE name = $1 FOR UPDATE",
+            HOURLY_WATERMARK,
+        )
+        if watermark is None:
+            # First run: start at the oldest log so history is backfilled
+            oldest = await conn.fetchval("SELECT MIN(created_at) FROM ai_usage_logs")
+            watermark = floor_hour(_utc(oldest)) if oldest else target
+            initial = ((HOURLY_WATERMARK, watermark), (DAILY_WATERMARK, floor_day(watermark)))
+            for name, value in initial:
+                await conn.execute(
+                    """
+                    INSERT INTO aggregation_watermarks (name, watermark)
+                    VALUES ($1, $2)
+                    ON CONFLICT (name) DO NOTHING
+                    """,
+                    name,
+                    value,
+                )
+
+        watermark = _utc(watermark)
+        window_end = min(target, watermark + timedelta(hours=max_hours))
+        if window_end <= watermark:
+            return 0
+
+        # Rebuild the hours in the window from raw rows
+        await conn.execute(
+            """
+            DELETE FROM ai_usage_rollups_hourly
+            WHERE bucket_start >= $1 AND bucket_start < $2
+            """,
+            watermark,
+            window_end,
+        )
+        await conn.execute(
+            f"""
+            INSERT INTO ai_usage_rollups_hourly (bucket_start, {DIMENSIONS_SQL}, {METRICS_SQL})
+            SELECT date_trunc('hour', created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                   {DIMENSIONS_SQL}, {ROLLUP_SUMS_SQL}
+            FROM (
+                SELECT created_at, {DIMENSIONS_SQL}, {RAW_METRICS_SQL}
+                FROM ai_usage_logs
+                WHERE created_at >= $1 AND created_at < $2
+            ) raw
+            GROUP BY 1, {DIMENSIONS_SQL}
+            """,
+            watermark,
+            window_end,
+        )
+
+        # Rebuild any days whose hours are now all rolled up
+        daily_watermark = await conn.fetchval(
+            "SELECT watermark FROM aggregation_watermarks WHERE name = $1 FOR UPDATE",
+            DAILY_WATERMARK,
+        )
+        day_start = _utc(daily_watermark) if daily_watermark else floor_day(watermark)
+        day_end = floor_day(window_end)
+        if day_end > day_start:
+            await conn.execute(
+                """
+                DELETE FROM ai_usage_rollups_daily
+                WHERE bucket_start >= $1 AND bucket_start < $2
+                """,
+                day_start,
+                day_end,
+            )
+            await conn.execute(
+                f"""
+                INSERT INTO ai_usage_rollups_daily (bucket_start, {DIMENSIONS_SQL}, {METRICS_SQL})
+                SELECT date_trunc('day', bucket_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                       {DIMENSIONS_SQL}, {ROLLUP_SUMS_SQL}
+                FROM ai_usage_rollups_hourly
+                WHERE bucket_start >= $1 AND bucket_start < $2
+                GROUP BY 1, {DIMENSIONS_SQL}
+                """,
+                day_start,
+                day_end,
+            )
+
+        await conn.execute(
+            """
+            INSERT INTO aggregation_watermarks (name, watermark, updated_at)
+            VALUES ($1, $2, CURRENT_TIMESTAMP), ($3, $4, CURRENT_TIMESTAMP)
+            ON CONFLICT (name) DO UPDATE
+            SET watermark = EXCLUDED.watermark, updated_at = EXCLUDED.updated_at
+            """,
+            HOURLY_WATERMARK,
+            window_end,
+            DAILY_WATERMARK,
+            max(day_start, day_end),
+        )
+
+    hours = int((window_end - watermark) / timedelta(hours=1))
+    logger.info(f"Rolled up {hours}h of AI usage through {window_end.isoformat()}")
+    return hours
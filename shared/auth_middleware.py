@@ -8,6 +8,8 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 
+from shared.sessions import revocations
+
 # JWT Configuration
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-secret-key-change-in-production")
 JWT_ALGORITHM = "HS256"
@@ -23,6 +25,8 @@ class TokenData(BaseModel):
     is_admin: bool = False
     exp: Optional[datetime] = None
     type: Optional[str] = None  # 'access' or 'refresh'
+    session_id: Optional[str] = None  # 'sid' claim, absent on tokens from before sessions
+    session_version: int = 0  # 'ver' claim
 
 
 def verify_token(token: str) -> TokenData:
@@ -37,13 +41,23 @@ def verify_token(token: str) -> TokenData:
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token: missing user ID"
             )
 
-        return TokenData(
+        # Refresh tokens outlive in-memory revocations; they are only accepted by /auth/refresh
+        if payload.get("type") == "refresh":
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type"
+            )
+
+        token_data = TokenData(
             user_id=user_id,
             fairyname=payload.get("fairyname", ""),
             email=payload.get("email"),
             is_builder=payload.get("is_builder", False),
             is_admin=payload.get("is_admin", False),
+            session_id=payload.get("sid"),
+            session_version=payload.get("ver", 0),
         )
+        check_not_revoked(token_data)
+        return token_data
 
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has expired")
@@ -51,6 +65,16 @@ def verify_token(token: str) -> TokenData:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
 
+def check_not_revoked(token_data: TokenData) -> None:
+    """Reject a token whose session or user has been revoked (checked in memory)"""
+    if revocations.is_revoked(
+        token_data.user_id, token_data.session_id, token_data.session_version
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked"
+        )
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> TokenData:
@@ -1,11 +1,24 @@
 # shared/database.py
+import asyncio
 import os
 import ssl
+import time
+from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from typing import Any, Optional
 
 import asyncpg
 
+from shared.db_metrics import query_metrics
+from shared.db_statements import (
+    HotConnection,
+    forget_hot_query,
+    get_hot_query,
+    init_connection,
+    prepare_hot_query,
+    rows_as_slots,
+)
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
@@ -22,50 +35,227 @@ else:
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# Connection pool
+# Optional streaming replica for heavy reads (analytics, history lists)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+if DATABASE_READ_URL and DATABASE_READ_URL.startswith("postgres://"):
+    DATABASE_READ_URL = DATABASE_READ_URL.replace("postgres://", "postgresql://", 1)
+
+# Reads fall back to the primary when the replica is further behind than this
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "30"))
+DB_REPLICA_LAG_CHECK_SECONDS = float(os.getenv("DB_REPLICA_LAG_CHECK_SECONDS", "5"))
+
+# Connection pools
 _pool: Optional[asyncpg.Pool] = None
+_read_pool: Optional[asyncpg.Pool] = None
+
+
+class InstrumentedConnection:
+    """
+    A raw asyncpg connection whose statements are recorded in query_metrics.
+
+    Yielded by ``Database.transaction()``, so statements run directly on the
+    connection (the ledger's hot paths) show up in /metrics like those run through
+    Database. Anything not wrapped here is passed through to the connection.
+    """
+
+    def __init__(self, conn: asyncpg.Connection, acquire_wait: float = 0.0):
+        self._conn = conn
+        # The pool wait is attributed to the first statement, as Database does
+        self._acquire_wait = acquire_wait
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def _time(self, query: str):
+        wait, self._acquire_wait = self._acquire_wait, 0.0
+        return query_metrics.time(query, wait)
+
+    async def execute(self, query: str, *args, **kwargs) -> str:
+        with self._time(query) as timer:
+            status = await self._conn.execute(query, *args, **kwargs)
+            timer.set_status(status)
+        return status
+
+    async def executemany(self, query: str, args, **kwargs) -> None:
+        with self._time(query) as timer:
+            await self._conn.executemany(query, args, **kwargs)
+            timer.rows = len(args)
+
+    async def fetch(self, query: str, *args, **kwargs) -> list:
+        with self._time(query) as timer:
+            rows = await self._conn.fetch(query, *args, **kwargs)
+            timer.rows = len(rows)
+        return rows
+
+    async def fetchrow(self, query: str, *args, **kwargs):
+        with self._time(query) as timer:
+            row = await self._conn.fetchrow(query, *args, **kwargs)
+            timer.rows = 1 if row else 0
+        return row
+
+    async def fetchval(self, query: str, *args, **kwargs):
+        with self._time(query) as timer:
+            value = await self._conn.fetchval(query, *args, **kwargs)
+            timer.rows = 1
+        return value
+
+    async def copy_records_to_table(self, table_name: str, *, records, **kwargs) -> str:
+        records = list(records)
+        with self._time(f"COPY {table_name} FROM STDIN") as timer:
+            status = await self._conn.copy_records_to_table(table_name, records=records, **kwargs)
+            timer.rows = len(records)
+        return status
 
 
 class Database:
-    """Database wrapper for asyncpg with connection pooling"""
+    """Database wrapper for asyncpg with connection pooling.
+
+    A Database created by ``connection()`` (or the ``get_db_session`` dependency) is a
+    session bound to a single pooled connection: every call reuses that connection
+    instead of acquiring one from the pool per statement.
+    """
 
-    def __init__(self, pool: asyncpg.Pool):
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        connection: Optional[asyncpg.Connection] = None,
+        read_only: bool = False,
+    ):
         self.pool = pool
+        self.read_only = read_only
+        self._connection = connection
+        # asyncpg connections can't run statements concurrently, so session calls
+        # are serialized. The owning task may re-enter (e.g. fetch inside transaction).
+        self._session_lock = asyncio.Lock() if connection is not None else None
+        self._session_owner: Optional[asyncio.Task] = None
+
+    @property
+    def is_session(self) -> bool:
+        """True when bound to a single connection"""
+        return self._connection is not None
+
+    @asynccontextmanager
+    async def _acquire(self):
+        """Acquire a pooled connection, yielding it with the time spent waiting for it"""
+        if self._connection is not None:
+            async with self._session_guard():
+                yield self._connection, 0.0
+            return
+
+        started = time.perf_counter()
+        async with self.pool.acquire() as conn:
+            wait = time.perf_counter() - started
+            query_metrics.record_acquire(wait)
+            yield conn, wait
 
     async def fetch_one(self, query: str, *args) -> Optional[dict[str, Any]]:
         """Fetch a single row"""
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(query, *args)
+        async with self._acquire() as (conn, wait):
+            with query_metrics.time(query, wait) as timer:
+                row = await conn.fetchrow(query, *args)
+                timer.rows = 1 if row else 0
             return dict(row) if row else None
 
-    async def fetch_all(self, query: str, *args) -> list[dict[str, Any]]:
-        """Fetch multiple rows"""
-        async with self.pool.acquire() as conn:
-            rows = await conn.fetch(query, *args)
+    async def fetch_all(self, query: str, *args, slots: bool = False) -> list[Any]:
+        """Fetch multiple rows (as lightweight __slots__ rows when slots=True)"""
+        async with self._acquire() as (conn, wait):
+            with query_metrics.time(query, wait) as timer:
+                rows = await conn.fetch(query, *args)
+                timer.rows = len(rows)
+            if slots:
+                return rows_as_slots(rows)
             return [dict(row) for row in rows]
 
+    async def fetch_one_prepared(self, name: str, *args) -> Optional[Any]:
+        """Fetch a single row using a registered hot query"""
+        rows = await self._run_prepared(name, args, single=True)
+        return rows[0] if rows else None
+
+    async def fetch_all_prepared(self, name: str, *args) -> list[Any]:
+        """Fetch rows using a registered hot query, with JSON columns decoded"""
+        return await self._run_prepared(name, args, single=False)
+
+    async def _run_prepared(self, name: str, args: tuple, single: bool) -> list[Any]:
+        """Run a hot query on its per-connection prepared statement"""
+        query = get_hot_query(name)
+        async with self._acquire() as (conn, wait):
+            with query_metrics.time(query.sql, wait) as timer:
+                for attempt in range(2):
+                    prepared = await prepare_hot_query(conn, query)
+                    try:
+                        if single:
+                            row = await prepared.statement.fetchrow(*args)
+                            records = [row] if row else []
+                        else:
+                            records = await prepared.statement.fetch(*args)
+                        break
+                    except asyncpg.exceptions.InvalidCachedStatementError:
+                        # Schema changed under the statement; re-prepare once
+                        forget_hot_query(conn, name)
+                        if attempt:
+                            raise
+                timer.rows = len(records)
+            return [prepared.decode(record, query.slots) for record in records]
+
     async def execute(self, query: str, *args) -> str:
         """Execute a query without returning results"""
-        async with self.pool.acquire() as conn:
-            return await conn.execute(query, *args)
+        async with self._acquire() as (conn, wait):
+            with query_metrics.time(query, wait) as timer:
+                status = await conn.execute(query, *args)
+                timer.set_status(status)
+            return status
 
     async def execute_schema(self, query: str, *args) -> str:
         """Execute a schema/DDL query with extended timeout"""
-        async with self.pool.acquire() as conn:
+        async with self._acquire() as (conn, wait):
             # Use 5 minute timeout for schema operations
-            return await conn.execute(query, *args, timeout=300)
+            with query_metrics.time(query, wait):
+                return await conn.execute(query, *args, timeout=300)
 
     async def execute_many(self, query: str, args_list: list[tuple]) -> None:
         """Execute a query multiple times with different arguments"""
-        async with self.pool.acquire() as conn:
-            await conn.executemany(query, args_list)
+        async with self._acquire() as (conn, wait):
+            with query_metrics.time(query, wait) as timer:
+                await conn.executemany(query, args_list)
+                timer.rows = len(args_list)
 
     @asynccontextmanager
     async def transaction(self):
-        """Context manager for database transactions"""
-        async with self.pool.acquire() as conn:
+        """Context manager for database transactions (a savepoint when already in one)"""
+        async with self._acquire() as (conn, wait):
             async with conn.transaction():
-                yield conn
+                yield InstrumentedConnection(conn, wait)
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Hold one pooled connection for a critical section.
+
+        Yields a session-bound Database so a run of sequential queries pays for a
+        single pool acquire. Keep the section free of slow non-database awaits
+        (LLM calls, outbound HTTP) so the connection goes back to the pool quickly.
+        """
+        if self._connection is not None:
+            yield self
+            return
+
+        async with self._acquire() as (conn, _wait):
+            yield Database(self.pool, connection=conn, read_only=self.read_only)
+
+    @asynccontextmanager
+    async def _session_guard(self):
+        """Serialize session use across tasks while letting the owning task re-enter"""
+        task = asyncio.current_task()
+        if self._session_owner is task:
+            yield
+            return
+
+        async with self._session_lock:
+            self._session_owner = task
+            try:
+                yield
+            finally:
+                self._session_owner = None
 
 
 async def init_db():
@@ -118,18 +308,12 @@ async def init_db():
         logger.info(
             f"Creating database connection pool for {service_name} service (min: {min_size}, max: {max_size})..."
         )
-        _pool = await asyncpg.create_pool(
-            DATABASE_URL,
-            ssl=ssl_context,
-            min_size=min_size,
-            max_size=max_size,
-            max_queries=50000,
-            max_cached_statement_lifetime=300,
-            command_timeout=30,  # Reduced default timeout to fail faster
-            max_inactive_connection_lifetime=300,  # Close inactive connections
-        )
+        _pool = await _create_pool(DATABASE_URL, ssl_context, min_size, max_size)
         logger.info("Database connection pool created successfully")
 
+        if DATABASE_READ_URL:
+            await _init_read_pool(ssl_context, max_size)
+
         # Create tables if they don't exist (skip in production if SKIP_SCHEMA_INIT is set)
         skip_schema_init = os.getenv("SKIP_SCHEMA_INIT", "false").lower() == "true"
         if not skip_schema_init:
@@ -147,9 +331,90 @@ async def init_db():
         raise
 
 
+async def _create_pool(
+    dsn: str, ssl_context: Optional[ssl.SSLContext], min_size: int, max_size: int
+) -> asyncpg.Pool:
+    """Create a connection pool with the shared connection settings"""
+    return await asyncpg.create_pool(
+        dsn,
+        ssl=ssl_context,
+        min_size=min_size,
+        max_size=max_size,
+        max_queries=50000,
+        max_cached_statement_lifetime=300,
+        command_timeout=30,  # Reduced default timeout to fail faster
+        max_inactive_connection_lifetime=300,  # Close inactive connections
+        init=init_connection,  # JSON codecs
+        connection_class=HotConnection,  # Per-connection prepared hot queries
+    )
+
+
+async def _init_read_pool(ssl_context: Optional[ssl.SSLContext], primary_max_size: int):
+    """Create the replica pool; reads stay on the primary if the replica is unreachable"""
+    import logging
+
+    logger = logging.getLogger(__name__)
+    global _read_pool
+
+    min_size = int(os.getenv("DB_READ_POOL_MIN_SIZE", 1))
+    max_size = int(os.getenv("DB_READ_POOL_MAX_SIZE", primary_max_size))
+    try:
+        _read_pool = await _create_pool(DATABASE_READ_URL, ssl_context, min_size, max_size)
+        logger.info(f"Read replica pool created (min: {min_size}, max: {max_size})")
+    except Exception as e:
+        logger.warning(f"Read replica unavailable, reads will use the primary: {e}")
+        _read_pool = None
+
+
+class ReplicaLagMonitor:
+    """Caches the replica's replay lag so routing decisions don't query it per request"""
+
+    # Zero lag when the replica has replayed everything it received, otherwise the age of
+    # the last replayed transaction (which alone would grow while the primary is idle)
+    LAG_QUERY = """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END AS lag_seconds
+    """
+
+    def __init__(self, check_interval: float = DB_REPLICA_LAG_CHECK_SECONDS):
+        self.check_interval = check_interval
+        self.lag_seconds: Optional[float] = None  # None means unknown/unreachable
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def current_lag(self, pool: asyncpg.Pool) -> Optional[float]:
+        """Replica lag in seconds, refreshed at most once per check interval"""
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return self.lag_seconds
+
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return self.lag_seconds
+            try:
+                async with pool.acquire() as conn:
+                    lag = await conn.fetchval(self.LAG_QUERY, timeout=2)
+                self.lag_seconds = float(lag or 0)
+            except Exception as e:
+                import logging
+
+                logging.getLogger(__name__).warning(f"Replica lag check failed: {e}")
+                self.lag_seconds = None
+            self._checked_at = time.monotonic()
+            return self.lag_seconds
+
+
+replica_lag_monitor = ReplicaLagMonitor()
+
+
 async def close_db():
-    """Close database connection pool"""
-    global _pool
+    """Close database connection pools"""
+    global _pool, _read_pool
+    if _read_pool:
+        await _read_pool.close()
+        _read_pool = None
     if _pool:
         await _pool.close()
         _pool = None
@@ -162,6 +427,52 @@ async def get_db() -> Database:
     return Database(_pool)
 
 
+async def get_db_session() -> AsyncIterator[Database]:
+    """Dependency that holds one connection for the whole request.
+
+    Use for handlers that run many sequential queries and don't make slow
+    outbound calls; everything else should keep using get_db.
+    """
+    db = await get_db()
+    async with db.connection() as session:
+        yield session
+
+
+async def get_read_only_db(max_lag_seconds: Optional[float] = None) -> Database:
+    """
+    Database for read-only work, served by the replica when it is fresh enough.
+
+    Falls back to the primary when no replica is configured, the replica is
+    unreachable, or its replay lag exceeds max_lag_seconds (DB_REPLICA_MAX_LAG_SECONDS
+    by default). Never use the result for writes.
+    """
+    primary = await get_db()
+    if _read_pool is None:
+        return Database(primary.pool, read_only=True)
+
+    max_lag = DB_REPLICA_MAX_LAG_SECONDS if max_lag_seconds is None else max_lag_seconds
+    lag = await replica_lag_monitor.current_lag(_read_pool)
+    if lag is None or lag > max_lag:
+        query_metrics.record_replica_fallback()
+        return Database(primary.pool, read_only=True)
+
+    return Database(_read_pool, read_only=True)
+
+
+async def get_read_db() -> Database:
+    """Dependency for read-only routes (admin analytics, history lists)"""
+    return await get_read_only_db()
+
+
+def read_db(max_lag_seconds: float):
+    """Dependency factory for read-only routes that need a tighter freshness bound"""
+
+    async def dependency() -> Database:
+        return await get_read_only_db(max_lag_seconds)
+
+    return dependency
+
+
 async def create_tables():
     """Create database tables if they don't exist"""
     import logging
@@ -244,30 +555,155 @@ async def create_tables():
     """
     )
 
-    # DUST transactions table
+    # DUST transactions table, range partitioned by month (see shared/partitioning.py).
+    # Unique keys on a partitioned table must include created_at, so idempotency keys are
+    # kept unique through dust_transaction_idempotency_keys instead.
     await db.execute_schema(
         """
         CREATE TABLE IF NOT EXISTS dust_transactions (
-            id UUID PRIMARY KEY,
+            id UUID NOT NULL,
             user_id UUID REFERENCES users(id) ON DELETE CASCADE,
             amount INTEGER NOT NULL,
             type VARCHAR(50) NOT NULL,
             description TEXT,
             app_id UUID,
-            idempotency_key VARCHAR(255) UNIQUE,
+            idempotency_key VARCHAR(255),
             status VARCHAR(50) DEFAULT 'completed',
             metadata JSONB DEFAULT '{}',
-            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+
+        CREATE TABLE IF NOT EXISTS dust_transaction_idempotency_keys (
+            idempotency_key VARCHAR(255) PRIMARY KEY,
+            transaction_id UUID NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL
         );
 
+        CREATE OR REPLACE FUNCTION claim_dust_transaction_idempotency_key()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO dust_transaction_idempotency_keys
+                (idempotency_key, transaction_id, created_at)
+            VALUES (NEW.idempotency_key, NEW.id, NEW.created_at);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_trigger WHERE tgname = 'dust_transactions_idempotency_key'
+            ) THEN
+                CREATE TRIGGER dust_transactions_idempotency_key
+                AFTER INSERT ON dust_transactions
+                FOR EACH ROW WHEN (NEW.idempotency_key IS NOT NULL)
+                EXECUTE FUNCTION claim_dust_transaction_idempotency_key();
+            END IF;
+        END $$;
+
         CREATE INDEX IF NOT EXISTS idx_dust_transactions_user
         ON dust_transactions(user_id, created_at DESC);
+        -- Keyset pagination of transaction history
+        CREATE INDEX IF NOT EXISTS idx_dust_transactions_user_keyset
+        ON dust_transactions(user_id, created_at DESC, id DESC);
         CREATE INDEX IF NOT EXISTS idx_dust_transactions_app
         ON dust_transactions(app_id, created_at DESC);
     """
     )
 
+    # Per-user ledger statistics, maintained in the same transaction as each ledger write
+    await db.execute_schema(
+        """
+        CREATE TABLE IF NOT EXISTS user_ledger_stats (
+            user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+            total_granted BIGINT NOT NULL DEFAULT 0,
+            total_consumed BIGINT NOT NULL DEFAULT 0,
+            total_purchased BIGINT NOT NULL DEFAULT 0,
+            total_refunded BIGINT NOT NULL DEFAULT 0,
+            transaction_count BIGINT NOT NULL DEFAULT 0,
+            first_transaction TIMESTAMP WITH TIME ZONE,
+            last_transaction TIMESTAMP WITH TIME ZONE,
+            favorite_app_id UUID,
+            favorite_app_consumes BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_user_ledger_stats_last_transaction
+        ON user_ledger_stats(last_transaction DESC);
+
+        CREATE TABLE IF NOT EXISTS user_ledger_app_stats (
+            user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            app_id UUID NOT NULL,
+            consume_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, app_id)
+        );
+    """
+    )
+
+    # Ledger reconciliation: balance checkpoints and drift flags
+    await db.execute_schema(
+        """
+        CREATE INDEX IF NOT EXISTS idx_dust_transactions_created_at
+        ON dust_transactions(created_at);
+
+        CREATE TABLE IF NOT EXISTS ledger_balance_checkpoints (
+            user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            transaction_id UUID NOT NULL,
+            transaction_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            balance BIGINT NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, transaction_id)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_ledger_balance_checkpoints_user_at
+        ON ledger_balance_checkpoints(user_id, transaction_at DESC, transaction_id DESC);
+
+        CREATE TABLE IF NOT EXISTS ledger_drift_flags (
+            id BIGSERIAL PRIMARY KEY,
+            user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            stored_balance BIGINT NOT NULL,
+            ledger_balance BIGINT NOT NULL,
+            checkpoint_transaction_id UUID,
+            detected_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            last_seen_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            resolved_at TIMESTAMP WITH TIME ZONE
+        );
+
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_ledger_drift_flags_open
+        ON ledger_drift_flags(user_id) WHERE resolved_at IS NULL;
+    """
+    )
+
+    # DUST holds: amounts reserved (already debited from dust_balance) until captured
+    # as a consume transaction, released, or expired
+    await db.execute_schema(
+        """
+        CREATE TABLE IF NOT EXISTS dust_holds (
+            id UUID PRIMARY KEY,
+            user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            app_id UUID,
+            amount INTEGER NOT NULL CHECK (amount > 0),
+            action VARCHAR(255) NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'held'
+                CHECK (status IN ('held', 'captured', 'released', 'expired')),
+            idempotency_key VARCHAR(255) NOT NULL UNIQUE,
+            transaction_id UUID,
+            captured_amount INTEGER,
+            metadata JSONB DEFAULT '{}',
+            expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            resolved_at TIMESTAMP WITH TIME ZONE
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_dust_holds_user_held
+        ON dust_holds(user_id) WHERE status = 'held';
+        CREATE INDEX IF NOT EXISTS idx_dust_holds_expiry
+        ON dust_holds(expires_at) WHERE status = 'held';
+    """
+    )
+
     # Add Apple Receipt Verification Fields to existing dust_transactions table
     await db.execute_schema(
         """
@@ -288,6 +724,41 @@ async def create_tables():
     """
     )
 
+    # Bulk grant jobs (set-based, chunked, resumable)
+    await db.execute_schema(
+        """
+        CREATE TABLE IF NOT EXISTS bulk_grant_jobs (
+            id UUID PRIMARY KEY,
+            admin_id UUID NOT NULL,
+            amount INTEGER NOT NULL CHECK (amount > 0),
+            reason TEXT NOT NULL,
+            metadata JSONB DEFAULT '{}',
+            status VARCHAR(20) NOT NULL DEFAULT 'pending'
+                CHECK (status IN ('pending', 'running', 'completed', 'failed')),
+            total_users INTEGER NOT NULL,
+            processed_users INTEGER NOT NULL DEFAULT 0,
+            granted_users INTEGER NOT NULL DEFAULT 0,
+            skipped_users INTEGER NOT NULL DEFAULT 0,
+            chunk_size INTEGER NOT NULL,
+            next_chunk INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP WITH TIME ZONE
+        );
+
+        CREATE TABLE IF NOT EXISTS bulk_grant_job_users (
+            job_id UUID NOT NULL REFERENCES bulk_grant_jobs(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            user_id UUID NOT NULL,
+            PRIMARY KEY (job_id, position)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_bulk_grant_jobs_status
+        ON bulk_grant_jobs(status, updated_at);
+    """
+    )
+
     # Apps table
     await db.execute_schema(
         """
@@ -338,6 +809,19 @@ async def create_tables():
 
         CREATE INDEX IF NOT EXISTS idx_hourly_stats_hour
         ON hourly_app_stats(hour DESC);
+
+        -- Users per app and UTC day, filled by the hourly aggregator for distinct counts
+        CREATE TABLE IF NOT EXISTS daily_app_users (
+            app_id UUID NOT NULL REFERENCES apps(id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            PRIMARY KEY (app_id, day, user_id)
+        );
+
+        -- Consumes by time for the hourly aggregator
+        CREATE INDEX IF NOT EXISTS idx_dust_transactions_consume_created
+        ON dust_transactions(created_at) INCLUDE (app_id, user_id, amount)
+        WHERE type = 'consume' AND status = 'completed';
     """
     )
 
@@ -819,6 +1303,7 @@ async def create_tables():
         CREATE INDEX IF NOT EXISTS idx_user_stories_user_id ON user_stories(user_id);
         CREATE INDEX IF NOT EXISTS idx_user_stories_created_at ON user_stories(created_at DESC);
         CREATE INDEX IF NOT EXISTS idx_user_stories_favorited ON user_stories(user_id, is_favorited) WHERE is_favorited = TRUE;
+        CREATE INDEX IF NOT EXISTS idx_user_stories_keyset ON user_stories(user_id, is_favorited DESC, created_at DESC, id DESC);
         CREATE INDEX IF NOT EXISTS idx_user_stories_story_length ON user_stories(story_length);
     """
     )
@@ -945,6 +1430,7 @@ async def create_tables():
         CREATE INDEX IF NOT EXISTS idx_user_inspirations_category ON user_inspirations(category);
         CREATE INDEX IF NOT EXISTS idx_user_inspirations_favorited ON user_inspirations(user_id, is_favorited) WHERE is_favorited = TRUE;
         CREATE INDEX IF NOT EXISTS idx_user_inspirations_active ON user_inspirations(user_id, created_at DESC) WHERE deleted_at IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_user_inspirations_keyset ON user_inspirations(user_id, is_favorited DESC, created_at DESC, id DESC) WHERE deleted_at IS NULL;
     """
     )
 
@@ -996,6 +1482,7 @@ async def create_tables():
         CREATE INDEX IF NOT EXISTS idx_fortune_readings_user_id ON fortune_readings(user_id);
         CREATE INDEX IF NOT EXISTS idx_fortune_readings_created_at ON fortune_readings(created_at DESC);
         CREATE INDEX IF NOT EXISTS idx_fortune_readings_favorited ON fortune_readings(user_id, is_favorited) WHERE is_favorited = TRUE;
+        CREATE INDEX IF NOT EXISTS idx_fortune_readings_keyset ON fortune_readings(user_id, is_favorited DESC, created_at DESC, id DESC);
         CREATE INDEX IF NOT EXISTS idx_fortune_readings_target_person ON fortune_readings(target_person_id);
         CREATE INDEX IF NOT EXISTS idx_fortune_readings_type ON fortune_readings(reading_type);
         CREATE INDEX IF NOT EXISTS idx_fortune_readings_user_type ON fortune_readings(user_id, reading_type, created_at DESC);
@@ -1066,6 +1553,7 @@ async def create_tables():
         CREATE INDEX IF NOT EXISTS idx_user_recipes_complexity ON user_recipes(complexity);
         CREATE INDEX IF NOT EXISTS idx_user_recipes_servings ON user_recipes(servings);
         CREATE INDEX IF NOT EXISTS idx_user_recipes_active_new ON user_recipes(user_id, created_at DESC) WHERE deleted_at IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_user_recipes_keyset ON user_recipes(user_id, is_favorited DESC, created_at DESC, id DESC) WHERE deleted_at IS NULL;
     """
     )
 
@@ -1194,6 +1682,7 @@ async def create_tables():
         CREATE INDEX IF NOT EXISTS idx_wyr_sessions_user_id ON wyr_game_sessions(user_id);
         CREATE INDEX IF NOT EXISTS idx_wyr_sessions_status ON wyr_game_sessions(user_id, status);
         CREATE INDEX IF NOT EXISTS idx_wyr_sessions_created ON wyr_game_sessions(created_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_wyr_sessions_keyset ON wyr_game_sessions(user_id, created_at DESC, id DESC);
     """
     )
 
@@ -1362,6 +1851,27 @@ async def create_tables():
         INSERT INTO system_config (key, value, description)
         VALUES ('initial_dust_amount', '100', 'Initial DUST amount granted to new users upon registration')
         ON CONFLICT (key) DO NOTHING;
+
+        -- Tell services caching system_config (shared/system_config.py) which key changed
+        CREATE OR REPLACE FUNCTION notify_system_config_change()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM pg_notify('system_config_changed', COALESCE(NEW.key, OLD.key));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_trigger WHERE tgname = 'system_config_notify'
+            ) THEN
+                CREATE TRIGGER system_config_notify
+                AFTER INSERT OR UPDATE OR DELETE ON system_config
+                FOR EACH ROW
+                EXECUTE FUNCTION notify_system_config_change();
+            END IF;
+        END $$;
     """
     )
 
@@ -1393,6 +1903,19 @@ async def create_tables():
         CREATE INDEX IF NOT EXISTS idx_account_deletion_logs_deletion_requested_at ON account_deletion_logs(deletion_requested_at DESC);
         CREATE INDEX IF NOT EXISTS idx_account_deletion_logs_deleted_by ON account_deletion_logs(deleted_by);
         CREATE INDEX IF NOT EXISTS idx_account_deletion_logs_reason ON account_deletion_logs(deletion_reason);
+
+        -- Deletions run as queued jobs (shared/account_deletion.py); rows from before have
+        -- no status
+        ALTER TABLE account_deletion_logs ADD COLUMN IF NOT EXISTS status VARCHAR(20);
+        ALTER TABLE account_deletion_logs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE account_deletion_logs ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP WITH TIME ZONE;
+        ALTER TABLE account_deletion_logs ADD COLUMN IF NOT EXISTS last_error TEXT;
+        ALTER TABLE account_deletion_logs ADD COLUMN IF NOT EXISTS progress JSONB NOT NULL DEFAULT '{}';
+
+        CREATE INDEX IF NOT EXISTS idx_account_deletion_logs_due
+        ON account_deletion_logs(next_attempt_at) WHERE status IN ('pending', 'running');
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_account_deletion_logs_active_user
+        ON account_deletion_logs(user_id) WHERE status IN ('pending', 'running');
     """
     )
 
@@ -1523,11 +2046,12 @@ async def create_tables():
     """
     )
 
-    # AI Usage Logs table for unified tracking of text, image, and video models
+    # AI Usage Logs table for unified tracking of text, image, and video models,
+    # range partitioned by month
     await db.execute_schema(
         """
         CREATE TABLE IF NOT EXISTS ai_usage_logs (
-            id UUID PRIMARY KEY,
+            id UUID NOT NULL,
             user_id UUID NOT NULL,
             app_id UUID NOT NULL,
 
@@ -1564,12 +2088,12 @@ async def create_tables():
 
             -- Metadata and context
             request_metadata JSONB DEFAULT '{}',
-            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
 
-            -- Indexes for performance
+            PRIMARY KEY (id, created_at),
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
             FOREIGN KEY (app_id) REFERENCES apps(id) ON DELETE CASCADE
-        );
+        ) PARTITION BY RANGE (created_at);
 
         -- Create indexes for common queries
         CREATE INDEX IF NOT EXISTS idx_ai_usage_logs_user_id ON ai_usage_logs(user_id);
@@ -1588,6 +2112,62 @@ async def create_tables():
     """
     )
 
+    # Incremental AI usage rollups (maintained by shared/ai_usage_rollups.py)
+    await db.execute_schema(
+        """
+        CREATE TABLE IF NOT EXISTS aggregation_watermarks (
+            name VARCHAR(100) PRIMARY KEY,
+            watermark TIMESTAMP WITH TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS ai_usage_rollups_hourly (
+            bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+            model_type VARCHAR(20) NOT NULL,
+            provider VARCHAR(50) NOT NULL,
+            model_id VARCHAR(200) NOT NULL,
+            app_id UUID NOT NULL,
+            user_id UUID NOT NULL,
+            request_count BIGINT NOT NULL DEFAULT 0,
+            prompt_tokens BIGINT NOT NULL DEFAULT 0,
+            completion_tokens BIGINT NOT NULL DEFAULT 0,
+            images_generated BIGINT NOT NULL DEFAULT 0,
+            videos_generated BIGINT NOT NULL DEFAULT 0,
+            cost_usd DECIMAL(18,8) NOT NULL DEFAULT 0,
+            latency_ms_sum BIGINT NOT NULL DEFAULT 0,
+            fallback_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket_start, model_type, provider, model_id, app_id, user_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS ai_usage_rollups_daily (
+            bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+            model_type VARCHAR(20) NOT NULL,
+            provider VARCHAR(50) NOT NULL,
+            model_id VARCHAR(200) NOT NULL,
+            app_id UUID NOT NULL,
+            user_id UUID NOT NULL,
+            request_count BIGINT NOT NULL DEFAULT 0,
+            prompt_tokens BIGINT NOT NULL DEFAULT 0,
+            completion_tokens BIGINT NOT NULL DEFAULT 0,
+            images_generated BIGINT NOT NULL DEFAULT 0,
+            videos_generated BIGINT NOT NULL DEFAULT 0,
+            cost_usd DECIMAL(18,8) NOT NULL DEFAULT 0,
+            latency_ms_sum BIGINT NOT NULL DEFAULT 0,
+            fallback_count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket_start, model_type, provider, model_id, app_id, user_id)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_ai_usage_rollups_hourly_user
+            ON ai_usage_rollups_hourly(user_id, bucket_start);
+        CREATE INDEX IF NOT EXISTS idx_ai_usage_rollups_hourly_app
+            ON ai_usage_rollups_hourly(app_id, bucket_start);
+        CREATE INDEX IF NOT EXISTS idx_ai_usage_rollups_daily_user
+            ON ai_usage_rollups_daily(user_id, bucket_start);
+        CREATE INDEX IF NOT EXISTS idx_ai_usage_rollups_daily_app
+            ON ai_usage_rollups_daily(app_id, bucket_start);
+    """
+    )
+
     # Create a view that unions old LLM logs with new AI logs for backward compatibility
     await db.execute_schema(
         """
@@ -1832,4 +2412,58 @@ async def create_tables():
     except Exception as e:
         logger.warning(f"20 Questions app creation failed (may already exist): {e}")
 
+    # Transactional outbox for webhooks and notifications (see shared/outbox.py)
+    await db.execute_schema(
+        """
+        CREATE TABLE IF NOT EXISTS outbox_events (
+            id UUID PRIMARY KEY,
+            destination VARCHAR(50) NOT NULL,
+            event_type VARCHAR(100) NOT NULL,
+            aggregate_id UUID,
+            payload JSONB NOT NULL,
+            dedup_key VARCHAR(255),
+            coalesce_key VARCHAR(255),
+            status VARCHAR(20) NOT NULL DEFAULT 'pending'
+                CHECK (status IN ('pending', 'delivering', 'delivered', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            last_error TEXT,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            delivered_at TIMESTAMP WITH TIME ZONE
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_outbox_events_due
+        ON outbox_events(next_attempt_at) WHERE status IN ('pending', 'delivering');
+        CREATE INDEX IF NOT EXISTS idx_outbox_events_coalesce
+        ON outbox_events(destination, coalesce_key) WHERE status = 'pending';
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_outbox_events_dedup
+        ON outbox_events(destination, dedup_key) WHERE dedup_key IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS idx_outbox_events_delivered
+        ON outbox_events(delivered_at) WHERE status = 'delivered';
+    """
+    )
+
+    # Pre-generated fairynames claimed at signup (see services/identity/fairynames.py)
+    await db.execute_schema(
+        """
+        CREATE TABLE IF NOT EXISTS fairyname_pool (
+            name VARCHAR(50) PRIMARY KEY,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            allocated_at TIMESTAMP WITH TIME ZONE
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_fairyname_pool_available
+        ON fairyname_pool(name) WHERE allocated_at IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_fairyname_pool_allocated
+        ON fairyname_pool(allocated_at) WHERE allocated_at IS NOT NULL;
+    """
+    )
+
+    # Monthly partitions for the partitioned log tables; a no-op for tables still awaiting
+    # conversion by scripts/partition_tables.py
+    from shared.partitioning import PARTITIONED_TABLES, ensure_partitions
+
+    for table in PARTITIONED_TABLES:
+        await ensure_partitions(db, table.name)
+
     logger.info("Database schema creation/update completed successfully")
@@ -0,0 +1,402 @@
+# shared/db_metrics.py
+"""
+Query-level instrumentation for the shared Database wrapper.
+
+Records per-statement latency histograms keyed by normalized SQL, keeps pool
+acquire wait separate from execution time, logs slow queries and exposes the
+collected data through a /metrics endpoint on every service.
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds (Prometheus-style, +Inf implied)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Queries slower than this (execution time, milliseconds) are logged
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+
+# Pool waits longer than this (milliseconds) are logged alongside slow queries
+SLOW_ACQUIRE_MS = float(os.getenv("DB_SLOW_ACQUIRE_MS", "250"))
+
+# Upper bound on distinct statements tracked, protects against unbounded dynamic SQL
+MAX_TRACKED_STATEMENTS = int(os.getenv("DB_METRICS_MAX_STATEMENTS", "1000"))
+
+METRICS_ENABLED = os.getenv("DB_METRICS_ENABLED", "true").lower() == "true"
+
+OVERFLOW_KEY = "__other__"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:(?:\$\d+|\?)\s*,\s*)+(?:\$\d+|\?)\s*\)")
+_COMMENT = re.compile(r"--[^\n]*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Normalize a SQL statement so that equivalent queries share one metrics key.
+
+    Comments are stripped, whitespace is collapsed, string and numeric literals are
+    replaced with ``?`` and lists of placeholders collapse to ``(...)``. Positional
+    parameters (``$1``) are kept since they are part of the statement shape.
+    """
+    normalized = _COMMENT.sub(" ", query)
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    normalized = _PLACEHOLDER_LIST.sub("(...)", normalized)
+    return normalized.rstrip(";").strip()
+
+
+def statement_id(normalized_query: str) -> str:
+    """Short stable identifier for a normalized statement"""
+    return hashlib.sha1(normalized_query.encode()).hexdigest()[:12]
+
+
+def _row_count_from_status(status: Any) -> int:
+    """Extract the affected row count from an asyncpg command status ("UPDATE 3")"""
+    if not isinstance(status, str):
+        return 0
+    tail = status.rsplit(" ", 1)[-1]
+    return int(tail) if tail.isdigit() else 0
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    __slots__ = ("counts", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def cumulative(self) -> list[int]:
+        """Cumulative bucket counts, last entry is the +Inf bucket"""
+        running = 0
+        result = []
+        for count in self.counts:
+            running += count
+            result.append(running)
+        return result
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile using bucket upper bounds"""
+        count = sum(self.counts)
+        if not count:
+            return 0.0
+        target = q * count
+        for index, cumulative in enumerate(self.cumulative()):
+            if cumulative >= target:
+                return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+
+class StatementStats:
+    """Aggregated timings for a single normalized statement"""
+
+    __slots__ = ("query", "calls", "errors", "rows", "execution", "acquire_wait")
+
+    def __init__(self, query: str):
+        self.query = query
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.execution = Histogram()
+        self.acquire_wait = Histogram()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": statement_id(self.query),
+            "query": self.query,
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "execution_seconds_total": round(self.execution.total, 6),
+            "execution_seconds_max": round(self.execution.max, 6),
+            "execution_seconds_p50": self.execution.quantile(0.5),
+            "execution_seconds_p95": self.execution.quantile(0.95),
+            "execution_seconds_p99": self.execution.quantile(0.99),
+            "acquire_wait_seconds_total": round(self.acquire_wait.total, 6),
+            "acquire_wait_seconds_max": round(self.acquire_wait.max, 6),
+        }
+
+
+class QueryTimer:
+    """Context manager that times one statement execution"""
+
+    __slots__ = ("metrics", "query", "acquire_wait", "rows", "started")
+
+    def __init__(self, metrics: "QueryMetrics", query: str, acquire_wait: float):
+        self.metrics = metrics
+        self.query = query
+        self.acquire_wait = acquire_wait
+        self.rows = 0
+        self.started = 0.0
+
+    def __enter__(self) -> "QueryTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.metrics.record(
+            self.query,
+            execution=time.perf_counter() - self.started,
+            acquire_wait=self.acquire_wait,
+            rows=self.rows,
+            error=exc_type is not None,
+        )
+        return False
+
+    def set_status(self, status: Any) -> None:
+        """Record affected rows from a command status string"""
+        self.rows = _row_count_from_status(status)
+
+
+class QueryMetrics:
+    """Process-wide registry of statement statistics"""
+
+    def __init__(self, max_statements: int = MAX_TRACKED_STATEMENTS):
+        self.max_statements = max_statements
+        self.enabled = METRICS_ENABLED
+        self.slow_query_ms = SLOW_QUERY_MS
+        self.slow_acquire_ms = SLOW_ACQUIRE_MS
+        self._statements: dict[str, StatementStats] = {}
+        self._normalized_cache: dict[str, str] = {}
+        self._pool_acquire = Histogram()
+        self._slow_queries = 0
+        self._replica_fallbacks = 0
+        self._started_at = time.time()
+        self._lock = threading.Lock()
+
+    def _normalize(self, query: str) -> str:
+        normalized = self._normalized_cache.get(query)
+        if normalized is None:
+            normalized = normalize_sql(query)
+            if len(self._normalized_cache) < self.max_statements * 4:
+                self._normalized_cache[query] = normalized
+        return normalized
+
+    def time(self, query: str, acquire_wait: float = 0.0) -> QueryTimer:
+        """Start timing a statement that was issued after waiting acquire_wait seconds"""
+        return QueryTimer(self, query, acquire_wait)
+
+    def record_acquire(self, seconds: float) -> None:
+        """Record a pool acquire wait independent of any statement"""
+        if self.enabled:
+            with self._lock:
+                self._pool_acquire.observe(seconds)
+
+    def record_replica_fallback(self) -> None:
+        """Count a read that was routed to the primary because the replica was stale"""
+        if self.enabled:
+            with self._lock:
+                self._replica_fallbacks += 1
+
+    def record(
+        self,
+        query: str,
+        execution: float,
+        acquire_wait: float = 0.0,
+        rows: int = 0,
+        error: bool = False,
+    ) -> None:
+        """Record one statement execution"""
+        if not self.enabled:
+            return
+
+        normalized = self._normalize(query)
+
+        with self._lock:
+            stats = self._statements.get(normalized)
+            if stats is None:
+                if len(self._statements) >= self.max_statements:
+                    normalized = OVERFLOW_KEY
+                    stats = self._statements.get(OVERFLOW_KEY)
+                if stats is None:
+                    stats = StatementStats(normalized)
+                    self._statements[normalized] = stats
+
+            stats.calls += 1
+            stats.rows += rows
+            if error:
+                stats.errors += 1
+            stats.execution.observe(execution)
+            stats.acquire_wait.observe(acquire_wait)
+
+            execution_ms = execution * 1000
+            wait_ms = acquire_wait * 1000
+            is_slow = execution_ms >= self.slow_query_ms or wait_ms >= self.slow_acquire_ms
+            if is_slow:
+                self._slow_queries += 1
+
+        if is_slow:
+            logger.warning(
+                f"SLOW_QUERY [{statement_id(normalized)}] exec={execution_ms:.1f}ms "
+                f"pool_wait={wait_ms:.1f}ms rows={rows} error={error} :: {normalized[:500]}"
+            )
+
+    def reset(self) -> None:
+        """Clear all collected statistics"""
+        with self._lock:
+            self._statements.clear()
+            self._pool_acquire = Histogram()
+            self._slow_queries = 0
+            self._replica_fallbacks = 0
+            self._started_at = time.time()
+
+    def snapshot(self, top: Optional[int] = None, sort_by: str = "total") -> dict[str, Any]:
+        """Return collected statistics sorted by the chosen key"""
+        sort_keys = {
+            "total": lambda s: s.execution.total,
+            "calls": lambda s: s.calls,
+            "max": lambda s: s.execution.max,
+            "wait": lambda s: s.acquire_wait.total,
+        }
+        key = sort_keys.get(sort_by, sort_keys["total"])
+
+        with self._lock:
+            statements = sorted(self._statements.values(), key=key, reverse=True)
+            if top:
+                statements = statements[:top]
+            return {
+                "collected_since": self._started_at,
+                "slow_query_threshold_ms": self.slow_query_ms,
+                "slow_queries": self._slow_queries,
+                "replica_fallbacks": self._replica_fallbacks,
+                "pool_acquire": {
+                    "count": sum(self._pool_acquire.counts),
+                    "seconds_total": round(self._pool_acquire.total, 6),
+                    "seconds_max": round(self._pool_acquire.max, 6),
+                    "seconds_p95": self._pool_acquire.quantile(0.95),
+                },
+                "statements": [stats.to_dict() for stats in statements],
+            }
+
+    def render_prometheus(self, pool_stats: Optional[dict[str, int]] = None) -> str:
+        """Render collected statistics in the Prometheus text exposition format"""
+        lines = []
+
+        def histogram_lines(name: str, histogram: Histogram, labels: str) -> None:
+            cumulative = histogram.cumulative()
+            for bound, count in zip(LATENCY_BUCKETS, cumulative[:-1], strict=True):
+                lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {cumulative[-1]}')
+            lines.append(f"{name}_sum{{{labels.rstrip(',')}}} {histogram.total:.6f}")
+            lines.append(f"{name}_count{{{labels.rstrip(',')}}} {cumulative[-1]}")
+
+        with self._lock:
+            lines.append("# TYPE db_pool_acquire_seconds histogram")
+            histogram_lines("db_pool_acquire_seconds", self._pool_acquire, "")
+
+            lines.append("# TYPE db_slow_queries_total counter")
+            lines.append(f"db_slow_queries_total {self._slow_queries}")
+
+            lines.append("# TYPE db_replica_fallbacks_total counter")
+            lines.append(f"db_replica_fallbacks_total {self._replica_fallbacks}")
+
+            lines.append("# TYPE db_query_seconds histogram")
+            lines.append("# TYPE db_query_acquire_wait_seconds histogram")
+            lines.append("# TYPE db_query_calls_total counter")
+            lines.append("# TYPE db_query_errors_total counter")
+            lines.append("# TYPE db_query_rows_total counter")
+            for stats in self._statements.values():
+                query_label = _escape_label(stats.query[:200])
+                labels = f'statement="{statement_id(stats.query)}",query="{query_label}",'
+                histogram_lines("db_query_seconds", stats.execution, labels)
+                histogram_lines("db_query_acquire_wait_seconds", stats.acquire_wait, labels)
+                short_labels = labels.rstrip(",")
+                lines.append(f"db_query_calls_total{{{short_labels}}} {stats.calls}")
+                lines.append(f"db_query_errors_total{{{short_labels}}} {stats.errors}")
+                lines.append(f"db_query_rows_total{{{short_labels}}} {stats.rows}")
+
+        if pool_stats:
+            lines.append("# TYPE db_pool_connections gauge")
+            for state, value in pool_stats.items():
+                lines.append(f'db_pool_connections{{state="{state}"}} {value}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+# Process-wide metrics registry used by shared.database.Database
+query_metrics = QueryMetrics()
+
+
+def _pool_stats() -> Optional[dict[str, int]]:
+    """Current connection pool gauges, if the pool is initialized"""
+    from shared import database
+
+    pool = database._pool
+    if pool is None:
+        return None
+    try:
+        return {
+            "size": pool.get_size(),
+            "idle": pool.get_idle_size(),
+            "max": pool.get_max_size(),
+        }
+    except Exception:
+        return None
+
+
+def _check_metrics_auth(authorization: Optional[str]) -> None:
+    """
+    Require METRICS_AUTH_TOKEN as a bearer token.
+
+    Fails closed: without a configured token the endpoint is only served in
+    development and is a 404 everywhere else.
+    """
+    expected = os.getenv("METRICS_AUTH_TOKEN")
+    if not expected:
+        if os.getenv("ENVIRONMENT", "production") != "development":
+            raise HTTPException(status_code=404, detail="Not Found")
+        return
+    if not hmac.compare_digest(authorization or "", f"Bearer {expected}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def get_metrics(
+    output_format: str = Query("prometheus", alias="format", pattern="^(prometheus|json)$"),
+    top: Optional[int] = Query(None, ge=1, le=1000),
+    sort: str = Query("total", pattern="^(total|calls|max|wait)$"),
+    authorization: Optional[str] = Header(None),
+):
+    """Database query metrics (Prometheus text by default, JSON with ?format=json)"""
+    _check_metrics_auth(authorization)
+
+    if output_format == "json":
+        snapshot = query_metrics.snapshot(top=top, sort_by=sort)
+        snapshot["pool"] = _pool_stats()
+        return JSONResponse(snapshot)
+
+    return PlainTextResponse(
+        query_metrics.render_prometheus(_pool_stats()),
+        media_type="text/plain; version=0.0.4",
+    )
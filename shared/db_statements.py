@@ -0,0 +1,210 @@
+# shared/db_statements.py
+"""
+Prepared-statement registry and typed row decoding for hot queries.
+
+Hot queries are registered once by name at import time and prepared lazily on each
+pooled connection the first time they run there. JSON/JSONB columns of prepared
+results arrive already decoded, either through the connection-level codecs installed
+by ``init_connection`` (opt-in with DB_JSON_CODECS=true) or by decoding the columns
+the prepared statement reports as json/jsonb.
+
+List endpoints can ask for ``__slots__`` row objects instead of dicts. Rows keep
+``row["column"]`` access so existing handlers work unchanged.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import asyncpg
+
+from shared.json_utils import fast_json_dumps, fast_json_loads
+
+logger = logging.getLogger(__name__)
+
+# Legacy call sites json.loads() JSONB values themselves, so connection-wide codecs are
+# opt-in until they have all moved to shared.json_utils.parse_jsonb_field.
+JSON_CODECS_ENABLED = os.getenv("DB_JSON_CODECS", "false").lower() == "true"
+
+JSON_TYPES = frozenset({"json", "jsonb"})
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    """A named statement that is prepared once per connection"""
+
+    name: str
+    sql: str
+    slots: bool = False
+
+
+_registry: dict[str, HotQuery] = {}
+
+
+def register_hot_query(name: str, sql: str, slots: bool = False) -> HotQuery:
+    """Register a hot query by name; re-registering identical SQL is a no-op"""
+    existing = _registry.get(name)
+    if existing and existing.sql != sql:
+        raise ValueError(f"Hot query '{name}' is already registered with different SQL")
+
+    query = HotQuery(name=name, sql=sql, slots=slots)
+    _registry[name] = query
+    return query
+
+
+def get_hot_query(name: str) -> HotQuery:
+    """Look up a registered hot query"""
+    try:
+        return _registry[name]
+    except KeyError:
+        raise KeyError(f"Hot query '{name}' is not registered") from None
+
+
+def registered_hot_queries() -> list[str]:
+    """Names of all registered hot queries"""
+    return sorted(_registry)
+
+
+class Row:
+    """Base class for lightweight ``__slots__`` rows with dict-style reads"""
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values, strict=True):
+            object.__setattr__(self, field, value)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Row):
+            return self.as_dict() == other.as_dict()
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def keys(self) -> tuple[str, ...]:
+        return self.__slots__
+
+    def as_dict(self) -> dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+_row_classes: dict[tuple[str, ...], type[Row]] = {}
+
+
+def row_class(fields: tuple[str, ...]) -> type[Row]:
+    """Return the (cached) Row subclass for a column list"""
+    cls = _row_classes.get(fields)
+    if cls is None:
+        cls = type("Row", (Row,), {"__slots__": fields})
+        _row_classes[fields] = cls
+    return cls
+
+
+def rows_as_slots(records: list) -> list[Row]:
+    """Convert asyncpg records to slots rows sharing one class"""
+    if not records:
+        return []
+    cls = row_class(tuple(records[0].keys()))
+    return [cls(*record.values()) for record in records]
+
+
+class HotConnection(asyncpg.Connection):
+    """Pool connection class that keeps this connection's prepared hot statements"""
+
+    __slots__ = ("hot_statements", "json_codecs")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hot_statements: dict[str, PreparedHotQuery] = {}
+        self.json_codecs = False
+
+
+def _encode_json(value: Any) -> str:
+    # Callers that still pass json.dumps() output hand us text that is already JSON
+    if isinstance(value, str):
+        return value
+    return fast_json_dumps(value)
+
+
+async def init_connection(conn: asyncpg.Connection) -> None:
+    """Pool ``init`` hook: install fast JSON/JSONB codecs when enabled"""
+    if not JSON_CODECS_ENABLED:
+        return
+
+    for type_name in JSON_TYPES:
+        await conn.set_type_codec(
+            type_name,
+            encoder=_encode_json,
+            decoder=fast_json_loads,
+            schema="pg_catalog",
+            format="text",
+        )
+    if isinstance(conn, HotConnection):
+        conn.json_codecs = True
+
+
+class PreparedHotQuery:
+    """A hot query prepared on one connection, with its row decoding worked out"""
+
+    __slots__ = ("statement", "fields", "json_indexes", "row_cls")
+
+    def __init__(self, statement, fields: tuple[str, ...], json_indexes: tuple[int, ...]):
+        self.statement = statement
+        self.fields = fields
+        self.json_indexes = json_indexes
+        self.row_cls = row_class(fields)
+
+    def decode(self, record, slots: bool):
+        values = list(record.values())
+        for index in self.json_indexes:
+            value = values[index]
+            if isinstance(value, (str, bytes)):
+                values[index] = fast_json_loads(value)
+        if slots:
+            return self.row_cls(*values)
+        return dict(zip(self.fields, values, strict=True))
+
+
+async def prepare_hot_query(conn: asyncpg.Connection, query: HotQuery) -> PreparedHotQuery:
+    """Prepare a hot query on a connection, reusing the connection's cached statement"""
+    cache: Optional[dict] = getattr(conn, "hot_statements", None)
+    if cache is not None and query.name in cache:
+        return cache[query.name]
+
+    statement = await conn.prepare(query.sql)
+    attributes = statement.get_attributes()
+    fields = tuple(attr.name for attr in attributes)
+    json_indexes: tuple[int, ...] = ()
+    if not getattr(conn, "json_codecs", False):
+        json_indexes = tuple(
+            index for index, attr in enumerate(attributes) if attr.type.name in JSON_TYPES
+        )
+
+    prepared = PreparedHotQuery(statement, fields, json_indexes)
+    if cache is not None:
+        cache[query.name] = prepared
+    return prepared
+
+
+def forget_hot_query(conn: asyncpg.Connection, name: str) -> None:
+    """Drop a connection's prepared statement so it is re-prepared on next use"""
+    cache: Optional[dict] = getattr(conn, "hot_statements", None)
+    if cache is not None:
+        cache.pop(name, None)
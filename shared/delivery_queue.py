@@ -0,0 +1,445 @@
+# shared/delivery_queue.py
+"""
+Redis-backed delivery queue and worker for outbound email and SMS.
+
+Messages are rendered when queued and pushed onto one Redis list per priority; OTPs go
+ahead of bulk mail such as deletion confirmations. Workers claim a message with a Lua
+script that pops from the first non-empty list and records it in an in-flight sorted set
+(scored by claim time) in one step, so a message survives a restart of the web process
+that queued it and of the worker that claimed it: in-flight messages whose worker
+stopped are pushed back after a lease. A failed send waits in a retry sorted set (scored
+by when it is due, with the outbox's exponential backoff) so a short provider outage
+doesn't use up its attempts. OTPs carry an expiry and are dropped rather than sent once
+the code is no longer valid.
+
+DeliveryWorker sends over a persistent SMTP connection pool and a persistent HTTP client
+and records per-channel throughput, send latency and queue wait, exposed at
+/metrics/delivery.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from enum import Enum
+from typing import Any, Optional
+
+import httpx
+import redis.asyncio as redis
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from shared.db_metrics import LATENCY_BUCKETS, Histogram, _check_metrics_auth
+from shared.email_service import SMTPConnectionPool, otp_email_content, send_email
+from shared.outbox import retry_delay
+from shared.redis_client import get_redis
+from shared.sms_service import otp_sms_content, send_sms
+from shared.uuid_utils import generate_uuid7
+
+logger = logging.getLogger(__name__)
+
+# Concurrent sends per worker process (bounded further by SMTP_POOL_SIZE for email)
+DELIVERY_CONCURRENCY = int(os.getenv("DELIVERY_CONCURRENCY", "8"))
+
+# How long an idle worker waits before checking the queues again
+DELIVERY_POLL_SECONDS = float(os.getenv("DELIVERY_POLL_SECONDS", "0.1"))
+
+# Claimed messages not acknowledged within this long go back on their queue
+INFLIGHT_LEASE_SECONDS = 90
+
+# With retry_delay's backoff the last attempt is ~7.5 minutes in, inside an OTP's validity
+MAX_ATTEMPTS = 5
+
+# How often failed sends that are due are moved back to their queue
+RETRY_POLL_SECONDS = 1.0
+
+# OTP codes are valid for 10 minutes (OTP_EXPIRE_MINUTES in the identity service)
+OTP_TTL_SECONDS = 600
+
+SMS_TIMEOUT_SECONDS = 10.0
+
+INFLIGHT_KEY = "delivery_queue:inflight"
+RETRY_KEY = "delivery_queue:retry"
+
+
+class Channel(str, Enum):
+    EMAIL = "email"
+    SMS = "sms"
+
+
+class Priority(str, Enum):
+    OTP = "otp"
+    BULK = "bulk"
+
+
+# Claim order: every OTP is sent before any bulk message
+PRIORITIES = (Priority.OTP, Priority.BULK)
+
+
+def queue_key(priority: Priority) -> str:
+    return f"delivery_queue:{Priority(priority).value}"
+
+
+# KEYS: queues in priority order, then the in-flight set. ARGV[1]: now (epoch seconds).
+CLAIM_SCRIPT = """
+local inflight = KEYS[#KEYS]
+for i = 1, #KEYS - 1 do
+    local message = redis.call('LPOP', KEYS[i])
+    if message then
+        redis.call('ZADD', inflight, ARGV[1], message)
+        return message
+    end
+end
+return nil
+"""
+
+# Moves messages scored up to a cutoff from a sorted set (in flight, by claim time, or
+# retrying, by due time) back to their queue.
+# KEYS: sorted set, OTP queue, bulk queue. ARGV[1]: cutoff.
+REQUEUE_SCRIPT = """
+local stale = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 500)
+for _, message in ipairs(stale) do
+    redis.call('ZREM', KEYS[1], message)
+    if cjson.decode(message)['priority'] == 'otp' then
+        redis.call('RPUSH', KEYS[2], message)
+    else
+        redis.call('RPUSH', KEYS[3], message)
+    end
+end
+return #stale
+"""
+
+
+async def enqueue_message(
+    redis_client: redis.Redis,
+    channel: Channel,
+    to: str,
+    body: str,
+    subject: Optional[str] = None,
+    html_body: Optional[str] = None,
+    priority: Priority = Priority.BULK,
+    kind: str = "message",
+    ttl_seconds: Optional[float] = None,
+) -> str:
+    """Queue a rendered message; returns its id"""
+    now = time.time()
+    message = {
+        "id": str(generate_uuid7()),
+        "channel": Channel(channel).value,
+        "priority": Priority(priority).value,
+        "kind": kind,
+        "to": to,
+        "subject": subject,
+        "body": body,
+        "html_body": html_body,
+        "attempts": 0,
+        "enqueued_at": now,
+        "expires_at": now + ttl_seconds if ttl_seconds else None,
+    }
+    await redis_client.rpush(queue_key(priority), json.dumps(message))
+    return message["id"]
+
+
+async def enqueue_email(
+    redis_client: redis.Redis,
+    to_email: str,
+    subject: str,
+    body: str,
+    html_body: Optional[str] = None,
+    priority: Priority = Priority.BULK,
+    kind: str = "email",
+    ttl_seconds: Optional[float] = None,
+) -> str:
+    return await enqueue_message(
+        redis_client, Channel.EMAIL, to_email, body, subject, html_body, priority, kind, ttl_seconds
+    )
+
+
+async def enqueue_otp(redis_client: redis.Redis, identifier_type: str, identifier: str, otp: str):
+    """Queue an OTP by email or SMS ahead of all bulk messages"""
+    if identifier_type == "email":
+        subject, body, html_body = otp_email_content(otp)
+        return await enqueue_email(
+            redis_client, identifier, subject, body, html_body, Priority.OTP, "otp", OTP_TTL_SECONDS
+        )
+    return await enqueue_message(
+        redis_client,
+        Channel.SMS,
+        identifier,
+        otp_sms_content(otp),
+        priority=Priority.OTP,
+        kind="otp",
+        ttl_seconds=OTP_TTL_SECONDS,
+    )
+
+
+async def queue_depths(redis_client: redis.Redis) -> dict[str, int]:
+    """Messages waiting per priority, plus in flight"""
+    pipe = redis_client.pipeline(transaction=False)
+    for priority in PRIORITIES:
+        pipe.llen(queue_key(priority))
+    pipe.zcard(INFLIGHT_KEY)
+    pipe.zcard(RETRY_KEY)
+    *waiting, inflight, retrying = await pipe.execute()
+    depths = {priority.value: depth for priority, depth in zip(PRIORITIES, waiting, strict=True)}
+    depths["inflight"] = inflight
+    depths["retrying"] = retrying
+    return depths
+
+
+class ChannelStats:
+    """Counters and timings for one channel and priority"""
+
+    __slots__ = ("sent", "failed", "retried", "expired", "send_latency", "queue_wait")
+
+    def __init__(self):
+        self.sent = self.failed = self.retried = self.expired = 0
+        self.send_latency = Histogram()
+        self.queue_wait = Histogram()
+
+    def to_dict(self, uptime: float) -> dict[str, Any]:
+        attempts = sum(self.send_latency.counts)
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "expired": self.expired,
+            "sent_per_second": round(self.sent / uptime, 4) if uptime else 0.0,
+            "send_latency_ms": {
+                "mean": round(self.send_latency.total / attempts * 1000, 3) if attempts else 0.0,
+                "p50": round(self.send_latency.quantile(0.5) * 1000, 3),
+                "p95": round(self.send_latency.quantile(0.95) * 1000, 3),
+                "max": round(self.send_latency.max * 1000, 3),
+            },
+            "queue_wait_ms": {
+                "p50": round(self.queue_wait.quantile(0.5) * 1000, 3),
+                "p95": round(self.queue_wait.quantile(0.95) * 1000, 3),
+                "max": round(self.queue_wait.max * 1000, 3),
+            },
+        }
+
+
+class DeliveryMetrics:
+    """Per-channel delivery statistics for this process"""
+
+    def __init__(self):
+        self._stats: dict[tuple[str, str], ChannelStats] = {}
+        self._started = time.monotonic()
+
+    def record(
+        self,
+        channel: str,
+        priority: str,
+        outcome: str,
+        send_seconds: Optional[float] = None,
+        queue_wait: Optional[float] = None,
+    ) -> None:
+        """outcome is one of sent, failed, retried or expired"""
+        stats = self._stats.setdefault((channel, priority), ChannelStats())
+        setattr(stats, outcome, getattr(stats, outcome) + 1)
+        if send_seconds is not None:
+            stats.send_latency.observe(send_seconds)
+        if queue_wait is not None:
+            stats.queue_wait.observe(queue_wait)
+
+    def reset(self) -> None:
+        self._stats.clear()
+        self._started = time.monotonic()
+
+    def snapshot(self) -> dict[str, Any]:
+        uptime = time.monotonic() - self._started
+        return {
+            "uptime_seconds": round(uptime, 1),
+            "channels": [
+                {"channel": channel, "priority": priority, **stats.to_dict(uptime)}
+                for (channel, priority), stats in sorted(self._stats.items())
+            ],
+        }
+
+    def render_prometheus(self, depths: Optional[dict[str, int]] = None) -> str:
+        lines = []
+
+        def histogram_lines(name: str, histogram: Histogram, labels: str) -> None:
+            cumulative = histogram.cumulative()
+            for bound, count in zip(LATENCY_BUCKETS, cumulative[:-1], strict=True):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative[-1]}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {cumulative[-1]}")
+
+        lines.append("# TYPE delivery_messages_total counter")
+        lines.append("# TYPE delivery_send_seconds histogram")
+        lines.append("# TYPE delivery_queue_wait_seconds histogram")
+        for (channel, priority), stats in sorted(self._stats.items()):
+            labels = f'channel="{channel}",priority="{priority}"'
+            for outcome in ("sent", "failed", "retried", "expired"):
+                count = getattr(stats, outcome)
+                lines.append(f'delivery_messages_total{{{labels},outcome="{outcome}"}} {count}')
+            histogram_lines("delivery_send_seconds", stats.send_latency, labels)
+            histogram_lines("delivery_queue_wait_seconds", stats.queue_wait, labels)
+
+        if depths:
+            lines.append("# TYPE delivery_queue_depth gauge")
+            for queue, depth in depths.items():
+                lines.append(f'delivery_queue_depth{{queue="{queue}"}} {depth}')
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide delivery metrics, fed by DeliveryWorker
+delivery_metrics = DeliveryMetrics()
+
+
+async def _wait(shutdown: asyncio.Event, seconds: float) -> None:
+    try:
+        await asyncio.wait_for(shutdown.wait(), seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+class DeliveryWorker:
+    """Sends queued messages with DELIVERY_CONCURRENCY concurrent consumers"""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        concurrency: int = DELIVERY_CONCURRENCY,
+        metrics: DeliveryMetrics = delivery_metrics,
+    ):
+        self.redis = redis_client
+        self.concurrency = concurrency
+        self.metrics = metrics
+        self.smtp = SMTPConnectionPool()
+        self.http = httpx.AsyncClient(
+            timeout=SMS_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=concurrency, max_keepalive_connections=concurrency
+            ),
+        )
+
+    async def run(self, shutdown: asyncio.Event) -> None:
+        """Consume until shutdown, then close the SMTP connections and HTTP client"""
+        try:
+            await asyncio.gather(
+                *(self._consume(shutdown) for _ in range(self.concurrency)),
+                self._recover(shutdown),
+            )
+        finally:
+            await self.smtp.close()
+            await self.http.aclose()
+
+    async def claim(self) -> Optional[str]:
+        keys = [queue_key(priority) for priority in PRIORITIES] + [INFLIGHT_KEY]
+        return await self.redis.eval(CLAIM_SCRIPT, len(keys), *keys, time.time())
+
+    async def _requeue(self, key: str, cutoff: float) -> int:
+        return await self.redis.eval(
+            REQUEUE_SCRIPT, 3, key, queue_key(Priority.OTP), queue_key(Priority.BULK), cutoff
+        )
+
+    async def requeue_stale(self) -> int:
+        """Push back messages whose worker stopped before acknowledging them"""
+        return await self._requeue(INFLIGHT_KEY, time.time() - INFLIGHT_LEASE_SECONDS)
+
+    async def requeue_due_retries(self, now: Optional[float] = None) -> int:
+        """Push back failed messages whose retry is due"""
+        return await self._requeue(RETRY_KEY, time.time() if now is None else now)
+
+    async def deliver(self, raw: str) -> str:
+        """Send one claimed message; returns its outcome"""
+        message = json.loads(raw)
+        channel, priority = message["channel"], message["priority"]
+        now = time.time()
+
+        if message["expires_at"] and now > message["expires_at"]:
+            await self.redis.zrem(INFLIGHT_KEY, raw)
+            self.metrics.record(channel, priority, "expired")
+            return "expired"
+
+        started = time.perf_counter()
+        try:
+            if channel == Channel.EMAIL.value:
+                await send_email(
+                    message["to"],
+                    message["subject"],
+                    message["body"],
+                    message["html_body"],
+                    pool=self.smtp,
+                )
+            else:
+                await send_sms(message["to"], message["body"], client=self.http)
+        except Exception as e:
+            elapsed = time.perf_counter() - started
+            attempts = message["attempts"] + 1
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.zrem(INFLIGHT_KEY, raw)
+            if attempts < MAX_ATTEMPTS:
+                outcome = "retried"
+                retry = json.dumps({**message, "attempts": attempts})
+                pipe.zadd(RETRY_KEY, {retry: time.time() + retry_delay(attempts)})
+            else:
+                outcome = "failed"
+                logger.error(
+                    f"Giving up on {message['kind']} {channel} {message['id']} "
+                    f"after {attempts} attempts: {e}"
+                )
+            await pipe.execute()
+            self.metrics.record(channel, priority, outcome, elapsed)
+            return outcome
+
+        await self.redis.zrem(INFLIGHT_KEY, raw)
+        self.metrics.record(
+            channel,
+            priority,
+            "sent",
+            time.perf_counter() - started,
+            now - message["enqueued_at"],
+        )
+        return "sent"
+
+    async def _consume(self, shutdown: asyncio.Event) -> None:
+        while not shutdown.is_set():
+            try:
+                raw = await self.claim()
+                if raw is None:
+                    await _wait(shutdown, DELIVERY_POLL_SECONDS)
+                    continue
+                await self.deliver(raw)
+            except Exception as e:
+                logger.error(f"Delivery worker error: {e}")
+                await _wait(shutdown, 1)
+
+    async def _recover(self, shutdown: asyncio.Event) -> None:
+        stale_checked = 0.0
+        while not shutdown.is_set():
+            try:
+                await self.requeue_due_retries()
+                if time.monotonic() - stale_checked >= INFLIGHT_LEASE_SECONDS / 3:
+                    stale_checked = time.monotonic()
+                    requeued = await self.requeue_stale()
+                    if requeued:
+                        logger.warning(f"Re-queued {requeued} messages from stopped workers")
+            except Exception as e:
+                logger.error(f"Delivery requeue error: {e}")
+            await _wait(shutdown, RETRY_POLL_SECONDS)
+
+
+delivery_metrics_router = APIRouter()
+
+
+@delivery_metrics_router.get("/metrics/delivery", include_in_schema=False)
+async def get_delivery_metrics(
+    output_format: str = Query("prometheus", alias="format", pattern="^(prometheus|json)$"),
+    authorization: Optional[str] = Header(None),
+):
+    """Email/SMS delivery metrics for this process and current queue depths"""
+    _check_metrics_auth(authorization)
+    depths = await queue_depths(await get_redis())
+
+    if output_format == "json":
+        return JSONResponse({**delivery_metrics.snapshot(), "queues": depths})
+
+    return PlainTextResponse(
+        delivery_metrics.render_prometheus(depths), media_type="text/plain; version=0.0.4"
+    )
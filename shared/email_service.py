@@ -1,5 +1,7 @@
 # email_service.py
+import asyncio
 import os
+import time
 from datetime import datetime
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -7,6 +9,8 @@ from typing import Optional
 
 import aiosmtplib
 
+from shared.outbox import OutboxDestination, OutboxEvent, enqueue_event
+
 # Email configuration
 SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
@@ -14,9 +18,94 @@ SMTP_USERNAME = os.getenv("SMTP_USERNAME")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 FROM_EMAIL = os.getenv("FROM_EMAIL", "noreply@fairydust.fun")
 
+# Persistent connections per delivery worker process
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+
+# Servers drop idle sessions; connections idle longer than this are reopened
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
+
+SMTP_TIMEOUT_SECONDS = 30
+
+
+class SMTPConnectionPool:
+    """
+    Persistent, authenticated SMTP connections shared by concurrent senders.
+
+    Connections are opened on demand (at most size at once), reused across messages
+    and reopened after sitting idle, so a send costs one SMTP transaction instead of a
+    TCP connect, STARTTLS handshake and login. A send on a reused connection the server
+    already closed is retried once on a fresh one.
+    """
+
+    def __init__(self, size: int = SMTP_POOL_SIZE, idle_seconds: float = SMTP_IDLE_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._slots = asyncio.Semaphore(size)
+        self._idle: list[tuple[aiosmtplib.SMTP, float]] = []
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=SMTP_HOST,
+            port=SMTP_PORT,
+            username=SMTP_USERNAME,
+            password=SMTP_PASSWORD,
+            start_tls=True,
+            timeout=SMTP_TIMEOUT_SECONDS,
+        )
+        await client.connect()
+        return client
+
+    async def _checkout(self) -> Optional[aiosmtplib.SMTP]:
+        """Most recently used live connection, closing any that idled out"""
+        while self._idle:
+            client, last_used = self._idle.pop()
+            if client.is_connected and time.monotonic() - last_used < self.idle_seconds:
+                return client
+            await _close_quietly(client)
+        return None
 
-async def send_email(to_email: str, subject: str, body: str, html_body: Optional[str] = None):
-    """Send email using SMTP"""
+    async def send(self, message: MIMEMultipart) -> None:
+        async with self._slots:
+            client = await self._checkout()
+            reused = client is not None
+            if client is None:
+                client = await self._connect()
+
+            try:
+                await client.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                await _close_quietly(client)
+                if not reused:
+                    raise
+                # The server closed the session while it sat in the pool
+                client = await self._connect()
+                try:
+                    await client.send_message(message)
+                except Exception:
+                    await _close_quietly(client)
+                    raise
+            except Exception:
+                await _close_quietly(client)
+                raise
+
+            self._idle.append((client, time.monotonic()))
+
+    async def close(self) -> None:
+        while self._idle:
+            client, _ = self._idle.pop()
+            await _close_quietly(client)
+
+
+async def _close_quietly(client: aiosmtplib.SMTP) -> None:
+    try:
+        if client.is_connected:
+            await client.quit()
+    except Exception:
+        client.close()
+
+
+def build_email(
+    to_email: str, subject: str, body: str, html_body: Optional[str] = None
+) -> MIMEMultipart:
     message = MIMEMultipart("alternative")
     message["From"] = FROM_EMAIL
     message["To"] = to_email
@@ -29,7 +118,22 @@ async def send_email(to_email: str, subject: str, body: str, html_body: Optional
     if html_body:
         message.attach(MIMEText(html_body, "html"))
 
-    # Send email
+    return message
+
+
+async def send_email(
+    to_email: str,
+    subject: str,
+    body: str,
+    html_body: Optional[str] = None,
+    pool: Optional[SMTPConnectionPool] = None,
+):
+    """Send email using SMTP, over a pooled connection when a pool is given"""
+    message = build_email(to_email, subject, body, html_body)
+    if pool is not None:
+        await pool.send(message)
+        return
+
     await aiosmtplib.send(
         message,
         hostname=SMTP_HOST,
@@ -40,8 +144,8 @@ async def send_email(to_email: str, subject: str, body: str, html_body: Optional
     )
 
 
-async def send_otp_email(email: str, otp: str):
-    """Send OTP verification email"""
+def otp_email_content(otp: str) -> tuple[str, str, str]:
+    """Subject, text and HTML body of the OTP verification email"""
     subject = "Your fairydust verification code"
 
     body = f"""
@@ -71,11 +175,16 @@ async def send_otp_email(email: str, otp: str):
     </html>
     """
 
-    await send_email(email, subject, body, html_body)
+    return subject, body, html_body
 
 
-async def send_account_deletion_confirmation(email: str, fairyname: str, deletion_id: str):
-    """Send account deletion confirmation email"""
+async def send_otp_email(email: str, otp: str):
+    """Send OTP verification email"""
+    await send_email(email, *otp_email_content(otp))
+
+
+def account_deletion_email_content(fairyname: str, deletion_id: str) -> tuple[str, str, str]:
+    """Subject, text and HTML body of the account deletion confirmation"""
     subject = "Your fairydust account has been deleted"
 
     body = f"""
@@ -129,4 +238,47 @@ async def send_account_deletion_confirmation(email: str, fairyname: str, deletio
     </html>
     """
 
-    await send_email(email, subject, body, html_body)
+    return subject, body, html_body
+
+
+async def send_account_deletion_confirmation(email: str, fairyname: str, deletion_id: str):
+    """Send account deletion confirmation email"""
+    await send_email(email, *account_deletion_email_content(fairyname, deletion_id))
+
+
+async def enqueue_account_deletion_confirmation(conn, email: str, fairyname: str, deletion_id):
+    """Queue the deletion confirmation in the deleting transaction (sent by the outbox)"""
+    await enqueue_event(
+        conn,
+        EMAIL_DESTINATION.name,
+        "account.deleted",
+        {"email": email, "fairyname": fairyname, "deletion_id": str(deletion_id)},
+        dedup_key=f"account.deleted:{deletion_id}",
+    )
+
+
+async def deliver_email_event(event: OutboxEvent):
+    """Hand a notification email to the delivery queue, behind pending OTPs"""
+    # Imported here: the delivery queue sends through this module
+    from shared.delivery_queue import Priority, enqueue_email
+    from shared.redis_client import get_redis
+
+    if event.event_type == "account.deleted":
+        payload = event.payload
+        await enqueue_email(
+            await get_redis(),
+            payload["email"],
+            *account_deletion_email_content(payload["fairyname"], payload["deletion_id"]),
+            priority=Priority.BULK,
+            kind=event.event_type,
+        )
+    else:
+        raise ValueError(f"Unknown email event type: {event.event_type}")
+
+
+EMAIL_DESTINATION = OutboxDestination(
+    name="email",
+    deliver=deliver_email_event,
+    concurrency=int(os.getenv("OUTBOX_EMAIL_CONCURRENCY", "4")),
+    timeout=30.0,
+)
@@ -0,0 +1,137 @@
+# shared/generation_context.py
+"""
+Per-user generation context.
+
+Story, recipe, inspire and Would You Rather prompts are personalized from the user's
+birth date, interests and people in their life. Instead of each generation querying
+users, user_profile_data and people_in_my_life, the three are read together into one
+JSON snapshot, built by a single query and kept in Redis at generation_context:{user_id}.
+A generation request gets its context in one MGET; each app formats the part it needs.
+
+Identity's write routes (profile, people, people photos) call
+invalidate_generation_context, which drops the snapshot and bumps the user's context
+version. A snapshot built from the database is only stored if the version is unchanged
+since the read that missed, so a build racing an edit can't put the old data back.
+The TTL bounds staleness from writes outside those routes.
+"""
+
+import json
+import logging
+import os
+from typing import Any
+
+from shared.database import Database
+from shared.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+GENERATION_CONTEXT_TTL_SECONDS = int(os.getenv("GENERATION_CONTEXT_TTL_SECONDS", "21600"))
+
+# Built as JSON text in the database, so it's stored in Redis as is
+SNAPSHOT_SQL = """
+    SELECT json_build_object(
+        'birth_date', u.birth_date,
+        'interests', (
+            SELECT field_value FROM user_profile_data
+            WHERE user_id = u.id AND field_name = 'interests'
+        ),
+        'people', COALESCE(
+            (
+                SELECT json_agg(
+                    json_build_object(
+                        'id', p.id,
+                        'name', p.name,
+                        'entry_type', p.entry_type,
+                        'relationship', p.relationship,
+                        'birth_date', p.birth_date,
+                        'species', p.species,
+                        'personality_description', p.personality_description,
+                        'photo_url', p.photo_url
+                    )
+                    ORDER BY p.created_at
+                )
+                FROM people_in_my_life p
+                WHERE p.user_id = u.id
+            ),
+            '[]'::json
+        )
+    )::text AS snapshot
+    FROM users u
+    WHERE u.id = $1
+"""
+
+# Stores a snapshot only if the context version is the one read before building it.
+# KEYS: snapshot, version. ARGV: version read ('' if none), snapshot JSON, TTL.
+STORE_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+EMPTY_CONTEXT = {"birth_date": None, "interests": None, "people": []}
+
+
+def context_key(user_id) -> str:
+    return f"generation_context:{user_id}"
+
+
+def version_key(user_id) -> str:
+    return f"generation_context_version:{user_id}"
+
+
+async def build_generation_context(db: Database, user_id) -> str:
+    """The user's snapshot as JSON text, from the database"""
+    row = await db.fetch_one(SNAPSHOT_SQL, user_id)
+    return row["snapshot"] if row else json.dumps(EMPTY_CONTEXT)
+
+
+async def get_generation_context(db: Database, user_id, redis=None) -> dict[str, Any]:
+    """The user's birth date, interests and people, from the cached snapshot"""
+    try:
+        redis = redis or await get_redis()
+        snapshot, version = await redis.mget(context_key(user_id), version_key(user_id))
+    except Exception as e:
+        logger.warning(f"Generation context cache unavailable for {user_id}: {e}")
+        return json.loads(await build_generation_context(db, user_id))
+
+    if snapshot:
+        return json.loads(snapshot)
+
+    snapshot = await build_generation_context(db, user_id)
+    try:
+        await redis.eval(
+            STORE_SCRIPT,
+            2,
+            context_key(user_id),
+            version_key(user_id),
+            version or "",
+            snapshot,
+            GENERATION_CONTEXT_TTL_SECONDS,
+        )
+    except Exception as e:
+        logger.warning(f"Failed to cache generation context for {user_id}: {e}")
+    return json.loads(snapshot)
+
+
+async def invalidate_generation_context(redis, user_id) -> None:
+    """Drop the user's snapshot after a write to their profile or people"""
+    try:
+        pipe = redis.pipeline(transaction=True)
+        pipe.incr(version_key(user_id))
+        pipe.expire(version_key(user_id), GENERATION_CONTEXT_TTL_SECONDS)
+        pipe.delete(context_key(user_id))
+        await pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to invalidate generation context for {user_id}: {e}")
+
+
+def interests_from(context: dict[str, Any]) -> list[str]:
+    """The user's interests, stored either as a comma-separated string or a list"""
+    interests = context.get("interests")
+    if isinstance(interests, str):
+        return [interest.strip() for interest in interests.split(",") if interest.strip()]
+    if isinstance(interests, list):
+        return [str(interest) for interest in interests]
+    return []
@@ -5,33 +5,25 @@ from typing import Any, Optional
 
 import aiohttp
 
+from shared.outbox import OutboxDestination, OutboxEvent, enqueue_event
+
 logger = logging.getLogger(__name__)
 
 
-async def send_hubspot_webhook(
-    event_type: str, user_data: dict[str, Any], changed_fields: Optional[list[str]] = None
-) -> bool:
-    """
-    Send user data to HubSpot via Zapier webhook
+# Bursts of profile edits within this window go out as one user.updated
+COALESCE_SECONDS = float(os.getenv("HUBSPOT_WEBHOOK_COALESCE_SECONDS", "5"))
 
-    Args:
-        event_type: Type of event ('user.created' or 'user.updated')
-        user_data: User data dictionary from database
-        changed_fields: List of fields that were updated (for user.updated events)
 
-    Returns:
-        bool: True if webhook sent successfully, False otherwise
-    """
+def hubspot_webhook_enabled() -> bool:
     webhook_url = os.getenv("ZAPIER_HUBSPOT_WEBHOOK")
     webhook_enabled = os.getenv("HUBSPOT_WEBHOOK_ENABLED", "true").lower() == "true"
+    return bool(webhook_url) and webhook_enabled
 
-    if not webhook_url or not webhook_enabled:
-        logger.debug(
-            f"HubSpot webhook skipped - URL: {bool(webhook_url)}, Enabled: {webhook_enabled}"
-        )
-        return True  # Return success if webhook is intentionally disabled
 
-    # Build webhook payload
+def build_hubspot_payload(
+    event_type: str, user_data: dict[str, Any], changed_fields: Optional[list[str]] = None
+) -> dict[str, Any]:
+    """Webhook payload for a user row"""
     payload = {
         "event_type": event_type,
         "user_id": str(user_data["id"]),
@@ -57,24 +49,69 @@ async def send_hubspot_webhook(
         payload["changed_fields"] = changed_fields
 
     # Remove None values to keep payload clean
-    payload = {k: v for k, v in payload.items() if v is not None}
+    return {k: v for k, v in payload.items() if v is not None}
+
+
+# build_hubspot_payload("user.created", u) in SQL, for writers that create a user and queue
+# its event in one statement; u is the inserted users row
+USER_CREATED_PAYLOAD_SQL = """
+    jsonb_strip_nulls(jsonb_build_object(
+        'event_type', 'user.created',
+        'user_id', u.id::text,
+        'fairyname', u.fairyname,
+        'email', u.email,
+        'phone', u.phone,
+        'first_name', u.first_name,
+        'birth_date', u.birth_date,
+        'auth_provider', u.auth_provider,
+        'dust_balance', COALESCE(u.dust_balance, 0),
+        'city', u.city,
+        'country', u.country,
+        'created_at', u.created_at,
+        'updated_at', u.updated_at,
+        'is_admin', COALESCE(u.is_admin, false),
+        'is_onboarding_completed', COALESCE(u.is_onboarding_completed, false)
+    ))
+"""
+
+
+async def post_hubspot_payload(payload: dict[str, Any], event_id: Optional[str] = None) -> None:
+    """POST a payload to the Zapier webhook, raising on any failure"""
+    headers = {"X-Event-Id": event_id} if event_id else None
+    timeout = aiohttp.ClientTimeout(total=5)  # 5 second timeout
+
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with session.post(
+            os.getenv("ZAPIER_HUBSPOT_WEBHOOK"), json=payload, headers=headers
+        ) as response:
+            if response.status != 200:
+                raise RuntimeError(f"HubSpot webhook returned status {response.status}")
 
-    try:
-        timeout = aiohttp.ClientTimeout(total=5)  # 5 second timeout
-
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(webhook_url, json=payload) as response:
-                if response.status == 200:
-                    logger.info(
-                        f"HubSpot webhook sent successfully: {event_type} for user {user_data.get('fairyname')}"
-                    )
-                    return True
-                else:
-                    logger.warning(
-                        f"HubSpot webhook failed with status {response.status}: {event_type} for user {user_data.get('fairyname')}"
-                    )
-                    return False
 
+async def send_hubspot_webhook(
+    event_type: str, user_data: dict[str, Any], changed_fields: Optional[list[str]] = None
+) -> bool:
+    """
+    Send user data to HubSpot via Zapier webhook
+
+    Args:
+        event_type: Type of event ('user.created' or 'user.updated')
+        user_data: User data dictionary from database
+        changed_fields: List of fields that were updated (for user.updated events)
+
+    Returns:
+        bool: True if webhook sent successfully, False otherwise
+    """
+    if not hubspot_webhook_enabled():
+        logger.debug("HubSpot webhook skipped - not configured or disabled")
+        return True  # Return success if webhook is intentionally disabled
+
+    try:
+        await post_hubspot_payload(build_hubspot_payload(event_type, user_data, changed_fields))
+        logger.info(
+            f"HubSpot webhook sent successfully: {event_type} for user {user_data.get('fairyname')}"
+        )
+        return True
     except asyncio.TimeoutError:
         logger.warning(
             f"HubSpot webhook timeout: {event_type} for user {user_data.get('fairyname')}"
@@ -113,3 +150,59 @@ async def send_user_updated_webhook(user_data: dict[str, Any], changed_fields: l
     Convenience function for user update events
     """
     return await send_hubspot_webhook("user.updated", user_data, changed_fields)
+
+
+async def enqueue_user_created(conn, user_data: dict[str, Any]) -> None:
+    """Queue user.created in the transaction that creates the user (sent by the outbox)"""
+    if not hubspot_webhook_enabled():
+        return
+    await enqueue_event(
+        conn,
+        HUBSPOT_DESTINATION.name,
+        "user.created",
+        build_hubspot_payload("user.created", user_data),
+        aggregate_id=user_data["id"],
+        dedup_key=f"user.created:{user_data['id']}",
+    )
+
+
+async def enqueue_user_updated(
+    conn, user_data: dict[str, Any], changed_fields: list[str]
+) -> None:
+    """Queue user.updated in the updating transaction; bursts per user are coalesced"""
+    if not hubspot_webhook_enabled():
+        return
+    await enqueue_event(
+        conn,
+        HUBSPOT_DESTINATION.name,
+        "user.updated",
+        build_hubspot_payload("user.updated", user_data, changed_fields),
+        aggregate_id=user_data["id"],
+        coalesce_key=f"user.updated:{user_data['id']}",
+        delay_seconds=COALESCE_SECONDS,
+    )
+
+
+def merge_user_updates(payloads: list[dict[str, Any]]) -> dict[str, Any]:
+    """Latest user snapshot, with the changed fields of every folded update"""
+    changed_fields = list(
+        dict.fromkeys(field for payload in payloads for field in payload.get("changed_fields", []))
+    )
+    merged = dict(payloads[-1])
+    if changed_fields:
+        merged["changed_fields"] = changed_fields
+    return merged
+
+
+async def deliver_hubspot_event(event: OutboxEvent) -> None:
+    if not hubspot_webhook_enabled():
+        return  # Disabled since the event was queued; drop it
+    await post_hubspot_payload(event.payload, str(event.id))
+
+
+HUBSPOT_DESTINATION = OutboxDestination(
+    name="hubspot",
+    deliver=deliver_hubspot_event,
+    concurrency=int(os.getenv("OUTBOX_HUBSPOT_CONCURRENCY", "4")),
+    merge=merge_user_updates,
+)
@@ -8,6 +8,13 @@ import json
 import logging
 from typing import Any, TypeVar, Union
 
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
@@ -271,6 +278,20 @@ def safe_json_dumps(obj: Any, default_str: str = "{}") -> str:
         return default_str
 
 
+def fast_json_loads(value: str | bytes) -> Any:
+    """Parse JSON with orjson when available, falling back to the stdlib"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(value)
+    return json.loads(value)
+
+
+def fast_json_dumps(obj: Any) -> str:
+    """Serialize to a JSON string with orjson when available, falling back to the stdlib"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=str)
+
+
 # Commonly used schemas for validation
 RECIPE_METADATA_SCHEMA = {
     "required": [],
@@ -0,0 +1,337 @@
+# shared/ledger_stats.py
+"""
+Per-user ledger statistics maintained alongside dust_transactions.
+
+Every writer of dust_transactions folds the new row into user_ledger_stats (and the
+per-app consume counts behind favorite_app_id) inside the same database transaction,
+so reading a user's stats is a primary-key lookup instead of aggregating their whole
+history. Writers must already hold the user's row lock (SELECT ... FOR UPDATE on
+users), which every ledger path takes before touching the balance.
+
+Users without a stats row yet are rebuilt from dust_transactions on their next write
+or read; backfill_ledger_stats() does the same for everyone up front and
+check_ledger_stats() compares stored rows against a fresh aggregation.
+"""
+
+import logging
+from collections.abc import Iterable
+from typing import Any, Optional
+from uuid import UUID
+
+from shared.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Transaction type -> running total it feeds
+TOTAL_COLUMNS = {
+    "grant": "total_granted",
+    "consume": "total_consumed",
+    "purchase": "total_purchased",
+    "refund": "total_refunded",
+}
+
+STAT_FIELDS = (
+    "total_granted",
+    "total_consumed",
+    "total_purchased",
+    "total_refunded",
+    "transaction_count",
+    "first_transaction",
+    "last_transaction",
+    "favorite_app_id",
+)
+
+# Full aggregation of dust_transactions for a set of users ($1)
+AGGREGATE_SQL = """
+    SELECT
+        user_id,
+        COALESCE(SUM(amount) FILTER (WHERE type = 'grant'), 0) AS total_granted,
+        COALESCE(SUM(ABS(amount)) FILTER (WHERE type = 'consume'), 0) AS total_consumed,
+        COALESCE(SUM(amount) FILTER (WHERE type = 'purchase'), 0) AS total_purchased,
+        COALESCE(SUM(amount) FILTER (WHERE type = 'refund'), 0) AS total_refunded,
+        COUNT(*) AS transaction_count,
+        MIN(created_at) AS first_transaction,
+        MAX(created_at) AS last_transaction
+    FROM dust_transactions
+    WHERE user_id = ANY($1::uuid[])
+    GROUP BY user_id
+"""
+
+APP_AGGREGATE_SQL = """
+    SELECT user_id, app_id, COUNT(*) AS consume_count
+    FROM dust_transactions
+    WHERE user_id = ANY($1::uuid[]) AND type = 'consume' AND app_id IS NOT NULL
+    GROUP BY user_id, app_id
+"""
+
+# Most-consumed app per user, from user_ledger_app_stats
+FAVORITE_APP_SQL = """
+    LEFT JOIN LATERAL (
+        SELECT app_id, consume_count
+        FROM user_ledger_app_stats a
+        WHERE a.user_id = agg.user_id
+        ORDER BY consume_count DESC
+        LIMIT 1
+    ) fav ON TRUE
+"""
+
+
+def _record_sql(column: Optional[str]) -> str:
+    """Single-statement increment of a user's stats for one new transaction"""
+    total = f"{column} = s.{column} + $3," if column else ""
+    return f"""
+        WITH app AS (
+            INSERT INTO user_ledger_app_stats (user_id, app_id, consume_count)
+            SELECT $1::uuid, $2::uuid, 1 WHERE $2::uuid IS NOT NULL
+            ON CONFLICT (user_id, app_id)
+            DO UPDATE SET consume_count = user_ledger_app_stats.consume_count + 1
+            RETURNING app_id, consume_count
+        )
+        UPDATE user_ledger_stats s
+        SET {total}
+            transaction_count = s.transaction_count + 1,
+            first_transaction = COALESCE(s.first_transaction, CURRENT_TIMESTAMP),
+            last_transaction = CURRENT_TIMESTAMP,
+            favorite_app_id = CASE
+                WHEN (SELECT consume_count FROM app) > s.favorite_app_consumes
+                THEN (SELECT app_id FROM app)
+                ELSE s.favorite_app_id
+            END,
+            favorite_app_consumes = GREATEST(
+                s.favorite_app_consumes, COALESCE((SELECT consume_count FROM app), 0)
+            ),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE s.user_id = $1
+        RETURNING s.user_id
+    """
+
+
+async def record_ledger_transaction(
+    conn, user_id: UUID, tx_type: str, amount: int, app_id: Optional[UUID] = None
+) -> None:
+    """Fold one new dust_transactions row into the user's stats (call in its transaction)"""
+    # Types without a running total (e.g. transfer) still count as transactions
+    column = TOTAL_COLUMNS.get(tx_type)
+    consume_app_id = app_id if tx_type == "consume" else None
+    args = [user_id, consume_app_id]
+    if column:
+        args.append(abs(amount) if tx_type == "consume" else amount)
+    if not await conn.fetchval(_record_sql(column), *args):
+        await rebuild_ledger_stats(conn, [user_id])
+
+
+async def record_ledger_grants(conn, user_ids: list[UUID], amount: int) -> None:
+    """Fold one grant of amount per user into stats, set-based for bulk grants"""
+    await record_ledger_totals(
+        conn, "grant", dict.fromkeys(user_ids, amount), dict.fromkeys(user_ids, 1)
+    )
+
+
+async def record_ledger_totals(
+    conn, tx_type: str, amounts: dict[UUID, int], counts: dict[UUID, int]
+) -> None:
+    """
+    Fold several new transactions of one type per user into stats in one statement.
+
+    amounts is each user's summed amount and counts their number of new rows. Consumes
+    also feed per-app counts, so they go through record_ledger_transaction instead.
+    """
+    if tx_type == "consume":
+        raise ValueError("consumes must be recorded with record_ledger_transaction")
+    if not amounts:
+        return
+
+    column = TOTAL_COLUMNS.get(tx_type)
+    total = f"{column} = s.{column} + t.amount," if column else ""
+    user_ids = sorted(amounts)
+    updated = await conn.fetch(
+        f"""
+        UPDATE user_ledger_stats s
+        SET {total}
+            transaction_count = s.transaction_count + t.count,
+            first_transaction = COALESCE(s.first_transaction, CURRENT_TIMESTAMP),
+            last_transaction = CURRENT_TIMESTAMP,
+            updated_at = CURRENT_TIMESTAMP
+        FROM unnest($1::uuid[], $2::bigint[], $3::bigint[]) AS t(user_id, amount, count)
+        WHERE s.user_id = t.user_id
+        RETURNING s.user_id
+        """,
+        user_ids,
+        [amounts[user_id] for user_id in user_ids],
+        [counts[user_id] for user_id in user_ids],
+    )
+    seen = {row["user_id"] for row in updated}
+    missing = [user_id for user_id in user_ids if user_id not in seen]
+    if missing:
+        await rebuild_ledger_stats(conn, missing)
+
+
+async def rebuild_ledger_stats(conn, user_ids: Iterable[UUID]) -> None:
+    """Recompute stats rows for users from dust_transactions"""
+    user_ids = list(user_ids)
+    await conn.execute(
+        "DELETE FROM user_ledger_app_stats WHERE user_id = ANY($1::uuid[])", user_ids
+    )
+    await conn.execute(
+        f"INSERT INTO user_ledger_app_stats (user_id, app_id, consume_count) {APP_AGGREGATE_SQL}",
+        user_ids,
+    )
+    await conn.execute(
+        f"""
+        INSERT INTO user_ledger_stats (
+            user_id, total_granted, total_consumed, total_purchased, total_refunded,
+            transaction_count, first_transaction, last_transaction,
+            favorite_app_id, favorite_app_consumes
+        )
+        SELECT agg.*, fav.app_id, COALESCE(fav.consume_count, 0)
+        FROM ({AGGREGATE_SQL}) agg
+        {FAVORITE_APP_SQL}
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_granted = EXCLUDED.total_granted,
+            total_consumed = EXCLUDED.total_consumed,
+            total_purchased = EXCLUDED.total_purchased,
+            total_refunded = EXCLUDED.total_refunded,
+            transaction_count = EXCLUDED.transaction_count,
+            first_transaction = EXCLUDED.first_transaction,
+            last_transaction = EXCLUDED.last_transaction,
+            favorite_app_id = EXCLUDED.favorite_app_id,
+            favorite_app_consumes = EXCLUDED.favorite_app_consumes,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        user_ids,
+    )
+
+
+async def _rebuild_locked(db: Database, user_ids: list[UUID]) -> None:
+    """Rebuild users' stats while holding their row locks so no ledger write interleaves"""
+    async with db.transaction() as conn:
+        await conn.execute(
+            "SELECT 1 FROM users WHERE id = ANY($1::uuid[]) ORDER BY id FOR UPDATE", user_ids
+        )
+        await rebuild_ledger_stats(conn, user_ids)
+
+
+async def get_ledger_stats(db: Database, user_id: UUID) -> Optional[dict[str, Any]]:
+    """
+    A user's stats row; users not backfilled yet are rebuilt on the spot.
+
+    Returns None for users without any transactions.
+    """
+    query = f"SELECT user_id, {', '.join(STAT_FIELDS)} FROM user_ledger_stats WHERE user_id = $1"
+    stats = await db.fetch_one(query, user_id)
+    if stats is None and await db.fetch_one(
+        "SELECT 1 FROM dust_transactions WHERE user_id = $1 LIMIT 1", user_id
+    ):
+        await _rebuild_locked(db, [user_id])
+        stats = await db.fetch_one(query, user_id)
+    return stats
+
+
+async def backfill_ledger_stats(db: Database, batch_size: int = 500) -> int:
+    """
+    Build stats rows for every user with transactions but no stats row yet.
+
+    Walks users in id order one batch per transaction, so it can be interrupted and
+    re-run at any time. Returns the number of users backfilled.
+    """
+    backfilled = 0
+    last_id = None
+    while True:
+        rows = await db.fetch_all(
+            """
+            SELECT u.id FROM users u
+            WHERE ($1::uuid IS NULL OR u.id > $1)
+              AND NOT EXISTS (SELECT 1 FROM user_ledger_stats s WHERE s.user_id = u.id)
+              AND EXISTS (SELECT 1 FROM dust_transactions t WHERE t.user_id = u.id)
+            ORDER BY u.id
+            LIMIT $2
+            """,
+            last_id,
+            batch_size,
+        )
+        if not rows:
+            break
+
+        user_ids = [row["id"] for row in rows]
+        await _rebuild_locked(db, user_ids)
+        backfilled += len(user_ids)
+        last_id = user_ids[-1]
+
+    if backfilled:
+        logger.info(f"Backfilled ledger stats for {backfilled} users")
+    return backfilled
+
+
+async def check_ledger_stats(
+    db: Database,
+    user_ids: Optional[list[UUID]] = None,
+    sample_size: int = 200,
+    repair: bool = False,
+) -> list[dict[str, Any]]:
+    """
+    Compare stored stats with a fresh aggregation of dust_transactions.
+
+    Checks the given users, or the most recently active sample_size users. Returns one
+    entry per user whose stored row differs ({"user_id", "stored", "actual"}); with
+    repair=True those users are rebuilt.
+    """
+    if user_ids is None:
+        rows = await db.fetch_all(
+            "SELECT user_id FROM user_ledger_stats ORDER BY last_transaction DESC LIMIT $1",
+            sample_size,
+        )
+        user_ids = [row["user_id"] for row in rows]
+    if not user_ids:
+        return []
+
+    stored = {
+        row["user_id"]: row
+        for row in await db.fetch_all(
+            f"""
+            SELECT user_id, {", ".join(STAT_FIELDS)}, favorite_app_consumes
+            FROM user_ledger_stats WHERE user_id = ANY($1::uuid[])
+            """,
+            user_ids,
+        )
+    }
+    actual = {
+        row["user_id"]: row
+        for row in await db.fetch_all(
+            f"""
+            SELECT agg.*, fav.consume_count AS favorite_app_consumes
+            FROM ({AGGREGATE_SQL}) agg
+            LEFT JOIN LATERAL (
+                SELECT COUNT(*) AS consume_count
+                FROM dust_transactions t
+                WHERE t.user_id = agg.user_id AND t.type = 'consume' AND t.app_id IS NOT NULL
+                GROUP BY t.app_id
+                ORDER BY consume_count DESC
+                LIMIT 1
+            ) fav ON TRUE
+            """,
+            user_ids,
+        )
+    }
+
+    mismatches = []
+    for user_id in user_ids:
+        have, want = stored.get(user_id), actual.get(user_id)
+        if have is None and want is None:
+            continue
+        if have is not None and want is not None and _stats_match(have, want):
+            continue
+        mismatches.append({"user_id": user_id, "stored": have, "actual": want})
+
+    if mismatches:
+        logger.warning(f"Ledger stats drift for {len(mismatches)} of {len(user_ids)} users")
+        if repair:
+            await _rebuild_locked(db, [entry["user_id"] for entry in mismatches])
+    return mismatches
+
+
+def _stats_match(stored: dict[str, Any], actual: dict[str, Any]) -> bool:
+    """Stored totals equal the aggregation (the favorite app only has to tie on count)"""
+    for field in STAT_FIELDS:
+        if field != "favorite_app_id" and stored[field] != actual[field]:
+            return False
+    return (stored["favorite_app_consumes"] or 0) == (actual["favorite_app_consumes"] or 0)
@@ -13,6 +13,42 @@ from uuid import UUID
 import httpx
 
 from shared.llm_pricing import calculate_llm_cost
+from shared.system_config import system_config
+
+# Used when the admin has configured no global fallbacks
+DEFAULT_GLOBAL_FALLBACKS = [
+    ("anthropic", "claude-3-5-sonnet-20241022"),
+    ("openai", "gpt-4o"),
+]
+
+
+def global_fallbacks_from_config(config: dict[str, str]) -> list[tuple[str, str]]:
+    """
+    (provider, model) pairs from the admin's llm_* system_config keys: the primary model,
+    then llm_fallback_N_provider/llm_fallback_N_model in order of N. Unset primary keys
+    default as in the admin's /api/global-fallbacks.
+    """
+    if not config:
+        return list(DEFAULT_GLOBAL_FALLBACKS)
+
+    fallbacks = []
+    default_provider, default_model = DEFAULT_GLOBAL_FALLBACKS[0]
+    primary_provider = config.get("llm_primary_provider", default_provider)
+    primary_model = config.get("llm_primary_model", default_model)
+    if primary_provider and primary_model:
+        fallbacks.append((primary_provider, primary_model))
+
+    numbered: dict[str, dict[str, str]] = {}
+    for key, value in config.items():
+        parts = key.split("_")
+        if key.startswith("llm_fallback_") and len(parts) >= 4:
+            numbered.setdefault(parts[2], {})[parts[3]] = value
+    for number in sorted(numbered):
+        fallback = numbered[number]
+        if fallback.get("provider") and fallback.get("model"):
+            fallbacks.append((fallback["provider"], fallback["model"]))
+
+    return fallbacks
 
 
 class LLMError(Exception):
@@ -273,6 +309,10 @@ class LLMClient:
         """Get global fallback models from admin configuration with caching"""
         import time
 
+        # Services running SystemConfig read the admin configuration from memory
+        if system_config.loaded:
+            return global_fallbacks_from_config(system_config.with_prefix("llm_"))
+
         # Check cache validity
         current_time = time.time()
         if (
@@ -323,10 +363,7 @@ class LLMClient:
                 return self._global_fallbacks_cache
 
         # Hardcoded emergency fallbacks only if admin service is unreachable AND no cache
-        return [
-            ("anthropic", "claude-3-5-sonnet-20241022"),
-            ("openai", "gpt-4o"),
-        ]
+        return list(DEFAULT_GLOBAL_FALLBACKS)
 
     async def _make_api_call(
         self, provider: str, model_id: str, prompt: str, parameters: dict
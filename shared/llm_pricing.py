@@ -11,6 +11,8 @@ import os
 from enum import Enum
 from typing import Optional
 
+from shared.system_config import system_config
+
 logger = logging.getLogger(__name__)
 
 
@@ -83,6 +85,10 @@ async def load_pricing_from_db():
     global _pricing_cache, _cache_timestamp
     import time
 
+    # Services running SystemConfig already hold the current pricing
+    if system_config.loaded:
+        return system_config.get("model_pricing") or PRICING_CONFIG
+
     current_time = time.time()
 
     # Check cache validity
@@ -133,6 +139,9 @@ def get_pricing_config():
     """Get current pricing configuration (sync version for non-async contexts)"""
     global _pricing_cache, _sync_fallback_warned
 
+    if system_config.loaded:
+        return system_config.get("model_pricing") or PRICING_CONFIG
+
     if _pricing_cache is not None:
         return _pricing_cache
 
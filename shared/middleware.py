@@ -4,12 +4,16 @@ Centralized middleware for the fairydust platform.
 Provides consistent request validation, error handling, and security across all services.
 """
 
+import functools
+import hashlib
+import inspect
 import logging
 import time
 from collections.abc import Callable
 from typing import Any, Optional
 
 from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
@@ -109,7 +113,14 @@ class RequestValidationMiddleware(BaseHTTPMiddleware):
 
     def _should_skip_validation(self, path: str) -> bool:
         """Skip validation for certain paths"""
-        skip_paths = ["/health", "/docs", "/redoc", "/openapi.json", "/favicon.ico"]
+        skip_paths = [
+            "/health",
+            "/metrics",
+            "/docs",
+            "/redoc",
+            "/openapi.json",
+            "/favicon.ico",
+        ]
         return any(path.startswith(skip_path) for skip_path in skip_paths)
 
     def _create_error_response(
@@ -148,9 +159,11 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
         response.headers["X-Service-Name"] = self.service_name
 
-        # Add cache control for API responses
-        if request.url.path.startswith("/api") or "json" in response.headers.get(
-            "content-type", ""
+        # Add cache control for API responses; validated responses (conditional_get) keep
+        # theirs so clients can store them and revalidate
+        content_type = response.headers.get("content-type", "")
+        if "etag" not in response.headers and (
+            request.url.path.startswith("/api") or "json" in content_type
         ):
             response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
             response.headers["Pragma"] = "no-cache"
@@ -204,6 +217,105 @@ class RequestSizeValidationMiddleware(BaseHTTPMiddleware):
         return await call_next(request)
 
 
+# Conditional GET: routes opted in with @conditional_get send a strong ETag and answer a
+# matching If-None-Match with 304 Not Modified and no body
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+
+def strong_etag(data: bytes) -> str:
+    """A strong ETag for a representation (or a version string identifying one)"""
+    return f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison, as the RFC says)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str, cache_control: str = CONDITIONAL_CACHE_CONTROL) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def conditional_get(
+    version: Optional[Callable[..., Any]] = None,
+    cache_control: str = CONDITIONAL_CACHE_CONTROL,
+):
+    """
+    Opt a GET route in to ETag validation.
+
+    Without ``version`` the ETag is a hash of the serialized body: the route runs, its
+    result is serialized once, and a client that already has it gets a 304 instead of
+    the body. A route may return a ready JSON ``Response`` (e.g. a cached JSON string)
+    to skip serialization.
+
+    ``version`` is called with the route's keyword arguments (sync or async) and returns
+    a string identifying the representation, such as a version column, or None to fall
+    back to the body hash. A matching client gets its 304 before the route runs.
+
+    Apply below the router decorator:
+
+        @router.get("/config")
+        @conditional_get()
+        async def get_config(): ...
+    """
+
+    def decorator(endpoint: Callable) -> Callable:
+        signature = inspect.signature(endpoint)
+        request_param = next(
+            (name for name, p in signature.parameters.items() if p.annotation is Request),
+            None,
+        )
+        parameters = list(signature.parameters.values())
+        if request_param is None:
+            parameters.append(
+                inspect.Parameter(
+                    "conditional_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request
+                )
+            )
+
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            request = kwargs[request_param] if request_param else kwargs.pop("conditional_request")
+            if_none_match = request.headers.get("if-none-match")
+
+            etag = None
+            if version is not None:
+                current = version(**kwargs)
+                if inspect.isawaitable(current):
+                    current = await current
+                if current is not None:
+                    etag = strong_etag(f"{request.url.path}?{request.url.query}:{current}".encode())
+                    if etag_matches(if_none_match, etag):
+                        return not_modified(etag, cache_control)
+
+            result = endpoint(**kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+
+            if isinstance(result, Response):
+                # Errors and non-buffered responses pass through unvalidated
+                if result.status_code != 200 or not hasattr(result, "body"):
+                    return result
+                response = result
+            else:
+                response = JSONResponse(content=jsonable_encoder(result))
+
+            etag = etag or strong_etag(response.body)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag, cache_control)
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = cache_control
+            return response
+
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        return wrapper
+
+    return decorator
+
+
 def create_standard_error_handler():
     """
     Create standardized error handlers for FastAPI apps
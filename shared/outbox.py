@@ -0,0 +1,274 @@
+# shared/outbox.py
+"""
+Transactional outbox for outbound webhooks and notifications.
+
+Writers call enqueue_event() on the connection of the transaction that changes the data,
+so an event exists exactly when the change commits: a slow receiver adds nothing to the
+request and a failing one loses nothing. OutboxDispatcher delivers due events in the
+background: claimed in batches with SKIP LOCKED under a lease (so several replicas can
+dispatch and a crashed one's events come back), delivered under a per-destination
+concurrency limit, retried with exponential backoff and parked as failed after the
+destination's max attempts.
+
+Events with a dedup_key are recorded at most once per destination. Events with a
+coalesce_key (e.g. user.updated per user) are folded together: every pending event for
+the key is claimed with the first one due and delivered once, built by the
+destination's merge().
+"""
+
+import asyncio
+import json
+import logging
+import os
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from uuid import UUID
+
+from shared.database import Database
+from shared.uuid_utils import generate_uuid7
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+
+# Claimed events are retried by any dispatcher if not settled within the lease
+CLAIM_LEASE_SECONDS = 120
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+# Delivered events are kept this long for inspection; payloads can hold contact details
+DELIVERED_RETENTION = timedelta(days=3)
+
+# Claims the due events for the given destinations, plus every other pending event that
+# shares a coalesce key with one of them. $1 batch size, $2 lease seconds, $3 destinations.
+CLAIM_SQL = """
+    WITH due AS (
+        SELECT id, destination, coalesce_key FROM outbox_events
+        WHERE status IN ('pending', 'delivering')
+          AND next_attempt_at <= CURRENT_TIMESTAMP
+          AND destination = ANY($3::text[])
+        ORDER BY next_attempt_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    ),
+    folded AS (
+        SELECT o.id FROM outbox_events o
+        JOIN (SELECT DISTINCT destination, coalesce_key FROM due) k
+            ON o.destination = k.destination AND o.coalesce_key = k.coalesce_key
+        WHERE o.status = 'pending' AND o.id NOT IN (SELECT id FROM due)
+        FOR UPDATE OF o SKIP LOCKED
+    )
+    UPDATE outbox_events o
+    SET status = 'delivering',
+        attempts = o.attempts + 1,
+        next_attempt_at = CURRENT_TIMESTAMP + $2::int * INTERVAL '1 second'
+    WHERE o.id IN (SELECT id FROM due UNION ALL SELECT id FROM folded)
+    RETURNING o.id, o.destination, o.event_type, o.aggregate_id, o.payload,
+              o.coalesce_key, o.attempts, o.created_at
+"""
+
+# Settles claimed events: delivered, back to pending after a delay, or failed.
+# $1 ids, $2 statuses, $3 retry delays (seconds), $4 errors.
+SETTLE_SQL = """
+    UPDATE outbox_events o
+    SET status = r.status,
+        next_attempt_at = CURRENT_TIMESTAMP + r.delay * INTERVAL '1 second',
+        delivered_at = CASE WHEN r.status = 'delivered' THEN CURRENT_TIMESTAMP END,
+        last_error = r.error
+    FROM unnest($1::uuid[], $2::text[], $3::float8[], $4::text[]) AS r(id, status, delay, error)
+    WHERE o.id = r.id
+"""
+
+
+@dataclass
+class OutboxEvent:
+    id: UUID
+    destination: str
+    event_type: str
+    payload: dict[str, Any]
+    aggregate_id: Optional[UUID] = None
+    attempts: int = 0
+    created_at: Optional[datetime] = None
+
+
+@dataclass(frozen=True)
+class OutboxDestination:
+    """
+    Where events go. deliver() raises on failure; merge() folds the payloads of
+    coalesced events (oldest first) into one, defaulting to the latest.
+    """
+
+    name: str
+    deliver: Callable[[OutboxEvent], Awaitable[None]]
+    concurrency: int = 4
+    max_attempts: int = 10
+    timeout: float = 10.0
+    merge: Optional[Callable[[list[dict[str, Any]]], dict[str, Any]]] = None
+
+
+async def enqueue_event(
+    conn,
+    destination: str,
+    event_type: str,
+    payload: dict[str, Any],
+    aggregate_id: Optional[UUID] = None,
+    dedup_key: Optional[str] = None,
+    coalesce_key: Optional[str] = None,
+    delay_seconds: float = 0,
+) -> None:
+    """
+    Record an event in the caller's transaction (an asyncpg connection or Database).
+
+    delay_seconds holds the event back, giving later events with the same coalesce_key
+    a chance to be folded into the same delivery.
+    """
+    await conn.execute(
+        """
+        INSERT INTO outbox_events (
+            id, destination, event_type, aggregate_id, payload, dedup_key, coalesce_key,
+            next_attempt_at
+        ) VALUES ($1, $2, $3, $4, $5, $6, $7, CURRENT_TIMESTAMP + $8 * INTERVAL '1 second')
+        ON CONFLICT (destination, dedup_key) WHERE dedup_key IS NOT NULL DO NOTHING
+        """,
+        generate_uuid7(),
+        destination,
+        event_type,
+        aggregate_id,
+        json.dumps(payload, default=str),
+        dedup_key,
+        coalesce_key,
+        float(delay_seconds),
+    )
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff after the given number of failed attempts"""
+    return min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS)
+
+
+class OutboxDispatcher:
+    """Delivers outbox events for a set of destinations"""
+
+    def __init__(
+        self,
+        db: Database,
+        destinations: Iterable[OutboxDestination],
+        batch_size: int = OUTBOX_BATCH_SIZE,
+    ):
+        self.db = db
+        self.destinations = {destination.name: destination for destination in destinations}
+        self.batch_size = batch_size
+        self._limits = {
+            name: asyncio.Semaphore(destination.concurrency)
+            for name, destination in self.destinations.items()
+        }
+
+    async def dispatch(self) -> dict[str, int]:
+        """Claim, deliver and settle one batch; returns counts for the batch"""
+        async with self.db.transaction() as conn:
+            rows = await conn.fetch(
+                CLAIM_SQL, self.batch_size, CLAIM_LEASE_SECONDS, list(self.destinations)
+            )
+
+        counts = {"claimed": len(rows), "delivered": 0, "coalesced": 0, "retried": 0, "failed": 0}
+        if not rows:
+            return counts
+
+        # One delivery per coalesce key (or per event), events oldest first
+        groups: dict[tuple, list[OutboxEvent]] = {}
+        for row in sorted(rows, key=lambda row: (row["created_at"], row["id"])):
+            payload = row["payload"]
+            event = OutboxEvent(
+                id=row["id"],
+                destination=row["destination"],
+                event_type=row["event_type"],
+                payload=json.loads(payload) if isinstance(payload, str) else payload,
+                aggregate_id=row["aggregate_id"],
+                attempts=row["attempts"],
+                created_at=row["created_at"],
+            )
+            key = (event.destination, row["coalesce_key"] or event.id)
+            groups.setdefault(key, []).append(event)
+
+        errors = await asyncio.gather(*(self._deliver(events) for events in groups.values()))
+
+        ids, statuses, delays, messages = [], [], [], []
+        for events, error in zip(groups.values(), errors, strict=True):
+            destination = self.destinations[events[0].destination]
+            attempts = max(event.attempts for event in events)
+            if error is None:
+                status, delay = "delivered", 0.0
+                counts["delivered"] += 1
+                counts["coalesced"] += len(events) - 1
+            elif attempts >= destination.max_attempts:
+                status, delay = "failed", 0.0
+                counts["failed"] += len(events)
+                logger.error(
+                    f"Outbox {destination.name} gave up on {events[-1].event_type} "
+                    f"{events[-1].id} after {attempts} attempts: {error}"
+                )
+            else:
+                status, delay = "pending", retry_delay(attempts)
+                counts["retried"] += len(events)
+
+            for event in events:
+                ids.append(event.id)
+                statuses.append(status)
+                delays.append(delay)
+                messages.append(error)
+
+        await self.db.execute(SETTLE_SQL, ids, statuses, delays, messages)
+        return counts
+
+    async def _deliver(self, events: list[OutboxEvent]) -> Optional[str]:
+        """Deliver a group as one event; returns the error, if any"""
+        destination = self.destinations[events[0].destination]
+        event = events[-1]
+        if len(events) > 1:
+            payloads = [e.payload for e in events]
+            merged = destination.merge(payloads) if destination.merge else payloads[-1]
+            event = OutboxEvent(**{**event.__dict__, "payload": merged})
+
+        async with self._limits[destination.name]:
+            try:
+                await asyncio.wait_for(destination.deliver(event), destination.timeout)
+                return None
+            except asyncio.TimeoutError:
+                return f"Timed out after {destination.timeout}s"
+            except Exception as e:
+                return str(e) or type(e).__name__
+
+    async def purge_delivered(self, older_than: timedelta = DELIVERED_RETENTION) -> int:
+        """Delete delivered events past retention; returns how many"""
+        status = await self.db.execute(
+            """
+            DELETE FROM outbox_events
+            WHERE status = 'delivered' AND delivered_at < CURRENT_TIMESTAMP - $1::interval
+            """,
+            older_than,
+        )
+        return int(status.split()[-1])
+
+    async def run(self, shutdown: asyncio.Event) -> None:
+        """Dispatch until shutdown, draining full batches back to back"""
+        while not shutdown.is_set():
+            try:
+                counts = await self.dispatch()
+                if counts["retried"] or counts["failed"]:
+                    logger.warning(
+                        f"Outbox batch: {counts['delivered']} delivered, "
+                        f"{counts['retried']} to retry, {counts['failed']} failed"
+                    )
+                if counts["claimed"] >= self.batch_size:
+                    continue
+            except Exception as e:
+                logger.error(f"Outbox dispatch failed: {e}")
+
+            try:
+                await asyncio.wait_for(shutdown.wait(), OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
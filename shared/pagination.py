@@ -0,0 +1,102 @@
+# shared/pagination.py
+"""
+Keyset (cursor) pagination for history lists.
+
+Lists are ordered newest first (optionally favorites first) with the row id as a final
+tie-breaker; ids are UUIDv7 so they sort with creation time. A cursor encodes the sort
+key of the last row on a page, and the next page starts with a single row comparison
+``(cols) < (values)`` that a matching composite index serves directly, instead of
+scanning and discarding OFFSET rows.
+
+Cursors are opaque URL-safe strings; clients pass ``next_cursor`` back unchanged.
+"""
+
+import base64
+import json
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+
+# Standard orderings (all columns DESC)
+NEWEST_FIRST = ("created_at", "id")
+FAVORITES_FIRST = ("is_favorited", "created_at", "id")
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"d": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"u": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "d" in value:
+            return datetime.fromisoformat(value["d"])
+        if "u" in value:
+            return UUID(value["u"])
+        raise ValueError("Unknown cursor value")
+    return value
+
+
+def _row_value(row: Any, column: str) -> Any:
+    try:
+        return row[column]
+    except TypeError:
+        return getattr(row, column)
+
+
+def encode_cursor(columns: Sequence[str], values: Sequence[Any]) -> str:
+    """Encode the sort key of a row as an opaque cursor"""
+    payload = {"k": ",".join(columns), "v": [_encode_value(value) for value in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[str]) -> list[Any]:
+    """Decode a cursor for the given ordering, rejecting malformed or foreign cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["k"] != ",".join(columns) or len(payload["v"]) != len(columns):
+            raise ValueError("Cursor does not match this list")
+        return [_decode_value(value) for value in payload["v"]]
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor") from e
+
+
+def keyset_condition(columns: Sequence[str], cursor: str, params: list) -> str:
+    """
+    SQL condition selecting rows after the cursor for a DESC ordering on columns.
+
+    Appends the cursor values to params and returns e.g.
+    ``(created_at, id) < ($2, $3)``.
+    """
+    values = decode_cursor(cursor, columns)
+    placeholders = []
+    for value in values:
+        params.append(value)
+        placeholders.append(f"${len(params)}")
+    return f"({', '.join(columns)}) < ({', '.join(placeholders)})"
+
+
+def order_by(columns: Sequence[str]) -> str:
+    """ORDER BY clause matching keyset_condition"""
+    return "ORDER BY " + ", ".join(f"{column} DESC" for column in columns)
+
+
+def paginate(rows: list, limit: int, columns: Sequence[str]) -> tuple[list, Optional[str]]:
+    """
+    Trim a limit+1 fetch to one page and build the cursor for the next page.
+
+    next_cursor is None on the last page.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(columns, [_row_value(last, column) for column in columns])
@@ -0,0 +1,350 @@
+# shared/partitioning.py
+"""
+Monthly range partitioning for the append-only log tables.
+
+dust_transactions and ai_usage_logs are partitioned by created_at into one partition
+per calendar month (UTC) named <table>_pYYYYMM, plus a <table>_default partition that
+only catches rows no monthly partition covers. maintain_partitions() keeps the next
+months created ahead of time and applies retention by detaching (or dropping)
+partitions that lie entirely before the retention window, so old data leaves without
+a DELETE.
+
+Deployments that created these tables unpartitioned are converted in place by
+convert_to_partitioned() (see scripts/partition_tables.py): the old table becomes a
+single <table>_legacy partition covering everything before next month.
+"""
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from shared.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Monthly partitions kept created beyond the current month
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+# What retention does with expired partitions: "detach" keeps them as plain tables for
+# archiving, "drop" deletes them
+PARTITION_RETENTION_ACTION = os.getenv("PARTITION_RETENTION_ACTION", "detach")
+
+# Advisory lock key so only one service replica runs partition maintenance at a time
+PARTITION_LOCK_KEY = 730_003
+
+
+def _retention_months(env_var: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(env_var)
+    return int(value) if value else default
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    name: str
+    # Months of partitions kept before the current month; None keeps everything
+    retention_months: Optional[int]
+
+
+PARTITIONED_TABLES = (
+    # Balance checkpoints and ledger stats are rebuilt from full history, so the ledger
+    # keeps everything unless retention is configured explicitly
+    PartitionedTable(
+        "dust_transactions", _retention_months("DUST_TRANSACTIONS_RETENTION_MONTHS", None)
+    ),
+    # Older usage stays available through the hourly/daily rollups
+    PartitionedTable("ai_usage_logs", _retention_months("AI_USAGE_LOGS_RETENTION_MONTHS", 13)),
+)
+
+_BOUND_RE = re.compile(r"FROM \((?:'([^']+)'|MINVALUE)\) TO \((?:'([^']+)'|MAXVALUE)\)")
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    # None for MINVALUE/MAXVALUE; both None for the DEFAULT partition
+    lower: Optional[datetime]
+    upper: Optional[datetime]
+    is_default: bool = False
+
+    def covers(self, month: datetime) -> bool:
+        if self.is_default:
+            return False
+        return (self.lower is None or self.lower <= month) and (
+            self.upper is None or month < self.upper
+        )
+
+
+def month_start(value: datetime) -> datetime:
+    """First instant of value's month in UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def _parse_bound_value(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    # Postgres prints offsets as +00; fromisoformat wants +00:00
+    if re.search(r"[+-]\d\d$", value):
+        value += ":00"
+    return datetime.fromisoformat(value)
+
+
+def parse_partition_bound(name: str, bound: str) -> Partition:
+    """Partition from its pg_get_expr(relpartbound) text"""
+    if bound.strip().upper() == "DEFAULT":
+        return Partition(name, None, None, is_default=True)
+    match = _BOUND_RE.search(bound)
+    if not match:
+        raise ValueError(f"Unsupported partition bound for {name}: {bound}")
+    return Partition(name, _parse_bound_value(match.group(1)), _parse_bound_value(match.group(2)))
+
+
+async def is_partitioned(db: Database, table: str) -> bool:
+    row = await db.fetch_one(
+        "SELECT c.relkind = 'p' AS partitioned FROM pg_class c WHERE c.oid = to_regclass($1)",
+        table,
+    )
+    return bool(row and row["partitioned"])
+
+
+async def list_partitions(db: Database, table: str) -> list[Partition]:
+    rows = await db.fetch_all(
+        """
+        SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass($1)
+        ORDER BY c.relname
+        """,
+        table,
+    )
+    return [parse_partition_bound(row["name"], row["bound"]) for row in rows]
+
+
+def months_to_create(
+    partitions: list[Partition], now: datetime, months_ahead: int = PARTITION_MONTHS_AHEAD
+) -> list[datetime]:
+    """Months from the current one through months_ahead that no partition covers yet"""
+    first = month_start(now)
+    months = [add_months(first, offset) for offset in range(months_ahead + 1)]
+    return [month for month in months if not any(p.covers(month) for p in partitions)]
+
+
+def expired_partitions(
+    partitions: list[Partition], now: datetime, retention_months: int
+) -> list[Partition]:
+    """Partitions whose whole range is older than the retention window"""
+    cutoff = add_months(month_start(now), -retention_months)
+    return [p for p in partitions if p.upper is not None and p.upper <= cutoff]
+
+
+async def ensure_partitions(
+    db: Database,
+    table: str,
+    now: Optional[datetime] = None,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+) -> list[str]:
+    """Create the default partition and upcoming monthly partitions; returns created names"""
+    if not await is_partitioned(db, table):
+        return []
+
+    now = now or datetime.now(timezone.utc)
+    await db.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+
+    created = []
+    for month in months_to_create(await list_partitions(db, table), now, months_ahead):
+        name = partition_name(table, month)
+        try:
+            await db.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table}
+                FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')
+                """
+            )
+            created.append(name)
+        except Exception as e:
+            # Typically rows for this month already landed in the default partition
+            logger.error(f"Could not create partition {name}: {e}")
+    if created:
+        logger.info(f"Created partitions {', '.join(created)}")
+    return created
+
+
+async def apply_retention(
+    db: Database,
+    table: str,
+    retention_months: int,
+    now: Optional[datetime] = None,
+    action: str = PARTITION_RETENTION_ACTION,
+) -> list[str]:
+    """Detach (and with action="drop", drop) expired partitions; returns their names"""
+    now = now or datetime.now(timezone.utc)
+    removed = []
+    for partition in expired_partitions(await list_partitions(db, table), now, retention_months):
+        await db.execute(f"ALTER TABLE {table} DETACH PARTITION {partition.name}")
+        if action == "drop":
+            await db.execute(f"DROP TABLE {partition.name}")
+        removed.append(partition.name)
+        logger.info(f"Retention: {action} partition {partition.name} of {table}")
+    return removed
+
+
+async def maintain_partitions(db: Database, now: Optional[datetime] = None) -> dict[str, Any]:
+    """Create upcoming partitions and apply retention for every partitioned table"""
+    summary: dict[str, Any] = {}
+    async with db.connection() as session:
+        lock = await session.fetch_one(
+            "SELECT pg_try_advisory_lock($1) AS locked", PARTITION_LOCK_KEY
+        )
+        if not lock["locked"]:
+            return summary
+
+        try:
+            for table in PARTITIONED_TABLES:
+                if not await is_partitioned(session, table.name):
+                    continue
+                summary[table.name] = {
+                    "created": await ensure_partitions(session, table.name, now),
+                    "removed": (
+                        await apply_retention(session, table.name, table.retention_months, now)
+                        if table.retention_months is not None
+                        else []
+                    ),
+                }
+        finally:
+            await session.execute("SELECT pg_advisory_unlock($1)", PARTITION_LOCK_KEY)
+    return summary
+
+
+async def convert_to_partitioned(db: Database, table: str, now: Optional[datetime] = None) -> bool:
+    """
+    Turn an unpartitioned table into a monthly partitioned one in place.
+
+    The existing table is renamed to <table>_legacy and attached as the partition for
+    everything before next month, keeping its data and indexes. Holds an exclusive
+    lock on the table while it validates the legacy range, so run it off-peak.
+    Returns False if the table is already partitioned.
+    """
+    if await is_partitioned(db, table):
+        return False
+
+    now = now or datetime.now(timezone.utc)
+    boundary = add_months(month_start(now), 1).isoformat()
+    legacy = f"{table}_legacy"
+
+    async with db.transaction() as conn:
+        await conn.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+
+        indexes = await conn.fetch(
+            """
+            SELECT i.relname AS name, pg_get_indexdef(i.oid) AS definition, x.indisunique
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = to_regclass($1)
+            """,
+            table,
+        )
+        foreign_keys = await conn.fetch(
+            """
+            SELECT conname, pg_get_constraintdef(oid) AS definition
+            FROM pg_constraint
+            WHERE conrelid = to_regclass($1) AND contype = 'f'
+            """,
+            table,
+        )
+        triggers = await conn.fetch(
+            """
+            SELECT tgname, pg_get_triggerdef(oid) AS definition
+            FROM pg_trigger
+            WHERE tgrelid = to_regclass($1) AND NOT tgisinternal
+            """,
+            table,
+        )
+        # Views bind to the table itself, so they would follow it to <table>_legacy
+        views = await conn.fetch(
+            """
+            SELECT DISTINCT v.oid::regclass::text AS name, pg_get_viewdef(v.oid) AS definition
+            FROM pg_depend d
+            JOIN pg_rewrite r ON r.oid = d.objid
+            JOIN pg_class v ON v.oid = r.ev_class
+            WHERE d.refobjid = to_regclass($1) AND v.oid <> d.refobjid
+            """,
+            table,
+        )
+
+        # Move the old table and its index names out of the way
+        for trigger in triggers:
+            await conn.execute(f"DROP TRIGGER {trigger['tgname']} ON {table}")
+        await conn.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        for index in indexes:
+            await conn.execute(f"ALTER INDEX {index['name']} RENAME TO {index['name']}_legacy")
+
+        await conn.execute(
+            f"UPDATE {legacy} SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL"
+        )
+        await conn.execute(f"ALTER TABLE {legacy} ALTER COLUMN created_at SET NOT NULL")
+
+        # New partitioned parent with the same columns, defaults and checks
+        await conn.execute(
+            f"""
+            CREATE TABLE {table} (
+                LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE
+            ) PARTITION BY RANGE (created_at)
+            """
+        )
+        await conn.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)")
+        for fk in foreign_keys:
+            await conn.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {fk['conname']} {fk['definition']}"
+            )
+
+        # The range check lets ATTACH skip its own validation scan
+        await conn.execute(
+            f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_range CHECK (created_at < '{boundary}')"
+        )
+        await conn.execute(
+            f"""
+            ALTER TABLE {table} ATTACH PARTITION {legacy}
+            FOR VALUES FROM (MINVALUE) TO ('{boundary}')
+            """
+        )
+
+        # Recreate non-unique indexes on the parent; the legacy copies are attached
+        # instead of rebuilt. Uniqueness is the primary key (and, for
+        # dust_transactions, the idempotency key table kept by trigger).
+        for index in indexes:
+            if not index["indisunique"]:
+                await conn.execute(index["definition"])
+        for trigger in triggers:
+            await conn.execute(trigger["definition"])
+        for view in views:
+            await conn.execute(f"CREATE OR REPLACE VIEW {view['name']} AS {view['definition']}")
+
+        if table == "dust_transactions":
+            await conn.execute(
+                f"""
+                INSERT INTO dust_transaction_idempotency_keys
+                    (idempotency_key, transaction_id, created_at)
+                SELECT idempotency_key, id, created_at FROM {legacy}
+                WHERE idempotency_key IS NOT NULL
+                ON CONFLICT (idempotency_key) DO NOTHING
+                """
+            )
+
+    await ensure_partitions(db, table, now)
+    logger.info(f"Converted {table} to monthly partitions (legacy data before {boundary})")
+    return True
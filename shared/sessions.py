@@ -0,0 +1,264 @@
+# shared/sessions.py
+"""
+Login sessions and token revocation.
+
+Each login (OTP or OAuth) opens a session: an entry in the user's sessions:{user_id}
+hash holding the device and a hash of the session's refresh token, so a user can be
+signed in on several devices at once and refreshing on one doesn't sign out another.
+Tokens carry the session id (sid) and the user's session version (ver), a counter in
+the same hash.
+
+Revoking a session (logout) removes its entry; revoking a user (sign out everywhere,
+admin deactivation, account deletion) removes every entry and bumps the version. Either
+is published on Redis pub/sub and kept in a sorted set for as long as an access token
+issued before it could still be valid. Every service keeps those revocations in memory
+(RevocationCache), loaded at startup and followed over pub/sub, so checking an access
+token stays a dictionary lookup with no Redis round trip. Refresh checks the session
+hash in Redis, as refresh tokens outlive the in-memory revocations.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "auth_revocations"
+REVOCATIONS_KEY = "auth_revocations"
+
+# Identity's token lifetimes: a revocation has to be remembered as long as an access
+# token issued before it is valid, a session as long as its refresh token
+ACCESS_TOKEN_TTL_SECONDS = 60 * 60
+SESSION_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# Full reload interval, in case a revocation was missed while resubscribing
+RELOAD_SECONDS = 300
+
+SESSION_FIELD_PREFIX = "s:"
+VERSION_FIELD = "v"
+
+# Opens a session, dropping the user's expired ones. Returns the user's session version.
+# KEYS: sessions hash. ARGV: session field, session JSON, TTL, now.
+CREATE_SESSION_SCRIPT = """
+local fields = redis.call('HGETALL', KEYS[1])
+for i = 1, #fields, 2 do
+    if string.sub(fields[i], 1, 2) == 's:' then
+        local ok, session = pcall(cjson.decode, fields[i + 1])
+        if not ok or tonumber(session['expires_at']) < tonumber(ARGV[4]) then
+            redis.call('HDEL', KEYS[1], fields[i])
+        end
+    end
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return tonumber(redis.call('HGET', KEYS[1], 'v') or '0')
+"""
+
+# Ends every session of a user and bumps the version, so tokens issued before are
+# rejected. KEYS: sessions hash, revocations set, legacy refresh token key.
+# ARGV: user id, revocation expiry, channel, session TTL. Returns the new version.
+REVOKE_USER_SCRIPT = """
+local version = redis.call('HINCRBY', KEYS[1], 'v', 1)
+for _, field in ipairs(redis.call('HKEYS', KEYS[1])) do
+    if string.sub(field, 1, 2) == 's:' then
+        redis.call('HDEL', KEYS[1], field)
+    end
+end
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+redis.call('DEL', KEYS[3])
+local member = 'user:' .. ARGV[1] .. ':' .. version
+redis.call('ZADD', KEYS[2], ARGV[2], member)
+redis.call('PUBLISH', ARGV[3], member)
+return version
+"""
+
+
+def sessions_key(user_id) -> str:
+    return f"sessions:{user_id}"
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def create_session(
+    redis,
+    user_id,
+    session_id: str,
+    refresh_token: str,
+    device: Optional[str] = None,
+) -> int:
+    """Open a session; returns the user's session version"""
+    now = time.time()
+    session = {
+        "refresh_hash": _hash_token(refresh_token),
+        "device": (device or "")[:200],
+        "created_at": int(now),
+        "expires_at": int(now + SESSION_TTL_SECONDS),
+    }
+    version = await redis.eval(
+        CREATE_SESSION_SCRIPT,
+        1,
+        sessions_key(user_id),
+        SESSION_FIELD_PREFIX + session_id,
+        json.dumps(session),
+        SESSION_TTL_SECONDS,
+        now,
+    )
+    return int(version)
+
+
+async def check_refresh(redis, user_id, session_id: str, refresh_token: str) -> Optional[int]:
+    """The session version if the refresh token is its session's current one, else None"""
+    session, version = await redis.hmget(
+        sessions_key(user_id), SESSION_FIELD_PREFIX + session_id, VERSION_FIELD
+    )
+    if not session:
+        return None
+    session = json.loads(session)
+    if session["expires_at"] < time.time():
+        return None
+    if session["refresh_hash"] != _hash_token(refresh_token):
+        return None
+    return int(version or 0)
+
+
+async def list_sessions(redis, user_id) -> list[dict[str, Any]]:
+    """The user's open sessions, newest first"""
+    now = time.time()
+    sessions = []
+    for field, value in (await redis.hgetall(sessions_key(user_id))).items():
+        if not field.startswith(SESSION_FIELD_PREFIX):
+            continue
+        session = json.loads(value)
+        if session["expires_at"] >= now:
+            sessions.append(
+                {
+                    "session_id": field[len(SESSION_FIELD_PREFIX) :],
+                    "device": session["device"] or None,
+                    "created_at": session["created_at"],
+                }
+            )
+    return sorted(sessions, key=lambda session: session["created_at"], reverse=True)
+
+
+async def revoke_session(redis, user_id, session_id: str) -> bool:
+    """End one session; returns whether it was open"""
+    member = f"session:{session_id}"
+    pipe = redis.pipeline(transaction=True)
+    pipe.hdel(sessions_key(user_id), SESSION_FIELD_PREFIX + session_id)
+    pipe.zadd(REVOCATIONS_KEY, {member: time.time() + ACCESS_TOKEN_TTL_SECONDS})
+    pipe.publish(REVOCATION_CHANNEL, member)
+    removed, _, _ = await pipe.execute()
+    return bool(removed)
+
+
+async def revoke_user_sessions(redis, user_id) -> int:
+    """End every session of the user, invalidating all their tokens; returns the new version"""
+    return int(
+        await redis.eval(
+            REVOKE_USER_SCRIPT,
+            3,
+            sessions_key(user_id),
+            REVOCATIONS_KEY,
+            f"refresh_token:{user_id}",
+            str(user_id),
+            time.time() + ACCESS_TOKEN_TTL_SECONDS,
+            REVOCATION_CHANNEL,
+            SESSION_TTL_SECONDS,
+        )
+    )
+
+
+class RevocationCache:
+    """Recent revocations held in memory, followed over pub/sub"""
+
+    def __init__(self):
+        # user id -> (lowest valid session version, expiry); session id -> expiry
+        self._versions: dict[str, tuple[int, float]] = {}
+        self._sessions: dict[str, float] = {}
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, user_id: str, session_id: Optional[str], version: int = 0) -> bool:
+        """Whether a token for this user, session and session version has been revoked"""
+        revoked = self._versions.get(user_id)
+        if revoked and version < revoked[0]:
+            return True
+        return session_id is not None and session_id in self._sessions
+
+    def apply(self, member: str, expires_at: float) -> None:
+        kind, _, rest = member.partition(":")
+        if kind == "session":
+            self._sessions[rest] = expires_at
+        elif kind == "user":
+            user_id, _, version = rest.rpartition(":")
+            current = self._versions.get(user_id)
+            if not current or int(version) >= current[0]:
+                self._versions[user_id] = (int(version), expires_at)
+
+    async def load(self, redis) -> None:
+        """Replace the cached revocations with the unexpired ones in Redis"""
+        now = time.time()
+        await redis.zremrangebyscore(REVOCATIONS_KEY, "-inf", now)
+        members = await redis.zrangebyscore(REVOCATIONS_KEY, now, "+inf", withscores=True)
+        self._versions, self._sessions = {}, {}
+        for member, expires_at in members:
+            self.apply(member, expires_at)
+
+    async def start(self, redis) -> None:
+        """Load revocations and start following new ones"""
+        self._redis = redis
+        try:
+            await self.load(redis)
+        except Exception as e:
+            logger.error(f"Failed to load token revocations: {e}")
+        self._task = asyncio.create_task(self._follow())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _follow(self) -> None:
+        """Apply published revocations; resubscribe and reload on loss"""
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                # Loaded after subscribing, so nothing published in between is missed
+                await self.load(self._redis)
+                loaded_at = time.monotonic()
+
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message["type"] == "message":
+                        self.apply(message["data"], time.time() + ACCESS_TOKEN_TTL_SECONDS)
+                    if time.monotonic() - loaded_at > RELOAD_SECONDS:
+                        await self.load(self._redis)
+                        loaded_at = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Token revocation listener failed, resubscribing: {e}")
+                await asyncio.sleep(5)
+            finally:
+                await pubsub.close()
+
+
+# Process-wide revocations, started by services that authenticate users
+revocations = RevocationCache()
+
+
+async def start_revocation_sync(redis) -> None:
+    await revocations.start(redis)
+
+
+async def stop_revocation_sync() -> None:
+    await revocations.stop()
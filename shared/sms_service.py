@@ -1,5 +1,6 @@
 # sms_service.py
 import os
+from typing import Optional
 
 import httpx
 
@@ -9,8 +10,8 @@ TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_FROM_NUMBER = os.getenv("TWILIO_FROM_NUMBER")
 
 
-async def send_sms(to_number: str, message: str):
-    """Send SMS using Twilio"""
+async def send_sms(to_number: str, message: str, client: Optional[httpx.AsyncClient] = None):
+    """Send SMS using Twilio, reusing client's connections when one is given"""
     if not all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER]):
         # Log warning in production
         print(f"SMS not configured. Would send to {to_number}: {message}")
@@ -18,18 +19,24 @@ async def send_sms(to_number: str, message: str):
 
     url = f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Messages.json"
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            url,
-            auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
-            data={"From": TWILIO_FROM_NUMBER, "To": to_number, "Body": message},
-        )
+    request = {
+        "auth": (TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
+        "data": {"From": TWILIO_FROM_NUMBER, "To": to_number, "Body": message},
+    }
+    if client is not None:
+        response = await client.post(url, **request)
+    else:
+        async with httpx.AsyncClient() as one_off:
+            response = await one_off.post(url, **request)
 
-        if response.status_code != 201:
-            raise Exception(f"Failed to send SMS: {response.text}")
+    if response.status_code != 201:
+        raise Exception(f"Failed to send SMS: {response.text}")
+
+
+def otp_sms_content(otp: str) -> str:
+    return f"Your fairydust verification code is: {otp}. Valid for 10 minutes."
 
 
 async def send_otp_sms(phone: str, otp: str):
     """Send OTP verification SMS"""
-    message = f"Your fairydust verification code is: {otp}. Valid for 10 minutes."
-    await send_sms(phone, message)
+    await send_sms(phone, otp_sms_content(otp))
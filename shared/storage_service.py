@@ -1,5 +1,6 @@
 """Cloud storage service for handling file uploads to Cloudflare R2"""
 
+import asyncio
 import os
 import uuid
 from typing import Optional
@@ -63,8 +64,9 @@ class StorageService:
         unique_filename = f"people/{user_id}/{person_id}/{uuid.uuid4()}.{file_extension}"
 
         try:
-            # Upload to R2
-            self.client.put_object(
+            # Upload to R2, off the event loop so uploads can run concurrently
+            await asyncio.to_thread(
+                self.client.put_object,
                 Bucket=self.bucket_name,
                 Key=unique_filename,
                 Body=content,
@@ -101,7 +103,7 @@ class StorageService:
             if not key:
                 return False
 
-            self.client.delete_object(Bucket=self.bucket_name, Key=key)
+            await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket_name, Key=key)
             return True
 
         except ClientError:
@@ -323,83 +325,62 @@ class StorageService:
         except Exception:
             return None
 
+    def _purge_prefix(self, prefix: str) -> tuple[int, list[str]]:
+        """Delete every object under a prefix, a listing page (up to 1000 keys) per request"""
+        deleted = 0
+        errors = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+            if not objects:
+                continue
+
+            response = self.client.delete_objects(
+                Bucket=self.bucket_name, Delete={"Objects": objects, "Quiet": True}
+            )
+            failed = response.get("Errors", [])
+            deleted += len(objects) - len(failed)
+            errors.extend(
+                f"Failed to delete {error['Key']}: {error['Message']}" for error in failed
+            )
+        return deleted, errors
+
     async def delete_user_assets(self, user_id: str) -> dict:
         """
         Delete all storage assets for a user (avatars, people photos, generated images)
 
+        The prefixes are purged in parallel, each with batched DeleteObjects calls.
+
         Args:
             user_id: User's UUID
 
         Returns:
             dict: Summary of deletion results
         """
-        deletion_summary = {
-            "avatars_deleted": 0,
-            "people_photos_deleted": 0,
-            "character_images_deleted": 0,
-            "generated_images_deleted": 0,
-            "total_deleted": 0,
-            "errors": [],
+        # User-specific prefixes to delete, by summary field
+        prefixes = {
+            "avatars_deleted": f"avatars/{user_id}/",
+            "people_photos_deleted": f"people/{user_id}/",
+            "character_images_deleted": f"characters/{user_id}/",
+            "generated_images_deleted": f"generated/{user_id}/",
         }
+        deletion_summary = dict.fromkeys(prefixes, 0)
+        deletion_summary["errors"] = []
 
-        try:
-            # Define user-specific prefixes to delete
-            prefixes_to_delete = [
-                f"avatars/{user_id}/",
-                f"people/{user_id}/",
-                f"characters/{user_id}/",  # Character images
-                f"generated/{user_id}/",  # Generated images if they exist
-            ]
-
-            for prefix in prefixes_to_delete:
-                try:
-                    # List all objects with this prefix
-                    response = self.client.list_objects_v2(Bucket=self.bucket_name, Prefix=prefix)
-
-                    if "Contents" in response:
-                        # Delete objects in batches (R2 supports up to 1000 per batch)
-                        objects_to_delete = []
-                        for obj in response["Contents"]:
-                            objects_to_delete.append({"Key": obj["Key"]})
-
-                            # Track by category
-                            if prefix.startswith("avatars/"):
-                                deletion_summary["avatars_deleted"] += 1
-                            elif prefix.startswith("people/"):
-                                deletion_summary["people_photos_deleted"] += 1
-                            elif prefix.startswith("characters/"):
-                                deletion_summary["character_images_deleted"] += 1
-                            elif prefix.startswith("generated/"):
-                                deletion_summary["generated_images_deleted"] += 1
-
-                        # Batch delete
-                        if objects_to_delete:
-                            delete_response = self.client.delete_objects(
-                                Bucket=self.bucket_name, Delete={"Objects": objects_to_delete}
-                            )
-
-                            # Check for errors in batch delete
-                            if "Errors" in delete_response:
-                                for error in delete_response["Errors"]:
-                                    deletion_summary["errors"].append(
-                                        f"Failed to delete {error['Key']}: {error['Message']}"
-                                    )
-
-                except Exception as e:
-                    deletion_summary["errors"].append(f"Error deleting prefix {prefix}: {str(e)}")
-
-            deletion_summary["total_deleted"] = (
-                deletion_summary["avatars_deleted"]
-                + deletion_summary["people_photos_deleted"]
-                + deletion_summary["character_images_deleted"]
-                + deletion_summary["generated_images_deleted"]
-            )
-
-            return deletion_summary
-
-        except Exception as e:
-            deletion_summary["errors"].append(f"General deletion error: {str(e)}")
-            return deletion_summary
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self._purge_prefix, prefix) for prefix in prefixes.values()),
+            return_exceptions=True,
+        )
+        for (field, prefix), result in zip(prefixes.items(), results, strict=True):
+            if isinstance(result, Exception):
+                deletion_summary["errors"].append(f"Error deleting prefix {prefix}: {result}")
+                continue
+            deleted, errors = result
+            deletion_summary[field] = deleted
+            deletion_summary["errors"].extend(errors)
+
+        deletion_summary["total_deleted"] = sum(deletion_summary[field] for field in prefixes)
+        return deletion_summary
 
 
 # Global instance
@@ -0,0 +1,172 @@
+# shared/system_config.py
+"""
+In-process copy of the system_config table.
+
+SystemConfig loads every key at startup and keeps them current: a trigger on
+system_config calls pg_notify() with the changed key on every insert, update or delete
+(whoever the writer is: the admin config, pricing and global fallback routes or a manual
+fix), and a listening connection re-reads just that key. Reads are dictionary lookups,
+parsed to the key's type once per change. If the listening connection drops, the
+watcher reconnects and reloads everything; a periodic full reload covers anything
+missed in between.
+
+Services that call start_system_config() in their lifespan read config with
+system_config.get(key). Before it has loaded (scripts, tests, a service that doesn't
+start it) get() returns the key's default.
+"""
+
+import asyncio
+import json
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from shared.database import Database
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "system_config_changed"
+
+# Full reload interval, in case a notification was missed while reconnecting
+RELOAD_SECONDS = 300
+
+# Audit snapshots written by the pricing routes; large and never read on hot paths
+EXCLUDED_PREFIXES = ("model_pricing_history_",)
+
+
+@dataclass(frozen=True)
+class ConfigKey:
+    name: str
+    parse: Callable[[str], Any]
+    default: Any = None
+
+
+# Keys read on hot paths, with their types and defaults. Other keys are served as strings.
+CONFIG_KEYS = {
+    key.name: key
+    for key in (
+        ConfigKey("daily_login_bonus_amount", int, 5),
+        ConfigKey("initial_dust_amount", int, 100),
+        ConfigKey("model_pricing", json.loads),
+        ConfigKey("llm_primary_provider", str),
+        ConfigKey("llm_primary_model", str),
+    )
+}
+
+
+def _excluded(key: str) -> bool:
+    return key.startswith(EXCLUDED_PREFIXES)
+
+
+class SystemConfig:
+    """system_config keys and parsed values, kept current by change notifications"""
+
+    def __init__(self, keys: dict[str, ConfigKey] = CONFIG_KEYS):
+        self.keys = keys
+        self.loaded = False
+        self._values: dict[str, Any] = {}
+        self._db: Optional[Database] = None
+        self._task: Optional[asyncio.Task] = None
+        self._changed: asyncio.Queue[Optional[str]] = asyncio.Queue()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Parsed value of a key; the key's default (or default) if unset or unparseable"""
+        if key in self._values:
+            return self._values[key]
+        config_key = self.keys.get(key)
+        return config_key.default if config_key and default is None else default
+
+    def with_prefix(self, prefix: str) -> dict[str, Any]:
+        return {key: value for key, value in self._values.items() if key.startswith(prefix)}
+
+    def _set(self, key: str, raw: Optional[str]) -> None:
+        if raw is None:
+            self._values.pop(key, None)
+            return
+        config_key = self.keys.get(key)
+        if config_key is None:
+            self._values[key] = raw
+            return
+        try:
+            self._values[key] = config_key.parse(raw)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Ignoring unparseable system_config {key}={raw[:100]!r}: {e}")
+            self._values.pop(key, None)
+
+    async def load(self, db: Database) -> None:
+        """Replace all values from the table"""
+        rows = await db.fetch_all("SELECT key, value FROM system_config")
+        self._values = {}
+        for row in rows:
+            if not _excluded(row["key"]):
+                self._set(row["key"], row["value"])
+        self.loaded = True
+
+    async def refresh_key(self, db: Database, key: str) -> None:
+        row = await db.fetch_one("SELECT value FROM system_config WHERE key = $1", key)
+        self._set(key, row["value"] if row else None)
+
+    def _on_notify(self, connection, pid, channel, key) -> None:
+        if not _excluded(key):
+            self._changed.put_nowait(key)
+
+    async def start(self, db: Database) -> None:
+        """Start following changes, returning once the first load has been attempted"""
+        self._db = db
+        self._changed = asyncio.Queue()
+        ready = asyncio.Event()
+        self._task = asyncio.create_task(self._watch(ready))
+        await ready.wait()
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _watch(self, ready: asyncio.Event) -> None:
+        """Hold a LISTEN connection, re-reading changed keys; reload on every (re)connect"""
+        while True:
+            try:
+                async with self._db.pool.acquire() as conn:
+                    await conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                    try:
+                        # Loaded after listening, so a change committed in between isn't missed
+                        await self.load(self._db)
+                        ready.set()
+                        await self._apply_changes(conn)
+                    finally:
+                        if not conn.is_closed():
+                            await conn.remove_listener(NOTIFY_CHANNEL, self._on_notify)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not ready.is_set():
+                    logger.error(f"Failed to load system_config, serving defaults: {e}")
+                    ready.set()
+                logger.error(f"system_config listener failed, reconnecting: {e}")
+                await asyncio.sleep(5)
+
+    async def _apply_changes(self, conn) -> None:
+        while not conn.is_closed():
+            try:
+                key = await asyncio.wait_for(self._changed.get(), RELOAD_SECONDS)
+            except asyncio.TimeoutError:
+                await self.load(self._db)
+                continue
+            await self.refresh_key(self._db, key)
+            logger.info(f"🔄 system_config {key} changed")
+        raise ConnectionError("LISTEN connection closed")
+
+
+# Process-wide config, started by services that read config on hot paths
+system_config = SystemConfig()
+
+
+async def start_system_config(db: Database) -> None:
+    await system_config.start(db)
+
+
+async def stop_system_config() -> None:
+    await system_config.stop()
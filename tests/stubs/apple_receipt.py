@@ -0,0 +1,115 @@
+"""
+Local stand-in for Apple's verifyReceipt endpoint.
+
+Receipts are base64-encoded JSON built with make_receipt(). The stub answers like Apple:
+status 0 with the receipt for a receipt from its own environment, 21007/21008 for one from
+the other environment, 21002 for anything it can't decode, or the status a receipt asks
+for. Requests to a host or path containing "sandbox" are served as the sandbox.
+
+In-process (no network):
+
+    stub = create_app()
+    service = AppleReceiptVerificationService(transport=httpx.ASGITransport(app=stub))
+
+As a server:
+
+    python -m tests.stubs.apple_receipt --port 8099
+    APPLE_SANDBOX_URL=http://localhost:8099/sandbox/verifyReceipt
+    APPLE_PRODUCTION_URL=http://localhost:8099/verifyReceipt
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import time
+from typing import Optional
+from uuid import uuid4
+
+from fastapi import FastAPI, Request
+
+
+def make_receipt(
+    bundle_id: str,
+    product_id: str,
+    transaction_id: Optional[str] = None,
+    environment: str = "Sandbox",
+    quantity: int = 1,
+    status: Optional[int] = None,
+) -> str:
+    """A receipt the stub accepts (or answers with status, if given)"""
+    transaction_id = transaction_id or str(uuid4().int)[:15]
+    receipt = {
+        "bundle_id": bundle_id,
+        "environment": environment,
+        "in_app": [
+            {
+                "product_id": product_id,
+                "transaction_id": transaction_id,
+                "original_transaction_id": transaction_id,
+                "purchase_date_ms": str(int(time.time() * 1000)),
+                "quantity": str(quantity),
+            }
+        ],
+    }
+    if status is not None:
+        receipt["status"] = status
+    return base64.b64encode(json.dumps(receipt).encode()).decode()
+
+
+def create_app(delay: float = 0.0) -> FastAPI:
+    """
+    The stub app. app.state.requests records (environment, receipt-data) per call;
+    delay (seconds) slows every answer, e.g. to overlap concurrent verifications.
+    """
+    app = FastAPI(title="Apple verifyReceipt stub")
+    app.state.requests = []
+    app.state.delay = delay
+
+    @app.post("/verifyReceipt")
+    @app.post("/sandbox/verifyReceipt")
+    async def verify_receipt(request: Request):
+        environment = (
+            "Sandbox"
+            if "sandbox" in request.headers.get("host", "") or "sandbox" in request.url.path
+            else "Production"
+        )
+        body = await request.json()
+        receipt_data = body.get("receipt-data", "")
+        app.state.requests.append((environment, receipt_data))
+
+        if app.state.delay:
+            await asyncio.sleep(app.state.delay)
+
+        try:
+            receipt = json.loads(base64.b64decode(receipt_data, validate=True))
+        except (binascii.Error, ValueError):
+            return {"status": 21002}
+
+        if "status" in receipt:
+            return {"status": receipt["status"], "environment": environment}
+        if receipt.get("environment") != environment:
+            return {"status": 21007 if environment == "Production" else 21008}
+
+        return {
+            "status": 0,
+            "environment": environment,
+            "receipt": {
+                "bundle_id": receipt["bundle_id"],
+                "receipt_type": "ProductionSandbox" if environment == "Sandbox" else "Production",
+                "in_app": receipt["in_app"],
+            },
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Apple verifyReceipt stub")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.delay), host="127.0.0.1", port=args.port)
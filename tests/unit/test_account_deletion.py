@@ -0,0 +1,104 @@
+import asyncio
+import fnmatch
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from shared.account_deletion import AccountDeletionWorker, purge_user_keys
+
+
+class FakeRedis:
+    """Plain keys, with SCAN over them"""
+
+    def __init__(self, keys):
+        self.keys = set(keys)
+
+    async def unlink(self, *keys):
+        found = self.keys & set(keys)
+        self.keys -= found
+        return len(found)
+
+    async def scan_iter(self, match, count):
+        for key in sorted(self.keys):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+
+class FakeDatabase:
+    """Records the statements a deletion job runs"""
+
+    def __init__(self):
+        self.statements = []
+        self.users_deleted = 0
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield self
+
+    async def fetchrow(self, query, user_id):
+        self.users_deleted += 1
+        return {"email": "pixie@example.com", "phone": None}
+
+    async def execute(self, query, *args):
+        self.statements.append((" ".join(query.split()), args))
+
+
+def make_job():
+    return {
+        "id": "job-1",
+        "user_id": "user-1",
+        "fairyname": "pixie",
+        "email": None,
+        "attempts": 1,
+        "progress": {},
+    }
+
+
+@pytest.mark.unit
+def test_purge_user_keys_covers_index_identifiers_and_legacy_patterns():
+    redis = FakeRedis(
+        {
+            "refresh_token:user-1",
+            "api_limit:user-1",
+            "otp:pixie@example.com",
+            "session:abc:user-1",
+            "rate_limit:stories:user-1:hour",
+            "refresh_token:user-2",
+            "otp:other@example.com",
+        }
+    )
+
+    deleted = asyncio.run(purge_user_keys(redis, "user-1", ("pixie@example.com", None)))
+
+    assert deleted == 5
+    assert redis.keys == {"refresh_token:user-2", "otp:other@example.com"}
+
+
+@pytest.mark.unit
+def test_job_resumes_after_storage_failure_without_repeating_steps():
+    db = FakeDatabase()
+    redis = FakeRedis({"refresh_token:user-1"})
+    purges = []
+
+    async def purge_assets(user_id):
+        purges.append(user_id)
+        if len(purges) == 1:
+            return {"total_deleted": 0, "errors": ["R2 unavailable"]}
+        return {"total_deleted": 3, "errors": []}
+
+    worker = AccountDeletionWorker(db, redis, purge_assets)
+    job = make_job()
+
+    assert not asyncio.run(worker.run_job(job))
+    assert job["progress"]["database"] == {"user_deleted": True}
+    assert "SET status = $2" in db.statements[-1][0]
+    assert db.statements[-1][1][1] == "pending"
+
+    assert asyncio.run(worker.run_job(job))
+    assert db.users_deleted == 1
+    assert len(purges) == 2
+    assert job["progress"]["redis"] == {"keys_deleted": 1}
+    completed, args = db.statements[-1]
+    assert "status = 'completed'" in completed
+    assert json.loads(args[1])["total_deleted"] == 3
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from shared.ai_usage_rollups import plan_segments
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.unit
+def test_window_is_stitched_from_rollups_and_raw_edges():
+    """Whole days come from daily rollups, leftover hours from hourly, edges from raw."""
+    segments = plan_segments(
+        start=utc(2025, 3, 1, 10, 30),
+        end=utc(2025, 3, 5, 14, 20),
+        hourly_watermark=utc(2025, 3, 5, 14),
+        daily_watermark=utc(2025, 3, 5),
+    )
+
+    assert segments == [
+        ("raw", utc(2025, 3, 1, 10, 30), utc(2025, 3, 1, 11)),
+        ("hourly", utc(2025, 3, 1, 11), utc(2025, 3, 2)),
+        ("daily", utc(2025, 3, 2), utc(2025, 3, 5)),
+        ("hourly", utc(2025, 3, 5), utc(2025, 3, 5, 14)),
+        ("raw", utc(2025, 3, 5, 14), utc(2025, 3, 5, 14, 20)),
+    ]
+
+
+@pytest.mark.unit
+def test_lagging_aggregator_falls_back_to_raw_rows():
+    """Hours past the watermark are read raw; no watermark means all raw."""
+    start, end = utc(2025, 3, 1, 9), utc(2025, 3, 1, 18, 5)
+
+    assert plan_segments(start, end, None, None) == [("raw", start, end)]
+    assert plan_segments(start, end, utc(2025, 3, 1, 12), utc(2025, 3, 1)) == [
+        ("hourly", start, utc(2025, 3, 1, 12)),
+        ("raw", utc(2025, 3, 1, 12), end),
+    ]
@@ -0,0 +1,64 @@
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from shared.middleware import SecurityHeadersMiddleware, conditional_get
+
+
+def make_client():
+    app = FastAPI()
+    app.add_middleware(SecurityHeadersMiddleware, service_name="test")
+    calls = {"profile": 0, "config": 0}
+
+    @app.get("/profile/{name}")
+    @conditional_get()
+    async def profile(name: str):
+        calls["profile"] += 1
+        return {"name": name}
+
+    @app.get("/config")
+    @conditional_get(version=lambda **_: "v1")
+    async def config():
+        calls["config"] += 1
+        return {"options": [1, 2]}
+
+    @app.get("/cached")
+    @conditional_get()
+    async def cached():
+        return Response(content='{"dust": 3}', media_type="application/json")
+
+    return TestClient(app), calls
+
+
+@pytest.mark.unit
+def test_body_hash_etag_answers_304_without_a_body():
+    client, calls = make_client()
+
+    first = client.get("/profile/pixie")
+    etag = first.headers["etag"]
+    assert first.json() == {"name": "pixie"}
+    assert etag.startswith('"') and not etag.startswith("W/")
+    # Validated responses keep a cache policy that lets clients store and revalidate
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    again = client.get("/profile/pixie", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    changed = client.get("/profile/sprite", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+    ready_etag = client.get("/cached").headers["etag"]
+    assert client.get("/cached", headers={"If-None-Match": ready_etag}).status_code == 304
+    assert calls["profile"] == 3
+
+
+@pytest.mark.unit
+def test_version_etag_skips_the_route():
+    client, calls = make_client()
+
+    etag = client.get("/config").headers["etag"]
+    assert client.get("/config", headers={"If-None-Match": etag}).status_code == 304
+    assert calls["config"] == 1
@@ -0,0 +1,89 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from shared.database import Database
+from shared.db_metrics import query_metrics
+
+
+class FakeConnection:
+    def __init__(self):
+        self.statements = []
+
+    async def fetchrow(self, query, *args):
+        self.statements.append(query)
+        await asyncio.sleep(0)
+        return {"n": len(self.statements)}
+
+    async def execute(self, query, *args):
+        self.statements.append(query)
+        return "SELECT 1"
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class FakePool:
+    def __init__(self):
+        self.acquires = 0
+        self.connection = FakeConnection()
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.acquires += 1
+        yield self.connection
+
+
+@pytest.mark.unit
+def test_session_acquires_once_for_many_statements():
+    """A session reuses its connection instead of acquiring per statement."""
+    pool = FakePool()
+    db = Database(pool)
+
+    async def run():
+        async with db.connection() as session:
+            assert session.is_session
+            for _ in range(5):
+                await session.fetch_one("SELECT 1")
+            # Nested connection() and transaction() reuse the same connection
+            async with session.connection() as nested:
+                async with nested.transaction():
+                    await nested.execute("SELECT 1")
+
+    asyncio.run(run())
+    assert pool.acquires == 1
+    assert len(pool.connection.statements) == 6
+
+
+@pytest.mark.unit
+def test_session_serializes_concurrent_tasks():
+    """Concurrent tasks sharing a session don't interleave on the connection."""
+    pool = FakePool()
+    db = Database(pool)
+
+    async def run():
+        async with db.connection() as session:
+            await asyncio.gather(*(session.fetch_one("SELECT 1") for _ in range(10)))
+
+    asyncio.run(run())
+    assert pool.acquires == 1
+    assert len(pool.connection.statements) == 10
+
+
+@pytest.mark.unit
+def test_transaction_statements_are_recorded():
+    """Statements run on the connection transaction() yields show up in query metrics."""
+    db = Database(FakePool())
+    query_metrics.reset()
+
+    async def run():
+        async with db.transaction() as conn:
+            await conn.fetchrow("SELECT balance FROM users WHERE id = $1 FOR UPDATE", "user-1")
+            await conn.execute("UPDATE users SET balance = $1 WHERE id = $2", 5, "user-1")
+
+    asyncio.run(run())
+    statements = {stats["query"]: stats for stats in query_metrics.snapshot()["statements"]}
+    assert statements["SELECT balance FROM users WHERE id = $1 FOR UPDATE"]["calls"] == 1
+    assert statements["UPDATE users SET balance = $1 WHERE id = $2"]["calls"] == 1
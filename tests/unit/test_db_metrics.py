@@ -0,0 +1,86 @@
+import pytest
+from fastapi import HTTPException
+
+from shared.db_metrics import OVERFLOW_KEY, QueryMetrics, _check_metrics_auth, normalize_sql
+
+
+@pytest.mark.unit
+def test_normalize_sql_collapses_literals_and_whitespace():
+    """Equivalent statements with different literals share one key."""
+    first = normalize_sql(
+        """
+        SELECT * FROM users
+        WHERE status = 'active'  -- only active users
+        LIMIT 10
+        """
+    )
+    second = normalize_sql("SELECT * FROM users WHERE status = 'pending' LIMIT 50")
+
+    assert first == second == "SELECT * FROM users WHERE status = ? LIMIT ?"
+
+
+@pytest.mark.unit
+def test_normalize_sql_keeps_positional_parameters():
+    """$n placeholders are part of the statement shape and are preserved."""
+    assert normalize_sql("SELECT id FROM users WHERE id = $1") == (
+        "SELECT id FROM users WHERE id = $1"
+    )
+    assert normalize_sql("SELECT id FROM apps WHERE id IN ($1, $2, $3)") == (
+        "SELECT id FROM apps WHERE id IN (...)"
+    )
+
+
+@pytest.mark.unit
+def test_record_separates_wait_from_execution():
+    """Pool wait and execution time are tracked in separate histograms."""
+    metrics = QueryMetrics()
+    metrics.record("SELECT 1", execution=0.002, acquire_wait=0.3, rows=1)
+    metrics.record("SELECT 2", execution=0.004, acquire_wait=0.0, rows=1)
+
+    snapshot = metrics.snapshot()
+    assert len(snapshot["statements"]) == 1
+
+    stats = snapshot["statements"][0]
+    assert stats["calls"] == 2
+    assert stats["rows"] == 2
+    assert stats["execution_seconds_max"] == pytest.approx(0.004)
+    assert stats["acquire_wait_seconds_max"] == pytest.approx(0.3)
+    # A 300ms wait exceeds the default 250ms acquire threshold
+    assert snapshot["slow_queries"] == 1
+
+
+@pytest.mark.unit
+def test_timer_counts_errors_and_caps_statements():
+    """Failed statements count as errors and overflow statements are bucketed."""
+    metrics = QueryMetrics(max_statements=1)
+
+    with pytest.raises(RuntimeError):
+        with metrics.time("SELECT * FROM users WHERE id = $1"):
+            raise RuntimeError("boom")
+
+    with metrics.time("SELECT * FROM apps WHERE id = $1") as timer:
+        timer.set_status("UPDATE 3")
+
+    queries = {s["query"]: s for s in metrics.snapshot()["statements"]}
+    assert queries["SELECT * FROM users WHERE id = $1"]["errors"] == 1
+    assert queries[OVERFLOW_KEY]["rows"] == 3
+    assert "db_query_seconds_bucket" in metrics.render_prometheus()
+
+
+@pytest.mark.unit
+def test_metrics_auth_fails_closed(monkeypatch):
+    """Without a token, /metrics is hidden outside development."""
+    monkeypatch.delenv("METRICS_AUTH_TOKEN", raising=False)
+    monkeypatch.delenv("ENVIRONMENT", raising=False)
+    with pytest.raises(HTTPException) as missing:
+        _check_metrics_auth(None)
+    assert missing.value.status_code == 404
+
+    monkeypatch.setenv("ENVIRONMENT", "development")
+    _check_metrics_auth(None)
+
+    monkeypatch.setenv("METRICS_AUTH_TOKEN", "secret")
+    with pytest.raises(HTTPException) as wrong:
+        _check_metrics_auth("Bearer nope")
+    assert wrong.value.status_code == 401
+    _check_metrics_auth("Bearer secret")
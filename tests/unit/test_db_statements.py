@@ -0,0 +1,89 @@
+import asyncio
+from collections import namedtuple
+from contextlib import asynccontextmanager
+
+import pytest
+
+from shared.database import Database
+from shared.db_statements import register_hot_query, row_class
+
+Attribute = namedtuple("Attribute", "name type")
+PgType = namedtuple("PgType", "oid name kind schema")
+
+
+class FakeRecord(dict):
+    pass
+
+
+class FakeStatement:
+    def __init__(self, attributes, records):
+        self._attributes = attributes
+        self._records = records
+
+    def get_attributes(self):
+        return self._attributes
+
+    async def fetch(self, *args):
+        return self._records
+
+    async def fetchrow(self, *args):
+        return self._records[0] if self._records else None
+
+
+class FakeConnection:
+    def __init__(self, statement):
+        self.statement = statement
+        self.prepares = 0
+        self.hot_statements = {}
+
+    async def prepare(self, sql):
+        self.prepares += 1
+        return self.statement
+
+
+class FakePool:
+    def __init__(self, connection):
+        self.connection = connection
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.connection
+
+
+@pytest.mark.unit
+def test_slots_rows_support_dict_style_reads():
+    """Slots rows keep row["col"] access for existing handlers."""
+    cls = row_class(("id", "title"))
+    row = cls(1, "Dragon")
+
+    assert row["title"] == "Dragon"
+    assert row.get("missing", "x") == "x"
+    assert row.as_dict() == {"id": 1, "title": "Dragon"}
+    assert not hasattr(row, "__dict__")
+    assert row_class(("id", "title")) is cls
+
+
+@pytest.mark.unit
+def test_hot_query_prepares_once_and_decodes_json():
+    """A hot query is prepared once per connection and JSONB arrives decoded."""
+    query = register_hot_query(
+        "tests.stories", "SELECT id, metadata FROM user_stories WHERE user_id = $1", slots=True
+    )
+    statement = FakeStatement(
+        [
+            Attribute("id", PgType(23, "int4", "b", "pg_catalog")),
+            Attribute("metadata", PgType(3802, "jsonb", "b", "pg_catalog")),
+        ],
+        [FakeRecord(id=1, metadata='{"theme": "space"}')],
+    )
+    conn = FakeConnection(statement)
+    db = Database(FakePool(conn))
+
+    async def run():
+        await db.fetch_all_prepared(query.name, 1)
+        return await db.fetch_all_prepared(query.name, 1)
+
+    rows = asyncio.run(run())
+    assert conn.prepares == 1
+    assert rows[0]["metadata"] == {"theme": "space"}
+    assert rows[0].id == 1
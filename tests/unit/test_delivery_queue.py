@@ -0,0 +1,176 @@
+import asyncio
+import json
+
+import pytest
+
+import shared.delivery_queue as delivery_queue
+from shared.delivery_queue import (
+    CLAIM_SCRIPT,
+    INFLIGHT_KEY,
+    MAX_ATTEMPTS,
+    REQUEUE_SCRIPT,
+    DeliveryMetrics,
+    DeliveryWorker,
+    Priority,
+    enqueue_email,
+    enqueue_otp,
+    queue_key,
+)
+from shared.outbox import retry_delay
+
+
+class FakePipeline:
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args) for name, args in self.calls]
+
+
+class FakeRedis:
+    """Lists and the in-flight and retry sets, with the scripts done in Python"""
+
+    def __init__(self):
+        self.lists = {}
+        self.inflight = {}
+        self.retry = {}
+
+    def _zset(self, key):
+        return self.inflight if key == INFLIGHT_KEY else self.retry
+
+    async def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+
+    async def zadd(self, key, mapping):
+        self._zset(key).update(mapping)
+
+    async def zrem(self, key, member):
+        self._zset(key).pop(member, None)
+
+    async def eval(self, script, numkeys, *keys_and_args):
+        if script == REQUEUE_SCRIPT:
+            zset, otp_queue, bulk_queue, cutoff = keys_and_args
+            due = [m for m, score in sorted(self._zset(zset).items()) if score <= cutoff]
+            for message in due:
+                del self._zset(zset)[message]
+                priority = json.loads(message)["priority"]
+                await self.rpush(otp_queue if priority == "otp" else bulk_queue, message)
+            return len(due)
+        assert script == CLAIM_SCRIPT
+        *queues, _ = keys_and_args[:numkeys]
+        for queue in queues:
+            if self.lists.get(queue):
+                message = self.lists[queue].pop(0)
+                self.inflight[message] = float(keys_and_args[numkeys])
+                return message
+        return None
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def run_worker(redis_client, sent, fail=False, retry_at=None):
+    """Claim and deliver until the queues are empty; returns the outcomes
+
+    With retry_at, retries due by then are moved back whenever the queues run dry.
+    """
+
+    async def send_email(to_email, subject, body, html_body=None, pool=None):
+        sent.append(("email", to_email, subject))
+        if fail:
+            raise RuntimeError("smtp down")
+
+    async def send_sms(to_number, message, client=None):
+        sent.append(("sms", to_number, message))
+
+    async def run():
+        worker = DeliveryWorker(redis_client, concurrency=1, metrics=DeliveryMetrics())
+        outcomes = []
+        try:
+            while True:
+                raw = await worker.claim()
+                if raw is None and retry_at and await worker.requeue_due_retries(retry_at):
+                    raw = await worker.claim()
+                if raw is None:
+                    break
+                outcomes.append(await worker.deliver(raw))
+        finally:
+            await worker.http.aclose()
+        return worker.metrics, outcomes
+
+    original = delivery_queue.send_email, delivery_queue.send_sms
+    delivery_queue.send_email, delivery_queue.send_sms = send_email, send_sms
+    try:
+        return asyncio.run(run())
+    finally:
+        delivery_queue.send_email, delivery_queue.send_sms = original
+
+
+@pytest.mark.unit
+def test_otps_are_sent_before_bulk_mail_and_dropped_once_expired():
+    """OTPs jump the bulk queue; an OTP past its validity is never sent."""
+    redis_client = FakeRedis()
+
+    async def enqueue():
+        await enqueue_email(redis_client, "bulk@example.com", "Account deleted", "bye")
+        await enqueue_otp(redis_client, "email", "user@example.com", "123456")
+        await enqueue_otp(redis_client, "phone", "+15550100", "654321")
+        await enqueue_otp(redis_client, "email", "late@example.com", "000000")
+
+    asyncio.run(enqueue())
+    stale = json.loads(redis_client.lists[queue_key(Priority.OTP)][-1])
+    stale["expires_at"] = stale["enqueued_at"] - 1
+    redis_client.lists[queue_key(Priority.OTP)][-1] = json.dumps(stale)
+
+    sent = []
+    metrics, outcomes = run_worker(redis_client, sent)
+
+    assert outcomes == ["sent", "sent", "expired", "sent"]
+    assert [to for _, to, _ in sent] == ["user@example.com", "+15550100", "bulk@example.com"]
+    assert "654321" in sent[1][2]
+    assert redis_client.inflight == {}
+    channels = {(c["channel"], c["priority"]): c for c in metrics.snapshot()["channels"]}
+    assert channels[("email", "otp")]["sent"] == 1 and channels[("email", "otp")]["expired"] == 1
+    assert channels[("sms", "otp")]["sent"] == 1 and channels[("email", "bulk")]["sent"] == 1
+
+
+@pytest.mark.unit
+def test_failed_sends_are_retried_then_given_up():
+    """A failing send waits out its backoff, is retried until MAX_ATTEMPTS, then dropped."""
+    redis_client = FakeRedis()
+    asyncio.run(enqueue_email(redis_client, "bulk@example.com", "Hello", "hi"))
+
+    sent = []
+    _, outcomes = run_worker(redis_client, sent, fail=True)
+
+    # Not claimed again until its retry is due
+    assert outcomes == ["retried"] and len(sent) == 1
+    ((retry, due),) = redis_client.retry.items()
+    assert json.loads(retry)["attempts"] == 1
+    assert due - json.loads(retry)["enqueued_at"] >= retry_delay(1)
+
+    async def requeue_early():
+        worker = DeliveryWorker(redis_client, concurrency=1)
+        try:
+            return await worker.requeue_due_retries(due - 1)
+        finally:
+            await worker.http.aclose()
+
+    assert asyncio.run(requeue_early()) == 0
+
+    redis_client = FakeRedis()
+    asyncio.run(enqueue_email(redis_client, "bulk@example.com", "Hello", "hi"))
+    sent = []
+    metrics, outcomes = run_worker(redis_client, sent, fail=True, retry_at=float("inf"))
+
+    assert outcomes == ["retried"] * (MAX_ATTEMPTS - 1) + ["failed"]
+    assert len(sent) == MAX_ATTEMPTS
+    assert redis_client.lists[queue_key(Priority.BULK)] == [] and redis_client.inflight == {}
+    assert redis_client.retry == {}
+    (stats,) = metrics.snapshot()["channels"]
+    assert (stats["retried"], stats["failed"], stats["sent"]) == (MAX_ATTEMPTS - 1, 1, 0)
+    assert 'outcome="failed"} 1' in metrics.render_prometheus({"inflight": 0})
@@ -0,0 +1,66 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "services" / "identity"))
+
+from fairynames import allocate_fairyname, refill_fairyname_pool  # noqa: E402
+
+
+class FakeDatabase:
+    """A pool table and the names users already have"""
+
+    def __init__(self, pool=(), taken=(), locked=False):
+        self.pool = dict.fromkeys(pool)
+        self.taken = set(taken)
+        self.locked = locked
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield self
+
+    async def fetchval(self, query, *args):
+        if "advisory" in query:
+            return not self.locked
+        return sum(1 for allocated in self.pool.values() if not allocated)
+
+    async def fetch_one(self, query, *args):
+        if "UPDATE fairyname_pool" in query:
+            for name, allocated in self.pool.items():
+                if not allocated:
+                    self.pool[name] = True
+                    return {"name": name}
+            return None
+        return {"id": 1} if args[0] in self.taken else None
+
+    async def execute(self, query, names):
+        added = [n for n in names if n not in self.taken and n not in self.pool]
+        self.pool.update(dict.fromkeys(added))
+        return f"INSERT 0 {len(added)}"
+
+
+@pytest.mark.unit
+def test_allocation_claims_each_pooled_name_once_then_falls_back():
+    """Pooled names are handed out once; an empty pool still yields a free name."""
+    db = FakeDatabase(pool=["lunarspark0001", "cosmicdream0002"])
+
+    async def allocate():
+        return [await allocate_fairyname(db) for _ in range(3)]
+
+    first, second, fallback = asyncio.run(allocate())
+
+    assert {first, second} == {"lunarspark0001", "cosmicdream0002"}
+    assert fallback not in db.pool and fallback not in db.taken
+
+
+@pytest.mark.unit
+def test_refill_tops_up_to_target_and_skips_when_locked():
+    """Refill adds only missing names and leaves the work to a replica holding the lock."""
+    db = FakeDatabase(pool=["lunarspark0001"])
+
+    assert asyncio.run(refill_fairyname_pool(db, target=250, batch_size=100)) == 249
+    assert asyncio.run(refill_fairyname_pool(db, target=250)) == 0
+    assert asyncio.run(refill_fairyname_pool(FakeDatabase(locked=True), target=10)) is None
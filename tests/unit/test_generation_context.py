@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+from shared.generation_context import (
+    context_key,
+    get_generation_context,
+    interests_from,
+    invalidate_generation_context,
+    version_key,
+)
+
+
+class FakePipeline:
+    def __init__(self, values):
+        self.values = values
+
+    def incr(self, key):
+        self.values[key] = str(int(self.values.get(key, 0)) + 1)
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    async def execute(self):
+        return []
+
+
+class FakeRedis:
+    """Plain string keys, with the store script's version check"""
+
+    def __init__(self):
+        self.values = {}
+
+    async def mget(self, *keys):
+        return [self.values.get(key) for key in keys]
+
+    async def eval(self, script, numkeys, snapshot_key, version_key, version, snapshot, ttl):
+        if self.values.get(version_key, "") != version:
+            return 0
+        self.values[snapshot_key] = snapshot
+        return 1
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.values)
+
+
+class FakeDatabase:
+    def __init__(self, snapshot, on_fetch=None):
+        self.snapshot = snapshot
+        self.on_fetch = on_fetch
+        self.fetches = 0
+
+    async def fetch_one(self, query, user_id):
+        self.fetches += 1
+        if self.on_fetch:
+            await self.on_fetch()
+        return {"snapshot": json.dumps(self.snapshot)}
+
+
+SNAPSHOT = {
+    "birth_date": "1990-04-01",
+    "interests": "baking, hiking",
+    "people": [{"id": "person-1", "name": "Bean", "entry_type": "pet"}],
+}
+
+
+@pytest.mark.unit
+def test_snapshot_built_once_and_rebuilt_after_invalidation():
+    redis = FakeRedis()
+    db = FakeDatabase(SNAPSHOT)
+
+    assert asyncio.run(get_generation_context(db, "user-1", redis)) == SNAPSHOT
+    assert asyncio.run(get_generation_context(db, "user-1", redis)) == SNAPSHOT
+    assert db.fetches == 1
+
+    asyncio.run(invalidate_generation_context(redis, "user-1"))
+    assert context_key("user-1") not in redis.values
+    assert redis.values[version_key("user-1")] == "1"
+
+    asyncio.run(get_generation_context(db, "user-1", redis))
+    assert db.fetches == 2
+    assert interests_from(SNAPSHOT) == ["baking", "hiking"]
+
+
+@pytest.mark.unit
+def test_build_racing_an_invalidation_is_not_cached():
+    redis = FakeRedis()
+
+    async def edit_during_build():
+        await invalidate_generation_context(redis, "user-1")
+
+    db = FakeDatabase(SNAPSHOT, on_fetch=edit_during_build)
+
+    # The caller still gets its snapshot, but it isn't stored over the newer edit
+    assert asyncio.run(get_generation_context(db, "user-1", redis)) == SNAPSHOT
+    assert context_key("user-1") not in redis.values
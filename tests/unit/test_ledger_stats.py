@@ -0,0 +1,90 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from shared.ledger_stats import (
+    record_ledger_grants,
+    record_ledger_totals,
+    record_ledger_transaction,
+)
+
+
+class FakeConnection:
+    def __init__(self, existing_users=()):
+        self.existing_users = set(existing_users)
+        self.calls = []
+
+    async def fetchval(self, query, *args):
+        self.calls.append(("fetchval", query, args))
+        return args[0] if args[0] in self.existing_users else None
+
+    async def fetch(self, query, *args):
+        self.calls.append(("fetch", query, args))
+        return [{"user_id": user_id} for user_id in args[0] if user_id in self.existing_users]
+
+    async def execute(self, query, *args):
+        self.calls.append(("execute", query, args))
+
+    def rebuilt_users(self):
+        return [
+            args[0]
+            for method, query, args in self.calls
+            if method == "execute" and query.lstrip().startswith("INSERT INTO user_ledger_stats")
+        ]
+
+
+@pytest.mark.unit
+def test_consume_increments_total_and_favorite_app():
+    user_id, app_id = uuid4(), uuid4()
+    conn = FakeConnection(existing_users=[user_id])
+
+    asyncio.run(record_ledger_transaction(conn, user_id, "consume", -25, app_id))
+
+    ((_, query, args),) = conn.calls
+    assert "total_consumed = s.total_consumed + $3" in query
+    assert args == (user_id, app_id, 25)
+    assert conn.rebuilt_users() == []
+
+
+@pytest.mark.unit
+def test_untracked_type_only_counts_transaction():
+    user_id = uuid4()
+    conn = FakeConnection(existing_users=[user_id])
+
+    asyncio.run(record_ledger_transaction(conn, user_id, "transfer", 10))
+
+    ((_, query, args),) = conn.calls
+    assert "$3" not in query
+    assert args == (user_id, None)
+
+
+@pytest.mark.unit
+def test_missing_stats_rows_are_rebuilt_from_transactions():
+    known, new = uuid4(), uuid4()
+    conn = FakeConnection(existing_users=[known])
+
+    asyncio.run(record_ledger_grants(conn, [known, new], 50))
+    asyncio.run(record_ledger_transaction(conn, new, "refund", 5))
+
+    assert conn.rebuilt_users() == [[new], [new]]
+
+
+@pytest.mark.unit
+def test_refunds_are_recorded_per_user_in_one_statement():
+    first, second = uuid4(), uuid4()
+    conn = FakeConnection(existing_users=[first, second])
+
+    asyncio.run(record_ledger_totals(conn, "refund", {second: 5, first: 30}, {second: 1, first: 2}))
+
+    ((method, query, args),) = conn.calls
+    assert method == "fetch"
+    assert "total_refunded = s.total_refunded + t.amount" in query
+    user_ids = sorted([first, second])
+    totals = {first: (30, 2), second: (5, 1)}
+    assert args == (
+        user_ids,
+        [totals[user_id][0] for user_id in user_ids],
+        [totals[user_id][1] for user_id in user_ids],
+    )
+    assert conn.rebuilt_users() == []
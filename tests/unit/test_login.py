@@ -0,0 +1,47 @@
+import asyncio
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "services" / "identity"))
+
+from login import _UPSERT_QUERIES, upsert_otp_user  # noqa: E402
+
+
+class FakeDatabase:
+    """Answers the login upsert and name allocation, recording each statement"""
+
+    def __init__(self, upsert_rows=()):
+        self.upsert_rows = list(upsert_rows)
+        self.queries = []
+
+    async def fetch_one(self, query, *args):
+        if query in _UPSERT_QUERIES.values():
+            self.queries.append(("upsert", args))
+            return self.upsert_rows.pop(0)
+        self.queries.append(("allocate", args))
+        return {"name": "lunarspark0042"}
+
+
+@pytest.mark.unit
+def test_upsert_retries_with_an_allocated_name_when_the_pool_is_empty():
+    """An empty pool yields no row; the retry passes a name allocated the slow way."""
+    user = {"id": 1, "fairyname": "lunarspark0042", "total_logins": 1, "is_new_user": True}
+    db = FakeDatabase(upsert_rows=[None, user])
+
+    result, is_new_user = asyncio.run(upsert_otp_user(db, "email", "new@example.com"))
+
+    assert is_new_user and result == {"id": 1, "fairyname": "lunarspark0042", "total_logins": 1}
+    assert [kind for kind, _ in db.queries] == ["upsert", "allocate", "upsert"]
+    assert db.queries[0][1][2] is None and db.queries[2][1][2] == "lunarspark0042"
+
+
+@pytest.mark.unit
+def test_upsert_sql_takes_every_argument_it_is_passed():
+    """The CTE itself needs Postgres; here only its shape is checked against the call."""
+    for column, query in _UPSERT_QUERIES.items():
+        assert {int(n) for n in re.findall(r"\$(\d+)", query)} == {1, 2, 3, 4, 5}
+        assert f"WHERE {column} = $2" in query
+        assert "{column}" not in query and "{payload}" not in query
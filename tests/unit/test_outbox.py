@@ -0,0 +1,90 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+from shared.hubspot_webhook import merge_user_updates
+from shared.outbox import OutboxDestination, OutboxDispatcher, retry_delay
+
+
+class FakeDatabase:
+    """Hands out claimed rows once and records how they are settled"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.settled = {}
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield self
+
+    async def fetch(self, query, *args):
+        rows, self.rows = self.rows, []
+        return rows
+
+    async def execute(self, query, ids, statuses, delays, errors):
+        for settled in zip(ids, statuses, delays, errors, strict=True):
+            self.settled[settled[0]] = settled[1:]
+
+
+def event_row(event_type, payload, coalesce_key=None, attempts=1, age_seconds=0):
+    return {
+        "id": uuid4(),
+        "destination": "hubspot",
+        "event_type": event_type,
+        "aggregate_id": None,
+        "payload": payload,
+        "coalesce_key": coalesce_key,
+        "attempts": attempts,
+        "created_at": datetime.now(timezone.utc) - timedelta(seconds=age_seconds),
+    }
+
+
+def recording_destination(fail=False, max_attempts=10):
+    delivered = []
+
+    async def deliver(event):
+        delivered.append(event)
+        if fail:
+            raise RuntimeError("receiver down")
+
+    destination = OutboxDestination(
+        "hubspot", deliver, max_attempts=max_attempts, merge=merge_user_updates
+    )
+    return destination, delivered
+
+
+@pytest.mark.unit
+def test_bursts_of_updates_for_a_user_are_delivered_once():
+    """Folded user.updated events go out as the latest snapshot with all changed fields."""
+    older = event_row("user.updated", {"city": "Oslo", "changed_fields": ["city"]}, "u:1", 1, 3)
+    newer = event_row("user.updated", {"city": "Rome", "changed_fields": ["phone", "city"]}, "u:1")
+    created = event_row("user.created", {"city": "Oslo"})
+    db = FakeDatabase([newer, created, older])
+    destination, delivered = recording_destination()
+
+    counts = asyncio.run(OutboxDispatcher(db, [destination]).dispatch())
+
+    assert counts == {"claimed": 3, "delivered": 2, "coalesced": 1, "retried": 0, "failed": 0}
+    (update,) = [event for event in delivered if event.event_type == "user.updated"]
+    assert update.id == newer["id"]
+    assert update.payload == {"city": "Rome", "changed_fields": ["city", "phone"]}
+    assert {status for status, _, _ in db.settled.values()} == {"delivered"}
+
+
+@pytest.mark.unit
+def test_failed_deliveries_back_off_then_fail_after_max_attempts():
+    """A failure is retried with backoff until the destination's attempts run out."""
+    retrying, exhausted = event_row("user.created", {}, attempts=2), event_row("user.created", {})
+    exhausted["attempts"] = 3
+    db = FakeDatabase([retrying, exhausted])
+    destination, _ = recording_destination(fail=True, max_attempts=3)
+
+    counts = asyncio.run(OutboxDispatcher(db, [destination]).dispatch())
+
+    assert counts["retried"] == 1 and counts["failed"] == 1
+    assert db.settled[retrying["id"]] == ("pending", retry_delay(2), "receiver down")
+    assert db.settled[exhausted["id"]] == ("failed", 0.0, "receiver down")
+    assert retry_delay(1) < retry_delay(2) < retry_delay(50) == retry_delay(60)
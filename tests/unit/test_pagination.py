@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+from uuid import UUID
+
+import pytest
+from fastapi import HTTPException
+
+from shared.pagination import (
+    FAVORITES_FIRST,
+    NEWEST_FIRST,
+    decode_cursor,
+    keyset_condition,
+    paginate,
+)
+
+ROW_ID = UUID("018f0c6e-1d2a-7c3b-9a4e-5f6a7b8c9d0e")
+CREATED = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.unit
+def test_paginate_round_trips_cursor_into_keyset_condition():
+    rows = [
+        {"is_favorited": True, "created_at": CREATED, "id": ROW_ID},
+        {"is_favorited": False, "created_at": CREATED, "id": ROW_ID},
+    ]
+
+    page, cursor = paginate(rows, 1, FAVORITES_FIRST)
+    assert page == rows[:1]
+
+    params = ["user"]
+    condition = keyset_condition(FAVORITES_FIRST, cursor, params)
+    assert condition == "(is_favorited, created_at, id) < ($2, $3, $4)"
+    assert params == ["user", True, CREATED, ROW_ID]
+
+
+@pytest.mark.unit
+def test_last_page_has_no_cursor():
+    rows = [{"created_at": CREATED, "id": ROW_ID}]
+    assert paginate(rows, 1, NEWEST_FIRST) == (rows, None)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, NEWEST_FIRST)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.unit
+def test_cursor_from_another_ordering_is_rejected():
+    _, cursor = paginate([{"created_at": CREATED, "id": ROW_ID}] * 2, 1, NEWEST_FIRST)
+    with pytest.raises(HTTPException):
+        decode_cursor(cursor, FAVORITES_FIRST)
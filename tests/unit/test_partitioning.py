@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from shared.partitioning import (
+    add_months,
+    expired_partitions,
+    months_to_create,
+    parse_partition_bound,
+    partition_name,
+)
+
+NOW = datetime(2025, 11, 20, 15, 30, tzinfo=timezone.utc)
+
+
+def utc(year, month):
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.unit
+def test_parse_bounds_from_postgres():
+    monthly = parse_partition_bound(
+        "ai_usage_logs_p202511",
+        "FOR VALUES FROM ('2025-11-01 00:00:00+00') TO ('2025-12-01 00:00:00+00')",
+    )
+    legacy = parse_partition_bound(
+        "ai_usage_logs_legacy", "FOR VALUES FROM (MINVALUE) TO ('2025-11-01 00:00:00+00')"
+    )
+    default = parse_partition_bound("ai_usage_logs_default", "DEFAULT")
+
+    assert (monthly.lower, monthly.upper) == (utc(2025, 11), utc(2025, 12))
+    assert (legacy.lower, legacy.upper) == (None, utc(2025, 11))
+    assert default.is_default
+
+
+@pytest.mark.unit
+def test_months_to_create_skips_covered_months_and_crosses_years():
+    existing = [
+        parse_partition_bound(
+            "t_legacy", "FOR VALUES FROM (MINVALUE) TO ('2025-12-01 00:00:00+00')"
+        ),
+        parse_partition_bound("t_default", "DEFAULT"),
+    ]
+
+    months = months_to_create(existing, NOW, months_ahead=3)
+
+    assert months == [utc(2025, 12), utc(2026, 1), utc(2026, 2)]
+    names = [partition_name("t", month) for month in months]
+    assert names == ["t_p202512", "t_p202601", "t_p202602"]
+
+
+@pytest.mark.unit
+def test_expired_partitions_lie_wholly_before_the_retention_window():
+    partitions = [
+        parse_partition_bound(
+            f"t_p{month:%Y%m}",
+            f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') "
+            f"TO ('{add_months(month, 1):%Y-%m-%d} 00:00:00+00')",
+        )
+        for month in (utc(2024, 9), utc(2024, 10), utc(2024, 11))
+    ]
+    partitions.append(parse_partition_bound("t_default", "DEFAULT"))
+
+    expired = expired_partitions(partitions, NOW, retention_months=13)
+
+    assert [p.name for p in expired] == ["t_p202409"]
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from shared import database
+
+
+class FakePool:
+    def __init__(self, lag=None, fail=False):
+        self.lag = lag
+        self.fail = fail
+        self.checks = 0
+
+    def acquire(self):
+        pool = self
+
+        class _Ctx:
+            async def __aenter__(self):
+                if pool.fail:
+                    raise OSError("replica down")
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def fetchval(self, query, timeout=None):
+                pool.checks += 1
+                return pool.lag
+
+        return _Ctx()
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    primary = FakePool()
+    monkeypatch.setattr(database, "_pool", primary)
+    monkeypatch.setattr(database, "replica_lag_monitor", database.ReplicaLagMonitor(60))
+
+    def with_replica(replica):
+        monkeypatch.setattr(database, "_read_pool", replica)
+        return replica
+
+    return primary, with_replica
+
+
+@pytest.mark.unit
+def test_reads_use_fresh_replica(pools):
+    """A replica within the lag bound serves reads, and lag checks are cached."""
+    primary, with_replica = pools
+    replica = with_replica(FakePool(lag=0.5))
+
+    first = asyncio.run(database.get_read_only_db())
+    second = asyncio.run(database.get_read_only_db())
+
+    assert first.pool is replica and first.read_only
+    assert second.pool is replica
+    assert replica.checks == 1
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("replica", [FakePool(lag=45.0), FakePool(fail=True), None])
+def test_reads_fall_back_to_primary(pools, replica):
+    """Lagging, unreachable or unconfigured replicas route reads to the primary."""
+    primary, with_replica = pools
+    with_replica(replica)
+
+    db = asyncio.run(database.get_read_only_db())
+    assert db.pool is primary and db.read_only
+
+
+@pytest.mark.unit
+def test_route_lag_bound_is_tighter_than_default(pools):
+    """Per-route max lag overrides the service-wide bound."""
+    primary, with_replica = pools
+    with_replica(FakePool(lag=5.0))
+
+    assert asyncio.run(database.get_read_db()).pool is not primary
+    assert asyncio.run(database.read_db(max_lag_seconds=2)()).pool is primary
@@ -0,0 +1,92 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "services" / "ledger"))
+
+from apple_receipt_verification import AppleReceiptVerificationService  # noqa: E402
+from receipt_verification import ReceiptVerifier, receipt_digest  # noqa: E402
+
+from tests.stubs.apple_receipt import create_app, make_receipt  # noqa: E402
+
+BUNDLE_ID = "com.example.fairydust"
+
+
+class FakeRedis:
+    """Just the string commands the verifier's verify path uses"""
+
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+
+def verifier_for(stub, redis_client=None):
+    service = AppleReceiptVerificationService(transport=httpx.ASGITransport(app=stub))
+    service.bundle_id = BUNDLE_ID
+    return ReceiptVerifier(redis_client or FakeRedis(), service)
+
+
+@pytest.mark.unit
+def test_concurrent_and_repeated_verifications_call_apple_once():
+    """Overlapping calls share one Apple request; later ones are served from the cache."""
+    stub = create_app(delay=0.05)
+    verifier = verifier_for(stub)
+    receipt = make_receipt(BUNDLE_ID, "dust_100", transaction_id="1000001")
+
+    async def run():
+        results = await asyncio.gather(*(verifier.verify(receipt, "dust_100") for _ in range(5)))
+        results.append(await verifier.verify(receipt, "dust_100"))
+        return results
+
+    results = asyncio.run(run())
+
+    assert len(stub.state.requests) == 1
+    assert all(is_valid and error is None for is_valid, _, error in results)
+    assert asyncio.run(verifier.cached_transaction("1000001"))["status"] == 0
+
+
+@pytest.mark.unit
+def test_wrong_environment_falls_back_and_caches_the_result():
+    """A production receipt sent to the sandbox is retried against production."""
+    stub = create_app()
+    verifier = verifier_for(stub)
+    receipt = make_receipt(BUNDLE_ID, "dust_50", environment="Production")
+
+    is_valid, response, _ = asyncio.run(verifier.verify(receipt, "dust_50"))
+
+    assert is_valid and response["environment"] == "Production"
+    assert [env for env, _ in stub.state.requests] == ["Sandbox", "Production"]
+
+
+@pytest.mark.unit
+def test_permanent_rejections_are_cached_but_transient_errors_are_not():
+    """Retrying a malformed receipt fails from cache; Apple being down is asked again."""
+    stub = create_app()
+    redis_client = FakeRedis()
+    verifier = verifier_for(stub, redis_client)
+    malformed = make_receipt(BUNDLE_ID, "dust_50", status=21003)
+    unavailable = make_receipt(BUNDLE_ID, "dust_50", status=21005)
+
+    async def run():
+        for receipt in (malformed, malformed, unavailable, unavailable):
+            is_valid, _, _ = await verifier.verify(receipt, "dust_50")
+            assert not is_valid
+
+    asyncio.run(run())
+
+    assert [receipt for _, receipt in stub.state.requests] == [malformed, unavailable, unavailable]
+    assert f"apple_receipt:{receipt_digest(malformed, 'dust_50')}" in redis_client.values
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from shared.auth_middleware import JWT_ALGORITHM, JWT_SECRET_KEY, verify_token
+from shared.sessions import RevocationCache, _hash_token, check_refresh, revocations
+
+
+class FakeRedis:
+    """A sessions hash and the revocations sorted set"""
+
+    def __init__(self, hashes=None, revoked=None):
+        self.hashes = hashes or {}
+        self.revoked = revoked or {}
+
+    async def hmget(self, key, *fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    async def zremrangebyscore(self, key, low, high):
+        self.revoked = {m: score for m, score in self.revoked.items() if score > high}
+
+    async def zrangebyscore(self, key, low, high, withscores):
+        return [(m, score) for m, score in self.revoked.items() if score >= low]
+
+
+def token(**claims):
+    return jwt.encode(
+        {"user_id": "user-1", "fairyname": "pixie", "type": "access", **claims},
+        JWT_SECRET_KEY,
+        algorithm=JWT_ALGORITHM,
+    )
+
+
+@pytest.mark.unit
+def test_revocations_by_session_and_version():
+    cache = RevocationCache()
+    expires_at = time.time() + 60
+    redis = FakeRedis(
+        revoked={
+            "session:abc": expires_at,
+            "user:user-1:2": expires_at,
+            "user:user-2:1": time.time() - 1,
+        }
+    )
+    asyncio.run(cache.load(redis))
+
+    assert cache.is_revoked("user-3", "abc")
+    assert cache.is_revoked("user-1", "def", 1)
+    assert not cache.is_revoked("user-1", "def", 2)
+    # Expired revocations are dropped; tokens from before them have expired too
+    assert not cache.is_revoked("user-2", None, 0)
+
+    cache.apply("user:user-1:3", expires_at)
+    assert cache.is_revoked("user-1", "def", 2)
+
+
+@pytest.mark.unit
+def test_verify_token_rejects_revoked_and_refresh_tokens(monkeypatch):
+    cache = RevocationCache()
+    cache.apply("session:abc", time.time() + 60)
+    monkeypatch.setattr(revocations, "_sessions", cache._sessions)
+
+    assert verify_token(token(sid="def", ver=0)).session_id == "def"
+    for bad in (token(sid="abc"), token(sid="def", type="refresh")):
+        with pytest.raises(HTTPException) as error:
+            verify_token(bad)
+        assert error.value.status_code == 401
+
+
+@pytest.mark.unit
+def test_check_refresh_accepts_only_the_sessions_current_token():
+    session = {"refresh_hash": _hash_token("current"), "expires_at": time.time() + 60}
+    redis = FakeRedis({"sessions:user-1": {"s:abc": json.dumps(session), "v": "2"}})
+
+    assert asyncio.run(check_refresh(redis, "user-1", "abc", "current")) == 2
+    assert asyncio.run(check_refresh(redis, "user-1", "abc", "older")) is None
+    assert asyncio.run(check_refresh(redis, "user-1", "other", "current")) is None
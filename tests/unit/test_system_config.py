@@ -0,0 +1,124 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from shared.llm_client import DEFAULT_GLOBAL_FALLBACKS, global_fallbacks_from_config
+from shared.system_config import SystemConfig
+
+
+class FakeConnection:
+    def __init__(self, events):
+        self.events = events
+
+    async def add_listener(self, channel, callback):
+        self.events.append("listen")
+
+    async def remove_listener(self, channel, callback):
+        self.events.append("unlisten")
+
+    def is_closed(self):
+        return False
+
+
+class FakePool:
+    def __init__(self, events):
+        self.connection = FakeConnection(events)
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.connection
+
+
+class FakeDatabase:
+    """A system_config table"""
+
+    def __init__(self, rows):
+        self.rows = dict(rows)
+        self.events = []
+        self.pool = FakePool(self.events)
+
+    async def fetch_all(self, query, *args):
+        self.events.append("load")
+        return [{"key": key, "value": value} for key, value in self.rows.items()]
+
+    async def fetch_one(self, query, key):
+        return {"value": self.rows[key]} if key in self.rows else None
+
+
+@pytest.mark.unit
+def test_load_parses_known_keys_and_skips_history():
+    db = FakeDatabase(
+        {
+            "daily_login_bonus_amount": "10",
+            "initial_dust_amount": "not a number",
+            "model_pricing": '{"openai": {}}',
+            "model_pricing_history_1700000000": '{"old": true}',
+            "llm_fallback_1_provider": "openai",
+        }
+    )
+    config = SystemConfig()
+    assert config.get("daily_login_bonus_amount") == 5
+
+    asyncio.run(config.load(db))
+
+    assert config.loaded
+    assert config.get("daily_login_bonus_amount") == 10
+    # Unparseable values fall back to the key's default
+    assert config.get("initial_dust_amount") == 100
+    assert config.get("model_pricing") == {"openai": {}}
+    assert config.get("model_pricing_history_1700000000") is None
+    assert config.with_prefix("llm_") == {"llm_fallback_1_provider": "openai"}
+
+
+@pytest.mark.unit
+def test_refresh_key_applies_changes_and_deletes():
+    db = FakeDatabase({"daily_login_bonus_amount": "10"})
+    config = SystemConfig()
+    asyncio.run(config.load(db))
+
+    db.rows["daily_login_bonus_amount"] = "25"
+    asyncio.run(config.refresh_key(db, "daily_login_bonus_amount"))
+    assert config.get("daily_login_bonus_amount") == 25
+
+    del db.rows["daily_login_bonus_amount"]
+    asyncio.run(config.refresh_key(db, "daily_login_bonus_amount"))
+    assert config.get("daily_login_bonus_amount") == 5
+
+
+@pytest.mark.unit
+def test_start_listens_before_loading():
+    """A change committed between the first load and LISTEN can't be missed."""
+    db = FakeDatabase({"daily_login_bonus_amount": "10"})
+    config = SystemConfig()
+
+    async def run():
+        await config.start(db)
+        assert config.get("daily_login_bonus_amount") == 10
+        await config.stop()
+
+    asyncio.run(run())
+    assert db.events == ["listen", "load", "unlisten"]
+
+
+@pytest.mark.unit
+def test_global_fallbacks_from_config():
+    assert global_fallbacks_from_config({}) == DEFAULT_GLOBAL_FALLBACKS
+    assert global_fallbacks_from_config(
+        {
+            "llm_primary_provider": "anthropic",
+            "llm_primary_model": "claude-3-5-haiku-20241022",
+            "llm_fallback_2_provider": "openai",
+            "llm_fallback_2_model": "gpt-4o-mini",
+            "llm_fallback_1_provider": "deepseek",
+            "llm_fallback_1_model": "deepseek-chat",
+        }
+    ) == [
+        ("anthropic", "claude-3-5-haiku-20241022"),
+        ("deepseek", "deepseek-chat"),
+        ("openai", "gpt-4o-mini"),
+    ]
+    # Like the admin endpoint, an unset primary defaults instead of being dropped
+    assert global_fallbacks_from_config(
+        {"llm_fallback_1_provider": "openai", "llm_fallback_1_model": "gpt-4o-mini"}
+    ) == [("anthropic", "claude-3-5-sonnet-20241022"), ("openai", "gpt-4o-mini")]